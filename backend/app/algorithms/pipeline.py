@@ -59,8 +59,10 @@ class AlgorithmPipeline:
         try:
             # 首先从数据库查询旬计划数据
             logger.info(f"从数据库查询旬计划数据 - 批次ID: {import_batch_id}")
+            # 排产基于刚导入的旬计划，读主库，避免副本复制延迟导致数据缺失
             raw_plan_data = await DatabaseQueryService.get_decade_plans(
-                import_batch_id=import_batch_id
+                import_batch_id=import_batch_id,
+                primary=True
             )
             
             if not raw_plan_data:
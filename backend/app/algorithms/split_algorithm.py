@@ -676,7 +676,7 @@ class SplitAlgorithm(AlgorithmBase):
         Returns:
             AlgorithmResult: 拆分结果
         """
-        from app.services.database_query_service import DatabaseQueryService
+        from app.services.reference_data_cache import reference_data_cache
         
         result = self.create_result()
         result.input_data = input_data
@@ -688,8 +688,8 @@ class SplitAlgorithm(AlgorithmBase):
         
         # 从数据库查询拆分规则和机台关系
         split_rules = await self._get_split_rules_from_db()
-        machine_relations = await DatabaseQueryService.get_machine_relations()
-        machine_speeds = await DatabaseQueryService.get_machine_speeds()
+        machine_relations = await reference_data_cache.get_machine_relations()
+        machine_speeds = await reference_data_cache.get_machine_speeds()
         
         # 标记使用了真实数据库数据
         result.metrics.custom_metrics = {
@@ -189,7 +189,7 @@ class TimeCorrection(AlgorithmBase):
         Returns:
             AlgorithmResult: 校正结果
         """
-        from app.services.database_query_service import DatabaseQueryService
+        from app.services.reference_data_cache import reference_data_cache
         
         result = self.create_result()
         result.input_data = input_data
@@ -199,12 +199,12 @@ class TimeCorrection(AlgorithmBase):
         machine_codes = list(set(order.get('maker_code') for order in input_data if order.get('maker_code')))
         
         # 查询轮保计划
-        maintenance_plans = await DatabaseQueryService.get_maintenance_plans(machine_codes=machine_codes)
+        maintenance_plans = await reference_data_cache.get_maintenance_plans(machine_codes=machine_codes)
         
         # 查询班次配置 
-        shift_configs_list = await DatabaseQueryService.get_shift_config()
+        shift_configs_list = await reference_data_cache.get_shift_config()
         # 查询机台速度配置
-        machine_speeds = await DatabaseQueryService.get_machine_speeds()
+        machine_speeds = await reference_data_cache.get_machine_speeds()
         
         shift_config = {'shifts': shift_configs_list} if shift_configs_list else self._get_default_shift_config()
         
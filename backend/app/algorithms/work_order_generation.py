@@ -391,7 +391,7 @@ class WorkOrderGeneration(AlgorithmBase):
         Returns:
             AlgorithmResult: 工单生成结果
         """
-        from app.services.database_query_service import DatabaseQueryService
+        from app.services.reference_data_cache import reference_data_cache
         
         result = self.create_result()
         result.input_data = input_data
@@ -402,8 +402,8 @@ class WorkOrderGeneration(AlgorithmBase):
             return self.finalize_result(result)
         
         # 查询机台关系和速度配置
-        machine_relations = await DatabaseQueryService.get_machine_relations()
-        machine_speeds = await DatabaseQueryService.get_machine_speeds()
+        machine_relations = await reference_data_cache.get_machine_relations()
+        machine_speeds = await reference_data_cache.get_machine_speeds()
         
         # 标记使用了真实数据库数据
         result.metrics.custom_metrics = {
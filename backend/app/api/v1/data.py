@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 from datetime import datetime
 
-from app.db.connection import get_async_session
+from app.db.connection import get_async_session, get_read_session
 from app.schemas.base import (
     ImportPlanListResponse, PaginatedResponse, ImportPlanInfo,
     ImportPlanQuery, SuccessResponse, MachineInfo, MaterialInfo
@@ -157,7 +157,7 @@ async def list_machines(
     machine_type: Optional[str] = Query(None, description="机台类型过滤"),
     status: Optional[str] = Query(None, description="状态过滤"),
     search: Optional[str] = Query(None, description="搜索关键词（机台代码或名称）"),
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     分页查询机台列表
@@ -242,7 +242,7 @@ async def list_materials(
     package_type: Optional[str] = Query(None, description="包装类型过滤"),
     status: Optional[str] = Query(None, description="状态过滤"),
     search: Optional[str] = Query(None, description="搜索关键词（物料编号或名称）"),
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     分页查询物料列表
@@ -325,7 +325,7 @@ async def list_materials(
 
 @router.get("/statistics")
 async def get_system_statistics(
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取系统统计信息
@@ -4,16 +4,21 @@ APS智慧排产系统 - 机台配置管理API
 提供机台、机台关系、机台速度、维护计划、班次配置等基础数据的CRUD功能
 """
 from typing import Optional, List
-from datetime import datetime, time
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date, datetime, time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, delete, and_, or_
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, Field
 
 from app.db.connection import get_async_session
 from app.schemas.base import SuccessResponse
 from app.models.base_models import Machine
 from app.models.machine_config_models import MachineRelation, MachineSpeed, MaintenancePlan, ShiftConfig
+from app.services.reference_data_cache import invalidate_reference_data
+from app.services.machine_config_bulk import (
+    BulkValidationError, MachineConfigBulkService, build_table_specs, parse_bulk_payload
+)
 
 router = APIRouter(prefix="/machines", tags=["机台配置管理"])
 
@@ -34,6 +39,7 @@ class MachineRelationRequest(BaseModel):
     maker_code: str = Field(..., max_length=20, description="卷包机代码")
     relation_type: str = Field(..., max_length=20, description="关系类型")
     priority: int = Field(..., description="优先级")
+    effective_from: Optional[date] = Field(None, description="生效日期，默认当天")
 
 
 class MachineSpeedRequest(BaseModel):
@@ -66,6 +72,7 @@ class ShiftConfigRequest(BaseModel):
     start_time: time = Field(..., description="开始时间")
     end_time: time = Field(..., description="结束时间")
     is_active: bool = Field(default=True, description="是否激活")
+    effective_from: Optional[date] = Field(None, description="生效日期，默认当天")
 
 
 # === 机台基础信息 CRUD ===
@@ -155,6 +162,7 @@ async def create_machine(
         
         db.add(machine)
         await db.commit()
+        await invalidate_reference_data()
         await db.refresh(machine)
         
         return SuccessResponse(message="机台创建成功", data={"id": machine.id})
@@ -195,6 +203,7 @@ async def update_machine(
         machine.status = request.status
         
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="机台更新成功")
     except HTTPException:
@@ -218,6 +227,7 @@ async def delete_machine(
         
         await db.execute(delete(Machine).where(Machine.id == machine_id))
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="机台删除成功")
     except HTTPException:
@@ -294,11 +304,13 @@ async def create_machine_relation(
             feeder_code=request.feeder_code,
             maker_code=request.maker_code,
             relation_type=request.relation_type,
-            priority=request.priority
+            priority=request.priority,
+            effective_from=request.effective_from or date.today()
         )
         
         db.add(relation)
         await db.commit()
+        await invalidate_reference_data()
         await db.refresh(relation)
         
         return SuccessResponse(message="机台关系创建成功", data={"id": relation.id})
@@ -326,6 +338,7 @@ async def update_machine_relation(
         relation.priority = request.priority
         
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="机台关系更新成功")
     except HTTPException:
@@ -349,6 +362,7 @@ async def delete_machine_relation(
         
         await db.execute(delete(MachineRelation).where(MachineRelation.id == relation_id))
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="机台关系删除成功")
     except HTTPException:
@@ -438,6 +452,7 @@ async def create_machine_speed(
         
         db.add(speed)
         await db.commit()
+        await invalidate_reference_data()
         await db.refresh(speed)
         
         return SuccessResponse(message="机台速度创建成功", data={"id": speed.id})
@@ -471,6 +486,7 @@ async def update_machine_speed(
             speed.status = request.status
         
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="机台速度更新成功")
     except HTTPException:
@@ -494,6 +510,7 @@ async def delete_machine_speed(
         
         await db.execute(delete(MachineSpeed).where(MachineSpeed.id == speed_id))
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="机台速度删除成功")
     except HTTPException:
@@ -595,6 +612,7 @@ async def create_maintenance_plan(
         
         db.add(plan)
         await db.commit()
+        await invalidate_reference_data()
         await db.refresh(plan)
         
         return SuccessResponse(message="维护计划创建成功", data={"id": plan.id})
@@ -639,6 +657,7 @@ async def update_maintenance_plan(
         plan.maint_description = request.description
         
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="维护计划更新成功")
     except HTTPException:
@@ -662,6 +681,7 @@ async def delete_maintenance_plan(
         
         await db.execute(delete(MaintenancePlan).where(MaintenancePlan.id == plan_id))
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="维护计划删除成功")
     except HTTPException:
@@ -737,19 +757,18 @@ async def create_shift_config(
 ):
     """创建班次配置"""
     try:
-        from datetime import datetime
-        
         config = ShiftConfig(
             shift_name=request.shift_name,
             machine_name=request.shift_code,  # 使用 machine_name 字段存储班次代码
             start_time=request.start_time,
             end_time=request.end_time,
-            effective_from=datetime.now(),  # 设置必需的生效开始时间
+            effective_from=request.effective_from or datetime.now(),  # 设置必需的生效开始时间
             status='ACTIVE' if request.is_active else 'INACTIVE'
         )
         
         db.add(config)
         await db.commit()
+        await invalidate_reference_data()
         await db.refresh(config)
         
         return SuccessResponse(message="班次配置创建成功", data={"id": config.id})
@@ -778,6 +797,7 @@ async def update_shift_config(
         config.status = 'ACTIVE' if request.is_active else 'INACTIVE'
         
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="班次配置更新成功")
     except HTTPException:
@@ -801,6 +821,7 @@ async def delete_shift_config(
         
         await db.execute(delete(ShiftConfig).where(ShiftConfig.id == config_id))
         await db.commit()
+        await invalidate_reference_data()
         
         return SuccessResponse(message="班次配置删除成功")
     except HTTPException:
@@ -808,3 +829,77 @@ async def delete_shift_config(
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"删除班次配置失败: {str(e)}")
+
+
+# === 批量新增/更新与删除 ===
+
+BULK_TABLE_SPECS = build_table_specs({
+    "machines": MachineRequest,
+    "machine-relations": MachineRelationRequest,
+    "machine-speeds": MachineSpeedRequest,
+    "maintenance-plans": MaintenancePlanRequest,
+    "shift-configs": ShiftConfigRequest,
+})
+
+
+def _get_bulk_spec(table: str):
+    spec = BULK_TABLE_SPECS.get(table)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"不支持批量写入的配置表: {table}")
+    return spec
+
+
+@router.post("/{table}/bulk")
+async def bulk_upsert_machine_config(
+    table: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    批量新增/更新机台配置
+    
+    table: machines / machine-relations / machine-speeds / maintenance-plans / shift-configs；
+    请求体为与单行新增接口字段相同的JSON数组，或 Content-Type: text/csv 的CSV（表头为字段名）。
+    按唯一键新增或更新，整批校验、单事务写入
+    """
+    spec = _get_bulk_spec(table)
+    try:
+        items = parse_bulk_payload(await request.body(), request.headers.get("content-type"))
+        rows = MachineConfigBulkService.validate_rows(spec, items)
+    except BulkValidationError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "errors": e.errors})
+    
+    try:
+        result = await MachineConfigBulkService.upsert(db, spec, rows)
+        return SuccessResponse(message=f"批量写入{result['rows']}条配置成功", data=result)
+    except IntegrityError as e:
+        raise HTTPException(status_code=400, detail=f"批量写入违反数据约束，已全部回滚: {str(e.orig)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量写入配置失败: {str(e)}")
+
+
+@router.post("/{table}/bulk-delete")
+async def bulk_delete_machine_config(
+    table: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    批量删除机台配置
+    
+    请求体为主键ID数组，或包含唯一键字段的对象数组/CSV；单事务删除
+    """
+    spec = _get_bulk_spec(table)
+    try:
+        items = parse_bulk_payload(await request.body(), request.headers.get("content-type"))
+        mode, targets = MachineConfigBulkService.resolve_delete_targets(spec, items)
+    except BulkValidationError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "errors": e.errors})
+    
+    try:
+        result = await MachineConfigBulkService.delete(db, spec, mode, targets)
+        return SuccessResponse(message=f"批量删除{result['deleted']}条配置成功", data=result)
+    except IntegrityError as e:
+        raise HTTPException(status_code=400, detail=f"配置仍被引用，已全部回滚: {str(e.orig)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量删除配置失败: {str(e)}")
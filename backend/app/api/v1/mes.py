@@ -5,10 +5,18 @@ APS智慧排产系统 - MES集成API路由
 """
 from typing import List, Optional, Dict, Any
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.db.connection import get_async_session, get_read_session
 from app.services.mes_integration import mes_service
+from app.services.mes_data_export_service import MESDataExportService
+from app.services.mes_outbox import (
+    DISPATCH_STATUSES, MESOutboxService, OutboxValidationError, notify_mes_outbox_dispatcher
+)
 from app.schemas.base import SuccessResponse, ErrorResponse
 
 router = APIRouter(prefix="/mes", tags=["MES系统集成"])
@@ -38,16 +46,40 @@ class MachineStatusRequest(BaseModel):
 
 
 @router.post("/work-orders/push")
-async def push_work_orders_to_mes(request: WorkOrderPushRequest):
+async def push_work_orders_to_mes(
+    request: WorkOrderPushRequest,
+    enqueue: bool = Query(False, description="写入下发记录由后台分发器推送，不等待MES响应"),
+    db: AsyncSession = Depends(get_async_session)
+):
     """
     推送工单到MES系统
     
     Args:
         request: 工单推送请求
+        enqueue: 为true时工单写入下发记录后立即返回（需启用MES发件箱），
+            有工单缺少 plan_id/work_order_nr 时整批不写入并返回422
         
     Returns:
         推送结果
     """
+    if enqueue:
+        if not settings.mes_outbox_enabled:
+            raise HTTPException(status_code=400, detail="未启用MES发件箱（APS_MES_OUTBOX_ENABLED）")
+        dispatch_batch_id = f"PUSH_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        try:
+            queued = await MESOutboxService.enqueue(db, request.work_orders, dispatch_batch_id)
+            await db.commit()
+        except OutboxValidationError as e:
+            raise HTTPException(status_code=422, detail={"message": str(e), "errors": e.errors})
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"写入下发记录失败: {str(e)}")
+        notify_mes_outbox_dispatcher()
+        return SuccessResponse(
+            code=200,
+            message=f"{queued}个工单已加入下发队列",
+            data={'dispatch_batch_id': dispatch_batch_id, 'queued_count': queued}
+        )
+    
     try:
         mes_response = await mes_service.send_work_order_to_mes(request.work_orders)
         
@@ -165,6 +197,105 @@ async def get_machine_status(request: MachineStatusRequest):
         raise HTTPException(status_code=500, detail=f"获取机台状态失败: {str(e)}")
 
 
+@router.get("/work-orders/export")
+async def export_mes_work_orders(
+    task_id: Optional[str] = Query(None, description="排产任务ID"),
+    start_date: Optional[datetime] = Query(None, description="计划开始时间下限（未指定任务时使用）"),
+    end_date: Optional[datetime] = Query(None, description="计划开始时间上限（未指定任务时使用）"),
+    export_format: str = Query("XML", description="导出格式 XML/JSON"),
+    compress: bool = Query(False, description="是否gzip压缩"),
+    include_archive: bool = Query(False, description="按日期范围导出时是否包含归档工单")
+):
+    """
+    流式导出MES工单文档
+    
+    按任务或日期范围逐批读取喂丝机/卷包机工单，逐个元素输出MES规范的XML/JSON文档
+    
+    Returns:
+        MES文档文件流（compress时为 .gz）
+    """
+    export_format = export_format.upper()
+    if export_format not in ("XML", "JSON"):
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {export_format}")
+    
+    service = MESDataExportService()
+    if task_id:
+        chunks = service.stream_export_by_task(task_id, export_format, compress=compress)
+    elif start_date and end_date:
+        chunks = service.stream_export_by_date_range(
+            start_date, end_date, export_format, include_archive=include_archive, compress=compress
+        )
+    else:
+        raise HTTPException(status_code=400, detail="需要指定任务ID或日期范围")
+    
+    extension = export_format.lower()
+    filename = f"mes_work_orders_{task_id or start_date.strftime('%Y%m%d')}.{extension}"
+    media_type = "application/xml" if export_format == "XML" else "application/json"
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/outbox")
+async def get_mes_outbox(
+    dispatch_batch_id: Optional[str] = Query(None, description="下发批次ID（排产任务ID或推送批次号）"),
+    dispatch_status: Optional[str] = Query(None, description="下发状态 PENDING/DISPATCHED/CONFIRMED/FAILED"),
+    work_order_nrs: Optional[List[str]] = Query(None, description="工单号"),
+    limit: int = Query(100, ge=1, le=1000, description="返回的下发记录数"),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    查询MES工单下发状态
+    
+    Returns:
+        各下发状态的记录数和各工单的下发记录
+    """
+    if dispatch_status and dispatch_status not in DISPATCH_STATUSES:
+        raise HTTPException(status_code=400, detail=f"不支持的下发状态: {dispatch_status}")
+    try:
+        summary = await MESOutboxService.get_summary(db, dispatch_batch_id)
+        records = await MESOutboxService.get_records(
+            db, dispatch_batch_id, dispatch_status, work_order_nrs, limit
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询下发状态失败: {str(e)}")
+    return SuccessResponse(
+        code=200,
+        message=f"查询到{len(records)}条下发记录",
+        data={**summary, 'records': records}
+    )
+
+
+@router.post("/outbox/tasks/{task_id}")
+async def enqueue_task_work_orders(task_id: str, db: AsyncSession = Depends(get_async_session)):
+    """
+    将排产任务的全部工单加入下发队列（启用发件箱前生成的任务，或需要整体重新下发时使用）
+    
+    Returns:
+        各工单类型加入队列的数量
+    """
+    if not settings.mes_outbox_enabled:
+        raise HTTPException(status_code=400, detail="未启用MES发件箱（APS_MES_OUTBOX_ENABLED）")
+    try:
+        counts = await MESOutboxService.enqueue_task_orders(db, task_id)
+        await db.commit()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"写入下发记录失败: {str(e)}")
+    if not any(counts.values()):
+        raise HTTPException(status_code=404, detail=f"排产任务没有工单: {task_id}")
+    notify_mes_outbox_dispatcher()
+    return SuccessResponse(
+        code=200,
+        message=f"{sum(counts.values())}个工单已加入下发队列",
+        data={'dispatch_batch_id': task_id, 'queued_counts': counts}
+    )
+
+
 @router.get("/events/recent")
 async def get_recent_production_events():
     """
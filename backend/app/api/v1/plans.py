@@ -5,22 +5,34 @@ APS智慧排产系统 - 文件上传API
 支持异步文件处理和详细的错误报告
 """
 import os
+import re
+import time
 import uuid
+import hashlib
+import logging
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert
 
 from app.core.config import settings
-from app.db.connection import get_async_session
+from app.db.connection import get_async_session, get_read_session, get_db_session
+from app.core.responses import success_response
 from app.schemas.base import (
     FileUploadResponse, ImportBatchInfo, ParseRequest, ParseResponse,
-    SuccessResponse, ErrorResponse
+    ParseResultRecord, ParseErrorInfo, SuccessResponse, ErrorResponse
 )
-from app.services.excel_parser import parse_production_plan_excel, ExcelParseError
+from app.services.excel_parser import ExcelParseError
+from app.services.parse_result_cache import ParseResultCache
+from app.services.parse_worker_pool import run_in_parse_pool
+from app.services.plan_allocation import allocate_aggregate_values
 from app.models.base_models import ImportPlan, DecadePlan
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/plans", tags=["计划文件管理"])
 
 
@@ -88,32 +100,112 @@ async def check_filename_uniqueness(
     return None
 
 
-async def save_uploaded_file(file: UploadFile) -> str:
-    """保存上传的文件并返回文件路径"""
-    # 生成唯一文件名
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(settings.upload_temp_dir, unique_filename)
+def _write_chunk(buffer, hasher, chunk: bytes) -> None:
+    """写入一块数据并更新哈希（在线程池中执行，hashlib处理大块数据时释放GIL）"""
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+
+def _discard_file(path: str) -> None:
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def _commit_uploaded_file(temp_path: str, file_path: str) -> None:
+    """临时文件原子重命名为最终文件，相同内容的文件已存在时丢弃临时文件"""
+    if os.path.exists(file_path):
+        os.unlink(temp_path)
+    else:
+        os.replace(temp_path, file_path)
+
+
+async def save_uploaded_file(file: UploadFile) -> Tuple[str, str, int]:
+    """
+    分块流式保存上传的文件，读取的同时计算内容SHA-256并检查大小限制
+    
+    Starlette在调用接口前已将请求体缓存到临时文件，请求本身的大小由 UploadSizeLimitMiddleware 限制；
+    这里的逐块检查只保证保存的文件不超过 upload_max_size。
+    每次只持有一块数据（upload_read_chunk_size），内存占用与文件大小无关；
+    文件写入、哈希计算和重命名在线程池中执行，不阻塞事件循环。
+    先写入临时文件，完成后按内容哈希原子重命名，相同内容的文件只保存一份
+    
+    Returns:
+        Tuple[str, str, int]: (文件路径, 内容哈希, 文件大小)
+        
+    Raises:
+        HTTPException: 文件超过 upload_max_size（400）或保存失败（500）
+    """
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    temp_path = os.path.join(settings.upload_temp_dir, f"{uuid.uuid4()}{file_extension}.part")
     
     # 保存文件
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        return file_path
+        hasher = hashlib.sha256()
+        file_size = 0
+        buffer = await run_in_threadpool(open, temp_path, "wb")
+        try:
+            while True:
+                chunk = await file.read(settings.upload_read_chunk_size)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                # multipart开销允许的余量内文件仍可能超过 upload_max_size，复制时截断
+                if file_size > settings.upload_max_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"文件大小超过限制：超过{settings.upload_max_size}字节，最大允许：{settings.upload_max_size}字节"
+                    )
+                await run_in_threadpool(_write_chunk, buffer, hasher, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
+        
+        content_hash = hasher.hexdigest()
+        file_path = os.path.join(settings.upload_temp_dir, f"{content_hash}{file_extension}")
+        await run_in_threadpool(_commit_uploaded_file, temp_path, file_path)
+        return file_path, content_hash, file_size
+    except HTTPException:
+        await run_in_threadpool(_discard_file, temp_path)
+        raise
     except Exception as e:
         # 清理失败的文件
-        if os.path.exists(file_path):
-            os.unlink(file_path)
+        await run_in_threadpool(_discard_file, temp_path)
         raise HTTPException(status_code=500, detail=f"文件保存失败：{str(e)}")
 
 
+async def find_batch_by_content_hash(db: AsyncSession, content_hash: str) -> Optional[ImportPlan]:
+    """查找相同文件内容的最近一次已解析导入批次"""
+    from sqlalchemy import select, desc
+    
+    result = await db.execute(
+        select(ImportPlan)
+        .where(
+            ImportPlan.content_hash == content_hash,
+            ImportPlan.import_status == "COMPLETED"
+        )
+        .order_by(desc(ImportPlan.created_time))
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def is_file_shared(db: AsyncSession, file_path: str, exclude_id: int) -> bool:
+    """文件是否仍被其他导入批次引用（相同内容的上传共用一个文件）"""
+    from sqlalchemy import select, func
+    
+    result = await db.execute(
+        select(func.count()).select_from(ImportPlan)
+        .where(ImportPlan.file_path == file_path, ImportPlan.id != exclude_id)
+    )
+    return result.scalar() > 0
+
+
 async def create_import_record(
     db: AsyncSession, 
     import_batch_id: str,
     file_name: str,
     file_path: str,
-    file_size: int
+    file_size: int,
+    content_hash: Optional[str] = None
 ) -> ImportPlan:
     """创建导入记录"""
     import_plan = ImportPlan(
@@ -121,6 +213,7 @@ async def create_import_record(
         file_name=file_name,
         file_path=file_path,
         file_size=file_size,
+        content_hash=content_hash,
         import_status="UPLOADING",
         import_start_time=datetime.now(),
         created_by="api_user"
@@ -141,7 +234,7 @@ async def upload_excel_file(
     """
     上传Excel文件接口
     
-    支持的文件格式：.xlsx, .xls
+    支持的文件格式：.xlsx, .xls，以及上游系统导出的 .csv, .parquet（内容与xlsx工作表相同）
     最大文件大小：50MB
     
     Args:
@@ -161,8 +254,9 @@ async def upload_excel_file(
         
         # 如果需要覆盖已存在的文件，先处理旧记录
         if existing_plan:
-            # 删除旧的文件
-            if existing_plan.file_path and os.path.exists(existing_plan.file_path):
+            # 删除旧的文件（其他批次仍引用相同内容的文件时保留）
+            if (existing_plan.file_path and os.path.exists(existing_plan.file_path)
+                    and not await is_file_shared(db, existing_plan.file_path, existing_plan.id)):
                 try:
                     os.unlink(existing_plan.file_path)
                 except Exception as e:
@@ -180,8 +274,11 @@ async def upload_excel_file(
             )
             await db.commit()
         
-        # 保存文件
-        file_path = await save_uploaded_file(file)
+        # 保存文件（同时计算内容哈希）
+        file_path, content_hash, file_size = await save_uploaded_file(file)
+        
+        # 相同内容的已解析批次，新批次解析时直接复用其解析结果
+        duplicate_plan = await find_batch_by_content_hash(db, content_hash)
         
         # 创建导入记录
         import_plan = await create_import_record(
@@ -189,24 +286,32 @@ async def upload_excel_file(
             import_batch_id=import_batch_id,
             file_name=file.filename,
             file_path=file_path,
-            file_size=file.size or 0
+            file_size=file_size,
+            content_hash=content_hash
         )
         
         # 准备响应数据
         upload_info = ImportBatchInfo(
             import_batch_id=import_batch_id,
             file_name=file.filename,
-            file_size=file.size or 0,
+            file_size=file_size,
             upload_time=import_plan.created_time
         )
         
         # 根据是否覆盖文件生成不同的响应消息
         message = "文件覆盖上传成功" if existing_plan else "文件上传成功"
         
+        data = upload_info.model_dump()
+        data.update({
+            "content_hash": content_hash,
+            "duplicate_of_batch_id": duplicate_plan.import_batch_id if duplicate_plan else None,
+            "parse_result_cached": await ParseResultCache.is_cached(content_hash),
+        })
+        
         return FileUploadResponse(
             code=200,
             message=message,
-            data=upload_info.model_dump()
+            data=data
         )
         
     except HTTPException:
@@ -218,54 +323,184 @@ async def upload_excel_file(
 async def parse_excel_background(
     import_batch_id: str,
     file_path: str,
-    db: AsyncSession
+    content_hash: Optional[str] = None,
+    force_reparse: bool = False
 ):
-    """后台解析Excel文件"""
-    try:
-        # 更新状态为解析中
-        from sqlalchemy import update
-        await db.execute(
-            update(ImportPlan)
-            .where(ImportPlan.import_batch_id == import_batch_id)
-            .values(
-                import_status="PARSING",
-                import_start_time=datetime.now()
+    """
+    后台解析Excel文件（解析任务）
+    
+    请求返回后执行，使用独立的数据库会话；已有解析结果缓存时复用缓存，解析和聚合分配在解析进程池中进行，
+    否则（或 force_reparse 时）使用流水线分块导入（配置 plan_import_pipeline_enabled）。
+    相同内容已由流水线导入过时复制该批次的旬计划记录，流水线导入完成后记录批次标记供后续复用。
+    进度通过导入记录的 import_status（PARSING / COMPLETED / FAILED）由状态接口查询
+    """
+    from sqlalchemy import update
+    
+    async with get_db_session() as db:
+        try:
+            # 没有可复用的解析结果时，流水线分块解析、分配并写入，不在内存中物化全部记录
+            if settings.plan_import_pipeline_enabled and (
+                force_reparse or not content_hash or not await ParseResultCache.exists(content_hash)
+            ):
+                if content_hash and not force_reparse:
+                    source_batch_id = await ParseResultCache.get_imported_batch(content_hash)
+                    if source_batch_id and await import_from_completed_batch(db, import_batch_id, source_batch_id):
+                        return
+                
+                await import_excel_pipelined(db, import_batch_id, file_path)
+                if content_hash:
+                    await ParseResultCache.set_imported_batch(content_hash, import_batch_id)
+                return
+            
+            # 解析Excel文件（相同内容已解析过时复用结果）
+            parse_result, _ = await ParseResultCache.parse(file_path, content_hash, force=force_reparse)
+            
+            # 写入aps_decade_plan并更新导入记录，一次提交：状态为COMPLETED时旬计划已全部写入，
+            # 写入失败时异常进入下方处理，导入记录标记为FAILED
+            stats = await write_parse_results_to_decade_plan(db, import_batch_id, parse_result)
+            await db.execute(
+                update(ImportPlan)
+                .where(ImportPlan.import_batch_id == import_batch_id)
+                .values(
+                    total_records=parse_result['total_records'],
+                    valid_records=parse_result['valid_records'],
+                    error_records=parse_result['error_records'],
+                    import_status="COMPLETED",
+                    import_end_time=datetime.now()
+                )
             )
-        )
-        await db.commit()
-        
-        # 解析Excel文件
-        parse_result = parse_production_plan_excel(file_path)
-        
-        # 更新导入记录
-        await db.execute(
-            update(ImportPlan)
-            .where(ImportPlan.import_batch_id == import_batch_id)
-            .values(
-                total_records=parse_result['total_records'],
-                valid_records=parse_result['valid_records'],
-                error_records=parse_result['error_records'],
-                import_status="COMPLETED",
-                import_end_time=datetime.now()
+            await db.commit()
+            logger.info(f"后台解析完成 {import_batch_id}: 写入 {stats['rows']} 条旬计划记录")
+            
+        except Exception as e:
+            logger.error(f"后台解析失败 {import_batch_id}: {str(e)}")
+            await db.rollback()
+            # 更新状态为失败
+            await db.execute(
+                update(ImportPlan)
+                .where(ImportPlan.import_batch_id == import_batch_id)
+                .values(
+                    import_status="FAILED",
+                    import_end_time=datetime.now(),
+                    error_message=str(e)
+                )
             )
+            await db.commit()
+
+
+async def import_excel_pipelined(db: AsyncSession, import_batch_id: str, file_path: str) -> Dict[str, Any]:
+    """
+    流水线导入：解析、聚合分配和写入aps_decade_plan并发进行（见 PlanImportPipeline），
+    写入完成后更新导入记录，一次提交。失败时异常由调用方处理
+    """
+    from sqlalchemy import update
+    from app.services.plan_import_pipeline import PlanImportPipeline
+    
+    summary = await PlanImportPipeline(db, import_batch_id, build_decade_plan_values).run(file_path)
+    await db.execute(
+        update(ImportPlan)
+        .where(ImportPlan.import_batch_id == import_batch_id)
+        .values(
+            total_records=summary['total_records'],
+            valid_records=summary['valid_records'],
+            error_records=summary['error_records'],
+            import_status="COMPLETED",
+            import_end_time=datetime.now()
         )
-        await db.commit()
-        
-        # TODO: 将解析结果保存到数据库中的详细表
-        # 这里可以将 parse_result['records'] 保存到 aps_decade_plan 表
-        
-    except Exception as e:
-        # 更新状态为失败
-        await db.execute(
-            update(ImportPlan)
-            .where(ImportPlan.import_batch_id == import_batch_id)
-            .values(
-                import_status="FAILED",
-                import_end_time=datetime.now(),
-                error_message=str(e)
-            )
+    )
+    await db.commit()
+    return summary
+
+
+async def import_from_completed_batch(db: AsyncSession, import_batch_id: str, source_batch_id: str) -> bool:
+    """
+    复用相同内容已导入批次：复制其旬计划记录（INSERT ... SELECT）并更新导入记录，一次提交
+    
+    来源批次不存在或未完成（例如已被覆盖上传删除）时不写入并返回False，由调用方重新解析
+    """
+    from sqlalchemy import delete, literal, select, update
+    
+    result = await db.execute(
+        select(ImportPlan).where(
+            ImportPlan.import_batch_id == source_batch_id,
+            ImportPlan.import_status == "COMPLETED"
         )
-        await db.commit()
+    )
+    source = result.scalar_one_or_none()
+    if source is None:
+        return False
+    
+    table = DecadePlan.__table__
+    columns = [
+        column for column in table.columns
+        if column.name not in ('id', 'created_time', 'updated_time')
+    ]
+    await db.execute(delete(DecadePlan).where(DecadePlan.import_batch_id == import_batch_id))
+    await db.execute(
+        insert(table).from_select(
+            [column.name for column in columns],
+            select(*[
+                literal(import_batch_id).label(column.name) if column.name == 'import_batch_id' else column
+                for column in columns
+            ]).where(table.c.import_batch_id == source_batch_id)
+        )
+    )
+    await db.execute(
+        update(ImportPlan)
+        .where(ImportPlan.import_batch_id == import_batch_id)
+        .values(
+            total_records=source.total_records,
+            valid_records=source.valid_records,
+            error_records=source.error_records,
+            import_status="COMPLETED",
+            import_end_time=datetime.now()
+        )
+    )
+    await db.commit()
+    logger.info(f"导入批次 {import_batch_id} 复用相同内容批次 {source_batch_id} 的旬计划记录")
+    return True
+
+
+# 解析响应中每条记录的字段及默认值，与 ParseResultRecord 相同
+PARSE_RECORD_FIELDS = [
+    (name, None if field.is_required() else field.get_default(call_default_factory=True))
+    for name, field in ParseResultRecord.model_fields.items()
+]
+PARSE_ERROR_FIELDS = list(ParseErrorInfo.model_fields)
+
+
+def build_parse_result_data(import_batch_id: str, parse_result: Dict[str, Any]) -> Dict[str, Any]:
+    """按 ParseResult 的字段和顺序构建解析响应数据（字典），记录只保留 ParseResultRecord 的字段"""
+    return {
+        "import_batch_id": import_batch_id,
+        "total_records": parse_result['total_records'],
+        "valid_records": parse_result['valid_records'],
+        "error_records": parse_result['error_records'],
+        "warning_records": parse_result['warning_records'],
+        "records": [
+            {name: record.get(name, default) for name, default in PARSE_RECORD_FIELDS}
+            for record in parse_result['records']
+        ],
+        "errors": [{name: error.get(name) for name in PARSE_ERROR_FIELDS} for error in parse_result['errors']],
+        "warnings": [{name: warning.get(name) for name in PARSE_ERROR_FIELDS} for warning in parse_result['warnings']],
+        "parse_time": datetime.now(),
+    }
+
+
+def parsing_accepted_response(import_batch_id: str, message: str) -> JSONResponse:
+    """解析任务进行中的202响应，客户端通过状态接口轮询结果"""
+    return JSONResponse(
+        status_code=202,
+        content=SuccessResponse(
+            code=202,
+            message=message,
+            data={
+                "import_batch_id": import_batch_id,
+                "status": "PARSING",
+                "status_url": f"/api/v1/plans/{import_batch_id}/status"
+            }
+        ).model_dump(mode="json")
+    )
 
 
 @router.post("/{import_batch_id}/parse", response_model=ParseResponse)
@@ -273,12 +508,14 @@ async def parse_excel_file(
     import_batch_id: str,
     background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_async_session),
-    force_reparse: bool = False
+    force_reparse: bool = False,
+    background: bool = False
 ):
     """
     解析Excel文件接口
     
-    支持后台异步解析，返回解析任务信息
+    默认等待解析完成后返回解析结果；background=true 时提交后台解析任务并立即返回202，
+    通过 GET /{import_batch_id}/status 查询解析状态。两种方式的解析都在解析进程池中执行
     """
     try:
         # 查找导入记录
@@ -300,19 +537,33 @@ async def parse_excel_file(
         
         # 如果正在解析中
         if import_plan.import_status == "PARSING":
-            return ParseResponse(
-                code=202,
-                message="文件正在解析中，请稍后查询结果",
-                data={
-                    "import_batch_id": import_batch_id,
-                    "status": "PARSING",
-                    "message": "解析进行中..."
-                }
+            return parsing_accepted_response(import_batch_id, "文件正在解析中，请稍后查询结果")
+        
+        # 后台解析：标记为解析中后提交解析任务
+        if background:
+            from sqlalchemy import update
+            await db.execute(
+                update(ImportPlan)
+                .where(ImportPlan.import_batch_id == import_batch_id)
+                .values(
+                    import_status="PARSING",
+                    import_start_time=datetime.now(),
+                    error_message=None
+                )
+            )
+            await db.commit()
+            
+            background_tasks.add_task(
+                parse_excel_background, import_batch_id, import_plan.file_path,
+                import_plan.content_hash, force_reparse
             )
+            return parsing_accepted_response(import_batch_id, "解析任务已提交，请通过状态接口查询解析结果")
         
-        # 直接解析（同步方式，适合小文件）
+        # 直接解析（等待解析完成）；相同内容的文件已解析过时直接复用缓存结果
         try:
-            parse_result = parse_production_plan_excel(import_plan.file_path)
+            parse_result, cache_hit = await ParseResultCache.parse(
+                import_plan.file_path, import_plan.content_hash, force=force_reparse
+            )
             
             # 更新导入记录
             from sqlalchemy import update
@@ -332,39 +583,10 @@ async def parse_excel_file(
             # 保存解析结果到aps_decade_plan表
             await save_parse_results_to_decade_plan(db, import_batch_id, parse_result)
             
-            # 转换解析结果为响应格式
-            from app.schemas.base import ParseResult, ParseResultRecord, ParseErrorInfo
-            
-            records = []
-            for record_data in parse_result['records']:
-                record = ParseResultRecord(**record_data)
-                records.append(record)
-            
-            errors = []
-            for error_data in parse_result['errors']:
-                error = ParseErrorInfo(**error_data)
-                errors.append(error)
-            
-            warnings = []
-            for warning_data in parse_result['warnings']:
-                warning = ParseErrorInfo(**warning_data)
-                warnings.append(warning)
-            
-            result_data = ParseResult(
-                import_batch_id=import_batch_id,
-                total_records=parse_result['total_records'],
-                valid_records=parse_result['valid_records'],
-                error_records=parse_result['error_records'],
-                warning_records=parse_result['warning_records'],
-                records=records,
-                errors=errors,
-                warnings=warnings
-            )
-            
-            return ParseResponse(
-                code=200,
-                message="文件解析成功",
-                data=result_data
+            # 转换解析结果为响应格式（解析器输出为可信数据，不逐条构建模型校验）
+            return success_response(
+                data=build_parse_result_data(import_batch_id, parse_result),
+                message="文件解析成功（复用相同内容文件的解析结果）" if cache_hit else "文件解析成功"
             )
             
         except ExcelParseError as e:
@@ -438,206 +660,127 @@ async def save_parse_results_to_decade_plan(db: AsyncSession, import_batch_id: s
         db: 数据库会话
         import_batch_id: 导入批次ID
         parse_result: 解析结果字典
+        
+    Returns:
+        Dict: 批量写入统计，失败时返回None
     """
     try:
-        # 先删除同一批次的旧数据（如果存在）
-        from sqlalchemy import delete
-        await db.execute(
-            delete(DecadePlan).where(DecadePlan.import_batch_id == import_batch_id)
-        )
-        
-        # 获取从Excel中提取的年份
-        extracted_year = parse_result.get('extracted_year')
-        print(f"📅 从解析结果获取到的年份: {extracted_year}")
-        
-        # 收集所有记录数据
-        all_records = []
-        if 'sheet_details' in parse_result and parse_result['sheet_details']:
-            # 多工作表的结果
-            for sheet_detail in parse_result['sheet_details']:
-                for record_data in sheet_detail['records']:
-                    if 'extracted_year' not in record_data and extracted_year:
-                        record_data['extracted_year'] = extracted_year
-                    all_records.append(record_data)
-        else:
-            # 单工作表的结果
-            for record_data in parse_result['records']:
-                if 'extracted_year' not in record_data and extracted_year:
-                    record_data['extracted_year'] = extracted_year
-                all_records.append(record_data)
-        
-        # 预处理：识别和分配聚合数值
-        # Excel中同一牌号的多台机器记录需要分配聚合的"本次投料"和"本次成品"
-        processed_records = await _allocate_aggregate_values_corrected(all_records)
-        
-        # 批量创建decade_plan记录
-        decade_plans = []
-        for record_data in processed_records:
-            decade_plan = create_decade_plan_record(import_batch_id, record_data)
-            decade_plans.append(decade_plan)
+        stats = await write_parse_results_to_decade_plan(db, import_batch_id, parse_result)
+        await db.commit()
         
-        # 批量插入
-        if decade_plans:
-            db.add_all(decade_plans)
-            await db.commit()
-            
-        print(f"✅ 成功保存 {len(decade_plans)} 条旬计划记录到数据库（已处理聚合数值分配）")
+        logger.info(
+            f"成功保存 {stats['rows']} 条旬计划记录到数据库（已处理聚合数值分配）: "
+            f"{stats['chunks']}块, 耗时{stats['elapsed_seconds']:.3f}秒, {stats['rows_per_second']:.0f}行/秒"
+        )
+        return stats
         
     except Exception as e:
         await db.rollback()
-        print(f"❌ 保存旬计划数据失败: {str(e)}")
+        logger.error(f"保存旬计划数据失败: {str(e)}")
         # 不抛出异常，避免影响解析流程
-        
-        
+        return None
 
-async def _allocate_aggregate_values_corrected(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+async def write_parse_results_to_decade_plan(
+    db: AsyncSession,
+    import_batch_id: str,
+    parse_result: dict
+) -> Dict[str, Any]:
     """
-    修正的聚合数值分配逻辑
+    替换批次的旬计划记录：删除旧数据、分配聚合数值后批量写入
     
-    关键识别规则：
-    1. 连续的相同牌号记录且有相同的投料/成品数值 = 需要分配的聚合组
-    2. 不同牌号或数值不同的记录 = 独立记录，保持原样
-    3. 只有投料或成品为0/None的记录 = 独立记录，保持原样
+    事务由调用方提交，失败时抛出异常
     
     Args:
-        records: 原始记录列表
+        db: 数据库会话
+        import_batch_id: 导入批次ID
+        parse_result: 解析结果字典
         
     Returns:
-        处理后的记录列表
+        Dict: 批量写入统计
     """
-    from collections import defaultdict
-    import copy
+    # 先删除同一批次的旧数据（如果存在）
+    from sqlalchemy import delete
+    await db.execute(
+        delete(DecadePlan).where(DecadePlan.import_batch_id == import_batch_id)
+    )
     
-    print(f"🔄 开始修正的聚合数值分配，共 {len(records)} 条记录")
+    # 获取从Excel中提取的年份
+    extracted_year = parse_result.get('extracted_year')
+    logger.debug(f"从解析结果获取到的年份: {extracted_year}")
     
-    if not records:
-        return []
+    # 收集所有记录数据
+    all_records = []
+    if 'sheet_details' in parse_result and parse_result['sheet_details']:
+        # 多工作表的结果
+        for sheet_detail in parse_result['sheet_details']:
+            for record_data in sheet_detail['records']:
+                if 'extracted_year' not in record_data and extracted_year:
+                    record_data['extracted_year'] = extracted_year
+                all_records.append(record_data)
+    else:
+        # 单工作表的结果
+        for record_data in parse_result['records']:
+            if 'extracted_year' not in record_data and extracted_year:
+                record_data['extracted_year'] = extracted_year
+            all_records.append(record_data)
     
-    # 按连续的相同牌号和相同数值进行分组
-    groups = []
-    current_group = []
+    # 预处理：识别和分配聚合数值
+    # Excel中同一牌号的多台机器记录需要分配聚合的"本次投料"和"本次成品"
+    processed_records = await _allocate_aggregate_values_corrected(all_records)
     
-    for i, record in enumerate(records):
-        article_name = record.get('article_name', 'UNKNOWN')
-        material_input = record.get('material_input', 0) or 0
-        final_quantity = record.get('final_quantity', 0) or 0
-        
-        print(f"  处理记录 {i+1}: {article_name} - 投料:{material_input}, 成品:{final_quantity}")
-        
-        # 检查是否与当前组匹配
-        should_group = False
-        if current_group:
-            last_record = current_group[-1]
-            last_article = last_record.get('article_name', 'UNKNOWN')
-            last_material = last_record.get('material_input', 0) or 0
-            last_final = last_record.get('final_quantity', 0) or 0
-            
-            # 分组条件：相同牌号 AND 相同数值 AND 数值不为0 AND 行号连续
-            row_diff = record.get('row_number', 0) - last_record.get('row_number', 0)
-            should_group = (
-                article_name == last_article and
-                material_input == last_material and
-                final_quantity == last_final and
-                (material_input > 0 or final_quantity > 0) and  # 至少一个不为0
-                (last_material > 0 or last_final > 0) and  # 前一个记录也至少一个不为0
-                1 <= row_diff <= 2  # 行号必须是递增且相近的（考虑合并单元格但不允许跳跃）
-            )
-        
-        if should_group:
-            # 加入当前组
-            current_group.append(record.copy())
-            print(f"    ✓ 加入当前组（组大小: {len(current_group)}）")
-        else:
-            # 结束当前组，开始新组
-            if current_group:
-                groups.append(current_group)
-                print(f"    📦 完成组: {len(current_group)}条记录")
-            
-            current_group = [record.copy()]
-            print(f"    🆕 开始新组")
+    # Core批量插入，按块写入
+    return await bulk_insert_decade_plans(db, import_batch_id, processed_records)
+
+
+async def bulk_insert_decade_plans(
+    db: AsyncSession,
+    import_batch_id: str,
+    records: List[Dict[str, Any]],
+    chunk_size: int = None
+) -> Dict[str, Any]:
+    """
+    使用SQLAlchemy Core多行insert批量写入旬计划，绕过ORM工作单元开销
     
-    # 添加最后一组
-    if current_group:
-        groups.append(current_group)
-        print(f"    📦 最后一组: {len(current_group)}条记录")
+    每块只执行一条 INSERT ... VALUES (...), (...) 语句，事务由调用方提交
+    
+    Args:
+        db: 数据库会话
+        import_batch_id: 导入批次ID
+        records: 已完成聚合分配的记录数据
+        chunk_size: 每块行数，None时使用配置 decade_plan_insert_chunk_size
+        
+    Returns:
+        Dict: 写入统计（rows, chunks, elapsed_seconds, rows_per_second）
+    """
+    chunk_size = chunk_size or settings.decade_plan_insert_chunk_size
+    table = DecadePlan.__table__
     
-    print(f"📊 分组完成: 共 {len(groups)} 个组")
+    start_time = time.perf_counter()
+    values = [build_decade_plan_values(import_batch_id, record_data) for record_data in records]
     
-    # 处理每个组
-    processed_records = []
+    chunks = 0
+    for offset in range(0, len(values), chunk_size):
+        await db.execute(insert(table).values(values[offset:offset + chunk_size]))
+        chunks += 1
     
-    for group_idx, group_records in enumerate(groups):
-        if len(group_records) == 1:
-            # 单个记录，保持原样
-            print(f"🎯 组 {group_idx+1}: 单条记录，保持原样")
-            processed_records.append(group_records[0])
-            continue
-        
-        # 多个记录，需要分配
-        first_record = group_records[0]
-        article_name = first_record.get('article_name', 'UNKNOWN')
-        total_material = first_record.get('material_input', 0) or 0
-        total_final = first_record.get('final_quantity', 0) or 0
-        
-        print(f"🎯 组 {group_idx+1}: {article_name}，{len(group_records)}条记录需要分配")
-        print(f"   📦 聚合数值 - 投料:{total_material}, 成品:{total_final}")
-        
-        if total_material == 0 and total_final == 0:
-            # 都是0，保持原样
-            print(f"   ⚠️ 数值全为0，保持原样")
-            processed_records.extend(group_records)
-            continue
-        
-        # 平均分配
-        machine_count = len(group_records)
-        
-        # 基础分配（整除）
-        material_per_machine = total_material // machine_count if total_material > 0 else 0
-        final_per_machine = total_final // machine_count if total_final > 0 else 0
-        
-        # 余数处理
-        material_remainder = total_material % machine_count if total_material > 0 else 0
-        final_remainder = total_final % machine_count if total_final > 0 else 0
-        
-        print(f"   🎲 分配策略 - 每台基础: 投料{material_per_machine}, 成品{final_per_machine}")
-        print(f"   📈 余数: 投料余数{material_remainder}, 成品余数{final_remainder}")
-        
-        # 执行分配
-        for i, record in enumerate(group_records):
-            # 基础分配
-            allocated_material = material_per_machine
-            allocated_final = final_per_machine
-            
-            # 余数分配给前几个记录
-            if i < material_remainder:
-                allocated_material += 1
-            if i < final_remainder:
-                allocated_final += 1
-            
-            # 更新记录
-            record['material_input'] = allocated_material
-            record['final_quantity'] = allocated_final
-            record['_allocation_info'] = {
-                'original_material_input': total_material,
-                'original_final_quantity': total_final,
-                'machine_count': machine_count,
-                'allocation_method': 'equal_distribution'
-            }
-            
-            print(f"   ✅ 记录 {i+1}: 分配 投料{allocated_material}, 成品{allocated_final}")
-            processed_records.append(record)
+    elapsed = time.perf_counter() - start_time
+    return {
+        'rows': len(values),
+        'chunks': chunks,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': len(values) / elapsed if elapsed > 0 else 0.0
+    }
         
-        # 验证总量
-        verify_material = sum(r.get('material_input', 0) for r in group_records)
-        verify_final = sum(r.get('final_quantity', 0) for r in group_records)
         
-        if verify_material == total_material and verify_final == total_final:
-            print(f"   ✅ 分配验证成功")
-        else:
-            print(f"   ❌ 分配验证失败: 投料{verify_material}/{total_material}, 成品{verify_final}/{total_final}")
+
+async def _allocate_aggregate_values_corrected(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    修正的聚合数值分配逻辑（在解析进程池中执行，不阻塞事件循环）
     
-    print(f"🎊 修正的聚合分配完成，处理后共 {len(processed_records)} 条记录")
-    return processed_records
+    分配规则见 app.services.plan_allocation.allocate_aggregate_values
+    """
+    return await run_in_parse_pool(allocate_aggregate_values, records)
 
 
 def create_decade_plan_record(import_batch_id: str, record_data: dict) -> DecadePlan:
@@ -651,152 +794,129 @@ def create_decade_plan_record(import_batch_id: str, record_data: dict) -> Decade
     Returns:
         DecadePlan: 旬计划记录对象
     """
-    from datetime import datetime
-    import uuid
-    import re
+    return DecadePlan(**build_decade_plan_values(import_batch_id, record_data))
+
+
+def _parse_year_from_iso(value) -> Optional[int]:
+    """从ISO格式日期字符串中获取年份，无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).year
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_month_day(value: str, year: int) -> Optional[datetime]:
+    """解析 "10.16" 格式的月日字符串"""
+    if '.' not in value:
+        return None
+    month, day = value.split('.')
+    return datetime(year, int(month), int(day))
+
+
+def build_decade_plan_values(import_batch_id: str, record_data: dict) -> Dict[str, Any]:
+    """
+    计算旬计划记录的列值（年份、计划时间、机台代码、验证状态等派生字段）
     
-    # 解析日期 - 优先从production_date_range拆解
-    planned_start = None
-    planned_end = None
-    year = None
+    供ORM对象创建和Core批量插入共用
     
+    Args:
+        import_batch_id: 导入批次ID
+        record_data: 记录数据字典
+        
+    Returns:
+        Dict: aps_decade_plan 列名到值的映射
+    """
     # 获取年份 - 优先从Excel解析器提供的planned_start/planned_end数据中获取
-    print(f"🔍 检查记录数据: planned_start={record_data.get('planned_start')}, planned_end={record_data.get('planned_end')}")
-    
-    if record_data.get('planned_start'):
-        try:
-            original_planned_start = datetime.fromisoformat(record_data['planned_start'])
-            year = original_planned_start.year
-            print(f"✅ 从planned_start获取年份: {year}")
-        except Exception as e:
-            print(f"❌ 解析planned_start失败: {e}")
-    
-    if not year and record_data.get('planned_end'):
-        try:
-            original_planned_end = datetime.fromisoformat(record_data['planned_end'])
-            year = original_planned_end.year
-            print(f"✅ 从planned_end获取年份: {year}")
-        except Exception as e:
-            print(f"❌ 解析planned_end失败: {e}")
+    year = _parse_year_from_iso(record_data.get('planned_start')) or \
+        _parse_year_from_iso(record_data.get('planned_end'))
     
-    # 如果还没有年份，尝试从其他途径获取
     if not year:
-        # 方法1：检查Excel解析器是否提供了年份信息
-        if 'extracted_year' in record_data and record_data['extracted_year']:
+        if record_data.get('extracted_year'):
+            # 方法1：Excel解析器提供的年份信息
             year = record_data['extracted_year']
-            print(f"✅ 从Excel解析器获取年份: {year}")
-        # 方法2：尝试从日期范围字符串中提取年份
         elif record_data.get('production_date_range'):
-            date_range = record_data['production_date_range']
-            # 查找可能的年份模式，如"2024.10.16-10.31"
-            year_match = re.search(r'(\d{4})', str(date_range))
+            # 方法2：从日期范围字符串中提取年份，如"2024.10.16-10.31"
+            year_match = re.search(r'(\d{4})', str(record_data['production_date_range']))
             if year_match:
                 year = int(year_match.group(1))
-                print(f"✅ 从日期范围提取年份: {year}")
         
-        # 最后备选：使用2024年（根据Excel标题显示的年份）
+        # 最后备选：使用2024年（根据Excel标题"2024年10月16～31日生产作业计划表"）
         if not year:
-            year = 2024  # 根据Excel标题"2024年10月16～31日生产作业计划表"
-            print(f"⚠️ 使用默认年份2024（从Excel标题获得）: {year}")
+            year = 2024
     
-    # 从production_date_range解析日期范围
+    # 从production_date_range解析日期范围，格式如 "10.16-10.31" 或 "10.16 - 10.31"
+    planned_start = None
+    planned_end = None
     production_date_range = record_data.get('production_date_range', '')
     if production_date_range and '-' in production_date_range:
-        try:
-            # 解析格式如 "10.16-10.31" 或 "10.16 - 10.31"
-            date_parts = production_date_range.strip().split('-')
-            if len(date_parts) == 2:
-                start_str = date_parts[0].strip()
-                end_str = date_parts[1].strip()
-                
-                # 解析开始日期 "10.16"
-                if '.' in start_str:
-                    start_month, start_day = start_str.split('.')
-                    planned_start = datetime(year, int(start_month), int(start_day))
-                    print(f"✅ 从production_date_range构建planned_start: {planned_start}")
-                
-                # 解析结束日期 "10.31"
-                if '.' in end_str:
-                    end_month, end_day = end_str.split('.')
-                    planned_end = datetime(year, int(end_month), int(end_day))
-                    print(f"✅ 从production_date_range构建planned_end: {planned_end}")
-                
-        except (ValueError, IndexError) as e:
-            print(f"⚠️ 解析production_date_range失败: {production_date_range}, 错误: {e}")
+        date_parts = production_date_range.strip().split('-')
+        if len(date_parts) == 2:
+            try:
+                planned_start = _parse_month_day(date_parts[0].strip(), year)
+                planned_end = _parse_month_day(date_parts[1].strip(), year)
+            except (ValueError, IndexError) as e:
+                logger.debug(f"解析production_date_range失败: {production_date_range}, 错误: {e}")
     
     # 如果production_date_range解析失败，尝试从原始字段解析
     if not planned_start and record_data.get('planned_start'):
         try:
             planned_start = datetime.fromisoformat(record_data['planned_start'])
-        except:
+        except (TypeError, ValueError):
             pass
     if not planned_end and record_data.get('planned_end'):
         try:
             planned_end = datetime.fromisoformat(record_data['planned_end'])
-        except:
+        except (TypeError, ValueError):
             pass
     
-    # 如果还是没有日期，使用默认日期
+    # 如果还是没有日期，使用解析出的年份和默认日期
     if not planned_start:
-        planned_start = datetime(year, 11, 1)  # 使用解析出的年份，默认11月1日
-        print(f"⚠️ 使用默认planned_start: {planned_start}")
+        planned_start = datetime(year, 11, 1)
     if not planned_end:
-        planned_end = datetime(year, 11, 15)  # 使用解析出的年份，默认11月15日
-        print(f"⚠️ 使用默认planned_end: {planned_end}")
-    
-    print(f"🎯 最终日期结果: planned_start={planned_start}, planned_end={planned_end}, 年份={year}")
+        planned_end = datetime(year, 11, 15)
     
-    # 获取机台代码并转换为逗号分隔字符串
+    # 机台代码转换为逗号分隔的字符串格式（无空格）
     feeder_codes = record_data.get('feeder_codes', [])
     maker_codes = record_data.get('maker_codes', [])
-    
-    # 转换为逗号分隔的字符串格式（无空格）
     feeder_code = ','.join(feeder_codes) if feeder_codes else 'UNKNOWN'
     maker_code = ','.join(maker_codes) if maker_codes else 'UNKNOWN'
     
     # 生成工作订单号（使用行号即可，不需要机台后缀）
     row_number = record_data.get('row_number', 0)
-    work_order_nr = f"WO_{row_number}"
-    
-    # 获取数量，确保不为None
-    quantity_total = record_data.get('material_input') or 0
-    final_quantity = record_data.get('final_quantity') or 0
     
-    # 获取牌号，使用article_name作为article_nr
+    # 牌号，使用article_name作为article_nr
     article_name = record_data.get('article_name') or 'UNKNOWN'
-    article_nr = record_data.get('article_nr') or article_name
     
-    # 确定验证状态
+    # 确定验证状态 - 允许继承的空数量值
     validation_status = 'VALID'
     validation_message = None
-    
-    # 检查必要字段
     if not record_data.get('article_name'):
         validation_status = 'ERROR'
         validation_message = '缺少牌号信息'
     elif feeder_code == 'UNKNOWN' and maker_code == 'UNKNOWN':
         validation_status = 'ERROR'
         validation_message = '缺少机台信息'
-    # 移除数量检查 - 允许继承的空值
     
-    return DecadePlan(
-        import_batch_id=import_batch_id,
-        work_order_nr=work_order_nr,
-        article_nr=article_nr,
-        package_type=record_data.get('package_type'),
-        specification=record_data.get('specification'),
-        quantity_total=quantity_total,
-        final_quantity=final_quantity,
-        production_unit=record_data.get('production_unit'),
-        maker_code=maker_code,
-        feeder_code=feeder_code,
-        planned_start=planned_start,
-        planned_end=planned_end,
-        production_date_range=record_data.get('production_date_range'),
-        row_number=record_data.get('row_number'),
-        validation_status=validation_status,
-        validation_message=validation_message
-    )
+    return {
+        'import_batch_id': import_batch_id,
+        'work_order_nr': f"WO_{row_number}",
+        'article_nr': record_data.get('article_nr') or article_name,
+        'package_type': record_data.get('package_type'),
+        'specification': record_data.get('specification'),
+        'quantity_total': record_data.get('material_input') or 0,
+        'final_quantity': record_data.get('final_quantity') or 0,
+        'production_unit': record_data.get('production_unit'),
+        'maker_code': maker_code,
+        'feeder_code': feeder_code,
+        'planned_start': planned_start,
+        'planned_end': planned_end,
+        'production_date_range': record_data.get('production_date_range'),
+        'row_number': record_data.get('row_number'),
+        'validation_status': validation_status,
+        'validation_message': validation_message
+    }
 
 
 @router.get("/history")
@@ -805,7 +925,7 @@ async def get_upload_history(
     page_size: int = 20,
     status: Optional[str] = None,
     scheduling_status: Optional[str] = None,  # 新增：排产状态过滤
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取上传历史记录，包含排产状态信息
@@ -937,7 +1057,7 @@ async def get_upload_history(
 
 @router.get("/statistics")
 async def get_upload_statistics(
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取上传统计信息
@@ -1018,7 +1138,7 @@ async def get_upload_statistics(
 
 @router.get("/scheduling-statistics")
 async def get_scheduling_statistics(
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取排产相关的全局统计信息
@@ -1074,7 +1194,7 @@ async def get_scheduling_statistics(
 @router.get("/{import_batch_id}/decade-plans")
 async def get_decade_plans(
     import_batch_id: str,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     查询旬计划记录接口
@@ -1108,8 +1228,7 @@ async def get_decade_plans(
                 "validation_message": plan.validation_message
             })
         
-        return SuccessResponse(
-            code=200,
+        return success_response(
             message="查询成功",
             data={
                 "import_batch_id": import_batch_id,
@@ -1126,7 +1245,7 @@ async def get_decade_plans(
 
 @router.get("/available-for-scheduling")
 async def get_available_batches_for_scheduling(
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取可用于排产的批次列表
@@ -1178,7 +1297,7 @@ async def get_available_batches_for_scheduling(
 @router.get("/{import_batch_id}/scheduling-history")
 async def get_batch_scheduling_history(
     import_batch_id: str,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取特定批次的所有排产历史记录
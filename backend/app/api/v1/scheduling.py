@@ -9,12 +9,15 @@ from typing import Optional, Dict, Any
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.connection import get_async_session
+from app.db.connection import get_async_session, get_read_session
 from app.schemas.base import SuccessResponse, ErrorResponse
 from app.algorithms.scheduling_engine import SchedulingEngine
 from app.algorithms.pipeline import AlgorithmPipeline
 from app.models.scheduling_models import SchedulingTask, SchedulingTaskStatus
 from app.models.work_order_models import PackingOrder, FeedingOrder
+from app.services.work_order_cache import invalidate_work_order_cache
+from app.services.mes_outbox import MESOutboxService, notify_mes_outbox_dispatcher
+from app.core.config import settings
 from sqlalchemy import select, func
 
 router = APIRouter(prefix="/scheduling", tags=["排产算法管理"])
@@ -395,10 +398,20 @@ async def execute_scheduling_pipeline_background(
                 
                 print(f"🔍 DEBUG: 工单调度数据写入完成，共 {work_order_schedule_count} 条记录")
                 
+                # MES下发记录与工单在同一事务中写入，提交后由后台分发器推送到MES
+                mes_outbox_counts = {}
+                if settings.mes_outbox_enabled:
+                    mes_outbox_counts = await MESOutboxService.enqueue_task_orders(db, task_id)
+                
                 await db.commit()
                 
                 print(f"🔍 DEBUG: 事务提交成功!")
                 
+                # 新工单已提交，使甘特图工单缓存和ETag失效
+                await invalidate_work_order_cache()
+                if mes_outbox_counts:
+                    notify_mes_outbox_dispatcher()
+                
                 # 更新任务状态为已完成
                 task.task_status = SchedulingTaskStatus.COMPLETED
                 task.end_time = datetime.now()
@@ -415,6 +428,7 @@ async def execute_scheduling_pipeline_background(
                     "packing_orders_generated": packing_orders_count,
                     "feeding_orders_generated": feeding_orders_count,
                     "work_order_schedules_generated": work_order_schedule_count,
+                    "mes_dispatch_enqueued": sum(mes_outbox_counts.values()),
                     "total_work_orders": len(final_work_orders),
                     "execution_summary": pipeline_result.get('summary', {}),
                     "pipeline_stages": len(pipeline_result.get('stages', {}))
@@ -462,7 +476,7 @@ async def get_scheduling_tasks(
     end_date: Optional[str] = None,
     page: int = 1,
     page_size: int = 20,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     查询排产任务历史记录
@@ -754,10 +768,36 @@ async def cancel_scheduling_task(
         raise HTTPException(status_code=500, detail=f"任务取消失败：{str(e)}")
 
 
+@router.post("/tasks/archive")
+async def archive_superseded_tasks(limit: Optional[int] = None):
+    """
+    归档已被取代的排产任务
+    
+    将同一导入批次中已被更新任务取代的旧任务工单、排程和日志迁移到归档表，
+    保持热表数据量稳定
+    """
+    from app.services.work_order_archive_service import WorkOrderArchiveService
+    
+    if not WorkOrderArchiveService.is_enabled():
+        raise HTTPException(status_code=400, detail="工单归档未启用，请先执行归档表脚本并开启 APS_WORK_ORDER_ARCHIVE_ENABLED")
+    
+    try:
+        stats = await WorkOrderArchiveService.archive_superseded_tasks(limit)
+        
+        return SuccessResponse(
+            code=200,
+            message=f"归档完成，共归档{len(stats['archived_tasks'])}个任务",
+            data=stats
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"任务归档失败：{str(e)}")
+
+
 @router.get("/tasks/statistics")
 async def get_scheduling_statistics(
     days: int = 30,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取排产任务统计信息
@@ -865,7 +905,7 @@ async def get_scheduling_statistics(
 @router.get("/tasks/{task_id}/status")
 async def get_scheduling_task_status(
     task_id: str,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_async_session)  # 任务状态在写入后立即轮询，始终读主库避免复制延迟
 ):
     """
     查询排产任务状态接口
@@ -930,7 +970,7 @@ async def get_work_orders(
     status: Optional[str] = None,
     page: int = 1,
     page_size: int = 20,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     查询工单列表接口
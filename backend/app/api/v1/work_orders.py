@@ -4,16 +4,21 @@ APS智慧排产系统 - 工单管理API（甘特图数据源重构版）
 提供基于WorkOrderSchedule表的工单查询，用于甘特图显示
 支持用户示例数据格式：W0001/W0002/W0003 + 机台关系
 """
-from typing import Optional, Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Path, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, text
 from datetime import datetime
 import logging
 
-from app.db.connection import get_async_session
+from app.db.connection import get_read_session, get_db_session, get_read_db_session, is_read_replica_enabled
 from app.schemas.base import SuccessResponse
+from app.core.responses import dumps_json, success_payload, success_response
 from app.models.work_order_models import WorkOrderSchedule, PackingOrder, FeedingOrder
+from app.services.gantt_timeline import load_timeline
+from app.services.work_order_stream_export import EXPORT_DATASETS, EXPORT_FORMATS, export_stream, stream_dataset
+from app.services.work_order_cache import work_order_cache, work_order_cache_key, build_etag, etag_epoch, etag_matches
 
 # 初始化日志记录器
 logger = logging.getLogger(__name__)
@@ -29,7 +34,7 @@ async def get_work_order_schedule(
     article_nr: Optional[str] = Query(None, description="产品代码过滤"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(100, ge=1, le=2000, description="每页大小"),
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     查询工单排程数据（甘特图数据源）
@@ -98,7 +103,7 @@ async def get_work_order_schedule(
                 "created_time": schedule.created_time.isoformat() if schedule.created_time else None
             })
         
-        return SuccessResponse(
+        return success_response(
             message=f"查询到 {len(schedule_data)} 条工单排程数据",
             data={
                 "schedules": schedule_data,
@@ -126,7 +131,7 @@ async def get_work_orders(
     product_code: Optional[str] = Query(None, description="产品代码过滤"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(100, ge=1, le=2000, description="每页大小"),
-    db: AsyncSession = Depends(get_async_session)
+    if_none_match: Optional[str] = Header(None, description="上次响应的ETag")
 ):
     """
     查询工单列表接口（甘特图数据源重构）
@@ -134,6 +139,9 @@ async def get_work_orders(
     优先使用WorkOrderSchedule表提供甘特图数据，
     如果没有数据则降级使用MES工单表
     
+    序列化后的响应按查询参数缓存，排产任务写入新工单后失效；
+    响应携带强ETag，缓存命中或If-None-Match匹配（304）时不打开数据库会话
+    
     Returns:
         工单列表，兼容甘特图所需格式
     """
@@ -142,64 +150,227 @@ async def get_work_orders(
         effective_order_type = order_type or orderType
         effective_time_range = time_range or timeRange
         
-        # 优先使用WorkOrderSchedule表数据（甘特图数据源）
-        schedule_data = await get_schedule_data(
-            db, task_id, machine_code, product_code, page, page_size
+        filters = {
+            "task_id": task_id,
+            "order_type": effective_order_type,
+            "status": status,
+            "machine_code": machine_code,
+            "product_code": product_code,
+            "page": page,
+            "page_size": page_size,
+        }
+        return await _cached_payload_response(
+            work_order_cache_key(filters), if_none_match,
+            lambda session: _load_work_orders_payload(session, **filters)
         )
         
-        if schedule_data and schedule_data["total_count"] > 0:
-            # 转换WorkOrderSchedule数据为工单格式
-            work_orders = []
-            for schedule in schedule_data["schedules"]:
-                work_orders.append({
-                    "work_order_nr": schedule["work_order_nr"],
-                    "work_order_type": "HJB",  # 标记为卷包机工单（合并计划包含两种机台）
-                    "machine_type": "合并计划",
-                    "machine_code": f"{schedule['maker_code']}+{schedule['feeder_code']}",  # 兼容旧格式
-                    "maker_code": schedule["maker_code"],     # 卷包机代码
-                    "feeder_code": schedule["feeder_code"],   # 喂丝机代码
-                    "product_code": schedule["article_nr"],
-                    "plan_quantity": schedule["final_quantity"],
-                    "quantity_total": schedule["quantity_total"],
-                    "work_order_status": schedule["schedule_status"] or "PLANNED",
-                    "planned_start_time": schedule["planned_start"],
-                    "planned_end_time": schedule["planned_end"],
-                    "created_time": schedule["created_time"],
-                    "task_id": schedule["task_id"],
-                    "is_backup": schedule["is_backup"],
-                    "backup_reason": schedule["backup_reason"],
-                    "sync_group_id": schedule["sync_group_id"]
-                })
-            
-            return SuccessResponse(
-                message=f"查询到 {len(work_orders)} 条工单数据（排程数据源）",
-                data={
-                    "work_orders": work_orders,
-                    "total_count": schedule_data["total_count"],
-                    "page": page,
-                    "page_size": page_size,
-                    "data_source": "work_order_schedule"
-                }
-            )
-        
-        # 降级使用MES工单数据
-        work_orders = await get_mes_work_order_data(
-            db, task_id, effective_order_type, status, machine_code, 
-            product_code, page, page_size
-        )
-        return SuccessResponse(
-            message=f"查询到 {len(work_orders)} 条工单数据（MES数据源）",
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询工单失败: {str(e)}")
+
+
+async def _cached_payload_response(
+    cache_key: str,
+    if_none_match: Optional[str],
+    load: Callable[[AsyncSession], Awaitable[bytes]]
+) -> Response:
+    """
+    按工单版本号缓存序列化后的响应体，带强ETag，If-None-Match匹配时返回304
+
+    先由版本号确定ETag并查缓存，只在需要加载数据时打开一个数据库会话，
+    缓存命中和304不占用数据库连接（接口不注入会话依赖）。
+    ETag包含缓存时段编号，版本号递增失败时客户端最多在 max_age 后重新获取数据，不会无限期收到304
+    """
+    async def load_with(open_session) -> bytes:
+        async with open_session() as db:
+            return await load(db)
+
+    async def load_payload() -> bytes:
+        # 配置只读副本时缓存填充读主库，避免版本号递增后读到复制延迟的旧数据
+        return await load_with(get_db_session if is_read_replica_enabled() else get_read_db_session)
+    
+    version = await work_order_cache.current_version() if work_order_cache.enabled else None
+    if version is not None:
+        etag = build_etag(version, cache_key, epoch=etag_epoch(work_order_cache.max_age))
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        body = await work_order_cache.get_or_load(cache_key, load_payload)
+    else:
+        body = await load_with(get_read_db_session)
+        etag = build_etag(None, cache_key, body)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _load_work_orders_payload(
+    db: AsyncSession,
+    task_id: Optional[str],
+    order_type: Optional[str],
+    status: Optional[str],
+    machine_code: Optional[str],
+    product_code: Optional[str],
+    page: int,
+    page_size: int
+) -> bytes:
+    """查询工单列表并序列化为响应体"""
+    # 优先使用WorkOrderSchedule表数据（甘特图数据源）
+    schedule_data = await get_schedule_data(
+        db, task_id, machine_code, product_code, page, page_size
+    )
+
+    if schedule_data and schedule_data["total_count"] > 0:
+        # 转换WorkOrderSchedule数据为工单格式
+        work_orders = []
+        for schedule in schedule_data["schedules"]:
+            work_orders.append({
+                "work_order_nr": schedule["work_order_nr"],
+                "work_order_type": "HJB",  # 标记为卷包机工单（合并计划包含两种机台）
+                "machine_type": "合并计划",
+                "machine_code": f"{schedule['maker_code']}+{schedule['feeder_code']}",  # 兼容旧格式
+                "maker_code": schedule["maker_code"],     # 卷包机代码
+                "feeder_code": schedule["feeder_code"],   # 喂丝机代码
+                "product_code": schedule["article_nr"],
+                "plan_quantity": schedule["final_quantity"],
+                "quantity_total": schedule["quantity_total"],
+                "work_order_status": schedule["schedule_status"] or "PLANNED",
+                "planned_start_time": schedule["planned_start"],
+                "planned_end_time": schedule["planned_end"],
+                "created_time": schedule["created_time"],
+                "task_id": schedule["task_id"],
+                "is_backup": schedule["is_backup"],
+                "backup_reason": schedule["backup_reason"],
+                "sync_group_id": schedule["sync_group_id"]
+            })
+
+        return dumps_json(success_payload(
             data={
                 "work_orders": work_orders,
-                "total_count": len(work_orders),
+                "total_count": schedule_data["total_count"],
                 "page": page,
                 "page_size": page_size,
-                "data_source": "mes_work_orders"
-            }
+                "data_source": "work_order_schedule"
+            },
+            message=f"查询到 {len(work_orders)} 条工单数据（排程数据源）"
+        ))
+
+    # 降级使用MES工单数据
+    work_orders = await get_mes_work_order_data(
+        db, task_id, order_type, status, machine_code, 
+        product_code, page, page_size
+    )
+    return dumps_json(success_payload(
+        data={
+            "work_orders": work_orders,
+            "total_count": len(work_orders),
+            "page": page,
+            "page_size": page_size,
+            "data_source": "mes_work_orders"
+        },
+        message=f"查询到 {len(work_orders)} 条工单数据（MES数据源）"
+    ))
+
+
+@router.get("/gantt")
+async def get_gantt_timeline(
+    start: datetime = Query(..., description="视口开始时间"),
+    end: datetime = Query(..., description="视口结束时间"),
+    machines: Optional[str] = Query(None, description="机台代码，逗号分隔（为空表示全部机台）"),
+    task_id: Optional[str] = Query(None, description="排产任务ID过滤"),
+    width: int = Query(1200, ge=50, le=8000, description="视口宽度（像素）"),
+    bucket_seconds: Optional[int] = Query(None, ge=1, description="每格秒数（指定时代替 窗口时长/视口宽度）"),
+    min_gap_px: float = Query(1.0, ge=1, le=100, description="间隔小于该像素数的相邻工单合并为占用段（至少1个像素，保证条目数随视口宽度有界）"),
+    if_none_match: Optional[str] = Header(None, description="上次响应的ETag")
+):
+    """
+    视口甘特图接口
+    
+    只返回与时间窗口重叠的工单，并按视口分辨率合并同一机台上相邻的工单为占用段，
+    响应大小随视口宽度和机台数增长，而不是随窗口内工单数增长；
+    与工单列表接口共用版本号缓存和ETag
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="结束时间必须晚于开始时间")
+    machine_codes = sorted({code.strip() for code in machines.split(",") if code.strip()}) if machines else None
+    
+    try:
+        filters = {
+            "view": "gantt",
+            "start": start,
+            "end": end,
+            "machines": machine_codes,
+            "task_id": task_id,
+            "width": width,
+            "bucket_seconds": bucket_seconds,
+            "min_gap_px": min_gap_px,
+        }
+        return await _cached_payload_response(
+            work_order_cache_key(filters), if_none_match,
+            lambda session: _load_gantt_payload(
+                session, start, end, machine_codes, task_id, width, bucket_seconds, min_gap_px
+            )
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"查询工单失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"查询甘特图数据失败: {str(e)}")
+
+
+async def _load_gantt_payload(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    machines: Optional[List[str]],
+    task_id: Optional[str],
+    width: int,
+    bucket_seconds: Optional[int],
+    min_gap_px: float
+) -> bytes:
+    """查询视口甘特图并序列化为响应体"""
+    timeline = await load_timeline(db, start, end, machines, task_id, width, bucket_seconds, min_gap_px)
+    return dumps_json(success_payload(
+        data=timeline,
+        message=f"查询到 {timeline['bar_count']} 条工单，合并为 {timeline['item_count']} 个甘特图条目"
+    ))
+
+
+@router.get("/export/{dataset}")
+async def export_work_orders_stream(
+    dataset: str = Path(..., description="导出数据集: schedules / feeding-orders / packing-orders"),
+    format: str = Query("ndjson", description="导出格式: ndjson / csv"),
+    task_id: Optional[str] = Query(None, description="排产任务ID过滤"),
+    start_date: Optional[datetime] = Query(None, description="计划开始时间下限（喂丝机/卷包机工单）"),
+    end_date: Optional[datetime] = Query(None, description="计划开始时间上限（喂丝机/卷包机工单）"),
+    include_archive: bool = Query(False, description="按日期范围导出时是否包含归档工单")
+):
+    """
+    流式导出工单（NDJSON/CSV）
+    
+    使用服务端游标逐批读取并输出，不在内存中构建完整结果；
+    喂丝机/卷包机工单需指定任务ID或日期范围
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"不支持的导出数据集: {dataset}")
+    export_format = format.lower()
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {format}")
+    
+    try:
+        batches = stream_dataset(
+            dataset, task_id=task_id, start_date=start_date, end_date=end_date, include_archive=include_archive
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filename = f"{dataset}_{task_id or datetime.now().strftime('%Y%m%d%H%M%S')}.{export_format}"
+    return StreamingResponse(
+        export_stream(batches, export_format, dataset),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 async def get_schedule_data(
@@ -453,7 +624,7 @@ async def get_mes_work_order_data(
 @router.get("/{work_order_nr}")
 async def get_work_order_detail(
     work_order_nr: str,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     查询单个工单详情
@@ -531,7 +702,7 @@ async def get_work_order_detail(
 
 @router.get("/statistics/summary")
 async def get_work_order_statistics(
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
     获取工单统计信息
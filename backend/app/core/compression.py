@@ -0,0 +1,212 @@
+"""
+APS智慧排产系统 - 响应压缩中间件
+
+甘特图、导出和解析结果的JSON响应体可达数MB，车间客户端链路较慢，按 Accept-Encoding
+选择brotli（需安装可选依赖brotli）或gzip压缩：
+
+- 小于 compression_minimum_size 的响应、非文本类型、已编码的响应不压缩
+- 压缩级别取速度优先的中低档（gzip 4 / brotli 4），JSON压缩率已接近最高档
+- 带强ETag的响应（如甘特图工单缓存）内容由 (请求路径和查询串, ETag) 唯一确定，压缩结果按
+  (编码, 路径和查询串, ETag) 缓存在进程内，相同版本的数据只压缩一次；ETag只在同一URL内区分内容，
+  不同URL的响应即使ETag相同也不共用缓存。压缩后ETag转为弱ETag（与nginx相同），If-None-Match仍可匹配
+- 流式响应（多个body消息）逐块压缩并刷新，不缓冲整个响应
+"""
+from typing import Optional
+import gzip
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.cache import LocalLRUCache
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只使用gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/xml",
+    "application/javascript", "text/",
+)
+
+# 压缩结果缓存的有效期（秒）：ETag变化即失效，过期只用于回收长期不再访问的条目
+COMPRESSED_CACHE_TTL = 3600
+
+
+def select_encoding(accept_encoding: Optional[str], brotli_enabled: bool = True) -> Optional[str]:
+    """按 Accept-Encoding（含q值）选择 br 或 gzip，都不接受时返回None"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    candidates = ["br", "gzip"] if brotli_enabled and brotli is not None else ["gzip"]
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """一次性压缩完整响应体"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.compression_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level, mtime=0)
+
+
+class _StreamCompressor:
+    """流式响应逐块压缩，每块刷新使客户端及时收到数据"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.compression_brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """gzip/brotli响应压缩（纯ASGI中间件）"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        cache_max_entries: Optional[int] = None
+    ):
+        self.app = app
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+        self.cache = LocalLRUCache(
+            settings.compression_cache_max_entries if cache_max_entries is None else cache_max_entries,
+            COMPRESSED_CACHE_TTL
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding"), settings.compression_brotli_enabled)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self, encoding, send, _request_target(scope)).run(scope, receive)
+
+
+def _request_target(scope: Scope) -> str:
+    """请求路径和查询串，作为压缩结果缓存键的一部分"""
+    query = scope.get("query_string", b"")
+    path = scope.get("root_path", "") + scope["path"]
+    return f"{path}?{query.decode('latin-1')}" if query else path
+
+
+class _CompressedResponder:
+    """单个请求的压缩状态：缓存响应头直到第一个body消息，再决定是否压缩"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send, target: str):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.target = target
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_StreamCompressor] = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive):
+        await self.middleware.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or message["status"] in (204, 304)
+            )
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self._send_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None and not more_body:
+            await self._send_complete(body)
+            return
+
+        # 流式响应
+        if self.compressor is None:
+            self.compressor = _StreamCompressor(self.encoding)
+            self._set_compressed_headers(content_length=None)
+            await self._send_start()
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _send_complete(self, body: bytes):
+        if len(body) < self.middleware.minimum_size:
+            await self._send_start()
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        etag = Headers(raw=self.start_message["headers"]).get("etag")
+        cache_key = f"{self.encoding}:{self.target}:{etag}" if etag and not etag.startswith("W/") else None
+        compressed = self.middleware.cache.get(cache_key) if cache_key else None
+        if not isinstance(compressed, bytes):
+            compressed = compress_body(body, self.encoding)
+            if cache_key:
+                self.middleware.cache.set(cache_key, compressed)
+
+        self._set_compressed_headers(content_length=len(compressed))
+        await self._send_start()
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _set_compressed_headers(self, content_length: Optional[int]):
+        """设置压缩后的响应头；流式响应长度未知，去掉Content-Length"""
+        headers = MutableHeaders(raw=list(self.start_message["headers"]))
+        if content_length is None:
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(content_length)
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # 压缩后字节内容不同，强ETag改为弱ETag
+            headers["etag"] = f"W/{etag}"
+        self.start_message["headers"] = headers.raw
+
+    async def _send_start(self):
+        if self.start_message is not None:
+            await self.send(self.start_message)
+            self.start_message = None
@@ -26,11 +26,37 @@ class Settings(BaseSettings):
     mysql_pool_max_overflow: int = 30
     mysql_pool_timeout: int = 30
     mysql_pool_recycle: int = 1800
+    db_stream_batch_size: int = 1000  # 服务端游标流式查询每批行数
+    mysql_read_url: Optional[str] = None  # 只读副本连接串，未配置时读请求使用主库
+    db_read_after_write_window: float = 5.0  # 本进程主库写入后该时间窗口（秒）内的读请求仍走主库（仅进程内，尽力而为）
     
     # Redis配置 - 7.0+
     redis_url: str = "redis://:Redis_Apex_2025.@10.0.0.66:6379/13"
     redis_max_connections: int = 50
     redis_decode_responses: bool = True
+
+    # 缓存管理器（get_or_compute）配置
+    # msgpack / json / pickle；pickle反序列化可执行任意代码，仅在Redis只有可信写入方时显式启用
+    cache_serializer: str = "msgpack"
+    cache_local_enabled: bool = True  # 启用进程内LRU缓存层
+    cache_local_max_entries: int = 1024
+    cache_local_ttl: int = 30  # 进程内缓存有效期（秒），限制跨进程删除后的陈旧时间
+    cache_lock_timeout: float = 10.0  # 重算锁持有时长（秒），超时后等待方自行计算
+    cache_lock_poll_interval: float = 0.05  # 等待其他进程重算时的轮询间隔（秒）
+
+    # 基础配置数据缓存（机台关系/速度/班次/轮保/系统配置）
+    reference_cache_enabled: bool = True
+    reference_cache_version_check_interval: float = 1.0  # 读取Redis版本号的最小间隔（秒）
+    reference_cache_max_age: int = 300  # 进程内缓存最长有效期（秒），版本号递增失败时的兜底
+    reference_cache_retry_interval: int = 30  # Redis不可用后重试间隔（秒）
+
+    # 机台配置批量写入（/machine-config/bulk）
+    machine_bulk_chunk_size: int = 500  # 每条 INSERT ... ON DUPLICATE KEY UPDATE 的行数
+    machine_bulk_max_rows: int = 50000  # 单次批量写入的最大行数
+
+    # 甘特图工单查询（GET /work-orders）响应缓存，排产任务写入工单后失效
+    work_order_cache_enabled: bool = True
+    work_order_cache_max_entries: int = 512
     
     # LLM配置 - 阿里云DashScope
     llm_base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
@@ -45,8 +71,27 @@ class Settings(BaseSettings):
     
     # 文件上传配置
     upload_max_size: int = 50 * 1024 * 1024  # 50MB
-    upload_allowed_extensions: List[str] = [".xlsx", ".xls"]
+    upload_request_overhead: int = 64 * 1024  # multipart请求体中文件以外部分（边界、表单字段）允许的字节数
+    upload_allowed_extensions: List[str] = [".xlsx", ".xls", ".csv", ".parquet"]
     upload_temp_dir: str = "/tmp/aps_uploads"
+    decade_plan_insert_chunk_size: int = 500  # 旬计划Core批量插入每块行数
+    upload_read_chunk_size: int = 1024 * 1024  # 上传文件分块读取大小（字节）
+    parse_result_cache_ttl: int = 7 * 24 * 3600  # 按文件内容哈希缓存解析结果的有效期（秒）
+    excel_parse_streaming: bool = True  # 生产计划Excel以只读模式逐行流式解析
+    excel_parse_workers: int = 2  # Excel解析进程池工作进程数，0表示在线程池中解析
+    excel_parse_sheet_workers: int = 0  # 多工作表并行解析进程数，0表示按CPU核数，1表示逐个解析
+    excel_parse_parallel_min_bytes: int = 2 * 1024 * 1024  # 小于该大小的文件不并行解析（进程启动开销大于收益）
+    plan_import_pipeline_enabled: bool = True  # 后台导入使用 解析→校验→写入 分块流水线
+    plan_import_chunk_size: int = 2000  # 流水线每块记录数
+    plan_import_queue_size: int = 4  # 流水线相邻阶段之间最多缓存的块数
+    
+    # 响应压缩（gzip/brotli，brotli需安装可选依赖brotli）
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024  # 小于该字节数的响应不压缩
+    compression_gzip_level: int = 4  # 速度优先，JSON压缩率接近最高档
+    compression_brotli_enabled: bool = True  # 客户端支持时优先使用brotli
+    compression_brotli_quality: int = 4
+    compression_cache_max_entries: int = 256  # 按强ETag缓存的压缩结果条目数
     
     # 任务队列配置（Celery）
     celery_broker_url: str = "redis://:Redis_Apex_2025.@10.0.0.66:6379/14"
@@ -69,6 +114,31 @@ class Settings(BaseSettings):
     max_retry_count: int = 3
     scheduling_timeout: int = 3600  # 排产算法超时时间（秒）
     
+    # MES系统对接（未配置 mes_base_url 时工单推送使用内置Mock）
+    mes_base_url: Optional[str] = None  # 例如 http://mes.example.com/api/mes
+    mes_timeout: float = 10.0  # 单次请求超时（秒）
+    mes_max_connections: int = 20  # 连接池最大连接数（保持长连接复用）
+    mes_batch_size: int = 200  # 每个推送请求包含的工单数
+    mes_max_concurrency: int = 8  # 同时进行的推送请求数
+    mes_max_retries: int = 4  # 网络错误/429/5xx 的最大重试次数
+    mes_retry_base_delay: float = 0.2  # 指数退避基数（秒），实际等待在 [0, 基数×2^重试次数] 内随机
+    mes_retry_max_delay: float = 5.0  # 单次退避等待上限（秒）
+    
+    # MES工单下发发件箱（aps_mes_dispatch）：排产任务在写入工单的同一事务中写入下发记录，
+    # 后台分发器按批推送到MES（需配置 mes_base_url，已有库先执行 scripts/mes-dispatch-outbox-index.sql）
+    mes_outbox_enabled: bool = False
+    mes_outbox_batch_size: int = 500  # 分发器每次领取的下发记录数
+    mes_outbox_poll_interval: float = 5.0  # 没有待下发记录时的轮询间隔（秒）
+    mes_outbox_lease_seconds: int = 300  # 领取后未回写结果的记录在该时间后重新下发（进程中断时保证至少投递一次）
+    mes_outbox_max_retries: int = 100  # MES不可用时的最大重试次数，超过后标记为FAILED
+    mes_outbox_retry_base_delay: float = 5.0  # 重试间隔基数（秒），按重试次数指数增长
+    mes_outbox_retry_max_delay: float = 600.0  # 重试间隔上限（秒）
+    
+    # 工单归档配置（热/归档表分离，需先执行 scripts/work-order-archive.sql）
+    work_order_archive_enabled: bool = False
+    work_order_archive_batch_limit: int = 50  # 单次归档作业最多处理的任务数
+    work_order_archive_months_ahead: int = 3  # 归档表预建分区的月份数
+    
     @field_validator('upload_temp_dir')
     @classmethod
     def validate_upload_dir(cls, v):
@@ -0,0 +1,82 @@
+"""
+APS智慧排产系统 - 大列表接口的JSON响应
+
+工单列表、甘特图排程、旬计划和解析结果等接口一次返回数千条记录。默认路径下每条记录
+先构建Pydantic模型校验，再经 jsonable_encoder 逐层递归转换，最后由标准库json序列化。
+这些记录来自数据库或解析器，已是可信数据，这里直接把字典交给orjson（C实现）序列化：
+
+- orjson原生支持 datetime/date/time（ISO 8601，与 isoformat() 相同）、Enum、UUID、numpy标量
+- Decimal 与 jsonable_encoder 相同：无小数部分时为整数，否则为浮点数
+- 未安装orjson时使用标准库json，输出内容相同
+"""
+from typing import Any, Dict, Optional
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+import json
+
+from fastapi.responses import JSONResponse
+
+from app.schemas.base import ResponseStatus
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库json
+    orjson = None
+
+
+def _json_default(value: Any) -> Any:
+    """orjson/标准库json不能直接序列化的类型"""
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_json(content: Any, pretty: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON（中文不转义）；pretty=True 时缩进2个空格"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(content, default=_json_default, option=option)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        default=_json_default,
+        indent=2 if pretty else None,
+        separators=None if pretty else (",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 dumps_json 序列化的JSON响应，内容不经过 jsonable_encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def success_payload(data: Optional[Dict[str, Any]], message: str, code: int = 200) -> Dict[str, Any]:
+    """与 SuccessResponse 字段和顺序相同的响应字典，不构建模型"""
+    return {
+        "code": code,
+        "message": message,
+        "timestamp": datetime.now(),
+        "status": ResponseStatus.SUCCESS.value,
+        "data": data,
+    }
+
+
+def success_response(
+    data: Optional[Dict[str, Any]],
+    message: str,
+    code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> FastJSONResponse:
+    """大列表接口的成功响应（格式同 SuccessResponse）"""
+    return FastJSONResponse(content=success_payload(data, message, code), headers=headers)
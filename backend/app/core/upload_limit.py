@@ -0,0 +1,67 @@
+"""
+APS智慧排产系统 - 上传请求体大小限制中间件
+
+Starlette在调用接口函数之前已把multipart请求体完整读取并缓存到临时文件（UploadFile），
+接口内按块检查文件大小只能限制复制，不能限制请求本身。本中间件在请求体被读取时检查：
+
+- 声明的 Content-Length 超过限制时直接返回413，不读取请求体
+- 未声明长度（分块传输）时，读取过程中累计字节数，超过限制即中止并返回413
+
+只检查 multipart/form-data 请求；限制为 upload_max_size 加上 upload_request_overhead
+（multipart边界和文件以外的表单字段）
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+
+def upload_body_limit() -> int:
+    """multipart请求体的最大字节数"""
+    return settings.upload_max_size + settings.upload_request_overhead
+
+
+def _too_large_detail(max_body_size: int) -> str:
+    return f"上传请求体超过限制：最大允许{max_body_size}字节（文件最大{settings.upload_max_size}字节）"
+
+
+class UploadSizeLimitMiddleware:
+    """multipart上传请求体大小限制（纯ASGI中间件）"""
+
+    def __init__(self, app: ASGIApp, max_body_size: Optional[int] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        max_body_size = self.max_body_size if self.max_body_size is not None else upload_body_limit()
+        content_length = headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_body_size:
+            response = JSONResponse(status_code=413, content={"detail": _too_large_detail(max_body_size)})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    # 在表单解析中抛出，由FastAPI按HTTPException返回413
+                    raise HTTPException(status_code=413, detail=_too_large_detail(max_body_size))
+            return message
+
+        await self.app(scope, limited_receive, send)
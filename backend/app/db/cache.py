@@ -6,12 +6,25 @@ APS智慧排产系统 - Redis缓存连接模块
 """
 import redis.asyncio as redis
 from redis.asyncio.connection import ConnectionPool
-from typing import Optional, Any, Union, Dict
+from typing import Optional, Any, Union, Dict, Callable, Iterable, Tuple
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+import asyncio
+import copy
+import inspect
 import json
 import pickle
 import logging
+import time
+import uuid
 from contextlib import asynccontextmanager
 
+try:
+    import msgpack
+except ImportError:  # 默认缓存序列化格式，未安装时需配置 cache_serializer=json
+    msgpack = None
+
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -30,12 +43,287 @@ redis_pool = ConnectionPool.from_url(
 # 创建Redis客户端
 redis_client = redis.Redis(connection_pool=redis_pool)
 
+# 二进制连接池（不解码响应），供pickle/msgpack序列化的缓存值使用
+redis_binary_pool = ConnectionPool.from_url(
+    settings.redis_url,
+    max_connections=settings.redis_max_connections,
+    decode_responses=False,
+    socket_connect_timeout=10,
+    socket_keepalive=True,
+    socket_keepalive_options={},
+    health_check_interval=30,
+)
+
+redis_binary_client = redis.Redis(connection_pool=redis_binary_pool)
+
+
+# ==================== 序列化 ====================
+
+class CacheSerializer:
+    """缓存值序列化器基类，tag 为写入Redis时的单字节格式前缀"""
+
+    name = ""
+    tag = b""
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonSerializer(CacheSerializer):
+    """JSON序列化（兼容原有格式，datetime等类型会变为字符串）"""
+
+    name = "json"
+    tag = b"j"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class PickleSerializer(CacheSerializer):
+    """
+    pickle协议5序列化，完整保留Python类型
+
+    pickle.loads 会执行数据中的任意代码，能写入Redis的任何一方都可借此在API进程中执行代码，
+    因此只在显式配置 cache_serializer=pickle 时使用，其他格式下不会反序列化pickle前缀的值
+    """
+
+    name = "pickle"
+    tag = b"p"
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=5)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+# msgpack扩展类型编号
+_MSGPACK_DATETIME = 1
+_MSGPACK_DATE = 2
+_MSGPACK_TIME = 3
+_MSGPACK_TIMEDELTA = 4
+_MSGPACK_DECIMAL = 5
+
+
+def _msgpack_default(value: Any):
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_MSGPACK_DATETIME, value.isoformat().encode())
+    if isinstance(value, date):
+        return msgpack.ExtType(_MSGPACK_DATE, value.isoformat().encode())
+    if isinstance(value, dt_time):
+        return msgpack.ExtType(_MSGPACK_TIME, value.isoformat().encode())
+    if isinstance(value, timedelta):
+        return msgpack.ExtType(_MSGPACK_TIMEDELTA, repr(value.total_seconds()).encode())
+    if isinstance(value, Decimal):
+        return msgpack.ExtType(_MSGPACK_DECIMAL, str(value).encode())
+    raise TypeError(f"msgpack无法序列化类型: {type(value).__name__}")
+
+
+def _msgpack_ext_hook(code: int, data: bytes):
+    text = data.decode()
+    if code == _MSGPACK_DATETIME:
+        return datetime.fromisoformat(text)
+    if code == _MSGPACK_DATE:
+        return date.fromisoformat(text)
+    if code == _MSGPACK_TIME:
+        return dt_time.fromisoformat(text)
+    if code == _MSGPACK_TIMEDELTA:
+        return timedelta(seconds=float(text))
+    if code == _MSGPACK_DECIMAL:
+        return Decimal(text)
+    return msgpack.ExtType(code, data)
+
+
+class MsgpackSerializer(CacheSerializer):
+    """msgpack序列化，datetime/date/time/timedelta/Decimal通过扩展类型保留（元组还原为列表）"""
+
+    name = "msgpack"
+    tag = b"m"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("msgpack未安装，无法使用msgpack缓存序列化")
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+
+CACHE_SERIALIZERS = {
+    JsonSerializer.name: JsonSerializer,
+    PickleSerializer.name: PickleSerializer,
+    MsgpackSerializer.name: MsgpackSerializer,
+}
+
+
+def get_serializer(name: Optional[str] = None) -> CacheSerializer:
+    """按名称创建序列化器，未指定时使用 settings.cache_serializer"""
+    name = (name or settings.cache_serializer).lower()
+    if name not in CACHE_SERIALIZERS:
+        raise ValueError(f"不支持的缓存序列化格式: {name}")
+    return CACHE_SERIALIZERS[name]()
+
+
+# ==================== 进程内LRU缓存层 ====================
+
+_MISSING = object()
+
+
+class _ComputeCancelled(Exception):
+    """进程内负责计算的协程被取消，等待方收到后重新查询缓存并由其中一个接手计算"""
+
+
+class LocalLRUCache:
+    """
+    进程内LRU缓存（带过期时间）
+
+    写入和读取时都深拷贝，调用方修改写入的对象或返回值不会影响缓存中的值（与Redis层的语义一致）；
+    其他进程删除Redis中的键后，本进程最多在ttl秒内读到旧值
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # {键: (过期时间, 值)}
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """读取缓存值，未命中或已过期时返回 _MISSING"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return copy.deepcopy(entry[1])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """写入缓存值，超过容量时淘汰最久未使用的条目"""
+        self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ==================== 命名空间统计 ====================
+
+class CacheStats:
+    """按命名空间统计缓存命中率与耗时"""
+
+    def __init__(self):
+        self._namespaces: Dict[str, Dict[str, float]] = {}
+
+    def _bucket(self, namespace: str) -> Dict[str, float]:
+        bucket = self._namespaces.get(namespace)
+        if bucket is None:
+            bucket = self._namespaces[namespace] = {
+                'local_hits': 0, 'remote_hits': 0, 'misses': 0, 'waits': 0, 'errors': 0,
+                'lookups': 0, 'lookup_seconds': 0.0, 'computes': 0, 'compute_seconds': 0.0,
+            }
+        return bucket
+
+    def record_lookup(self, namespace: str, outcome: str, seconds: float):
+        """记录一次读取，outcome 为 local_hits / remote_hits / misses"""
+        bucket = self._bucket(namespace)
+        bucket[outcome] += 1
+        bucket['lookups'] += 1
+        bucket['lookup_seconds'] += seconds
+
+    def record_compute(self, namespace: str, seconds: float):
+        bucket = self._bucket(namespace)
+        bucket['computes'] += 1
+        bucket['compute_seconds'] += seconds
+
+    def record(self, namespace: str, counter: str):
+        self._bucket(namespace)[counter] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """返回各命名空间统计：命中率、本地命中率、平均读取/计算耗时（毫秒）"""
+        result = {}
+        for namespace, bucket in sorted(self._namespaces.items()):
+            hits = bucket['local_hits'] + bucket['remote_hits']
+            lookups = bucket['lookups']
+            result[namespace] = {
+                'local_hits': int(bucket['local_hits']),
+                'remote_hits': int(bucket['remote_hits']),
+                'misses': int(bucket['misses']),
+                'waits': int(bucket['waits']),
+                'errors': int(bucket['errors']),
+                'computes': int(bucket['computes']),
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'local_hit_rate': round(bucket['local_hits'] / lookups, 4) if lookups else 0.0,
+                'avg_lookup_ms': round(bucket['lookup_seconds'] / lookups * 1000, 3) if lookups else 0.0,
+                'avg_compute_ms': round(bucket['compute_seconds'] / bucket['computes'] * 1000, 3)
+                if bucket['computes'] else 0.0,
+            }
+        return result
+
+    def reset(self):
+        self._namespaces.clear()
+
+
+def key_namespace(key: str) -> str:
+    """缓存键的命名空间：最后一个冒号之前的部分（如 aps:plans:123 -> aps:plans）"""
+    return key.rsplit(':', 1)[0] if ':' in key else key
+
+
+# 全局进程内缓存层、统计与进行中的计算（单飞）
+local_cache = LocalLRUCache(settings.cache_local_max_entries, settings.cache_local_ttl)
+cache_stats = CacheStats()
+_inflight: Dict[str, asyncio.Future] = {}
+
+# 仅当锁仍属于自己时释放
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 
 class CacheManager:
-    """Redis缓存管理器"""
+    """
+    Redis缓存管理器
+
+    get/set 等方法保持原有JSON格式；get_object/set_object/get_or_compute
+    使用可配置的二进制序列化，并在Redis之前增加进程内LRU缓存层
+    """
     
-    def __init__(self, client: redis.Redis = None):
+    def __init__(
+        self,
+        client: redis.Redis = None,
+        binary_client: redis.Redis = None,
+        serializer: Union[str, CacheSerializer, None] = None,
+        local: Optional[LocalLRUCache] = _MISSING,
+        stats: CacheStats = None
+    ):
         self.client = client or redis_client
+        # 传入自定义客户端时二进制读写也使用该客户端
+        self.binary_client = binary_client or (client if client is not None else redis_binary_client)
+        self.serializer = serializer if isinstance(serializer, CacheSerializer) else get_serializer(serializer)
+        if local is _MISSING:
+            local = local_cache if settings.cache_local_enabled else None
+        self.local = local
+        self.stats = stats or cache_stats
     
     async def get(self, key: str, decode_json: bool = True) -> Optional[Any]:
         """获取缓存值"""
@@ -64,11 +352,10 @@ class CacheManager:
         """设置缓存值"""
         try:
             if encode_json:
-                if isinstance(value, (dict, list, tuple)):
-                    value = json.dumps(value, ensure_ascii=False, default=str)
-                elif not isinstance(value, (str, bytes, int, float)):
-                    value = json.dumps(value, ensure_ascii=False, default=str)
+                value = self._encode_json(value)
             
+            if self.local is not None:
+                self.local.delete(key)
             if ttl:
                 return await self.client.setex(key, ttl, value)
             else:
@@ -78,7 +365,9 @@ class CacheManager:
             return False
     
     async def delete(self, *keys: str) -> int:
-        """删除缓存"""
+        """删除缓存（同时清除本进程LRU缓存层）"""
+        if self.local is not None:
+            self.local.delete(*keys)
         try:
             return await self.client.delete(*keys)
         except Exception as e:
@@ -137,12 +426,14 @@ class CacheManager:
             if isinstance(value, (dict, list, tuple)):
                 value = json.dumps(value, ensure_ascii=False, default=str)
             
-            result = await self.client.hset(key, field, value)
-            
-            if ttl:
-                await self.client.expire(key, ttl)
+            # HSET与EXPIRE在同一管道中发送，一次往返
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, field, value)
+                if ttl:
+                    pipe.expire(key, ttl)
+                results = await pipe.execute()
             
-            return bool(result)
+            return bool(results[0])
         except Exception as e:
             logger.error(f"Cache hash_set error for key {key}, field {field}: {e}")
             return False
@@ -172,12 +463,13 @@ class CacheManager:
                 else:
                     json_values.append(str(value))
             
-            result = await self.client.lpush(key, *json_values)
-            
-            if ttl:
-                await self.client.expire(key, ttl)
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.lpush(key, *json_values)
+                if ttl:
+                    pipe.expire(key, ttl)
+                results = await pipe.execute()
             
-            return result
+            return results[0]
         except Exception as e:
             logger.error(f"Cache list_push error for key {key}: {e}")
             return 0
@@ -211,6 +503,320 @@ class CacheManager:
             logger.error(f"Cache list_range error for key {key}: {e}")
             return []
 
+    # ==================== 批量读写（MGET/MSET/管道） ====================
+
+    @staticmethod
+    def _encode_json(value: Any) -> Any:
+        """与 set 相同的JSON编码规则：字符串、字节、数字原样写入"""
+        if isinstance(value, (str, bytes, int, float)):
+            return value
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _decode_json(value: Any) -> Any:
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return value
+
+    async def get_many(self, keys: Iterable[str], decode_json: bool = True) -> Dict[str, Any]:
+        """
+        批量获取缓存值（单次MGET）
+
+        Returns:
+            Dict[str, Any]: {键: 值}，不存在的键不包含在结果中
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            values = await self.client.mget(keys)
+        except Exception as e:
+            logger.error(f"Cache get_many error for {len(keys)} keys: {e}")
+            return {}
+
+        result = {}
+        for key, value in zip(keys, values):
+            if value is not None:
+                result[key] = self._decode_json(value) if decode_json else value
+        return result
+
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        ttl: Optional[int] = None,
+        encode_json: bool = True
+    ) -> bool:
+        """
+        批量设置缓存值
+
+        无过期时间时使用单次MSET；有过期时间时在同一管道中逐个 SET EX，一次往返
+        """
+        if not mapping:
+            return True
+        if self.local is not None:
+            self.local.delete(*mapping)
+        try:
+            values = {
+                key: self._encode_json(value) if encode_json else value
+                for key, value in mapping.items()
+            }
+            if not ttl:
+                return bool(await self.client.mset(values))
+
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.set(key, value, ex=ttl)
+                results = await pipe.execute()
+            return all(results)
+        except Exception as e:
+            logger.error(f"Cache set_many error for {len(mapping)} keys: {e}")
+            return False
+
+    async def delete_many(self, keys: Iterable[str], chunk_size: int = 1000) -> int:
+        """批量删除缓存，按chunk_size拆分为多条DEL命令并在同一管道中发送"""
+        keys = list(keys)
+        if not keys:
+            return 0
+        if self.local is not None:
+            self.local.delete(*keys)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for start in range(0, len(keys), chunk_size):
+                    pipe.delete(*keys[start:start + chunk_size])
+                results = await pipe.execute()
+            return sum(results)
+        except Exception as e:
+            logger.error(f"Cache delete_many error for {len(keys)} keys: {e}")
+            return 0
+
+    async def hash_set_many(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None) -> int:
+        """批量设置哈希字段（单条HSET），过期时间在同一管道中设置"""
+        if not mapping:
+            return 0
+        try:
+            fields = {
+                field: json.dumps(value, ensure_ascii=False, default=str)
+                if isinstance(value, (dict, list, tuple)) else value
+                for field, value in mapping.items()
+            }
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping=fields)
+                if ttl:
+                    pipe.expire(key, ttl)
+                results = await pipe.execute()
+            return results[0]
+        except Exception as e:
+            logger.error(f"Cache hash_set_many error for key {key}: {e}")
+            return 0
+
+    async def list_push_many(self, items: Dict[str, Iterable[Any]], ttl: Optional[int] = None) -> Dict[str, int]:
+        """
+        向多个列表推送值，所有LPUSH和EXPIRE在同一管道中发送
+
+        Args:
+            items: {列表键: 值列表}
+            ttl: 过期时间（秒）
+
+        Returns:
+            Dict[str, int]: {列表键: 推送后列表长度}
+        """
+        items = {key: list(values) for key, values in items.items() if values}
+        if not items:
+            return {}
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, values in items.items():
+                    pipe.lpush(key, *[
+                        json.dumps(value, ensure_ascii=False, default=str)
+                        if isinstance(value, (dict, list, tuple)) else str(value)
+                        for value in values
+                    ])
+                    if ttl:
+                        pipe.expire(key, ttl)
+                results = await pipe.execute()
+            step = 2 if ttl else 1
+            return {key: results[index * step] for index, key in enumerate(items)}
+        except Exception as e:
+            logger.error(f"Cache list_push_many error for {len(items)} keys: {e}")
+            return {}
+
+    # ==================== 二进制序列化与两级缓存 ====================
+
+    def _encode(self, value: Any) -> bytes:
+        return self.serializer.tag + self.serializer.dumps(value)
+
+    def _decode(self, data: Union[bytes, str]) -> Any:
+        """按格式前缀反序列化，序列化格式切换前写入的值仍可读取（pickle值仅在配置为pickle时读取）"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        tag, payload = data[:1], data[1:]
+        if tag == self.serializer.tag:
+            return self.serializer.loads(payload)
+        for serializer_class in CACHE_SERIALIZERS.values():
+            if serializer_class.tag == tag and serializer_class is not PickleSerializer:
+                return serializer_class().loads(payload)
+        raise ValueError(f"未知的缓存值格式前缀: {tag!r}")
+
+    async def _lookup(self, key: str, namespace: str, local_ttl: Optional[float] = None) -> Any:
+        """依次读取进程内缓存层和Redis，未命中返回 _MISSING"""
+        start = time.perf_counter()
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not _MISSING:
+                self.stats.record_lookup(namespace, 'local_hits', time.perf_counter() - start)
+                return value
+
+        value = _MISSING
+        try:
+            data = await self.binary_client.get(key)
+            if data is not None:
+                value = self._decode(data)
+        except Exception as e:
+            logger.error(f"Cache get_object error for key {key}: {e}")
+            self.stats.record(namespace, 'errors')
+
+        if value is _MISSING:
+            self.stats.record_lookup(namespace, 'misses', time.perf_counter() - start)
+            return _MISSING
+
+        if self.local is not None:
+            self.local.set(key, value, local_ttl)
+        self.stats.record_lookup(namespace, 'remote_hits', time.perf_counter() - start)
+        return value
+
+    async def get_object(self, key: str, default: Any = None, namespace: str = None) -> Any:
+        """读取二进制序列化的缓存值（先查进程内缓存层）"""
+        value = await self._lookup(key, namespace or key_namespace(key))
+        return default if value is _MISSING else value
+
+    async def set_object(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        local_ttl: Optional[float] = None
+    ) -> bool:
+        """以二进制序列化写入Redis，并写入进程内缓存层"""
+        if self.local is not None:
+            self.local.set(key, value, local_ttl)
+        try:
+            data = self._encode(value)
+            if ttl:
+                return bool(await self.binary_client.set(key, data, ex=ttl))
+            return bool(await self.binary_client.set(key, data))
+        except Exception as e:
+            logger.error(f"Cache set_object error for key {key}: {e}")
+            return False
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[int] = None,
+        namespace: str = None,
+        local_ttl: Optional[float] = None,
+        lock_timeout: Optional[float] = None
+    ) -> Any:
+        """
+        读取缓存，未命中时计算并写入，防止缓存击穿
+
+        同一进程内同一键只有一个协程执行计算，其余协程等待其结果（各自得到结果的副本）；
+        负责计算的协程被取消（如客户端断开）时，等待方不会随之被取消，而是由其中一个接手计算；
+        跨进程通过Redis锁（SET NX PX）保证只有一个进程重算，
+        其他进程轮询等待结果，超过lock_timeout后自行计算。Redis不可用时直接计算
+
+        Args:
+            key: 缓存键
+            compute: 计算函数，可为普通函数或协程函数
+            ttl: Redis过期时间（秒）
+            namespace: 统计命名空间，默认取键的前缀
+            local_ttl: 进程内缓存层过期时间（秒），默认 settings.cache_local_ttl
+            lock_timeout: 重算锁超时时间（秒），默认 settings.cache_lock_timeout
+
+        Returns:
+            Any: 缓存值或计算结果
+        """
+        namespace = namespace or key_namespace(key)
+        while True:
+            value = await self._lookup(key, namespace, local_ttl)
+            if value is not _MISSING:
+                return value
+
+            pending = _inflight.get(key)
+            if pending is None:
+                break
+            self.stats.record(namespace, 'waits')
+            try:
+                return copy.deepcopy(await asyncio.shield(pending))
+            except _ComputeCancelled:
+                # 计算方被取消：重新查询，第一个恢复的等待方成为新的计算方
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        try:
+            value = await self._compute_with_lock(key, compute, ttl, namespace, local_ttl, lock_timeout)
+        except asyncio.CancelledError:
+            future.set_exception(_ComputeCancelled(key))
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 无等待方时避免“exception was never retrieved”警告
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            _inflight.pop(key, None)
+
+    async def _compute_with_lock(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[int],
+        namespace: str,
+        local_ttl: Optional[float],
+        lock_timeout: Optional[float]
+    ) -> Any:
+        """获取Redis重算锁后计算；锁被其他进程持有时等待其结果"""
+        lock_timeout = lock_timeout if lock_timeout is not None else settings.cache_lock_timeout
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        try:
+            acquired = bool(await self.binary_client.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)))
+        except Exception as e:
+            logger.error(f"Cache lock error for key {key}: {e}")
+            self.stats.record(namespace, 'errors')
+            acquired = None
+
+        if acquired is False:
+            self.stats.record(namespace, 'waits')
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.cache_lock_poll_interval)
+                value = await self._lookup(key, namespace, local_ttl)
+                if value is not _MISSING:
+                    return value
+            logger.warning(f"等待缓存重算超时，自行计算: {key}")
+
+        try:
+            start = time.perf_counter()
+            value = compute()
+            if inspect.isawaitable(value):
+                value = await value
+            self.stats.record_compute(namespace, time.perf_counter() - start)
+            await self.set_object(key, value, ttl, local_ttl)
+            return value
+        finally:
+            if acquired:
+                try:
+                    await self.binary_client.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.error(f"Cache lock release error for key {key}: {e}")
+
 
 @asynccontextmanager
 async def get_cache_manager():
@@ -242,6 +848,7 @@ async def check_redis_connection() -> bool:
 async def close_redis_connections():
     """关闭Redis连接"""
     await redis_client.close()
+    await redis_binary_client.close()
     logger.info("Redis connections closed")
 
 
@@ -273,13 +880,21 @@ class RedisHealthCheck:
             }
 
 
-import time
-
 # 导出主要组件
 __all__ = [
     "redis_client",
     "redis_pool",
+    "redis_binary_client",
     "CacheManager",
+    "CacheSerializer",
+    "JsonSerializer",
+    "PickleSerializer",
+    "MsgpackSerializer",
+    "get_serializer",
+    "LocalLRUCache",
+    "CacheStats",
+    "local_cache",
+    "cache_stats",
     "get_cache_manager",
     "get_redis_client",
     "check_redis_connection",
@@ -4,13 +4,15 @@ APS智慧排产系统 - 数据库连接模块
 基于技术设计文档实现异步MySQL连接和会话管理
 支持连接池、事务管理、自动重连等企业级特性
 """
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncConnection, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.pool import NullPool
-from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy import text, event
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 import logging
+import re
 
 from app.core.config import settings
 
@@ -33,10 +35,76 @@ AsyncSessionLocal = async_sessionmaker(
     autocommit=False,
 )
 
+# 只读副本引擎 - 未配置副本时与主库引擎相同
+if settings.mysql_read_url:
+    read_engine = create_async_engine(
+        settings.mysql_read_url,
+        echo=settings.mysql_echo,
+        poolclass=NullPool,
+        future=True,
+    )
+else:
+    read_engine = engine
+
+# 只读会话工厂
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+    autocommit=False,
+)
+
 # 声明式基类
 Base = declarative_base()
 
 
+# 读写分离 - 本进程主库最近一次提交写入的时间（time.monotonic）
+# 该标记只在进程内有效，其他 uvicorn worker 或进程的写入不会触发窗口期，因此写后窗口只是尽力而为：
+# 只读会话只用于展示类接口（甘特图、历史、统计、导出），依赖刚写入数据的写入路径（如排产读取旬计划）必须读主库
+_WRITE_STATEMENT_PATTERN = re.compile(r"\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+_last_primary_write_at = None
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _flag_pending_write(conn, cursor, statement, parameters, context, executemany):
+    """标记连接上存在未提交的写操作"""
+    if _WRITE_STATEMENT_PATTERN.match(statement):
+        conn.info["has_pending_write"] = True
+
+
+@event.listens_for(engine.sync_engine, "commit")
+def _record_committed_write(conn):
+    """写事务提交后记录写入时间，用于读写分离的复制延迟规避"""
+    if conn.info.pop("has_pending_write", False):
+        mark_primary_write()
+
+
+@event.listens_for(engine.sync_engine, "rollback")
+def _clear_pending_write(conn):
+    conn.info.pop("has_pending_write", None)
+
+
+def mark_primary_write():
+    """记录主库写入，写入后窗口期内的读请求路由到主库"""
+    global _last_primary_write_at
+    _last_primary_write_at = time.monotonic()
+
+
+def is_read_replica_enabled() -> bool:
+    """是否配置了独立的只读副本"""
+    return read_engine is not engine
+
+
+def should_read_from_primary() -> bool:
+    """判断当前读请求是否需要走主库（未配置副本或处于本进程的写后窗口期）"""
+    if not is_read_replica_enabled():
+        return True
+    if _last_primary_write_at is None:
+        return False
+    return time.monotonic() - _last_primary_write_at < settings.db_read_after_write_window
+
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """
     获取异步数据库会话
@@ -77,6 +145,72 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def _open_read_session() -> AsyncSession:
+    """打开只读会话，副本不可用时回退到主库"""
+    if should_read_from_primary():
+        return AsyncSessionLocal()
+    
+    session = AsyncReadSessionLocal()
+    try:
+        await session.connection()
+        return session
+    except (DBAPIError, OSError) as e:
+        logger.warning(f"只读副本连接失败，回退到主库: {e}")
+        await session.close()
+        return AsyncSessionLocal()
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    获取只读数据库会话 - 优先使用只读副本
+    
+    用于甘特图、历史、统计、导出等只读接口；未配置副本、副本不可用
+    或本进程主库刚发生写入时自动回退到主库。其他进程的写入不受写后窗口保护，
+    可能短暂读到副本上的滞后数据，写入路径不应使用只读会话
+    
+    用法:
+        async def some_function(db: AsyncSession = Depends(get_read_session)):
+            # 只读查询
+            pass
+    """
+    session = await _open_read_session()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+@asynccontextmanager
+async def get_read_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    上下文管理器方式获取只读数据库会话，不提交事务
+    
+    用法:
+        async with get_read_db_session() as db:
+            result = await db.execute(query)
+    """
+    session = await _open_read_session()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+@asynccontextmanager
+async def get_autocommit_connection() -> AsyncGenerator[AsyncConnection, None]:
+    """
+    获取自动提交模式的主库连接 - 用于DDL
+
+    MySQL的DDL会隐式提交当前事务，不能与业务写入放在同一个事务会话中执行
+
+    用法:
+        async with get_autocommit_connection() as conn:
+            await conn.execute(text("ALTER TABLE ..."))
+    """
+    async with engine.connect() as conn:
+        yield await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+
 async def create_tables():
     """创建所有数据库表"""
     async with engine.begin() as conn:
@@ -134,6 +268,8 @@ async def check_database_connection():
 async def close_db_connections():
     """关闭数据库连接池"""
     await engine.dispose()
+    if is_read_replica_enabled():
+        await read_engine.dispose()
     logger.info("Database connections closed")
 
 
@@ -207,10 +343,17 @@ import time
 # 导出主要组件
 __all__ = [
     "engine",
+    "read_engine",
     "AsyncSessionLocal", 
+    "AsyncReadSessionLocal",
     "Base",
     "get_async_session",
     "get_db_session",
+    "get_read_session",
+    "get_read_db_session",
+    "get_autocommit_connection",
+    "mark_primary_write",
+    "should_read_from_primary",
     "create_tables",
     "drop_tables",
     "check_database_connection",
@@ -0,0 +1,178 @@
+"""
+APS智慧排产系统 - 预编译查询注册表
+
+将参数化SQL在注册时一次性构造为 TextClause（绑定参数类型、IN列表展开），
+可选过滤条件的每种组合只编译一次并缓存；查询结果通过按列下标生成的映射函数转换为字典，
+避免每次调用拼接SQL字符串和逐行按属性名取值
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime, time, timedelta
+from sqlalchemy import text, bindparam
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.types import TypeEngine
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+RowMapper = Callable[[Sequence[Any]], Dict[str, Any]]
+
+
+def build_row_mapper(columns: Sequence[str], converters: Dict[str, Callable[[Any], Any]] = None) -> RowMapper:
+    """
+    生成按列下标取值的行映射函数
+
+    columns 为 SELECT 列顺序对应的输出键名；converters 中的函数作用于对应列的值
+
+    Args:
+        columns: 输出字典键名，顺序与SELECT列一致
+        converters: {键名: 转换函数}
+
+    Returns:
+        Callable: row -> dict
+    """
+    converters = converters or {}
+    unknown = set(converters) - set(columns)
+    if unknown:
+        raise ValueError(f"转换函数对应的列不存在: {sorted(unknown)}")
+
+    namespace: Dict[str, Any] = {}
+    items = []
+    for index, key in enumerate(columns):
+        if key in converters:
+            converter_name = f"_c{index}"
+            namespace[converter_name] = converters[key]
+            items.append(f"{key!r}: {converter_name}(row[{index}])")
+        else:
+            items.append(f"{key!r}: row[{index}]")
+
+    source = "def _map_row(row):\n    return {" + ", ".join(items) + "}\n"
+    exec(compile(source, "<row_mapper>", "exec"), namespace)
+    return namespace["_map_row"]
+
+
+def time_to_hhmm(value: Any) -> Optional[str]:
+    """time/datetime/timedelta（MySQL TIME列）转换为 HH:MM 字符串，其他类型返回None"""
+    if isinstance(value, timedelta):
+        total_seconds = int(value.total_seconds())
+        return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}"
+    if isinstance(value, (time, datetime)):
+        return f"{value.hour:02d}:{value.minute:02d}"
+    return None
+
+
+class CompiledQuery:
+    """
+    预编译的参数化查询
+
+    select_sql 为固定部分，filters 为可选过滤条件 {参数名: SQL片段}，
+    参数值为None或空列表时对应片段不参与查询；order_by 追加在最后
+    """
+
+    def __init__(
+        self,
+        name: str,
+        select_sql: str,
+        columns: Sequence[str],
+        filters: Dict[str, str] = None,
+        order_by: str = "",
+        converters: Dict[str, Callable[[Any], Any]] = None,
+        param_types: Dict[str, TypeEngine] = None,
+        expanding: Iterable[str] = (),
+    ):
+        self.name = name
+        self.select_sql = select_sql.strip()
+        self.columns = tuple(columns)
+        self.filters = dict(filters or {})
+        self.order_by = order_by.strip()
+        self.param_types = dict(param_types or {})
+        self.expanding = frozenset(expanding)
+        self.map_row = build_row_mapper(self.columns, converters)
+        self._statements: Dict[Tuple[str, ...], TextClause] = {}
+        # 无可选条件的语句在注册时即编译
+        self.statement(())
+
+    def statement(self, active_filters: Tuple[str, ...]) -> TextClause:
+        """返回指定可选条件组合的已编译语句（首次使用时编译并缓存）"""
+        statement = self._statements.get(active_filters)
+        if statement is None:
+            parts = [self.select_sql]
+            parts.extend(self.filters[name] for name in active_filters)
+            if self.order_by:
+                parts.append(self.order_by)
+            statement = text("\n".join(parts))
+
+            bind_names = set(statement._bindparams)
+            typed = [
+                bindparam(name, type_=self.param_types.get(name), expanding=name in self.expanding)
+                for name in bind_names
+                if name in self.param_types or name in self.expanding
+            ]
+            if typed:
+                statement = statement.bindparams(*typed)
+
+            self._statements[active_filters] = statement
+        return statement
+
+    def bind(self, **params: Any) -> Tuple[TextClause, Dict[str, Any]]:
+        """
+        按参数选择语句并整理绑定参数
+
+        Returns:
+            Tuple[TextClause, Dict]: (语句, 绑定参数)
+        """
+        # 与原查询的真值判断一致：None、空字符串和空列表都视为未指定该过滤条件
+        active_filters = tuple(
+            name for name in self.filters
+            if params.get(name) not in (None, '', [], ())
+        )
+        bound = {}
+        for name, value in params.items():
+            if name in self.filters and name not in active_filters:
+                continue
+            if name in self.expanding and value is not None:
+                value = list(value)
+            bound[name] = value
+        return self.statement(active_filters), bound
+
+    def map_rows(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        """批量映射查询结果行"""
+        return list(map(self.map_row, rows))
+
+
+class QueryRegistry:
+    """查询注册表 - 按名称管理预编译查询"""
+
+    def __init__(self):
+        self._queries: Dict[str, CompiledQuery] = {}
+
+    def register(self, name: str, select_sql: str, columns: Sequence[str], **options: Any) -> CompiledQuery:
+        """注册查询，名称重复时抛出ValueError"""
+        if name in self._queries:
+            raise ValueError(f"查询已注册: {name}")
+        query = CompiledQuery(name, select_sql, columns, **options)
+        self._queries[name] = query
+        return query
+
+    def get(self, name: str) -> CompiledQuery:
+        """按名称获取查询，不存在时抛出KeyError"""
+        return self._queries[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._queries
+
+    def names(self) -> List[str]:
+        return list(self._queries)
+
+
+# 全局查询注册表
+query_registry = QueryRegistry()
+
+
+__all__ = [
+    "CompiledQuery",
+    "QueryRegistry",
+    "query_registry",
+    "build_row_mapper",
+    "time_to_hhmm",
+]
@@ -10,9 +10,14 @@ from contextlib import asynccontextmanager
 import logging
 
 from app.core.config import settings, validate_configuration
+from app.core.compression import CompressionMiddleware
+from app.core.upload_limit import UploadSizeLimitMiddleware
 from app.db.connection import check_database_connection, close_db_connections, DatabaseHealthCheck
-from app.db.cache import check_redis_connection, close_redis_connections, RedisHealthCheck
+from app.db.cache import check_redis_connection, close_redis_connections, RedisHealthCheck, cache_stats, local_cache
 from app.api.v1.router import api_v1_router
+from app.services.parse_worker_pool import shutdown_parse_executor
+from app.services.mes_client import close_mes_client
+from app.services.mes_outbox import start_mes_outbox_dispatcher, stop_mes_outbox_dispatcher
 
 # 配置日志
 logging.basicConfig(
@@ -48,12 +53,18 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("⚠️ Redis connection failed")
     
+    # 启动MES工单分发器（未启用发件箱时不启动）
+    start_mes_outbox_dispatcher()
+    
     yield
     
     # 关闭时
     logger.info("Shutting down application...")
+    await stop_mes_outbox_dispatcher()
     await close_db_connections()
     await close_redis_connections()
+    shutdown_parse_executor()
+    await close_mes_client()
     logger.info("Application shutdown complete")
 
 
@@ -76,6 +87,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩中间件（大JSON响应按 Accept-Encoding 使用brotli/gzip压缩）
+app.add_middleware(CompressionMiddleware)
+
+# 上传请求体大小限制（在Starlette缓存multipart请求体之前检查）
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # 注册API路由
 app.include_router(api_v1_router)
 
@@ -112,6 +129,21 @@ async def health_check():
     }
 
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """缓存统计接口 - 按命名空间返回命中率与平均耗时"""
+    return {
+        "serializer": settings.cache_serializer,
+        "local_cache": {
+            "enabled": settings.cache_local_enabled,
+            "entries": len(local_cache),
+            "max_entries": local_cache.max_entries,
+            "ttl": local_cache.ttl,
+        },
+        "namespaces": cache_stats.snapshot(),
+    }
+
+
 @app.get("/config")
 async def get_config_info():
     """配置信息接口（敏感信息已脱敏）"""
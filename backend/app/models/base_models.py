@@ -90,6 +90,7 @@ class ImportPlan(Base):
     file_name = Column(String(255), nullable=False, comment='文件名')
     file_path = Column(String(500), comment='文件路径')
     file_size = Column(BigInteger, comment='文件大小（字节）')
+    content_hash = Column(String(64), index=True, comment='文件内容SHA-256')
     total_records = Column(BigInteger, default=0, comment='总记录数')
     valid_records = Column(BigInteger, default=0, comment='有效记录数')
     error_records = Column(BigInteger, default=0, comment='错误记录数')
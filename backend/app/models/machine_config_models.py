@@ -3,7 +3,8 @@ APS智慧排产系统 - 机台配置相关数据模型
 
 实现机台速度、机台关系、班次配置等数据库模型
 """
-from sqlalchemy import Column, BigInteger, String, Integer, Time, Boolean, DECIMAL, DateTime, Text
+from datetime import date
+from sqlalchemy import Column, BigInteger, String, Integer, Time, Boolean, DECIMAL, Date, DateTime, Text
 from sqlalchemy.sql import func
 from app.db.connection import Base
 import enum
@@ -19,6 +20,9 @@ class MachineRelation(Base):
     maker_code = Column(String(20), nullable=False, comment='卷包机代码')
     relation_type = Column(String(20), nullable=False, comment='关系类型')
     priority = Column(Integer, nullable=False, comment='优先级')
+    effective_from = Column(Date, nullable=False, default=date.today, comment='生效日期')
+    effective_to = Column(Date, nullable=True, comment='失效日期')
+    status = Column(String(10), nullable=True, default='ACTIVE', comment='状态')
     
     # 审计字段
     created_time = Column(DateTime, default=func.now(), comment='创建时间')
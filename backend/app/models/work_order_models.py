@@ -4,7 +4,7 @@ APS智慧排产系统 - 工单结果数据模型（MES规范重构版）
 实现完全符合MES接口规范的卷包机和喂丝机工单数据库模型
 支持InputBatch结构和工单序列管理
 """
-from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Boolean, Date, DECIMAL, Text, ForeignKey
+from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Boolean, Date, DECIMAL, Text, ForeignKey, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.connection import Base
@@ -177,6 +177,27 @@ class InputBatch(Base):
     # packing_order = relationship("PackingOrder", back_populates="input_batches")
     
 
+class MESDispatch(Base):
+    """MES工单下发记录表 - 工单推送发件箱，由后台分发器推送到MES"""
+    __tablename__ = "aps_mes_dispatch"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True, comment='主键ID')
+    dispatch_batch_id = Column(String(50), nullable=False, comment='下发批次ID（排产任务ID或推送批次号）')
+    work_order_nr = Column(String(50), nullable=False, comment='工单号（plan_id）')
+    order_type = Column(String(10), nullable=False, comment='工单类型：PACKING/FEEDING')
+    dispatch_status = Column(String(20), default='PENDING', comment='下发状态：PENDING/DISPATCHED/CONFIRMED/FAILED')
+    dispatch_time = Column(DateTime, comment='最近一次下发时间')
+    dispatch_data = Column(JSON, comment='下发数据（MES工单JSON）')
+    mes_response = Column(JSON, comment='MES响应数据（JSON）')
+    mes_confirm_time = Column(DateTime, comment='MES确认时间')
+    mes_error_message = Column(Text, comment='MES错误信息')
+    retry_count = Column(Integer, default=0, comment='重试次数')
+    max_retry_count = Column(Integer, default=3, comment='最大重试次数')
+    next_retry_time = Column(DateTime, comment='下次下发时间（下发中的记录为租约到期时间）')
+    created_time = Column(DateTime, default=func.now(), comment='创建时间')
+    updated_time = Column(DateTime, default=func.now(), onupdate=func.now(), comment='更新时间')
+    
+
 # 为PackingOrder添加反向关系（暂时注释掉避免关系错误）
 # PackingOrder.input_batches = relationship("InputBatch", back_populates="packing_order", 
 #                                          foreign_keys="InputBatch.packing_order_id")
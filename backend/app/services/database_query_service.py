@@ -4,16 +4,184 @@ APS智慧排产系统 - 数据库查询服务
 提供轮保计划、班次配置、机台关系等数据的查询服务
 这些数据将被算法模块使用，替代硬编码的假数据
 """
-from typing import List, Dict, Any, Optional
-from datetime import datetime, date, time
-from sqlalchemy import text
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
+from datetime import datetime, date, timedelta
+from sqlalchemy import text, Date
+from sqlalchemy.sql.elements import TextClause
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.connection import get_db_session
+from app.core.config import settings
+from app.db.connection import get_db_session, get_read_db_session
+from app.db.query_registry import query_registry, time_to_hhmm
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# ==================== 预编译查询 ====================
+
+DECADE_PLANS_QUERY = query_registry.register(
+    'decade_plans',
+    """
+    SELECT id, import_batch_id, work_order_nr, article_nr, 
+           package_type, specification, quantity_total, final_quantity,
+           production_unit, maker_code, feeder_code,
+           planned_start, planned_end, production_date_range,
+           validation_status, validation_message
+    FROM aps_decade_plan
+    WHERE DATE(planned_start) >= :start_date
+    AND DATE(planned_start) <= :end_date
+    AND validation_status = :validation_status
+    """,
+    columns=[
+        'id', 'import_batch_id', 'work_order_nr', 'article_nr',
+        'package_type', 'specification', 'quantity_total', 'final_quantity',
+        'production_unit', 'maker_code', 'feeder_code',
+        'planned_start', 'planned_end', 'production_date_range',
+        'validation_status', 'validation_message'
+    ],
+    filters={
+        'import_batch_id': "AND import_batch_id = :import_batch_id",
+        'work_order_nrs': "AND work_order_nr IN :work_order_nrs",
+    },
+    order_by="ORDER BY planned_start, work_order_nr",
+    param_types={'start_date': Date(), 'end_date': Date()},
+    expanding=['work_order_nrs'],
+)
+
+WORK_ORDER_SCHEDULES_QUERY = query_registry.register(
+    'work_order_schedules',
+    """
+    SELECT id, work_order_nr, article_nr, final_quantity, quantity_total,
+           maker_code, feeder_code, planned_start, planned_end,
+           task_id, schedule_status, sync_group_id, is_backup, backup_reason,
+           created_time
+    FROM aps_work_order_schedule
+    WHERE 1=1
+    """,
+    columns=[
+        'id', 'work_order_nr', 'article_nr', 'final_quantity', 'quantity_total',
+        'maker_code', 'feeder_code', 'planned_start', 'planned_end',
+        'task_id', 'schedule_status', 'sync_group_id', 'is_backup', 'backup_reason',
+        'created_time'
+    ],
+    filters={'task_id': "AND task_id = :task_id"},
+    order_by="ORDER BY planned_start, work_order_nr",
+    converters={'is_backup': bool},
+)
+
+MAINTENANCE_PLANS_QUERY = query_registry.register(
+    'maintenance_plans',
+    """
+    SELECT machine_code, maint_start_time, maint_end_time, 
+           maint_type, maint_level, plan_status
+    FROM aps_maintenance_plan 
+    WHERE DATE(maint_start_time) >= :start_date 
+    AND DATE(maint_start_time) <= :end_date
+    AND plan_status IN ('PLANNED', 'CONFIRMED')
+    """,
+    columns=['machine_code', 'maint_start_time', 'maint_end_time', 'maint_type', 'maint_level', 'plan_status'],
+    filters={'machine_codes': "AND machine_code IN :machine_codes"},
+    param_types={'start_date': Date(), 'end_date': Date()},
+    expanding=['machine_codes'],
+)
+
+SHIFT_CONFIG_QUERY = query_registry.register(
+    'shift_config',
+    """
+    SELECT shift_name, start_time, end_time, is_ot_needed, max_ot_duration
+    FROM aps_shift_config 
+    WHERE machine_name = :machine_name
+    AND effective_from <= :effective_date
+    AND (effective_to IS NULL OR effective_to >= :effective_date)
+    AND status = 'ACTIVE'
+    ORDER BY shift_name
+    """,
+    columns=['name', 'start_time', 'end_time', 'is_ot_needed', 'max_ot_duration'],
+    converters={
+        # 数据库可能返回time或timedelta对象，统一转换为 HH:MM
+        'start_time': lambda value: time_to_hhmm(value) or '08:00',
+        'end_time': lambda value: time_to_hhmm(value) or '16:00',
+        'is_ot_needed': bool,
+        'max_ot_duration': lambda value: time_to_hhmm(value) if value else None,
+    },
+    param_types={'effective_date': Date()},
+)
+
+MACHINE_RELATIONS_QUERY = query_registry.register(
+    'machine_relations',
+    """
+    SELECT feeder_code, maker_code, priority
+    FROM aps_machine_relation 
+    WHERE status = 'ACTIVE'
+    AND (effective_to IS NULL OR effective_to >= CURDATE())
+    ORDER BY feeder_code, priority
+    """,
+    columns=['feeder_code', 'maker_code', 'priority'],
+)
+
+MACHINE_SPEEDS_QUERY = query_registry.register(
+    'machine_speeds',
+    """
+    SELECT machine_code, article_nr as product_code, speed, efficiency_rate
+    FROM aps_machine_speed
+    WHERE status = 'ACTIVE'
+    AND (effective_to IS NULL OR effective_to >= CURDATE())
+    ORDER BY machine_code, article_nr
+    """,
+    columns=['machine_code', 'product_code', 'speed', 'efficiency_rate'],
+)
+
+MACHINES_QUERY = query_registry.register(
+    'machines',
+    """
+    SELECT machine_code, machine_name, machine_type, equipment_type,
+           production_line, status
+    FROM aps_machine 
+    WHERE status = :status
+    """,
+    columns=['machine_code', 'machine_name', 'machine_type', 'equipment_type', 'production_line', 'status'],
+    filters={'machine_types': "AND machine_type IN :machine_types"},
+    order_by="ORDER BY machine_type, machine_code",
+    expanding=['machine_types'],
+)
+
+MATERIALS_QUERY = query_registry.register(
+    'materials',
+    """
+    SELECT article_nr, article_name, material_type, package_type,
+           specification, unit, conversion_rate, status
+    FROM aps_material 
+    WHERE status = 'ACTIVE'
+    """,
+    columns=[
+        'article_nr', 'article_name', 'material_type', 'package_type',
+        'specification', 'unit', 'conversion_rate', 'status'
+    ],
+    filters={
+        'article_nrs': "AND article_nr IN :article_nrs",
+        'material_type': "AND material_type = :material_type",
+    },
+    order_by="ORDER BY material_type, article_nr",
+    converters={'conversion_rate': lambda value: float(value) if value else 1.0},
+    expanding=['article_nrs'],
+)
+
+SYSTEM_CONFIG_QUERY = query_registry.register(
+    'system_config',
+    """
+    SELECT config_key, config_value, config_type
+    FROM aps_system_config 
+    WHERE status = 'ACTIVE'
+    """,
+    columns=['config_key', 'config_value', 'config_type'],
+    filters={
+        'config_group': "AND config_group = :config_group",
+        'config_keys': "AND config_key IN :config_keys",
+    },
+    expanding=['config_keys'],
+)
+
+
 class DatabaseQueryService:
     """数据库查询服务类"""
     
@@ -23,7 +191,8 @@ class DatabaseQueryService:
         work_order_nrs: List[str] = None,
         start_date: date = None,
         end_date: date = None,
-        validation_status: str = 'VALID'
+        validation_status: str = 'VALID',
+        primary: bool = False
     ) -> List[Dict[str, Any]]:
         """
         查询旬计划数据 - 这是算法处理的核心源数据
@@ -34,74 +203,120 @@ class DatabaseQueryService:
             start_date: 计划开始日期范围
             end_date: 计划结束日期范围
             validation_status: 验证状态，默认只查询有效数据
+            primary: 是否强制读主库（排产等写入路径需读到刚导入的数据）
             
         Returns:
             List[Dict]: 旬计划数据列表
         """
+        decade_plans = []
+        async for batch in DatabaseQueryService.stream_decade_plans(
+            import_batch_id=import_batch_id,
+            work_order_nrs=work_order_nrs,
+            start_date=start_date,
+            end_date=end_date,
+            validation_status=validation_status,
+            primary=primary
+        ):
+            decade_plans.extend(batch)
+        
+        logger.info(f"查询到 {len(decade_plans)} 条旬计划数据")
+        return decade_plans
+    
+    @staticmethod
+    async def stream_decade_plans(
+        import_batch_id: str = None,
+        work_order_nrs: List[str] = None,
+        start_date: date = None,
+        end_date: date = None,
+        validation_status: str = 'VALID',
+        batch_size: int = None,
+        primary: bool = False
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        流式查询旬计划数据 - 使用服务端游标按批返回，内存占用与批次大小相关而与数据总量无关
+        
+        Args:
+            import_batch_id: 导入批次ID
+            work_order_nrs: 工单号列表
+            start_date: 计划开始日期范围
+            end_date: 计划结束日期范围
+            validation_status: 验证状态，默认只查询有效数据
+            batch_size: 每批行数，None时使用配置 db_stream_batch_size
+            primary: 是否强制读主库
+            
+        Yields:
+            List[Dict]: 一批旬计划数据
+        """
         if start_date is None:
             # 默认查询范围扩大到过去1年到未来1年，确保覆盖所有数据
-            from datetime import timedelta
             start_date = (datetime.now() - timedelta(days=365)).date()
         if end_date is None:
-            from datetime import timedelta
             end_date = (datetime.now() + timedelta(days=365)).date()
-            
-        query = """
-        SELECT id, import_batch_id, work_order_nr, article_nr, 
-               package_type, specification, quantity_total, final_quantity,
-               production_unit, maker_code, feeder_code,
-               planned_start, planned_end, production_date_range,
-               validation_status, validation_message
-        FROM aps_decade_plan
-        WHERE DATE(planned_start) >= :start_date
-        AND DATE(planned_start) <= :end_date
-        AND validation_status = :validation_status
-        """
         
-        params = {
-            'start_date': start_date,
-            'end_date': end_date,
-            'validation_status': validation_status
-        }
+        statement, params = DECADE_PLANS_QUERY.bind(
+            start_date=start_date,
+            end_date=end_date,
+            validation_status=validation_status,
+            import_batch_id=import_batch_id,
+            work_order_nrs=work_order_nrs
+        )
+        
+        async for rows in DatabaseQueryService.stream_rows(statement, params, batch_size, primary=primary):
+            yield DECADE_PLANS_QUERY.map_rows(rows)
+    
+    @staticmethod
+    async def stream_work_order_schedules(
+        task_id: str = None,
+        batch_size: int = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        流式查询工单排程数据（aps_work_order_schedule）
         
-        # 添加可选过滤条件
-        if import_batch_id:
-            query += " AND import_batch_id = :import_batch_id"
-            params['import_batch_id'] = import_batch_id
+        Args:
+            task_id: 排产任务ID，None表示查询所有任务
+            batch_size: 每批行数，None时使用配置 db_stream_batch_size
             
-        if work_order_nrs:
-            query += " AND work_order_nr IN :work_order_nrs"
-            params['work_order_nrs'] = tuple(work_order_nrs)
+        Yields:
+            List[Dict]: 一批工单排程数据
+        """
+        statement, params = WORK_ORDER_SCHEDULES_QUERY.bind(task_id=task_id)
         
-        query += " ORDER BY planned_start, work_order_nr"
+        async for rows in DatabaseQueryService.stream_rows(statement, params, batch_size):
+            yield WORK_ORDER_SCHEDULES_QUERY.map_rows(rows)
+    
+    @staticmethod
+    async def stream_rows(
+        query: Union[str, TextClause],
+        params: Dict[str, Any] = None,
+        batch_size: int = None,
+        primary: bool = False
+    ) -> AsyncIterator[List[Any]]:
+        """
+        使用服务端游标（stream_results）执行查询，按批返回原始行
         
-        async with get_db_session() as db:
-            result = await db.execute(text(query), params)
-            rows = result.fetchall()
-            
-            decade_plans = []
-            for row in rows:
-                decade_plans.append({
-                    'id': row.id,
-                    'import_batch_id': row.import_batch_id,
-                    'work_order_nr': row.work_order_nr,
-                    'article_nr': row.article_nr,
-                    'package_type': row.package_type,
-                    'specification': row.specification,
-                    'quantity_total': row.quantity_total,
-                    'final_quantity': row.final_quantity,
-                    'production_unit': row.production_unit,
-                    'maker_code': row.maker_code,
-                    'feeder_code': row.feeder_code,
-                    'planned_start': row.planned_start,
-                    'planned_end': row.planned_end,
-                    'production_date_range': row.production_date_range,
-                    'validation_status': row.validation_status,
-                    'validation_message': row.validation_message
-                })
+        会话在迭代期间保持打开，调用方提前退出迭代时游标会随会话一起关闭。
+        默认使用只读会话（可能读到副本上的滞后数据），排产等写入路径应传入 primary=True
+        
+        Args:
+            query: SQL语句或预编译语句
+            params: 绑定参数
+            batch_size: 每批行数，None时使用配置 db_stream_batch_size
+            primary: 是否强制读主库
             
-            logger.info(f"查询到 {len(decade_plans)} 条旬计划数据")
-            return decade_plans
+        Yields:
+            List[Row]: 一批数据库行
+        """
+        batch_size = batch_size or settings.db_stream_batch_size
+        
+        open_session = get_db_session if primary else get_read_db_session
+        async with open_session() as db:
+            result = await db.stream(
+                text(query) if isinstance(query, str) else query,
+                params or {},
+                execution_options={'yield_per': batch_size}
+            )
+            async for rows in result.partitions(batch_size):
+                yield rows
     
     @staticmethod
     async def get_maintenance_plans(
@@ -126,38 +341,15 @@ class DatabaseQueryService:
             from datetime import timedelta
             end_date = start_date + timedelta(days=7)
         
-        query = """
-        SELECT machine_code, maint_start_time, maint_end_time, 
-               maint_type, maint_level, plan_status
-        FROM aps_maintenance_plan 
-        WHERE DATE(maint_start_time) >= :start_date 
-        AND DATE(maint_start_time) <= :end_date
-        AND plan_status IN ('PLANNED', 'CONFIRMED')
-        """
-        
-        params = {
-            'start_date': start_date,
-            'end_date': end_date
-        }
-        
-        if machine_codes:
-            query += " AND machine_code IN :machine_codes"
-            params['machine_codes'] = tuple(machine_codes)
+        statement, params = MAINTENANCE_PLANS_QUERY.bind(
+            start_date=start_date,
+            end_date=end_date,
+            machine_codes=machine_codes
+        )
         
         async with get_db_session() as db:
-            result = await db.execute(text(query), params)
-            rows = result.fetchall()
-            
-            maintenance_plans = []
-            for row in rows:
-                maintenance_plans.append({
-                    'machine_code': row.machine_code,
-                    'maint_start_time': row.maint_start_time,
-                    'maint_end_time': row.maint_end_time,
-                    'maint_type': row.maint_type,
-                    'maint_level': row.maint_level,
-                    'plan_status': row.plan_status
-                })
+            result = await db.execute(statement, params)
+            maintenance_plans = MAINTENANCE_PLANS_QUERY.map_rows(result.fetchall())
             
             logger.info(f"查询到 {len(maintenance_plans)} 条轮保计划")
             return maintenance_plans
@@ -180,74 +372,14 @@ class DatabaseQueryService:
         if effective_date is None:
             effective_date = datetime.now().date()
         
-        query = """
-        SELECT shift_name, machine_name, start_time, end_time,
-               is_ot_needed, max_ot_duration
-        FROM aps_shift_config 
-        WHERE machine_name = :machine_name
-        AND effective_from <= :effective_date
-        AND (effective_to IS NULL OR effective_to >= :effective_date)
-        AND status = 'ACTIVE'
-        ORDER BY shift_name
-        """
-        
-        params = {
-            'machine_name': machine_name,
-            'effective_date': effective_date
-        }
+        statement, params = SHIFT_CONFIG_QUERY.bind(
+            machine_name=machine_name,
+            effective_date=effective_date
+        )
         
         async with get_db_session() as db:
-            result = await db.execute(text(query), params)
-            rows = result.fetchall()
-            
-            shift_configs = []
-            for row in rows:
-                # 处理时间对象转换为字符串
-                # 数据库可能返回time或timedelta对象
-                if hasattr(row.start_time, 'strftime'):
-                    # time对象
-                    start_time = row.start_time.strftime('%H:%M')
-                elif hasattr(row.start_time, 'total_seconds'):
-                    # timedelta对象，转换为时间
-                    total_seconds = int(row.start_time.total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    start_time = f'{hours:02d}:{minutes:02d}'
-                else:
-                    start_time = '08:00'
-                
-                if hasattr(row.end_time, 'strftime'):
-                    # time对象
-                    end_time = row.end_time.strftime('%H:%M')
-                elif hasattr(row.end_time, 'total_seconds'):
-                    # timedelta对象，转换为时间
-                    total_seconds = int(row.end_time.total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    end_time = f'{hours:02d}:{minutes:02d}'
-                else:
-                    end_time = '16:00'
-                
-                # 处理max_ot_duration
-                max_ot_duration = None
-                if row.max_ot_duration:
-                    if hasattr(row.max_ot_duration, 'strftime'):
-                        # time对象
-                        max_ot_duration = row.max_ot_duration.strftime('%H:%M')
-                    elif hasattr(row.max_ot_duration, 'total_seconds'):
-                        # timedelta对象，转换为时间
-                        total_seconds = int(row.max_ot_duration.total_seconds())
-                        hours = total_seconds // 3600
-                        minutes = (total_seconds % 3600) // 60
-                        max_ot_duration = f'{hours:02d}:{minutes:02d}'
-                
-                shift_configs.append({
-                    'name': row.shift_name,
-                    'start_time': start_time,
-                    'end_time': end_time,
-                    'is_ot_needed': bool(row.is_ot_needed) if row.is_ot_needed is not None else False,
-                    'max_ot_duration': max_ot_duration
-                })
+            result = await db.execute(statement, params)
+            shift_configs = SHIFT_CONFIG_QUERY.map_rows(result.fetchall())
             
             logger.info(f"查询到 {len(shift_configs)} 个班次配置")
             return shift_configs
@@ -260,27 +392,14 @@ class DatabaseQueryService:
         Returns:
             Dict[str, List[str]]: {喂丝机代码: [卷包机代码列表]}
         """
-        query = """
-        SELECT feeder_code, maker_code, priority
-        FROM aps_machine_relation 
-        WHERE status = 'ACTIVE'
-        AND (effective_to IS NULL OR effective_to >= CURDATE())
-        ORDER BY feeder_code, priority
-        """
+        statement, params = MACHINE_RELATIONS_QUERY.bind()
         
         async with get_db_session() as db:
-            result = await db.execute(text(query))
-            rows = result.fetchall()
+            result = await db.execute(statement, params)
             
             relations = {}
-            for row in rows:
-                feeder_code = row.feeder_code
-                maker_code = row.maker_code
-                
-                if feeder_code not in relations:
-                    relations[feeder_code] = []
-                
-                relations[feeder_code].append(maker_code)
+            for feeder_code, maker_code, _ in result.fetchall():
+                relations.setdefault(feeder_code, []).append(maker_code)
             
             logger.info(f"查询到 {len(relations)} 个喂丝机的机台关系")
             return relations
@@ -293,41 +412,32 @@ class DatabaseQueryService:
         Returns:
             Dict[str, Dict]: {机台代码: {速度配置}}
         """
-        query = """
-                SELECT machine_code, \
-                       article_nr as product_code, \
-                       speed,
-                       efficiency_rate
-                FROM aps_machine_speed
-                WHERE status = 'ACTIVE'
-                  AND (effective_to IS NULL OR effective_to >= CURDATE())
-                ORDER BY machine_code, article_nr \
-                """
+        statement, params = MACHINE_SPEEDS_QUERY.bind()
 
         async with get_db_session() as db:
-            result = await db.execute(text(query))
-            rows = result.fetchall()
+            result = await db.execute(statement, params)
 
             speeds = {}
-            for row in rows:
-                machine_code = row.machine_code
+            for machine_code, product_code, speed, efficiency_rate in result.fetchall():
+                hourly_capacity = float(speed or 100)
+                efficiency_rate = float(efficiency_rate or 0.85)
 
                 if machine_code not in speeds:
                     speeds[machine_code] = {
-                        'hourly_capacity': float(row.speed or 100),
-                        'daily_capacity': float(row.speed or 100) * 24,
-                        'efficiency_rate': float(row.efficiency_rate or 0.85),
+                        'hourly_capacity': hourly_capacity,
+                        'daily_capacity': hourly_capacity * 24,
+                        'efficiency_rate': efficiency_rate,
                         'setup_time_minutes': 30,  # 默认值
                         'changeover_time_minutes': 15,  # 默认值
                         'product_speeds': {}
                     }
 
                 # 如果有产品特定速度，记录下来
-                if row.product_code:
-                    speeds[machine_code]['product_speeds'][row.product_code] = {
-                        'hourly_capacity': float(row.speed or 100),
-                        'daily_capacity': float(row.speed or 100) * 24,
-                        'efficiency_rate': float(row.efficiency_rate or 0.85)
+                if product_code:
+                    speeds[machine_code]['product_speeds'][product_code] = {
+                        'hourly_capacity': hourly_capacity,
+                        'daily_capacity': hourly_capacity * 24,
+                        'efficiency_rate': efficiency_rate
                     }
 
             logger.info(f"查询到 {len(speeds)} 个机台的速度配置")
@@ -348,35 +458,11 @@ class DatabaseQueryService:
         Returns:
             List[Dict]: 机台信息列表
         """
-        query = """
-        SELECT machine_code, machine_name, machine_type, equipment_type,
-               production_line, status
-        FROM aps_machine 
-        WHERE status = :status
-        """
-        
-        params = {'status': status}
-        
-        if machine_types:
-            query += " AND machine_type IN :machine_types"
-            params['machine_types'] = tuple(machine_types)
-        
-        query += " ORDER BY machine_type, machine_code"
+        statement, params = MACHINES_QUERY.bind(status=status, machine_types=machine_types)
         
         async with get_db_session() as db:
-            result = await db.execute(text(query), params)
-            rows = result.fetchall()
-            
-            machines = []
-            for row in rows:
-                machines.append({
-                    'machine_code': row.machine_code,
-                    'machine_name': row.machine_name,
-                    'machine_type': row.machine_type,
-                    'equipment_type': row.equipment_type,
-                    'production_line': row.production_line,
-                    'status': row.status
-                })
+            result = await db.execute(statement, params)
+            machines = MACHINES_QUERY.map_rows(result.fetchall())
             
             logger.info(f"查询到 {len(machines)} 个机台信息")
             return machines
@@ -480,41 +566,11 @@ class DatabaseQueryService:
         Returns:
             List[Dict]: 物料信息列表
         """
-        query = """
-        SELECT article_nr, article_name, material_type, package_type,
-               specification, unit, conversion_rate, status
-        FROM aps_material 
-        WHERE status = 'ACTIVE'
-        """
-        
-        params = {}
-        
-        if article_nrs:
-            query += " AND article_nr IN :article_nrs"
-            params['article_nrs'] = tuple(article_nrs)
-            
-        if material_type:
-            query += " AND material_type = :material_type"
-            params['material_type'] = material_type
-        
-        query += " ORDER BY material_type, article_nr"
+        statement, params = MATERIALS_QUERY.bind(article_nrs=article_nrs, material_type=material_type)
         
         async with get_db_session() as db:
-            result = await db.execute(text(query), params)
-            rows = result.fetchall()
-            
-            materials = []
-            for row in rows:
-                materials.append({
-                    'article_nr': row.article_nr,
-                    'article_name': row.article_name,
-                    'material_type': row.material_type,
-                    'package_type': row.package_type,
-                    'specification': row.specification,
-                    'unit': row.unit,
-                    'conversion_rate': float(row.conversion_rate) if row.conversion_rate else 1.0,
-                    'status': row.status
-                })
+            result = await db.execute(statement, params)
+            materials = MATERIALS_QUERY.map_rows(result.fetchall())
             
             logger.info(f"查询到 {len(materials)} 条物料信息")
             return materials
@@ -534,41 +590,25 @@ class DatabaseQueryService:
         Returns:
             Dict: {config_key: config_value}
         """
-        query = """
-        SELECT config_key, config_value, config_type
-        FROM aps_system_config 
-        WHERE status = 'ACTIVE'
-        """
-        
-        params = {}
-        
-        if config_group:
-            query += " AND config_group = :config_group"
-            params['config_group'] = config_group
-            
-        if config_keys:
-            query += " AND config_key IN :config_keys"
-            params['config_keys'] = tuple(config_keys)
+        statement, params = SYSTEM_CONFIG_QUERY.bind(config_group=config_group, config_keys=config_keys)
         
         async with get_db_session() as db:
-            result = await db.execute(text(query), params)
-            rows = result.fetchall()
+            result = await db.execute(statement, params)
             
             configs = {}
-            for row in rows:
-                config_value = row.config_value
+            for config_key, config_value, config_type in result.fetchall():
                 # 根据类型转换配置值
-                if row.config_type == 'INTEGER':
+                if config_type == 'INTEGER':
                     config_value = int(config_value)
-                elif row.config_type == 'DECIMAL':
+                elif config_type == 'DECIMAL':
                     config_value = float(config_value)
-                elif row.config_type == 'BOOLEAN':
+                elif config_type == 'BOOLEAN':
                     config_value = config_value.lower() in ('true', '1', 'yes')
-                elif row.config_type == 'JSON':
+                elif config_type == 'JSON':
                     import json
                     config_value = json.loads(config_value)
                 
-                configs[row.config_key] = config_value
+                configs[config_key] = config_value
             
             logger.info(f"查询到 {len(configs)} 个系统配置参数")
             return configs
\ No newline at end of file
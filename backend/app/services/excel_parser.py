@@ -3,19 +3,29 @@ APS智慧排产系统 - Excel解析器
 
 基于技术设计文档实现Excel文件解析功能
 处理复杂的生产作业计划表，包含合并单元格、机台列表等
-支持多种日期格式和数据验证
+支持多种日期格式和数据验证，以及相同内容的CSV/Parquet文件
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
+from itertools import repeat
 import pandas as pd
 import openpyxl
 from openpyxl.worksheet.worksheet import Worksheet
+import multiprocessing
+import os
 import re
 import logging
 from pathlib import Path
 
+from app.core.config import settings
+from app.services.tabular_reader import TabularWorkbook, is_tabular_file
+
 logger = logging.getLogger(__name__)
 
+# 解析器版本号：解析逻辑或结果格式变化时递增，按文件内容缓存的解析结果随之失效
+PARSER_VERSION = "1"
+
 
 class ExcelParseError(Exception):
     """Excel解析异常"""
@@ -60,14 +70,72 @@ class ProductionPlanRecord:
         }
 
 
+# 年份匹配模式（按优先级），包括"有效期限：2024.11.1～11.15"格式
+YEAR_PATTERNS = [
+    re.compile(r'(\d{4})年'),                    # 2024年
+    re.compile(r'(\d{4})\.'),                    # 2024.
+    re.compile(r'(\d{4})-'),                     # 2024-
+    re.compile(r'(\d{4})/'),                     # 2024/
+    re.compile(r'(\d{4})～'),                    # 2024～
+    re.compile(r'(\d{4})~'),                     # 2024~
+    re.compile(r'^(\d{4})$'),                    # 单独的年份
+    re.compile(r'(\d{4})\s'),                    # 2024 (后面有空格)
+    re.compile(r'有效期限.*?(\d{4})\.'),         # 有效期限：2024.11.1～11.15
+    re.compile(r'期限.*?(\d{4})\.'),             # 期限：2024.11.1～11.15
+    re.compile(r'：(\d{4})\.'),                  # ：2024.11.1
+]
+
+# 表头行核心列名，至少匹配4个视为表头
+HEADER_KEY_COLUMNS = ['包装', '规格', '喂丝机号', '卷包机号', '牌号', '投料', '成品']
+
+# 首列包含以下内容的行不是数据行
+SKIP_ROW_PATTERNS = [
+    '合计', '合   计',  # 合计行
+    '注：', '注意：',   # 注释行
+    '有效期限：',       # 有效期说明
+    '备注：',          # 备注行
+    '说明：',          # 说明行
+]
+
+HEADER_SEARCH_ROWS = 10  # 在前10行中查找表头
+YEAR_SEARCH_COLUMNS = 7  # 年份只在前7列中查找
+
+
+def match_year(text: str) -> Optional[int]:
+    """按优先级匹配年份，返回第一个合理的年份（1990-2050）"""
+    for pattern in YEAR_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            year = int(match.group(1))
+            if 1990 <= year <= 2050:
+                return year
+    return None
+
+
+def _row_text(values: Sequence[Any]) -> str:
+    return ' '.join(str(value).strip() for value in values if value)
+
+
 class ProductionPlanExcelParser:
-    """生产作业计划表Excel解析器"""
+    """
+    生产作业计划表Excel解析器
+
+    streaming=True 时以只读模式逐行读取工作表（iter_rows(values_only=True)），
+    单次遍历完成年份提取、表头识别和数据行解析，内存占用不随行数增长；
+    streaming=False 时使用完整模式按单元格随机访问。两种模式解析结果一致
     
-    def __init__(self):
+    sheet_workers > 1 时多个工作表在独立进程中并行解析
+    
+    也可解析上游系统导出的CSV/Parquet文件（单个工作表，始终按流式模式解析）
+    """
+    
+    def __init__(self, streaming: Optional[bool] = None, sheet_workers: Optional[int] = None):
         self.records: List[ProductionPlanRecord] = []
         self.errors: List[Dict[str, Any]] = []
         self.warnings: List[Dict[str, Any]] = []
         self.extracted_year: Optional[int] = None  # 从Excel中提取的年份
+        self.streaming = settings.excel_parse_streaming if streaming is None else streaming
+        self.sheet_workers = sheet_workers  # 多工作表并行解析进程数，None时按配置和文件大小决定
         
         # 列映射 - 基于示例Excel文件的列结构
         self.column_mapping = {
@@ -86,6 +154,9 @@ class ProductionPlanExcelParser:
         """
         解析Excel文件主入口，支持多个工作表
         
+        多工作表文件启用并行解析时（见 _resolve_sheet_workers），各工作表在独立的工作进程中解析，
+        每个进程各自以只读方式打开工作簿，结果按工作表顺序合并，与逐个解析一致
+        
         Args:
             file_path: Excel文件路径
             sheet_name: 指定工作表名称，为None时处理所有工作表
@@ -94,160 +165,366 @@ class ProductionPlanExcelParser:
             解析结果字典，包含records、errors、warnings
         """
         try:
-            logger.info(f"开始解析Excel文件: {file_path}")
-            
-            # 使用openpyxl读取Excel以处理合并单元格
-            workbook = openpyxl.load_workbook(file_path, data_only=True)
-            
-            # 获取要处理的工作表列表
-            if sheet_name:
-                # 处理指定的工作表
-                if sheet_name in workbook.sheetnames:
-                    worksheets_to_process = [(sheet_name, workbook[sheet_name])]
-                else:
-                    raise ExcelParseError(f"指定的工作表 '{sheet_name}' 不存在")
+            if is_tabular_file(file_path):
+                # CSV/Parquet只能逐行读取
+                self.streaming = True
+            logger.info(f"开始解析Excel文件: {file_path}（{'流式只读' if self.streaming else '完整'}模式）")
+            
+            sheet_workers = 1 if sheet_name else self._resolve_sheet_workers(file_path)
+            if sheet_workers > 1:
+                sheet_names = list_sheet_names(file_path)
+                sheet_workers = min(sheet_workers, len(sheet_names))
+            
+            if sheet_workers > 1:
+                all_results = self._parse_sheets_parallel(file_path, sheet_names, sheet_workers)
             else:
-                # 处理所有工作表
-                worksheets_to_process = [(sheet.title, sheet) for sheet in workbook.worksheets]
+                # 完整模式可按单元格随机访问；流式模式只读逐行读取
+                workbook = load_plan_workbook(file_path, read_only=self.streaming)
+                try:
+                    all_results = self._parse_workbook(workbook, sheet_name)
+                finally:
+                    if self.streaming:
+                        workbook.close()
             
-            logger.info(f"发现 {len(worksheets_to_process)} 个工作表需要处理: {[name for name, _ in worksheets_to_process]}")
+            result = self._merge_sheet_results(all_results)
             
-            all_results = []
+            logger.info(f"解析完成: 处理{result['sheets_processed']}个工作表, {result['total_records']}条记录, {result['valid_records']}条有效")
+            return result
             
-            # 处理每个工作表
-            for sheet_title, worksheet in worksheets_to_process:
-                logger.info(f"处理工作表: {sheet_title}")
-                
-                # 重置处理状态
-                self.records = []
-                self.errors = []
-                self.warnings = []
-                
-                try:
-                    # 提取年份信息 - 从工作表的前几行标题中提取
-                    self._extract_year_from_title(worksheet)
-                    
-                    # 查找表头位置 - 根据实际Excel格式，表头通常在第3行
-                    header_row = self._find_header_row(worksheet)
-                    if header_row is None:
-                        self._add_warning(f"工作表 '{sheet_title}' 中未找到有效的表头行")
-                        continue
-                    
-                    logger.info(f"在工作表 '{sheet_title}' 中找到表头行: {header_row}")
-                    
-                    # 解析表头列映射
-                    column_map = self._parse_header_columns(worksheet, header_row)
-                    logger.info(f"工作表 '{sheet_title}' 列映射: {column_map}")
+        except Exception as e:
+            logger.error(f"Excel解析失败: {str(e)}")
+            raise ExcelParseError(f"Excel解析失败: {str(e)}")
+    
+    def _resolve_sheet_workers(self, file_path: str) -> int:
+        """并行解析的工作进程数：未启用或文件小于阈值（进程启动开销大于收益）时为1"""
+        if is_tabular_file(file_path):
+            return 1
+        if self.sheet_workers is not None:
+            return self.sheet_workers
+        if settings.excel_parse_sheet_workers == 1:
+            return 1
+        if os.path.getsize(file_path) < settings.excel_parse_parallel_min_bytes:
+            return 1
+        return settings.excel_parse_sheet_workers or os.cpu_count() or 1
+    
+    def _parse_sheets_parallel(self, file_path: str, sheet_names: List[str], workers: int) -> List[Dict[str, Any]]:
+        """各工作表在独立进程中解析，按工作表顺序返回结果（未找到表头的工作表不返回）"""
+        logger.info(f"发现 {len(sheet_names)} 个工作表，使用 {workers} 个进程并行解析: {sheet_names}")
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            sheet_results = executor.map(
+                parse_excel_sheet, repeat(file_path), sheet_names, repeat(self.streaming)
+            )
+            return [sheet_result for sheet_result in sheet_results if sheet_result is not None]
+    
+    def _merge_sheet_results(self, all_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """按工作表顺序合并各工作表的解析结果"""
+        final_records = []
+        final_errors = []
+        final_warnings = []
+        extracted_year = None
+        
+        for sheet_result in all_results:
+            # 获取提取的年份（优先使用第一个工作表的年份）
+            if extracted_year is None and 'extracted_year' in sheet_result:
+                extracted_year = sheet_result['extracted_year']
+            
+            # 将年份信息添加到每个记录中
+            for record in sheet_result['records']:
+                if extracted_year and 'extracted_year' not in record:
+                    record['extracted_year'] = extracted_year
+            
+            final_records.extend(sheet_result['records'])
+            final_errors.extend(sheet_result['errors'])
+            final_warnings.extend(sheet_result['warnings'])
+        
+        return {
+            'total_records': len(final_records),
+            'valid_records': len([r for r in final_records if r.get('article_name') and (r.get('feeder_codes') or r.get('maker_codes'))]),
+            'error_records': len(final_errors),
+            'warning_records': len(final_warnings),
+            'records': final_records,
+            'errors': final_errors,
+            'warnings': final_warnings,
+            'sheets_processed': len(all_results),
+            'sheet_details': all_results,
+            'extracted_year': extracted_year,  # 添加提取的年份到最终结果
+        }
+    
+    def stream_excel_file(
+        self,
+        file_path: str,
+        on_chunk: Callable[[List[Dict[str, Any]]], None],
+        chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        分块流式解析Excel文件，不在内存中保留全部记录
+        
+        每解析出 chunk_size 条记录，完成合并单元格传播和数据验证后交给 on_chunk；
+        记录内容、顺序和 extracted_year 与 parse_excel_file 的 records 一致。
+        工作表年份只出现在数据行之后（如末尾的"有效期限"行）时，该工作表的记录缓存到年份确定后再输出
+        
+        Args:
+            file_path: Excel文件路径
+            on_chunk: 接收记录字典列表的回调（可阻塞，用于下游背压）
+            chunk_size: 每块记录数，None时使用配置 plan_import_chunk_size
+            
+        Returns:
+            解析汇总，与 parse_excel_file 的结果相同但不含 records（sheet_details 中也不含）
+        """
+        chunk_size = chunk_size or settings.plan_import_chunk_size
+        self.streaming = True
+        sheet_details = []
+        state = {'first_year': None, 'total': 0, 'valid': 0}
+        
+        def flush(force: bool = False):
+            if not self.records or (self.extracted_year is None and not force):
+                return
+            records, self.records = self.records, []
+            self._propagate_merged_values(records, sheet_state['previous'])
+            self._validate_records(records)
+            sheet_state['previous'] = records[-1]
+            if state['first_year'] is None:
+                state['first_year'] = self.extracted_year
+            sheet_state['valid'] += sum(1 for r in records if self._is_valid_record(r))
+            sheet_state['total'] += len(records)
+            
+            chunk = []
+            for record in records:
+                record_data = record.to_dict()
+                if state['first_year']:
+                    record_data['extracted_year'] = state['first_year']
+                if record_data.get('article_name') and (record_data.get('feeder_codes') or record_data.get('maker_codes')):
+                    state['valid'] += 1
+                chunk.append(record_data)
+            state['total'] += len(chunk)
+            # 等待年份而缓存的记录可能超过一块
+            for offset in range(0, len(chunk), chunk_size):
+                on_chunk(chunk[offset:offset + chunk_size])
+        
+        def on_row():
+            if len(self.records) >= chunk_size:
+                flush()
+        
+        try:
+            logger.info(f"开始分块解析Excel文件: {file_path}（每块{chunk_size}条）")
+            workbook = load_plan_workbook(file_path, read_only=True)
+            try:
+                for worksheet in workbook.worksheets:
+                    sheet_title = worksheet.title
+                    logger.info(f"处理工作表: {sheet_title}")
+                    self.records = []
+                    self.errors = []
+                    self.warnings = []
+                    sheet_state = {'total': 0, 'valid': 0, 'previous': None}
                     
-                    if not column_map:
-                        self._add_warning(f"工作表 '{sheet_title}' 中未找到有效的列映射")
+                    # 与 parse_excel_file 不同，工作表处理失败时部分记录已输出，无法只丢弃该工作表，整体失败
+                    if not self._parse_worksheet_streaming(worksheet, sheet_title, on_row):
                         continue
+                    if state['first_year'] is None:
+                        state['first_year'] = self.extracted_year
+                    flush(force=True)
                     
-                    # 解析数据行
-                    self._parse_data_rows(worksheet, header_row + 1, column_map, sheet_title)
-                    
-                    # 后处理：处理合并单元格的数据传播
-                    self._process_merged_cells(worksheet)
-                    
-                    # 数据验证和清洗
-                    self._validate_and_clean_data()
-                    
-                    # 保存当前工作表的结果
-                    sheet_result = {
+                    sheet_details.append({
                         'sheet_name': sheet_title,
-                        'records': [r.to_dict() for r in self.records],
                         'errors': self.errors.copy(),
                         'warnings': self.warnings.copy(),
-                        'total_records': len(self.records),
-                        'valid_records': len([r for r in self.records if self._is_valid_record(r)]),
-                        'extracted_year': self.extracted_year,  # 添加提取的年份信息
-                    }
-                    all_results.append(sheet_result)
-                    
-                except Exception as e:
-                    logger.error(f"处理工作表 '{sheet_title}' 时出错: {str(e)}")
-                    self._add_error(f"工作表 '{sheet_title}' 处理失败: {str(e)}")
-            
-            # 合并所有结果
-            final_records = []
-            final_errors = []
-            final_warnings = []
-            extracted_year = None
-            
-            for sheet_result in all_results:
-                # 获取提取的年份（优先使用第一个工作表的年份）
-                if extracted_year is None and 'extracted_year' in sheet_result:
-                    extracted_year = sheet_result['extracted_year']
-                
-                # 将年份信息添加到每个记录中
-                for record in sheet_result['records']:
-                    if extracted_year and 'extracted_year' not in record:
-                        record['extracted_year'] = extracted_year
-                
-                final_records.extend(sheet_result['records'])
-                final_errors.extend(sheet_result['errors'])
-                final_warnings.extend(sheet_result['warnings'])
-            
-            result = {
-                'total_records': len(final_records),
-                'valid_records': len([r for r in final_records if r.get('article_name') and (r.get('feeder_codes') or r.get('maker_codes'))]),
-                'error_records': len(final_errors),
-                'warning_records': len(final_warnings),
-                'records': final_records,
-                'errors': final_errors,
-                'warnings': final_warnings,
-                'sheets_processed': len(all_results),
-                'sheet_details': all_results,
-                'extracted_year': extracted_year,  # 添加提取的年份到最终结果
-            }
-            
-            logger.info(f"解析完成: 处理{result['sheets_processed']}个工作表, {result['total_records']}条记录, {result['valid_records']}条有效")
-            return result
-            
+                        'total_records': sheet_state['total'],
+                        'valid_records': sheet_state['valid'],
+                        'extracted_year': self.extracted_year,
+                    })
+            finally:
+                workbook.close()
         except Exception as e:
             logger.error(f"Excel解析失败: {str(e)}")
             raise ExcelParseError(f"Excel解析失败: {str(e)}")
+        
+        errors = [error for sheet in sheet_details for error in sheet['errors']]
+        warnings = [warning for sheet in sheet_details for warning in sheet['warnings']]
+        return {
+            'total_records': state['total'],
+            'valid_records': state['valid'],
+            'error_records': len(errors),
+            'warning_records': len(warnings),
+            'errors': errors,
+            'warnings': warnings,
+            'sheets_processed': len(sheet_details),
+            'sheet_details': sheet_details,
+            'extracted_year': sheet_details[0]['extracted_year'] if sheet_details else None,
+        }
+    
+    def _parse_workbook(self, workbook, sheet_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """逐个工作表解析，返回各工作表的解析结果"""
+        # 获取要处理的工作表列表
+        if sheet_name:
+            # 处理指定的工作表
+            if sheet_name in workbook.sheetnames:
+                worksheets_to_process = [(sheet_name, workbook[sheet_name])]
+            else:
+                raise ExcelParseError(f"指定的工作表 '{sheet_name}' 不存在")
+        else:
+            # 处理所有工作表
+            worksheets_to_process = [(sheet.title, sheet) for sheet in workbook.worksheets]
+        
+        logger.info(f"发现 {len(worksheets_to_process)} 个工作表需要处理: {[name for name, _ in worksheets_to_process]}")
+        
+        all_results = []
+        
+        # 处理每个工作表
+        for sheet_title, worksheet in worksheets_to_process:
+            sheet_result = self._parse_sheet(worksheet, sheet_title)
+            if sheet_result is not None:
+                all_results.append(sheet_result)
+        
+        return all_results
+    
+    def _parse_sheet(self, worksheet, sheet_title: str) -> Optional[Dict[str, Any]]:
+        """解析单个工作表，未找到表头或处理失败时返回None"""
+        logger.info(f"处理工作表: {sheet_title}")
+        
+        # 重置处理状态
+        self.records = []
+        self.errors = []
+        self.warnings = []
+        
+        try:
+            if self.streaming:
+                parsed = self._parse_worksheet_streaming(worksheet, sheet_title)
+            else:
+                parsed = self._parse_worksheet_full(worksheet, sheet_title)
+            if not parsed:
+                return None
+            
+            # 后处理：处理合并单元格的数据传播
+            self._process_merged_cells(worksheet)
+            
+            # 数据验证和清洗
+            self._validate_and_clean_data()
+            
+            # 保存当前工作表的结果
+            return {
+                'sheet_name': sheet_title,
+                'records': [r.to_dict() for r in self.records],
+                'errors': self.errors.copy(),
+                'warnings': self.warnings.copy(),
+                'total_records': len(self.records),
+                'valid_records': len([r for r in self.records if self._is_valid_record(r)]),
+                'extracted_year': self.extracted_year,  # 添加提取的年份信息
+            }
+            
+        except Exception as e:
+            logger.error(f"处理工作表 '{sheet_title}' 时出错: {str(e)}")
+            self._add_error(f"工作表 '{sheet_title}' 处理失败: {str(e)}")
+            return None
+    
+    def _parse_worksheet_full(self, worksheet: Worksheet, sheet_title: str) -> bool:
+        """完整模式：按单元格随机访问解析工作表，未找到表头或列映射时返回False"""
+        # 提取年份信息 - 从工作表的前几行标题中提取
+        self._extract_year_from_title(worksheet)
+        
+        # 查找表头位置 - 根据实际Excel格式，表头通常在第3行
+        header_row = self._find_header_row(worksheet)
+        if header_row is None:
+            self._add_warning(f"工作表 '{sheet_title}' 中未找到有效的表头行")
+            return False
+        
+        logger.info(f"在工作表 '{sheet_title}' 中找到表头行: {header_row}")
+        
+        # 解析表头列映射
+        column_map = self._parse_header_columns(worksheet, header_row)
+        logger.info(f"工作表 '{sheet_title}' 列映射: {column_map}")
+        
+        if not column_map:
+            self._add_warning(f"工作表 '{sheet_title}' 中未找到有效的列映射")
+            return False
+        
+        # 解析数据行
+        self._parse_data_rows(worksheet, header_row + 1, column_map, sheet_title)
+        return True
+    
+    def _parse_worksheet_streaming(self, worksheet, sheet_title: str, on_row: Optional[Callable[[], None]] = None) -> bool:
+        """
+        流式模式：单次遍历 iter_rows(values_only=True) 解析工作表
+        
+        前10行缓存用于识别表头，其余行边读边解析；年份按行序查找，找到后不再扫描
+        合并单元格除左上角外读取为空值，与完整模式一致，由数据行的向下继承和
+        _process_merged_cells 处理
+        
+        on_row 在每个数据行解析后调用，供分块输出（stream_excel_file）取走已解析的记录
+        """
+        # 部分生成工具写入的工作表尺寸不准确，重置后按实际行读取
+        if hasattr(worksheet, 'reset_dimensions'):
+            worksheet.reset_dimensions()
+        rows = enumerate(worksheet.iter_rows(values_only=True), start=1)
+        
+        self.extracted_year = None
+        head_rows: Dict[int, Sequence[Any]] = {}
+        for row_idx, values in rows:
+            head_rows[row_idx] = values
+            self._scan_year_in_row(row_idx, values)
+            if row_idx >= HEADER_SEARCH_ROWS:
+                break
+        
+        header_row = self._find_header_row_in_rows(head_rows)
+        if header_row is None:
+            self._use_default_year_if_missing()
+            self._add_warning(f"工作表 '{sheet_title}' 中未找到有效的表头行")
+            return False
+        
+        logger.info(f"在工作表 '{sheet_title}' 中找到表头行: {header_row}")
+        
+        column_map = self._map_header_columns(head_rows[header_row])
+        logger.info(f"工作表 '{sheet_title}' 列映射: {column_map}")
+        
+        if not column_map:
+            self._use_default_year_if_missing()
+            self._add_warning(f"工作表 '{sheet_title}' 中未找到有效的列映射")
+            return False
+        
+        carry: Dict[str, Any] = {}
+        for row_idx in sorted(head_rows):
+            if row_idx > header_row:
+                self._parse_row_values(row_idx, head_rows[row_idx], column_map, carry)
+                if on_row:
+                    on_row()
+        
+        for row_idx, values in rows:
+            if self.extracted_year is None:
+                self._scan_year_in_row(row_idx, values)
+            self._parse_row_values(row_idx, values, column_map, carry)
+            if on_row:
+                on_row()
+        
+        self._use_default_year_if_missing()
+        return True
+    
+    def _row_values(self, worksheet: Worksheet, row_idx: int, max_col: Optional[int] = None) -> List[Any]:
+        """完整模式读取一行单元格值"""
+        max_col = max_col or worksheet.max_column
+        return [worksheet.cell(row_idx, col_idx).value for col_idx in range(1, max_col + 1)]
     
     def _find_header_row(self, worksheet: Worksheet) -> Optional[int]:
         """查找包含列名的表头行 - 根据真实Excel格式，表头通常在第3行"""
+        rows = {
+            row_idx: self._row_values(worksheet, row_idx)
+            for row_idx in range(1, min(HEADER_SEARCH_ROWS + 1, worksheet.max_row + 1))
+        }
+        return self._find_header_row_in_rows(rows)
+    
+    def _find_header_row_in_rows(self, rows: Dict[int, Sequence[Any]]) -> Optional[int]:
+        """在前10行的单元格值中查找表头行，优先检查第3行"""
         # 首先检查第3行（根据用户提供的Excel格式）
         target_row = 3
-        if target_row <= worksheet.max_row:
-            row_values = []
-            for col_idx in range(1, worksheet.max_column + 1):
-                cell_value = worksheet.cell(target_row, col_idx).value
-                if cell_value:
-                    row_values.append(str(cell_value).strip())
-            
-            row_text = ' '.join(row_values)
-            logger.info(f"检查第{target_row}行: {row_text}")
-            
-            # 检查是否包含核心列名
-            key_columns = ['包装', '规格', '喂丝机号', '卷包机号', '牌号', '投料', '成品']
-            matched_columns = sum(1 for key in key_columns if key in row_text)
-            
-            if matched_columns >= 4:  # 至少匹配4个关键列
-                logger.info(f"在第{target_row}行找到表头，匹配{matched_columns}个关键列")
-                return target_row
+        search_order = ([target_row] if target_row in rows else []) + [
+            row_idx for row_idx in sorted(rows) if row_idx != target_row
+        ]
         
-        # 如果第3行不匹配，则在前10行中查找
-        for row_idx in range(1, min(11, worksheet.max_row + 1)):
-            if row_idx == target_row:  # 跳过已检查的第3行
-                continue
-                
-            row_values = []
-            for col_idx in range(1, worksheet.max_column + 1):
-                cell_value = worksheet.cell(row_idx, col_idx).value
-                if cell_value:
-                    row_values.append(str(cell_value).strip())
-            
-            # 检查是否包含关键列名
-            row_text = ' '.join(row_values)
+        for row_idx in search_order:
+            row_text = _row_text(rows[row_idx])
             logger.info(f"检查第{row_idx}行: {row_text}")
             
-            # 精确匹配表头列名
-            key_columns = ['包装', '规格', '喂丝机号', '卷包机号', '牌号', '投料', '成品']
-            matched_columns = sum(1 for key in key_columns if key in row_text)
+            # 检查是否包含核心列名
+            matched_columns = sum(1 for key in HEADER_KEY_COLUMNS if key in row_text)
             
             if matched_columns >= 4:  # 至少匹配4个关键列
                 logger.info(f"找到表头行: 第{row_idx}行，匹配{matched_columns}个关键列")
@@ -256,74 +533,41 @@ class ProductionPlanExcelParser:
         logger.warning("未找到有效的表头行")
         return None
     
+    def _scan_year_in_row(self, row_idx: int, values: Sequence[Any]) -> bool:
+        """在一行的前7列中查找年份，找到时设置 extracted_year"""
+        for value in values[:YEAR_SEARCH_COLUMNS]:
+            if value:
+                cell_text = str(value).strip()
+                year = match_year(cell_text)
+                if year is not None:
+                    self.extracted_year = year
+                    logger.info(f"✅ 从第{row_idx}行标题 '{cell_text}' 中成功提取年份: {year}")
+                    return True
+        return False
+    
+    def _use_default_year_if_missing(self):
+        """未找到年份时使用当前年份"""
+        if self.extracted_year is None:
+            self.extracted_year = datetime.now().year
+            logger.warning(f"⚠️ 未在Excel标题中找到年份信息，使用当前年份: {self.extracted_year}")
+    
     def _extract_year_from_title(self, worksheet: Worksheet) -> None:
-        """从Excel表格标题中提取年份信息"""
+        """从Excel表格标题中提取年份信息（按行序查找，第1行主标题优先，找到后立即停止）"""
         try:
-            # 优先从第一行标题"2024年10月16～31日生产作业计划表"中提取年份
             logger.info("开始从Excel标题中提取年份信息...")
             
             max_row = worksheet.max_row
-            max_col = worksheet.max_column
-            
-            logger.info(f"工作表尺寸: {max_row}行 x {max_col}列")
-            
-            # 搜索策略：优先级排序
-            # 1. 第一行（主标题）
-            # 2. 前5行（其他标题信息）
-            # 3. 如果还没找到，搜索包含"有效期限"等关键词的行
-            
-            search_ranges = []
-            
-            # 第一优先级：第1行
-            if max_row >= 1:
-                search_ranges.append(1)
-            
-            # 第二优先级：前5行（除了第1行）
-            search_ranges.extend(range(2, min(6, max_row + 1)))
-            
-            # 第三优先级：如果前面没找到，搜索所有行来查找"有效期限"等
-            if max_row > 5:
-                search_ranges.extend(range(6, max_row + 1))
-            
-            logger.info(f"搜索策略: 优先第1行，然后前5行，最后搜索其他行")
-            
-            for row_idx in search_ranges:
-                for col_idx in range(1, min(8, max_col + 1)):  # 限制在前7列
-                    cell_value = worksheet.cell(row_idx, col_idx).value
-                    if cell_value:
-                        cell_text = str(cell_value).strip()
-                        logger.info(f"检查单元格 ({row_idx}, {col_idx}): '{cell_text}'")
-                        
-                        # 扩展的年份匹配模式，包括"有效期限：2024.11.1～11.15"格式
-                        year_patterns = [
-                            r'(\d{4})年',                    # 2024年
-                            r'(\d{4})\.',                    # 2024.
-                            r'(\d{4})-',                     # 2024-
-                            r'(\d{4})/',                     # 2024/
-                            r'(\d{4})～',                    # 2024～
-                            r'(\d{4})~',                     # 2024~
-                            r'^(\d{4})$',                    # 单独的年份
-                            r'(\d{4})\s',                    # 2024 (后面有空格)
-                            r'有效期限.*?(\d{4})\.',         # 有效期限：2024.11.1～11.15
-                            r'期限.*?(\d{4})\.',             # 期限：2024.11.1～11.15
-                            r'：(\d{4})\.',                  # ：2024.11.1
-                        ]
-                        
-                        for pattern in year_patterns:
-                            match = re.search(pattern, cell_text)
-                            if match:
-                                year = int(match.group(1))
-                                logger.info(f"匹配到年份模式 '{pattern}': {year}")
-                                # 验证年份合理性（1990-2050）
-                                if 1990 <= year <= 2050:
-                                    self.extracted_year = year
-                                    logger.info(f"✅ 从第{row_idx}行标题 '{cell_text}' 中成功提取年份: {year}")
-                                    return  # 找到年份后立即返回，不再继续搜索
+            max_col = min(YEAR_SEARCH_COLUMNS, worksheet.max_column)
+            
+            logger.info(f"工作表尺寸: {max_row}行 x {worksheet.max_column}列")
+            
+            self.extracted_year = None
+            for row_idx in range(1, max_row + 1):
+                if self._scan_year_in_row(row_idx, self._row_values(worksheet, row_idx, max_col)):
+                    return  # 找到年份后立即返回，不再继续搜索
             
             # 如果没有找到年份，使用当前年份作为默认值
-            current_year = datetime.now().year
-            self.extracted_year = current_year
-            logger.warning(f"⚠️ 未在Excel标题中找到年份信息，使用当前年份: {current_year}")
+            self._use_default_year_if_missing()
             
         except Exception as e:
             logger.error(f"❌ 提取年份信息时出错: {e}")
@@ -331,46 +575,41 @@ class ProductionPlanExcelParser:
     
     def _parse_header_columns(self, worksheet: Worksheet, header_row: int) -> Dict[int, str]:
         """解析表头列映射 - 精确匹配Excel表头列名，处理空格字符"""
+        return self._map_header_columns(self._row_values(worksheet, header_row))
+    
+    def _map_header_columns(self, values: Sequence[Any]) -> Dict[int, str]:
+        """按表头行单元格值生成列映射 {列号(从1开始): 字段名}"""
         column_map = {}
         
-        for col_idx in range(1, worksheet.max_column + 1):
-            cell_value = worksheet.cell(header_row, col_idx).value
+        for col_idx, cell_value in enumerate(values, start=1):
             if cell_value:
                 header_name = str(cell_value).strip()
                 # 去除所有空格字符
                 clean_header = header_name.replace(' ', '')
-                logger.info(f"列{col_idx}: '{header_name}' -> 清理后: '{clean_header}'")
                 
                 # 直接精确匹配核心列名（处理空格后）
                 if clean_header == '包装':
                     column_map[col_idx] = 'package_type'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> package_type")
                 elif clean_header == '规格':
                     column_map[col_idx] = 'specification'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> specification")
                 elif clean_header in ['喂丝机号', '喂丝机']:
                     column_map[col_idx] = 'feeder_codes'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> feeder_codes")
                 elif clean_header in ['卷包机号', '卷包机']:
                     column_map[col_idx] = 'maker_codes'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> maker_codes")
                 elif clean_header == '生产单元':
                     column_map[col_idx] = 'production_unit'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> production_unit")
                 elif clean_header == '牌号':  # 这里是关键修复
                     column_map[col_idx] = 'article_name'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> article_name")
                 elif clean_header in ['本次投料', '投料']:
                     column_map[col_idx] = 'material_input'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> material_input")
                 elif clean_header in ['本次成品', '成品']:
                     column_map[col_idx] = 'final_quantity'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> final_quantity")
                 elif clean_header in ['成品生产日期', '生产日期', '日期']:
                     column_map[col_idx] = 'production_date_range'
-                    logger.info(f"映射列 {col_idx} '{clean_header}' -> production_date_range")
                 else:
                     logger.warning(f"未识别的列名: '{clean_header}' (列{col_idx}, 原始: '{header_name}')")
+                    continue
+                logger.info(f"映射列 {col_idx} '{clean_header}' -> {column_map[col_idx]}")
         
         # 验证必要的列映射
         required_fields = ['package_type', 'specification', 'article_name', 'feeder_codes', 'maker_codes']
@@ -382,128 +621,67 @@ class ProductionPlanExcelParser:
     
     def _parse_data_rows(self, worksheet: Worksheet, start_row: int, column_map: Dict[int, str], sheet_name: Optional[str] = None):
         """解析数据行，更好地处理合并单元格的数据继承"""
-        current_package_type = None
-        current_specification = None
-        current_article_name = None
-        current_feeder_codes = []
-        current_maker_codes = []
-        current_production_unit = None
-        current_material_input = None
-        current_final_quantity = None
-        current_production_date_range = None
-        
+        carry: Dict[str, Any] = {}
+        max_col = worksheet.max_column
         for row_idx in range(start_row, worksheet.max_row + 1):
-            # 检查是否为合计行或空行
-            first_cell = worksheet.cell(row_idx, 1).value
-            if not first_cell:
-                # 检查整行是否为空
-                row_has_data = False
-                for col_idx in range(1, worksheet.max_column + 1):
-                    if worksheet.cell(row_idx, col_idx).value:
-                        row_has_data = True
-                        break
-                if not row_has_data:
-                    continue
-            
+            self._parse_row_values(row_idx, self._row_values(worksheet, row_idx, max_col), column_map, carry)
+    
+    def _parse_row_values(self, row_idx: int, values: Sequence[Any], column_map: Dict[int, str], carry: Dict[str, Any]):
+        """
+        解析一行数据
+        
+        carry 保存各列最近一次的非空值，空单元格（含合并单元格的非首行）继承上一行的值
+        """
+        # 检查是否为合计行或空行
+        first_cell = values[0] if values else None
+        if not first_cell:
+            # 检查整行是否为空
+            if not any(values):
+                return
+        else:
             # 跳过合计行、注释行和其他非数据行
-            if first_cell:
-                first_cell_str = str(first_cell).strip()
-                # 跳过各种非数据行
-                skip_patterns = [
-                    '合计', '合   计',  # 合计行
-                    '注：', '注意：',   # 注释行
-                    '有效期限：',       # 有效期说明
-                    '备注：',          # 备注行
-                    '说明：',          # 说明行
-                ]
-                
-                should_skip = False
-                for pattern in skip_patterns:
-                    if pattern in first_cell_str:
-                        should_skip = True
-                        break
-                
-                if should_skip:
-                    logger.info(f"跳过非数据行 {row_idx}: {first_cell_str}")
-                    continue
+            first_cell_str = str(first_cell).strip()
+            if any(pattern in first_cell_str for pattern in SKIP_ROW_PATTERNS):
+                logger.info(f"跳过非数据行 {row_idx}: {first_cell_str}")
+                return
+        
+        record = ProductionPlanRecord()
+        record.row_number = row_idx
+        
+        # 解析各列数据
+        for col_idx, field_name in column_map.items():
+            cell_value = values[col_idx - 1] if col_idx <= len(values) else None
             
-            record = ProductionPlanRecord()
-            record.row_number = row_idx
+            if field_name in ('package_type', 'specification', 'production_unit',
+                              'article_name', 'production_date_range'):
+                if cell_value and str(cell_value).strip():
+                    carry[field_name] = str(cell_value).strip()
+                setattr(record, field_name, carry.get(field_name))
             
-            # 解析各列数据
-            for col_idx, field_name in column_map.items():
-                cell_value = worksheet.cell(row_idx, col_idx).value
-                
-                if field_name == 'package_type':
-                    if cell_value and str(cell_value).strip():
-                        current_package_type = str(cell_value).strip()
-                    record.package_type = current_package_type
-                
-                elif field_name == 'specification':
-                    if cell_value and str(cell_value).strip():
-                        current_specification = str(cell_value).strip()
-                    record.specification = current_specification
-                
-                elif field_name == 'feeder_codes':
-                    if cell_value:
-                        parsed_codes = self._parse_machine_codes(str(cell_value))
-                        if parsed_codes:
-                            current_feeder_codes = parsed_codes
-                    record.feeder_codes = current_feeder_codes
-                
-                elif field_name == 'maker_codes':
-                    if cell_value:
-                        parsed_codes = self._parse_machine_codes(str(cell_value))
-                        if parsed_codes:
-                            current_maker_codes = parsed_codes
-                    record.maker_codes = current_maker_codes
-                
-                elif field_name == 'production_unit':
-                    if cell_value and str(cell_value).strip():
-                        current_production_unit = str(cell_value).strip()
-                    record.production_unit = current_production_unit
-                
-                elif field_name == 'article_name':
-                    if cell_value and str(cell_value).strip():
-                        current_article_name = str(cell_value).strip()
-                    record.article_name = current_article_name
-                
-                elif field_name == 'material_input':
-                    if cell_value and str(cell_value).strip() not in ['--', '——', '']:
-                        try:
-                            # 处理数字格式
-                            value_str = str(cell_value).replace(',', '').replace('，', '')
-                            parsed_value = int(float(value_str))
-                            current_material_input = parsed_value
-                        except (ValueError, TypeError):
-                            self._add_warning(f"行{row_idx}: 投料量格式错误: {cell_value}")
-                    elif cell_value and str(cell_value).strip() in ['--', '——']:
-                        # 明确的"--"标记表示0，不继承前面的数值
-                        current_material_input = 0
-                    record.material_input = current_material_input
-                
-                elif field_name == 'final_quantity':
-                    if cell_value and str(cell_value).strip() not in ['--', '——', '']:
-                        try:
-                            # 处理数字格式
-                            value_str = str(cell_value).replace(',', '').replace('，', '')
-                            parsed_value = int(float(value_str))
-                            current_final_quantity = parsed_value
-                        except (ValueError, TypeError):
-                            self._add_warning(f"行{row_idx}: 成品量格式错误: {cell_value}")
-                    elif cell_value and str(cell_value).strip() in ['--', '——']:
-                        # 明确的"--"标记表示0，不继承前面的数值
-                        current_final_quantity = 0
-                    record.final_quantity = current_final_quantity
-                
-                elif field_name == 'production_date_range':
-                    if cell_value and str(cell_value).strip():
-                        current_production_date_range = str(cell_value).strip()
-                    record.production_date_range = current_production_date_range
-            
-            # 只有包含有效数据的记录才添加
-            if self._has_meaningful_data(record):
-                self.records.append(record)
+            elif field_name in ('feeder_codes', 'maker_codes'):
+                if cell_value:
+                    parsed_codes = self._parse_machine_codes(str(cell_value))
+                    if parsed_codes:
+                        carry[field_name] = parsed_codes
+                setattr(record, field_name, carry.get(field_name, []))
+            
+            elif field_name in ('material_input', 'final_quantity'):
+                if cell_value and str(cell_value).strip() not in ['--', '——', '']:
+                    try:
+                        # 处理数字格式
+                        value_str = str(cell_value).replace(',', '').replace('，', '')
+                        carry[field_name] = int(float(value_str))
+                    except (ValueError, TypeError):
+                        label = '投料量' if field_name == 'material_input' else '成品量'
+                        self._add_warning(f"行{row_idx}: {label}格式错误: {cell_value}")
+                elif cell_value and str(cell_value).strip() in ['--', '——']:
+                    # 明确的"--"标记表示0，不继承前面的数值
+                    carry[field_name] = 0
+                setattr(record, field_name, carry.get(field_name))
+        
+        # 只有包含有效数据的记录才添加
+        if self._has_meaningful_data(record):
+            self.records.append(record)
     
     def _parse_machine_codes(self, machine_str: str) -> List[str]:
         """解析机台代码字符串，处理逗号分隔和、符号分隔"""
@@ -551,15 +729,12 @@ class ProductionPlanExcelParser:
     def _process_merged_cells(self, worksheet: Worksheet):
         """处理合并单元格，将值传播到空白记录"""
         # 这是Excel解析的关键部分，处理跨行合并的单元格
-        if not self.records:
-            return
-        
-        # 向下传播包装类型和规格
-        for i in range(len(self.records)):
-            if i > 0:
-                current = self.records[i]
-                previous = self.records[i-1]
-                
+        self._propagate_merged_values(self.records)
+    
+    def _propagate_merged_values(self, records: List[ProductionPlanRecord], previous: Optional[ProductionPlanRecord] = None):
+        """向下传播包装类型和规格；previous 为上一块的最后一条记录（分块处理时跨块传播）"""
+        for current in records:
+            if previous is not None:
                 # 如果当前记录的包装类型为空，使用前一条记录的值
                 if not current.package_type and previous.package_type:
                     current.package_type = previous.package_type
@@ -567,10 +742,15 @@ class ProductionPlanExcelParser:
                 # 如果当前记录的规格为空，使用前一条记录的值
                 if not current.specification and previous.specification:
                     current.specification = previous.specification
+            previous = current
     
     def _validate_and_clean_data(self):
         """数据验证和清洗"""
-        for record in self.records:
+        self._validate_records(self.records)
+    
+    def _validate_records(self, records: List[ProductionPlanRecord]):
+        """逐条生成物料编号、解析日期范围并检查必填信息"""
+        for record in records:
             # 生成标准化物料编号
             if record.article_name:
                 record.article_nr = self._generate_article_nr(record.article_name)
@@ -598,7 +778,6 @@ class ProductionPlanExcelParser:
         """解析日期范围字符串"""
         try:
             # 示例格式: "11.1 - 11.15", "11.9 - 11.15"
-            print(date_range_str)
             if ' - ' in date_range_str or ' ～ ' in date_range_str:
                 parts = re.split(r' [-～] ', date_range_str)
                 if len(parts) == 2:
@@ -623,7 +802,7 @@ class ProductionPlanExcelParser:
         try:
             # 使用从Excel标题中提取的年份，如果没有则使用当前年份
             year = self.extracted_year if self.extracted_year else datetime.now().year
-            logger.info(f"解析日期 '{date_str}' 使用年份: {year}")
+            logger.debug(f"解析日期 '{date_str}' 使用年份: {year}")
             
             # 格式: "11.1" -> 11月1日
             if '.' in date_str:
@@ -632,7 +811,7 @@ class ProductionPlanExcelParser:
                     month = int(month_day[0])
                     day = int(month_day[1])
                     parsed_date = datetime(year, month, day)
-                    logger.info(f"解析日期结果: {parsed_date}")
+                    logger.debug(f"解析日期结果: {parsed_date}")
                     return parsed_date
             
             return None
@@ -665,22 +844,67 @@ class ProductionPlanExcelParser:
         logger.warning(message)
 
 
+def load_plan_workbook(file_path: str, read_only: bool = True):
+    """
+    打开计划文件：xlsx使用openpyxl（data_only，读取公式的计算值）；
+    CSV/Parquet返回只有一个工作表的只读工作簿（见 app.services.tabular_reader），忽略 read_only
+    """
+    if is_tabular_file(file_path):
+        return TabularWorkbook(file_path)
+    return openpyxl.load_workbook(file_path, read_only=read_only, data_only=True)
+
+
+def list_sheet_names(file_path: str) -> List[str]:
+    """按工作簿顺序返回工作表名称（只读打开，不加载单元格）"""
+    workbook = load_plan_workbook(file_path, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def parse_excel_sheet(file_path: str, sheet_name: str, streaming: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+    """
+    解析工作簿中的单个工作表（并行解析的工作进程入口）
+    
+    Returns:
+        工作表解析结果（与 sheet_details 中的元素格式相同），未找到表头或处理失败时返回None
+    """
+    parser = ProductionPlanExcelParser(True if is_tabular_file(file_path) else streaming, sheet_workers=1)
+    workbook = load_plan_workbook(file_path, read_only=parser.streaming)
+    try:
+        return parser._parse_sheet(workbook[sheet_name], sheet_name)
+    finally:
+        if parser.streaming:
+            workbook.close()
+
+
 # 工厂函数
-def create_excel_parser() -> ProductionPlanExcelParser:
+def create_excel_parser(
+    streaming: Optional[bool] = None,
+    sheet_workers: Optional[int] = None
+) -> ProductionPlanExcelParser:
     """创建Excel解析器实例"""
-    return ProductionPlanExcelParser()
+    return ProductionPlanExcelParser(streaming, sheet_workers)
 
 
-def parse_production_plan_excel(file_path: str, sheet_name: Optional[str] = None) -> Dict[str, Any]:
+def parse_production_plan_excel(
+    file_path: str,
+    sheet_name: Optional[str] = None,
+    streaming: Optional[bool] = None,
+    sheet_workers: Optional[int] = None
+) -> Dict[str, Any]:
     """
     解析生产作业计划Excel文件的便捷函数
     
     Args:
         file_path: Excel文件路径
         sheet_name: 指定工作表名称，为None时处理所有工作表
+        streaming: 是否使用流式只读模式，为None时使用配置 excel_parse_streaming
+        sheet_workers: 多工作表并行解析进程数（1表示逐个解析），为None时按配置和文件大小决定
         
     Returns:
         解析结果字典
     """
-    parser = create_excel_parser()
+    parser = create_excel_parser(streaming, sheet_workers)
     return parser.parse_excel_file(file_path, sheet_name)
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+APS智慧排产系统 - 视口甘特图时间轴
+
+按时间窗口和机台集合只查询与窗口重叠的工单（aps_work_order_schedule），并按视口分辨率做细节层级（LOD）合并：
+
+- 分辨率 = 窗口时长 / 视口宽度（像素），或直接指定每格秒数
+- 同一机台上与前一条间隔小于 min_gap_px 个像素的工单合并为占用段（开始、结束、工单数、
+  成品数量合计、实际占用时长），单独的工单仍返回工单明细
+- min_gap_px 至少为1：合并后同一机台上相邻条目间隔至少一个像素，每台机台最多约 视口宽度+1 个条目，
+  响应大小取决于视口而不是数据量；放大到工单间隔超过一个像素时自然退化为明细
+
+每条排程同时占用卷包机和喂丝机，分别出现在两台机台的泳道中；
+查询结果经服务端游标分批读取并逐行合并，不在内存中保留窗口内的全部工单
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.work_order_models import WorkOrderSchedule
+
+logger = logging.getLogger(__name__)
+
+
+# 查询的列（不加载ORM实体）
+TIMELINE_COLUMNS = (
+    WorkOrderSchedule.work_order_nr,
+    WorkOrderSchedule.article_nr,
+    WorkOrderSchedule.maker_code,
+    WorkOrderSchedule.feeder_code,
+    WorkOrderSchedule.planned_start,
+    WorkOrderSchedule.planned_end,
+    WorkOrderSchedule.final_quantity,
+    WorkOrderSchedule.schedule_status,
+    WorkOrderSchedule.is_backup,
+)
+
+
+def resolve_resolution(start: datetime, end: datetime, width: int, bucket_seconds: Optional[float] = None) -> float:
+    """每像素（每格）对应的秒数"""
+    if bucket_seconds:
+        return float(bucket_seconds)
+    return (end - start).total_seconds() / width
+
+
+def _bar_item(row) -> Dict[str, Any]:
+    return {
+        "type": "bar",
+        "work_order_nr": row.work_order_nr,
+        "article_nr": row.article_nr,
+        "start": row.planned_start,
+        "end": row.planned_end,
+        "final_quantity": row.final_quantity,
+        "schedule_status": row.schedule_status,
+        "is_backup": row.is_backup,
+    }
+
+
+class _LaneMerger:
+    """
+    单台机台的增量合并状态
+
+    工单按开始时间到达，只保留当前段的起止时间和合计值；段结束时立即输出条目，
+    内存只与输出条目数相关，不随工单数增长
+    """
+
+    def __init__(self, merge_gap: timedelta):
+        self.merge_gap = merge_gap
+        self.items: List[Dict[str, Any]] = []
+        self.first = None
+        self.count = 0
+        self.end = None
+        self.quantity = 0
+        self.busy = timedelta(0)
+
+    def add(self, row):
+        if self.count and row.planned_start - self.end < self.merge_gap:
+            # 区间按开始时间有序，并集长度只增加超出当前段结束时间的部分
+            self.busy += max(timedelta(0), row.planned_end - max(row.planned_start, self.end))
+            self.end = max(self.end, row.planned_end)
+            self.count += 1
+            self.quantity += row.final_quantity or 0
+            return
+        self.close()
+        self.first = row
+        self.count = 1
+        self.end = row.planned_end
+        self.quantity = row.final_quantity or 0
+        self.busy = row.planned_end - row.planned_start
+
+    def close(self):
+        if self.count == 1:
+            self.items.append(_bar_item(self.first))
+        elif self.count:
+            self.items.append({
+                "type": "segment",
+                "start": self.first.planned_start,
+                "end": self.end,
+                "bar_count": self.count,
+                "final_quantity": self.quantity,
+                "busy_seconds": self.busy.total_seconds(),
+            })
+        self.first = None
+        self.count = 0
+
+
+def merge_lane(rows: Iterable[Any], merge_gap: timedelta) -> List[Dict[str, Any]]:
+    """
+    合并一台机台上按开始时间排序的工单
+
+    与当前段结束时间的间隔小于 merge_gap（含重叠）的工单并入当前段；只含一条工单的段返回工单明细
+    """
+    merger = _LaneMerger(merge_gap)
+    for row in rows:
+        merger.add(row)
+    merger.close()
+    return merger.items
+
+
+class TimelineBuilder:
+    """
+    逐行构建视口甘特图
+
+    行按 planned_start 排序到达，分到机台泳道后立即合并，不保留原始行，
+    可直接消费服务端游标分批返回的结果
+
+    Args:
+        machines: 机台代码集合，None表示行中出现的全部机台
+        resolution_seconds: 每像素秒数
+        min_gap_px: 间隔小于该像素数的相邻工单合并（至少1个像素，保证条目数不超过视口宽度）
+    """
+
+    def __init__(self, machines: Optional[Sequence[str]], resolution_seconds: float, min_gap_px: float = 1.0):
+        self.machine_set = set(machines) if machines else None
+        self.resolution_seconds = resolution_seconds
+        self.merge_gap = timedelta(seconds=resolution_seconds * min_gap_px)
+        self.lanes: Dict[str, _LaneMerger] = {}
+        self.bar_count = 0
+
+    def add(self, row):
+        self.bar_count += 1
+        for machine_code in (row.maker_code, row.feeder_code):
+            if self.machine_set is None or machine_code in self.machine_set:
+                lane = self.lanes.get(machine_code)
+                if lane is None:
+                    lane = self.lanes[machine_code] = _LaneMerger(self.merge_gap)
+                lane.add(row)
+
+    def result(self, start: datetime, end: datetime) -> Dict[str, Any]:
+        lane_items = []
+        item_count = segment_count = 0
+        for machine_code in sorted(self.lanes):
+            lane = self.lanes[machine_code]
+            lane.close()
+            item_count += len(lane.items)
+            segment_count += sum(1 for item in lane.items if item["type"] == "segment")
+            lane_items.append({"machine_code": machine_code, "items": lane.items})
+
+        return {
+            "window": {"start": start, "end": end},
+            "resolution_seconds": self.resolution_seconds,
+            "level": "aggregate" if segment_count else "detail",
+            "lanes": lane_items,
+            "bar_count": self.bar_count,
+            "item_count": item_count,
+            "segment_count": segment_count,
+        }
+
+
+def build_timeline(
+    rows: Iterable[Any],
+    start: datetime,
+    end: datetime,
+    machines: Optional[Sequence[str]],
+    resolution_seconds: float,
+    min_gap_px: float = 1.0
+) -> Dict[str, Any]:
+    """
+    将按开始时间排序的排程行分到机台泳道并逐泳道合并
+
+    Args:
+        rows: 与窗口重叠的排程行（需有 TIMELINE_COLUMNS 对应属性），按 planned_start 排序
+        machines: 机台代码集合，None表示行中出现的全部机台
+        resolution_seconds: 每像素秒数
+        min_gap_px: 间隔小于该像素数的相邻工单合并
+    """
+    builder = TimelineBuilder(machines, resolution_seconds, min_gap_px)
+    for row in rows:
+        builder.add(row)
+    return builder.result(start, end)
+
+
+async def load_timeline(
+    db: AsyncSession,
+    start: datetime,
+    end: datetime,
+    machines: Optional[Sequence[str]] = None,
+    task_id: Optional[str] = None,
+    width: int = 1200,
+    bucket_seconds: Optional[float] = None,
+    min_gap_px: float = 1.0
+) -> Dict[str, Any]:
+    """
+    查询与窗口重叠的排程并按视口分辨率合并（机台条件使用 (maker_code/feeder_code, planned_start) 索引）
+
+    使用服务端游标按 db_stream_batch_size 分批读取，逐批合并，内存只与输出条目数相关
+    """
+    conditions = [WorkOrderSchedule.planned_start < end, WorkOrderSchedule.planned_end > start]
+    if machines:
+        conditions.append(or_(
+            WorkOrderSchedule.maker_code.in_(machines),
+            WorkOrderSchedule.feeder_code.in_(machines)
+        ))
+    if task_id:
+        conditions.append(WorkOrderSchedule.task_id == task_id)
+
+    query = (
+        select(*TIMELINE_COLUMNS)
+        .where(and_(*conditions))
+        .order_by(WorkOrderSchedule.planned_start, WorkOrderSchedule.work_order_nr)
+    )
+    builder = TimelineBuilder(machines, resolve_resolution(start, end, width, bucket_seconds), min_gap_px)
+    batch_size = settings.db_stream_batch_size
+    result = await db.stream(query, execution_options={'yield_per': batch_size})
+    async for rows in result.partitions(batch_size):
+        for row in rows:
+            builder.add(row)
+
+    timeline = builder.result(start, end)
+    logger.debug(
+        f"甘特图视口 {start} ~ {end}: {timeline['bar_count']}条工单 → "
+        f"{timeline['item_count']}个条目（{timeline['segment_count']}个占用段）"
+    )
+    return timeline
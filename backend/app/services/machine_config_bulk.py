@@ -0,0 +1,309 @@
+"""
+APS智慧排产系统 - 机台配置批量写入
+
+机台、机台关系、机台速度、轮保计划、班次配置的批量新增/更新与删除：
+
+- 请求体为JSON数组或CSV（表头为字段名），整批校验，有任一行不合法时不写入并返回全部错误
+- 按各表唯一键 INSERT ... ON DUPLICATE KEY UPDATE，每 machine_bulk_chunk_size 行一条语句，
+  所有语句在同一事务中执行，失败时整批回滚
+- 同一批中唯一键重复的行以最后一行为准
+- 提交后只递增一次基础配置缓存版本号（invalidate_reference_data），而不是每行一次
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+from dataclasses import dataclass, field
+from datetime import date, datetime
+import csv
+import io
+import json
+import logging
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.base_models import Machine
+from app.models.machine_config_models import MachineRelation, MachineSpeed, MaintenancePlan, ShiftConfig
+from app.services.reference_data_cache import invalidate_reference_data
+
+logger = logging.getLogger(__name__)
+
+
+class BulkValidationError(ValueError):
+    """批量数据校验失败，errors为 [{'row': 行号, 'errors': [...]}]"""
+
+    def __init__(self, message: str, errors: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+@dataclass
+class BulkTableSpec:
+    """批量写入的表定义"""
+    model: Any
+    request_model: Type[BaseModel]
+    key_columns: Tuple[str, ...]
+    to_row: Callable[[Any], Dict[str, Any]]
+    check: Optional[Callable[[Any], Optional[str]]] = None
+    insert_only_columns: Tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _check_machine(request) -> Optional[str]:
+    if request.machine_type not in ("PACKING", "FEEDING"):
+        return f"机台类型必须为 PACKING/FEEDING: {request.machine_type}"
+    if request.status not in ("ACTIVE", "INACTIVE", "MAINTENANCE"):
+        return f"机台状态必须为 ACTIVE/INACTIVE/MAINTENANCE: {request.status}"
+    return None
+
+
+def _check_maintenance_plan(request) -> Optional[str]:
+    if request.planned_end_time <= request.planned_start_time:
+        return "计划结束时间必须晚于开始时间"
+    return None
+
+
+def build_table_specs(request_models: Dict[str, Type[BaseModel]]) -> Dict[str, BulkTableSpec]:
+    """
+    构建各表的批量写入定义（字段映射与单行新增接口一致）
+
+    Args:
+        request_models: 路径名 → 单行接口的请求模型（定义在 app.api.v1.machines）
+    """
+    return {
+        "machines": BulkTableSpec(
+            model=Machine,
+            request_model=request_models["machines"],
+            key_columns=("machine_code",),
+            to_row=lambda r: {
+                "machine_code": r.machine_code,
+                "machine_name": r.machine_name,
+                "machine_type": r.machine_type,
+                "equipment_type": r.equipment_type,
+                "production_line": r.production_line,
+                "status": r.status,
+            },
+            check=_check_machine,
+        ),
+        "machine-relations": BulkTableSpec(
+            model=MachineRelation,
+            request_model=request_models["machine-relations"],
+            key_columns=("feeder_code", "maker_code", "effective_from"),
+            to_row=lambda r: {
+                "feeder_code": r.feeder_code,
+                "maker_code": r.maker_code,
+                "relation_type": r.relation_type,
+                "priority": r.priority,
+                "effective_from": r.effective_from or date.today(),
+            },
+        ),
+        "machine-speeds": BulkTableSpec(
+            model=MachineSpeed,
+            request_model=request_models["machine-speeds"],
+            key_columns=("machine_code", "article_nr", "effective_from"),
+            to_row=lambda r: {
+                "machine_code": r.machine_code,
+                "article_nr": r.article_nr,
+                "speed": r.speed,
+                "efficiency_rate": r.efficiency_rate,
+                "effective_from": _as_date(r.effective_from) or date.today(),
+                "effective_to": _as_date(r.effective_to),
+                "status": r.status or "ACTIVE",
+            },
+        ),
+        "maintenance-plans": BulkTableSpec(
+            model=MaintenancePlan,
+            request_model=request_models["maintenance-plans"],
+            key_columns=("maint_plan_no",),
+            to_row=lambda r: {
+                "maint_plan_no": r.plan_code,
+                "schedule_date": r.planned_start_time,
+                "equipment_position": "生产线",  # 默认设备位置，更新时保留原值
+                "machine_code": r.machine_code,
+                "maint_start_time": r.planned_start_time,
+                "maint_end_time": r.planned_end_time,
+                "maint_type": r.maintenance_type,
+                "maint_description": r.description,
+                "plan_status": r.status,
+            },
+            check=_check_maintenance_plan,
+            insert_only_columns=("equipment_position",),
+        ),
+        "shift-configs": BulkTableSpec(
+            model=ShiftConfig,
+            request_model=request_models["shift-configs"],
+            key_columns=("shift_name", "machine_name", "effective_from"),
+            to_row=lambda r: {
+                "shift_name": r.shift_name,
+                "machine_name": r.shift_code,  # 使用 machine_name 字段存储班次代码
+                "start_time": r.start_time,
+                "end_time": r.end_time,
+                "effective_from": r.effective_from or date.today(),
+                "status": "ACTIVE" if r.is_active else "INACTIVE",
+            },
+        ),
+    }
+
+
+def parse_bulk_payload(body: bytes, content_type: Optional[str]) -> List[Any]:
+    """解析请求体：text/csv 按表头转为字典（空单元格视为未填写），否则为JSON数组或 {"items": [...]}"""
+    if content_type and content_type.split(";")[0].strip().lower() in ("text/csv", "application/csv"):
+        try:
+            text = body.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            try:
+                text = body.decode("gb18030")
+            except UnicodeDecodeError as e:
+                raise BulkValidationError(f"CSV编码无法识别（支持UTF-8、GB18030）: {str(e)}")
+        reader = csv.DictReader(io.StringIO(text))
+        return [{key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+                for row in reader]
+
+    try:
+        payload = json.loads(body or b"null")
+    except ValueError as e:
+        raise BulkValidationError(f"请求体不是合法的JSON: {str(e)}")
+    if isinstance(payload, dict):
+        payload = payload.get("items")
+    if not isinstance(payload, list):
+        raise BulkValidationError("请求体必须为JSON数组、{\"items\": [...]} 或CSV")
+    return payload
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class MachineConfigBulkService:
+    """机台配置批量写入服务"""
+
+    @staticmethod
+    def validate_rows(spec: BulkTableSpec, items: List[Any]) -> List[Dict[str, Any]]:
+        """
+        整批校验并转换为数据库行，唯一键重复时以最后一行为准
+
+        Raises:
+            BulkValidationError: 任一行不合法时，包含所有不合法行的错误
+        """
+        if not items:
+            raise BulkValidationError("没有需要写入的数据")
+        if len(items) > settings.machine_bulk_max_rows:
+            raise BulkValidationError(f"单次最多写入 {settings.machine_bulk_max_rows} 行，实际 {len(items)} 行")
+
+        rows: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        errors = []
+        for index, item in enumerate(items, start=1):
+            try:
+                request = spec.request_model.model_validate(item)
+            except ValidationError as e:
+                errors.append({
+                    "row": index,
+                    "errors": [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+                })
+                continue
+            message = spec.check(request) if spec.check else None
+            if message:
+                errors.append({"row": index, "errors": [message]})
+                continue
+            row = spec.to_row(request)
+            rows[tuple(row[column] for column in spec.key_columns)] = row
+
+        if errors:
+            raise BulkValidationError(f"{len(errors)} 行数据校验失败", errors)
+        return list(rows.values())
+
+    @staticmethod
+    async def upsert(db: AsyncSession, spec: BulkTableSpec, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """分块 INSERT ... ON DUPLICATE KEY UPDATE，单事务提交后使基础配置缓存失效一次"""
+        table = spec.table
+        update_columns = [
+            column for column in rows[0]
+            if column not in spec.key_columns and column not in spec.insert_only_columns
+        ]
+        chunk_size = settings.machine_bulk_chunk_size
+        affected_rows = chunks = 0
+        try:
+            for chunk in _chunks(rows, chunk_size):
+                statement = mysql_insert(table).values(list(chunk))
+                statement = statement.on_duplicate_key_update(
+                    {column: statement.inserted[column] for column in update_columns}
+                )
+                result = await db.execute(statement)
+                affected_rows += result.rowcount or 0
+                chunks += 1
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        await invalidate_reference_data()
+        logger.info(f"批量写入{table.name}: {len(rows)}行，{chunks}条语句")
+        # MySQL影响行数：新增计1，更新计2，未变化计0
+        return {"table": table.name, "rows": len(rows), "statements": chunks, "affected_rows": affected_rows}
+
+    @staticmethod
+    def resolve_delete_targets(spec: BulkTableSpec, items: List[Any]) -> Tuple[str, List[Any]]:
+        """
+        解析批量删除目标：主键ID数组，或包含唯一键字段的对象数组
+
+        Returns:
+            ("id", [id, ...]) 或 ("key", [(唯一键值...), ...])
+        """
+        if not items:
+            raise BulkValidationError("没有需要删除的数据")
+        if len(items) > settings.machine_bulk_max_rows:
+            raise BulkValidationError(f"单次最多删除 {settings.machine_bulk_max_rows} 行，实际 {len(items)} 行")
+
+        ids, keys, errors = [], [], []
+        for index, item in enumerate(items, start=1):
+            if isinstance(item, dict) and "id" in item:
+                item = item["id"]
+            if isinstance(item, dict):
+                missing = [column for column in spec.key_columns if item.get(column) in (None, "")]
+                if missing:
+                    errors.append({"row": index, "errors": [f"缺少唯一键字段: {', '.join(missing)}"]})
+                else:
+                    keys.append(tuple(item[column] for column in spec.key_columns))
+                continue
+            try:
+                ids.append(int(item))
+            except (TypeError, ValueError):
+                errors.append({"row": index, "errors": [f"无效的ID: {item}"]})
+
+        if errors:
+            raise BulkValidationError(f"{len(errors)} 行删除条件不合法", errors)
+        if ids and keys:
+            raise BulkValidationError("同一批删除不能混用ID和唯一键")
+        return ("id", ids) if ids else ("key", keys)
+
+    @staticmethod
+    async def delete(db: AsyncSession, spec: BulkTableSpec, mode: str, targets: List[Any]) -> Dict[str, Any]:
+        """按ID或唯一键分块删除，单事务提交后使基础配置缓存失效一次"""
+        table = spec.table
+        if mode == "id":
+            column = table.c.id
+        else:
+            column = tuple_(*(table.c[name] for name in spec.key_columns))
+        deleted = chunks = 0
+        try:
+            for chunk in _chunks(targets, settings.machine_bulk_chunk_size):
+                result = await db.execute(delete(table).where(column.in_(list(chunk))))
+                deleted += result.rowcount or 0
+                chunks += 1
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        await invalidate_reference_data()
+        logger.info(f"批量删除{table.name}: {deleted}行，{chunks}条语句")
+        return {"table": table.name, "requested": len(targets), "deleted": deleted, "statements": chunks}
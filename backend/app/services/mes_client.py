@@ -0,0 +1,272 @@
+"""
+APS智慧排产系统 - MES系统HTTP客户端
+
+向MES系统批量推送工单、查询工单状态：
+
+- 单个 httpx.AsyncClient 复用长连接（连接池大小 mes_max_connections），不为每次推送建连
+- 工单按 mes_batch_size 分批，最多 mes_max_concurrency 个批次同时推送
+- 网络错误、超时、429 和 5xx 按指数退避重试（full jitter：等待时间在 [0, 基数×2^n] 内随机，
+  避免大量客户端同时重试），响应带 Retry-After 时按其等待；其他 4xx 不重试
+- 每个工单携带按 plan_id 和工单内容生成的幂等键，批次请求头 Idempotency-Key 由批内幂等键生成，
+  重试或重复推送同一工单时MES只处理一次；工单内容变更（重新排产）后幂等键随之变化
+
+接口约定（本地替身服务 app.services.mes_stub_server 按此实现）：
+    POST {mes_base_url}/work-orders          {"work_orders": [...]} → {"accepted": [...], "rejected": [...]}
+    POST {mes_base_url}/work-orders/status   {"plan_ids": [...]}    → {"statuses": [...]}
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+import asyncio
+import hashlib
+import json
+import logging
+import random
+
+import httpx
+
+from app.core.config import settings
+from app.core.responses import dumps_json
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class MESRequestError(Exception):
+    """MES请求失败（重试耗尽或不可重试的响应）"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, attempts: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.attempts = attempts
+
+
+def order_plan_id(order: Dict[str, Any]) -> Optional[str]:
+    """工单标识：MES导出格式使用 plan_id，旧接口使用 work_order_nr"""
+    plan_id = order.get('plan_id') or order.get('work_order_nr')
+    return str(plan_id) if plan_id else None
+
+
+def order_idempotency_key(order: Dict[str, Any]) -> str:
+    """工单幂等键：plan_id + 工单内容摘要（不含幂等键本身），同一内容重复推送时键不变"""
+    content = {key: value for key, value in order.items() if key != 'idempotency_key'}
+    digest = hashlib.sha256(
+        json.dumps(content, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+    return f"{order_plan_id(order)}:{digest[:16]}"
+
+
+def batch_idempotency_key(orders: Sequence[Dict[str, Any]]) -> str:
+    """批次幂等键：由批内工单幂等键生成"""
+    digest = hashlib.sha256("\n".join(order['idempotency_key'] for order in orders).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _chunks(items: Sequence[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class MESClient:
+    """MES系统HTTP客户端（参数未指定时使用 settings.mes_* 配置）"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        *,
+        batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_base_delay: Optional[float] = None,
+        retry_max_delay: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self.base_url = (base_url or settings.mes_base_url or "").rstrip("/")
+        self.batch_size = max(1, batch_size or settings.mes_batch_size)
+        self.max_concurrency = max(1, max_concurrency or settings.mes_max_concurrency)
+        self.max_retries = settings.mes_max_retries if max_retries is None else max_retries
+        self.retry_base_delay = settings.mes_retry_base_delay if retry_base_delay is None else retry_base_delay
+        self.retry_max_delay = settings.mes_retry_max_delay if retry_max_delay is None else retry_max_delay
+        self.timeout = timeout or settings.mes_timeout
+        self.max_connections = max_connections or settings.mes_max_connections
+        self._transport = transport
+        self._rng = rng or random.Random()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "MESClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            if not self.base_url:
+                raise MESRequestError("未配置MES地址（APS_MES_BASE_URL）")
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def backoff_delay(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """第 retry 次重试（从0开始）前的等待时间"""
+        if retry_after is not None:
+            return min(self.retry_max_delay, retry_after)
+        return self._rng.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** retry)))
+
+    @staticmethod
+    def _parse_body(response: httpx.Response, retry: int) -> Dict[str, Any]:
+        """解析成功响应的JSON对象，响应体不是JSON对象时按请求失败处理（不重试）"""
+        try:
+            body = response.json()
+        except ValueError as e:
+            raise MESRequestError(
+                f"MES响应不是合法的JSON {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code, attempts=retry + 1,
+            ) from e
+        if not isinstance(body, dict):
+            raise MESRequestError(
+                f"MES响应不是JSON对象 {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code, attempts=retry + 1,
+            )
+        return body
+
+    async def _post(self, path: str, payload: Dict[str, Any],
+                    headers: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, Any], int]:
+        """发送POST请求，可重试的错误按退避策略重试，返回 (响应JSON, 重试次数)"""
+        client = self._get_http_client()
+        # 工单字段可能包含 datetime/Decimal，使用与接口响应相同的序列化
+        content = dumps_json(payload)
+        headers = {**(headers or {}), "Content-Type": "application/json"}
+        retry = 0
+        while True:
+            retry_after = None
+            try:
+                response = await client.post(path, content=content, headers=headers)
+            except httpx.TransportError as e:
+                error = MESRequestError(f"MES连接失败: {type(e).__name__}: {e}", attempts=retry + 1)
+            else:
+                if response.status_code < 400:
+                    return self._parse_body(response, retry), retry
+                error = MESRequestError(
+                    f"MES返回错误 {response.status_code}: {response.text[:200]}",
+                    status_code=response.status_code, attempts=retry + 1,
+                )
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise error
+                try:
+                    retry_after = float(response.headers["Retry-After"])
+                except (KeyError, ValueError):
+                    retry_after = None
+
+            if retry >= self.max_retries:
+                raise error
+            delay = self.backoff_delay(retry, retry_after)
+            logger.warning(f"MES请求 {path} 失败，{delay:.2f}秒后第{retry + 1}次重试: {error}")
+            await asyncio.sleep(delay)
+            retry += 1
+
+    async def send_work_orders(self, work_orders: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        分批并发推送工单
+
+        Returns:
+            推送汇总：accepted_orders / rejected_orders（MES拒绝）/ failed_orders（重试耗尽等
+            请求失败，可重新推送）及各自数量、批次数和重试次数
+        """
+        orders, rejected_orders = [], []
+        for order in work_orders:
+            if not order_plan_id(order):
+                rejected_orders.append({'work_order_nr': None, 'reason': '工单缺少 plan_id/work_order_nr'})
+                continue
+            orders.append(dict(order, idempotency_key=order_idempotency_key(order)))
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send_batch(batch: Sequence[Dict[str, Any]]):
+            async with semaphore:
+                try:
+                    body, retries = await self._post(
+                        "/work-orders", {"work_orders": list(batch)},
+                        headers={"Idempotency-Key": batch_idempotency_key(batch)},
+                    )
+                    return batch, body, retries, None
+                except MESRequestError as e:
+                    return batch, None, e.attempts - 1, e
+
+        results = await asyncio.gather(*(send_batch(batch) for batch in _chunks(orders, self.batch_size)))
+
+        accepted_orders, failed_orders = [], []
+        total_retries = 0
+        for batch, body, retries, error in results:
+            total_retries += retries
+            if error is not None:
+                failed_orders.extend({'work_order_nr': order_plan_id(order), 'reason': str(error)} for order in batch)
+                continue
+            accepted_orders.extend(body.get('accepted', []))
+            rejected_orders.extend(
+                {'work_order_nr': item.get('plan_id'), 'reason': item.get('reason')}
+                for item in body.get('rejected', [])
+            )
+
+        logger.info(
+            f"推送{len(work_orders)}个工单到MES: 接受{len(accepted_orders)}个, 拒绝{len(rejected_orders)}个, "
+            f"失败{len(failed_orders)}个, {len(results)}个批次, 重试{total_retries}次"
+        )
+        return {
+            'accepted_count': len(accepted_orders),
+            'rejected_count': len(rejected_orders),
+            'failed_count': len(failed_orders),
+            'accepted_orders': accepted_orders,
+            'rejected_orders': rejected_orders,
+            'failed_orders': failed_orders,
+            'batch_count': len(results),
+            'retry_count': total_retries,
+            'mes_batch_id': f"MES_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        }
+
+    async def get_work_order_status(self, work_order_nrs: List[str]) -> List[Dict[str, Any]]:
+        """分批并发查询工单状态，返回MES状态列表（查询失败时抛出 MESRequestError）"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def query_batch(batch: Sequence[str]):
+            async with semaphore:
+                body, _ = await self._post("/work-orders/status", {"plan_ids": list(batch)})
+                return body.get('statuses', [])
+
+        results = await asyncio.gather(*(query_batch(batch) for batch in _chunks(work_order_nrs, self.batch_size)))
+        return [status for statuses in results for status in statuses]
+
+
+_client: Optional[MESClient] = None
+
+
+def get_mes_client() -> MESClient:
+    """获取全局MES客户端（首次使用时创建，连接池在应用生命周期内复用）"""
+    global _client
+    if _client is None:
+        _client = MESClient()
+    return _client
+
+
+async def close_mes_client():
+    """关闭全局MES客户端连接池（应用关闭时调用）"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
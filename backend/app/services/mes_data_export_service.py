@@ -3,21 +3,82 @@ APS智慧排产系统 - MES接口数据导出服务
 
 实现符合MES接口规范的数据导出功能，支持XML和JSON格式
 提供工单数据的结构化导出和状态同步
+
+大批量导出使用 stream_export_by_task / stream_export_by_date_range：按服务端游标逐批读取工单，
+逐个工单元素输出MES文档（可选gzip压缩），输出内容与 _generate_mes_xml / _generate_mes_json 一致，
+内存占用只与批次大小相关
 """
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
 from datetime import datetime
 from dataclasses import dataclass
-import json
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 import logging
+import zlib
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
+from app.core.responses import dumps_json
+from app.db.connection import get_read_db_session
 from app.services.database_query_service import DatabaseQueryService
+from app.services.work_order_archive_service import WorkOrderArchiveService
 from app.models.work_order_models import FeedingOrder, PackingOrder, WorkOrderSchedule
 
 logger = logging.getLogger(__name__)
 
 
+# 工单导出查询的公共SELECT部分，表名（热表/归档表）与WHERE/ORDER BY由各查询方法填充
+FEEDING_ORDER_SELECT = """
+        SELECT plan_id, production_line, batch_code, material_code, bom_revision, quantity,
+               plan_start_time, plan_end_time, sequence, shift,
+               is_vaccum, is_sh93, is_hdt, is_flavor, unit, plan_date, plan_output_quantity,
+               is_outsourcing, is_backup, order_status, task_id
+        FROM {table}
+"""
+
+PACKING_ORDER_SELECT = """
+        SELECT plan_id, production_line, batch_code, material_code, bom_revision, quantity,
+               plan_start_time, plan_end_time, sequence, shift,
+               input_plan_id, input_batch_code, input_quantity, batch_sequence,
+               is_whole_batch, is_main_channel, is_deleted, is_last_one,
+               input_material_code, input_bom_revision, tiled,
+               is_vaccum, is_sh93, is_hdt, is_flavor, unit, plan_date, plan_output_quantity,
+               is_outsourcing, is_backup, order_status, task_id
+        FROM {table}
+"""
+
+
+def _escape_xml_text(value: str) -> str:
+    """按 minidom 的规则转义文本（换行符按XML解析规范归一化）"""
+    if "\r" in value:
+        value = value.replace("\r\n", "\n").replace("\r", "\n")
+    return (value.replace("&", "&amp;").replace("<", "&lt;")
+            .replace("\"", "&quot;").replace(">", "&gt;"))
+
+
+def _pretty_xml(element: ET.Element, indent: str) -> str:
+    """按 minidom toprettyxml(indent="  ") 的格式序列化单个元素"""
+    children = list(element)
+    if children:
+        inner = "".join(_pretty_xml(child, indent + "  ") for child in children)
+        return f"{indent}<{element.tag}>\n{inner}{indent}</{element.tag}>\n"
+    if element.text:
+        return f"{indent}<{element.tag}>{_escape_xml_text(element.text)}</{element.tag}>\n"
+    return f"{indent}<{element.tag}/>\n"
+
+
+async def _gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """流式gzip压缩（不逐块刷新，压缩率与一次性压缩相同）"""
+    compressor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
 @dataclass
 class MESExportConfig:
     """MES导出配置"""
@@ -102,7 +163,8 @@ class MESDataExportService:
         self, 
         start_date: datetime, 
         end_date: datetime,
-        export_format: str = "XML"
+        export_format: str = "XML",
+        include_archive: bool = False
     ) -> Dict[str, Any]:
         """
         按日期范围导出工单数据
@@ -111,14 +173,15 @@ class MESDataExportService:
             start_date: 开始日期
             end_date: 结束日期
             export_format: 导出格式
+            include_archive: 是否包含已归档的历史任务工单
             
         Returns:
             Dict: 导出结果
         """
         try:
             # 查询指定日期范围的工单
-            feeding_orders = await self._get_feeding_orders_by_date_range(start_date, end_date)
-            packing_orders = await self._get_packing_orders_by_date_range(start_date, end_date)
+            feeding_orders = await self._get_feeding_orders_by_date_range(start_date, end_date, include_archive)
+            packing_orders = await self._get_packing_orders_by_date_range(start_date, end_date, include_archive)
             
             export_data = {
                 'date_range': {
@@ -154,175 +217,228 @@ class MESDataExportService:
             logger.error(f"按日期范围导出MES数据失败: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    async def _get_feeding_orders_by_task(self, task_id: str) -> List[Dict[str, Any]]:
-        """查询指定任务的喂丝机工单"""
-        from app.db.connection import get_db_session
-        from sqlalchemy import text
-        
-        query = """
-        SELECT plan_id, production_line, batch_code, material_code, bom_revision, quantity,
-               plan_start_time, plan_end_time, sequence, shift,
-               is_vaccum, is_sh93, is_hdt, is_flavor, unit, plan_date, plan_output_quantity,
-               is_outsourcing, is_backup, order_status
-        FROM aps_feeding_order 
-        WHERE task_id = :task_id 
-        ORDER BY plan_start_time, sequence
+    async def stream_export_by_task(
+        self,
+        task_id: str,
+        export_format: str = "XML",
+        compress: bool = False,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
         """
+        按排产任务ID流式导出MES文档
         
-        async with get_db_session() as db:
-            result = await db.execute(text(query), {'task_id': task_id})
-            rows = result.fetchall()
-            
-            orders = []
-            for row in rows:
-                orders.append({
-                    'plan_id': row.plan_id,
-                    'production_line': row.production_line,
-                    'batch_code': row.batch_code,
-                    'material_code': row.material_code,
-                    'bom_revision': row.bom_revision,
-                    'quantity': row.quantity,
-                    'plan_start_time': row.plan_start_time.strftime('%Y/%m/%d %H:%M:%S') if row.plan_start_time else None,
-                    'plan_end_time': row.plan_end_time.strftime('%Y/%m/%d %H:%M:%S') if row.plan_end_time else None,
-                    'sequence': row.sequence,
-                    'shift': row.shift,
-                    'is_vaccum': bool(row.is_vaccum),
-                    'is_sh93': bool(row.is_sh93),
-                    'is_hdt': bool(row.is_hdt),
-                    'is_flavor': bool(row.is_flavor),
-                    'unit': row.unit,
-                    'plan_date': row.plan_date.strftime('%Y/%m/%d') if row.plan_date else None,
-                    'plan_output_quantity': row.plan_output_quantity,
-                    'is_outsourcing': bool(row.is_outsourcing),
-                    'is_backup': bool(row.is_backup),
-                    'order_status': row.order_status
-                })
+        先查询工单数量写入Metadata，再逐批读取工单逐个元素输出，内容与 export_work_orders_by_task 相同
+        
+        Args:
+            task_id: 排产任务ID
+            export_format: 导出格式 XML/JSON
+            compress: 是否gzip压缩
+            batch_size: 每批行数，None时使用配置 db_stream_batch_size
             
-            return orders
+        Yields:
+            bytes: 文档片段
+        """
+        feeding_table = await WorkOrderArchiveService.resolve_task_table('aps_feeding_order', task_id)
+        packing_table = await WorkOrderArchiveService.resolve_task_table('aps_packing_order', task_id)
+        where = "WHERE task_id = :task_id"
+        params = {'task_id': task_id}
+        export_data = {
+            'task_id': task_id,
+            'export_time': datetime.now().isoformat(),
+            'feeding_orders_count': await self._count_orders([feeding_table], where, params),
+            'packing_orders_count': await self._count_orders([packing_table], where, params),
+        }
+        
+        async for chunk in self._stream_document(
+            export_data,
+            self.stream_feeding_orders_by_task(task_id, batch_size),
+            self.stream_packing_orders_by_task(task_id, batch_size),
+            export_format,
+            compress
+        ):
+            yield chunk
+        logger.info(
+            f"MES数据流式导出完成 - 任务{task_id}: {export_data['feeding_orders_count']}个喂丝机工单, "
+            f"{export_data['packing_orders_count']}个卷包机工单"
+        )
     
-    async def _get_packing_orders_by_task(self, task_id: str) -> List[Dict[str, Any]]:
-        """查询指定任务的卷包机工单"""
-        from app.db.connection import get_db_session
-        from sqlalchemy import text
+    async def stream_export_by_date_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        export_format: str = "XML",
+        include_archive: bool = False,
+        compress: bool = False,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """按日期范围流式导出MES文档，内容与 export_work_orders_by_date_range 相同"""
+        where = "WHERE plan_start_time >= :start_date AND plan_start_time <= :end_date"
+        params = {'start_date': start_date, 'end_date': end_date}
+        export_data = {
+            'date_range': {
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat()
+            },
+            'export_time': datetime.now().isoformat(),
+            'feeding_orders_count': await self._count_orders(
+                WorkOrderArchiveService.date_range_tables('aps_feeding_order', include_archive), where, params
+            ),
+            'packing_orders_count': await self._count_orders(
+                WorkOrderArchiveService.date_range_tables('aps_packing_order', include_archive), where, params
+            ),
+        }
         
-        query = """
-        SELECT plan_id, production_line, batch_code, material_code, bom_revision, quantity,
-               plan_start_time, plan_end_time, sequence, shift,
-               input_plan_id, input_batch_code, input_quantity, batch_sequence,
-               is_whole_batch, is_main_channel, is_deleted, is_last_one,
-               input_material_code, input_bom_revision, tiled,
-               is_vaccum, is_sh93, is_hdt, is_flavor, unit, plan_date, plan_output_quantity,
-               is_outsourcing, is_backup, order_status
-        FROM aps_packing_order 
+        async for chunk in self._stream_document(
+            export_data,
+            self.stream_feeding_orders_by_date_range(start_date, end_date, batch_size, include_archive),
+            self.stream_packing_orders_by_date_range(start_date, end_date, batch_size, include_archive),
+            export_format,
+            compress
+        ):
+            yield chunk
+    
+    async def write_export_file(self, chunks: AsyncIterator[bytes], file_path: str) -> int:
+        """将流式导出写入文件（写入在线程池执行），返回写入字节数"""
+        written = 0
+        file = await run_in_threadpool(open, file_path, 'wb')
+        try:
+            async for chunk in chunks:
+                await run_in_threadpool(file.write, chunk)
+                written += len(chunk)
+        finally:
+            await run_in_threadpool(file.close)
+        return written
+    
+    async def _count_orders(self, tables: List[str], where: str, params: Dict[str, Any]) -> int:
+        """统计各表中满足条件的工单数量之和"""
+        total = 0
+        async with get_read_db_session() as db:
+            for table in tables:
+                result = await db.execute(text(f"SELECT COUNT(*) FROM {table} {where}"), params)
+                total += result.scalar() or 0
+        return total
+    
+    def _stream_document(
+        self,
+        export_data: Dict[str, Any],
+        feeding_batches: AsyncIterator[List[Dict[str, Any]]],
+        packing_batches: AsyncIterator[List[Dict[str, Any]]],
+        export_format: str,
+        compress: bool
+    ) -> AsyncIterator[bytes]:
+        if export_format.upper() == "XML":
+            chunks = self._iter_mes_xml(export_data, feeding_batches, packing_batches)
+        else:
+            chunks = self._iter_mes_json(export_data, feeding_batches, packing_batches)
+        return _gzip_chunks(chunks) if compress else chunks
+    
+    async def stream_feeding_orders_by_task(
+        self,
+        task_id: str,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """流式查询指定任务的喂丝机工单，按批返回（任务已归档时读归档表）"""
+        table = await WorkOrderArchiveService.resolve_task_table('aps_feeding_order', task_id)
+        query = FEEDING_ORDER_SELECT.format(table=table) + """
         WHERE task_id = :task_id 
         ORDER BY plan_start_time, sequence
         """
         
-        async with get_db_session() as db:
-            result = await db.execute(text(query), {'task_id': task_id})
-            rows = result.fetchall()
-            
-            orders = []
-            for row in rows:
-                # 构建InputBatch结构
-                input_batch = None
-                if row.input_plan_id:
-                    input_batch = {
-                        'input_plan_id': row.input_plan_id,
-                        'input_batch_code': row.input_batch_code,
-                        'quantity': row.input_quantity,
-                        'batch_sequence': row.batch_sequence,
-                        'is_whole_batch': bool(row.is_whole_batch) if row.is_whole_batch is not None else None,
-                        'is_main_channel': bool(row.is_main_channel),
-                        'is_deleted': bool(row.is_deleted),
-                        'is_last_one': bool(row.is_last_one) if row.is_last_one is not None else None,
-                        'material_code': row.input_material_code,
-                        'bom_revision': row.input_bom_revision,
-                        'tiled': bool(row.tiled) if row.tiled is not None else None,
-                        'remark1': None,
-                        'remark2': None
-                    }
-                
-                orders.append({
-                    'plan_id': row.plan_id,
-                    'production_line': row.production_line,
-                    'batch_code': row.batch_code,
-                    'material_code': row.material_code,
-                    'bom_revision': row.bom_revision,
-                    'quantity': row.quantity,
-                    'plan_start_time': row.plan_start_time.strftime('%Y/%m/%d %H:%M:%S') if row.plan_start_time else None,
-                    'plan_end_time': row.plan_end_time.strftime('%Y/%m/%d %H:%M:%S') if row.plan_end_time else None,
-                    'sequence': row.sequence,
-                    'shift': row.shift,
-                    'input_batch': input_batch,
-                    'is_vaccum': bool(row.is_vaccum),
-                    'is_sh93': bool(row.is_sh93),
-                    'is_hdt': bool(row.is_hdt),
-                    'is_flavor': bool(row.is_flavor),
-                    'unit': row.unit,
-                    'plan_date': row.plan_date.strftime('%Y/%m/%d') if row.plan_date else None,
-                    'plan_output_quantity': row.plan_output_quantity,
-                    'is_outsourcing': bool(row.is_outsourcing),
-                    'is_backup': bool(row.is_backup),
-                    'order_status': row.order_status
-                })
-            
-            return orders
+        async for rows in DatabaseQueryService.stream_rows(query, {'task_id': task_id}, batch_size):
+            yield [self._row_to_feeding_dict(row, include_task_id=False) for row in rows]
     
-    async def _get_feeding_orders_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        """按日期范围查询喂丝机工单"""
-        from app.db.connection import get_db_session
-        from sqlalchemy import text
-        
-        query = """
-        SELECT plan_id, production_line, batch_code, material_code, bom_revision, quantity,
-               plan_start_time, plan_end_time, sequence, shift,
-               is_vaccum, is_sh93, is_hdt, is_flavor, unit, plan_date, plan_output_quantity,
-               is_outsourcing, is_backup, order_status, task_id
-        FROM aps_feeding_order 
-        WHERE plan_start_time >= :start_date AND plan_start_time <= :end_date
+    async def stream_packing_orders_by_task(
+        self,
+        task_id: str,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """流式查询指定任务的卷包机工单，按批返回（任务已归档时读归档表）"""
+        table = await WorkOrderArchiveService.resolve_task_table('aps_packing_order', task_id)
+        query = PACKING_ORDER_SELECT.format(table=table) + """
+        WHERE task_id = :task_id 
         ORDER BY plan_start_time, sequence
         """
         
-        async with get_db_session() as db:
-            result = await db.execute(text(query), {
-                'start_date': start_date,
-                'end_date': end_date
-            })
-            rows = result.fetchall()
-            
-            return [self._row_to_feeding_dict(row) for row in rows]
+        async for rows in DatabaseQueryService.stream_rows(query, {'task_id': task_id}, batch_size):
+            yield [self._row_to_packing_dict(row, include_task_id=False) for row in rows]
     
-    async def _get_packing_orders_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        """按日期范围查询卷包机工单"""
-        from app.db.connection import get_db_session
-        from sqlalchemy import text
+    async def stream_feeding_orders_by_date_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        batch_size: Optional[int] = None,
+        include_archive: bool = False
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """流式按日期范围查询喂丝机工单，按批返回；include_archive时追加查询归档表的相关月度分区"""
+        params = {'start_date': start_date, 'end_date': end_date}
         
-        query = """
-        SELECT plan_id, production_line, batch_code, material_code, bom_revision, quantity,
-               plan_start_time, plan_end_time, sequence, shift,
-               input_plan_id, input_batch_code, input_quantity, batch_sequence,
-               is_whole_batch, is_main_channel, is_deleted, is_last_one,
-               input_material_code, input_bom_revision, tiled,
-               is_vaccum, is_sh93, is_hdt, is_flavor, unit, plan_date, plan_output_quantity,
-               is_outsourcing, is_backup, order_status, task_id
-        FROM aps_packing_order 
-        WHERE plan_start_time >= :start_date AND plan_start_time <= :end_date
-        ORDER BY plan_start_time, sequence
-        """
+        for table in WorkOrderArchiveService.date_range_tables('aps_feeding_order', include_archive):
+            query = FEEDING_ORDER_SELECT.format(table=table) + """
+            WHERE plan_start_time >= :start_date AND plan_start_time <= :end_date
+            ORDER BY plan_start_time, sequence
+            """
+            async for rows in DatabaseQueryService.stream_rows(query, params, batch_size):
+                yield [self._row_to_feeding_dict(row) for row in rows]
+    
+    async def stream_packing_orders_by_date_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        batch_size: Optional[int] = None,
+        include_archive: bool = False
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """流式按日期范围查询卷包机工单，按批返回；include_archive时追加查询归档表的相关月度分区"""
+        params = {'start_date': start_date, 'end_date': end_date}
         
-        async with get_db_session() as db:
-            result = await db.execute(text(query), {
-                'start_date': start_date,
-                'end_date': end_date
-            })
-            rows = result.fetchall()
-            
-            return [self._row_to_packing_dict(row) for row in rows]
+        for table in WorkOrderArchiveService.date_range_tables('aps_packing_order', include_archive):
+            query = PACKING_ORDER_SELECT.format(table=table) + """
+            WHERE plan_start_time >= :start_date AND plan_start_time <= :end_date
+            ORDER BY plan_start_time, sequence
+            """
+            async for rows in DatabaseQueryService.stream_rows(query, params, batch_size):
+                yield [self._row_to_packing_dict(row) for row in rows]
     
-    def _row_to_feeding_dict(self, row) -> Dict[str, Any]:
+    async def _get_feeding_orders_by_task(self, task_id: str) -> List[Dict[str, Any]]:
+        """查询指定任务的喂丝机工单"""
+        orders = []
+        async for batch in self.stream_feeding_orders_by_task(task_id):
+            orders.extend(batch)
+        return orders
+    
+    async def _get_packing_orders_by_task(self, task_id: str) -> List[Dict[str, Any]]:
+        """查询指定任务的卷包机工单"""
+        orders = []
+        async for batch in self.stream_packing_orders_by_task(task_id):
+            orders.extend(batch)
+        return orders
+    
+    async def _get_feeding_orders_by_date_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        include_archive: bool = False
+    ) -> List[Dict[str, Any]]:
+        """按日期范围查询喂丝机工单"""
+        orders = []
+        async for batch in self.stream_feeding_orders_by_date_range(start_date, end_date, include_archive=include_archive):
+            orders.extend(batch)
+        return orders
+    
+    async def _get_packing_orders_by_date_range(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        include_archive: bool = False
+    ) -> List[Dict[str, Any]]:
+        """按日期范围查询卷包机工单"""
+        orders = []
+        async for batch in self.stream_packing_orders_by_date_range(start_date, end_date, include_archive=include_archive):
+            orders.extend(batch)
+        return orders
+    
+    def _row_to_feeding_dict(self, row, include_task_id: bool = True) -> Dict[str, Any]:
         """数据库行转换为喂丝机工单字典"""
-        return {
+        order = {
             'plan_id': row.plan_id,
             'production_line': row.production_line,
             'batch_code': row.batch_code,
@@ -342,11 +458,13 @@ class MESDataExportService:
             'plan_output_quantity': row.plan_output_quantity,
             'is_outsourcing': bool(row.is_outsourcing),
             'is_backup': bool(row.is_backup),
-            'order_status': row.order_status,
-            'task_id': row.task_id
+            'order_status': row.order_status
         }
+        if include_task_id:
+            order['task_id'] = row.task_id
+        return order
     
-    def _row_to_packing_dict(self, row) -> Dict[str, Any]:
+    def _row_to_packing_dict(self, row, include_task_id: bool = True) -> Dict[str, Any]:
         """数据库行转换为卷包机工单字典"""
         input_batch = None
         if row.input_plan_id:
@@ -366,7 +484,7 @@ class MESDataExportService:
                 'remark2': None
             }
         
-        return {
+        order = {
             'plan_id': row.plan_id,
             'production_line': row.production_line,
             'batch_code': row.batch_code,
@@ -387,22 +505,18 @@ class MESDataExportService:
             'plan_output_quantity': row.plan_output_quantity,
             'is_outsourcing': bool(row.is_outsourcing),
             'is_backup': bool(row.is_backup),
-            'order_status': row.order_status,
-            'task_id': row.task_id
+            'order_status': row.order_status
         }
+        if include_task_id:
+            order['task_id'] = row.task_id
+        return order
     
     def _generate_mes_xml(self, export_data: Dict[str, Any]) -> str:
         """生成MES规范的XML格式数据"""
         root = ET.Element("MESWorkOrders")
         
         # 添加元信息
-        meta = ET.SubElement(root, "Metadata")
-        ET.SubElement(meta, "ExportTime").text = export_data['export_time']
-        ET.SubElement(meta, "TaskId").text = export_data.get('task_id', '')
-        
-        stats = ET.SubElement(meta, "Statistics")
-        ET.SubElement(stats, "FeedingOrdersCount").text = str(export_data['feeding_orders_count'])
-        ET.SubElement(stats, "PackingOrdersCount").text = str(export_data['packing_orders_count'])
+        root.append(self._build_metadata_element(export_data))
         
         # 添加喂丝机工单
         feeding_orders = ET.SubElement(root, "FeedingOrders")
@@ -421,6 +535,17 @@ class MESDataExportService:
         reparsed = minidom.parseString(rough_string)
         return reparsed.toprettyxml(indent="  ", encoding='utf-8').decode('utf-8')
     
+    def _build_metadata_element(self, export_data: Dict[str, Any]) -> ET.Element:
+        """构建MES文档的Metadata元素"""
+        meta = ET.Element("Metadata")
+        ET.SubElement(meta, "ExportTime").text = export_data['export_time']
+        ET.SubElement(meta, "TaskId").text = export_data.get('task_id', '')
+        
+        stats = ET.SubElement(meta, "Statistics")
+        ET.SubElement(stats, "FeedingOrdersCount").text = str(export_data['feeding_orders_count'])
+        ET.SubElement(stats, "PackingOrdersCount").text = str(export_data['packing_orders_count'])
+        return meta
+    
     def _add_feeding_order_elements(self, parent: ET.Element, order: Dict[str, Any]):
         """添加喂丝机工单XML元素"""
         ET.SubElement(parent, "PlanId").text = order.get('plan_id', '')
@@ -481,9 +606,79 @@ class MESDataExportService:
         ET.SubElement(parent, "IsOutsourcing").text = str(order.get('is_outsourcing', False)).lower()
         ET.SubElement(parent, "IsBackup").text = str(order.get('is_backup', False)).lower()
     
+    async def _iter_mes_xml(
+        self,
+        export_data: Dict[str, Any],
+        feeding_batches: AsyncIterator[List[Dict[str, Any]]],
+        packing_batches: AsyncIterator[List[Dict[str, Any]]]
+    ) -> AsyncIterator[bytes]:
+        """逐批输出MES规范的XML文档，格式与 _generate_mes_xml 相同"""
+        yield (
+            '<?xml version="1.0" encoding="utf-8"?>\n<MESWorkOrders>\n'
+            + _pretty_xml(self._build_metadata_element(export_data), "  ")
+        ).encode("utf-8")
+        
+        sections = (
+            ("FeedingOrders", "FeedingOrder", feeding_batches, self._add_feeding_order_elements),
+            ("PackingOrders", "PackingOrder", packing_batches, self._add_packing_order_elements),
+        )
+        for section_tag, order_tag, batches, add_elements in sections:
+            # 没有工单时为空元素 <FeedingOrders/>，在第一个工单出现时才补全开始标签
+            parts = [f"  <{section_tag}"]
+            opened = False
+            async for batch in batches:
+                for order in batch:
+                    if not opened:
+                        parts.append(">\n")
+                        opened = True
+                    order_elem = ET.Element(order_tag)
+                    add_elements(order_elem, order)
+                    parts.append(_pretty_xml(order_elem, "    "))
+                if parts:
+                    yield "".join(parts).encode("utf-8")
+                    parts = []
+            parts.append(f"  </{section_tag}>\n" if opened else "/>\n")
+            yield "".join(parts).encode("utf-8")
+        
+        yield b"</MESWorkOrders>\n"
+    
+    async def _iter_mes_json(
+        self,
+        export_data: Dict[str, Any],
+        feeding_batches: AsyncIterator[List[Dict[str, Any]]],
+        packing_batches: AsyncIterator[List[Dict[str, Any]]]
+    ) -> AsyncIterator[bytes]:
+        """逐批输出MES规范的JSON文档，格式与 _generate_mes_json 相同（工单列表在最后两个字段）"""
+        pretty = self.config.pretty_format
+        # 元信息字段序列化后去掉结尾的 }，再依次追加两个工单数组
+        header = dumps_json(export_data, pretty=pretty)
+        yield header[:-2] if pretty else header[:-1]
+        
+        for key, batches in (("feeding_orders", feeding_batches), ("packing_orders", packing_batches)):
+            yield (f',\n  "{key}": [' if pretty else f',"{key}":[').encode("utf-8")
+            first = True
+            async for batch in batches:
+                items = []
+                for order in batch:
+                    body = dumps_json(order, pretty=pretty)
+                    if pretty:
+                        body = b"\n".join(b"    " + line for line in body.split(b"\n"))
+                    items.append(body)
+                if items:
+                    separator = b",\n" if pretty else b","
+                    if first:
+                        prefix = b"\n" if pretty else b""
+                    else:
+                        prefix = separator
+                    yield prefix + separator.join(items)
+                    first = False
+            yield b"]" if first or not pretty else b"\n  ]"
+        
+        yield b"\n}" if pretty else b"}"
+    
     def _generate_mes_json(self, export_data: Dict[str, Any]) -> str:
-        """生成MES规范的JSON格式数据"""
-        return json.dumps(export_data, ensure_ascii=False, indent=2 if self.config.pretty_format else None)
+        """生成MES规范的JSON格式数据（orjson序列化，时间字段为ISO 8601格式）"""
+        return dumps_json(export_data, pretty=self.config.pretty_format).decode("utf-8")
 
 
 # 便捷函数
@@ -493,7 +688,12 @@ async def export_mes_data_by_task(task_id: str, export_format: str = "XML") -> D
     return await service.export_work_orders_by_task(task_id, export_format)
 
 
-async def export_mes_data_by_date(start_date: datetime, end_date: datetime, export_format: str = "XML") -> Dict[str, Any]:
+async def export_mes_data_by_date(
+    start_date: datetime,
+    end_date: datetime,
+    export_format: str = "XML",
+    include_archive: bool = False
+) -> Dict[str, Any]:
     """按日期范围导出MES数据的便捷函数"""
     service = MESDataExportService()
-    return await service.export_work_orders_by_date_range(start_date, end_date, export_format)
\ No newline at end of file
+    return await service.export_work_orders_by_date_range(start_date, end_date, export_format, include_archive)
\ No newline at end of file
@@ -6,6 +6,8 @@ APS智慧排产系统 - MES系统集成Mock服务
 - 生产状态同步
 - 维护计划同步
 - 设备状态监控
+
+配置 mes_base_url 后工单推送和工单状态查询通过 MESClient 调用真实MES接口，其余接口仍为Mock
 """
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
@@ -14,6 +16,9 @@ import logging
 import asyncio
 import json
 
+from app.core.config import settings
+from app.services.mes_client import MESRequestError, get_mes_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -59,6 +64,9 @@ class MESIntegrationService:
         Returns:
             MESResponse: MES系统响应
         """
+        if settings.mes_base_url:
+            return await self._send_work_orders_via_client(work_orders)
+
         try:
             await asyncio.sleep(self.mock_delay)  # 模拟网络延迟
             
@@ -110,6 +118,24 @@ class MESIntegrationService:
                 error_code="MES_CONNECTION_ERROR"
             )
     
+    async def _send_work_orders_via_client(self, work_orders: List[Dict[str, Any]]) -> MESResponse:
+        """通过MES客户端分批并发推送，部分批次重试耗尽时返回失败并附带各工单结果"""
+        try:
+            result = await get_mes_client().send_work_orders(work_orders)
+        except MESRequestError as e:
+            logger.error(f"推送工单到MES系统失败: {str(e)}")
+            return MESResponse(success=False, message=f"MES系统连接失败: {str(e)}", error_code="MES_CONNECTION_ERROR")
+
+        message = f"工单推送完成: 接受{result['accepted_count']}个, 拒绝{result['rejected_count']}个"
+        if result['failed_count']:
+            return MESResponse(
+                success=False,
+                message=f"{message}, 推送失败{result['failed_count']}个",
+                data=result,
+                error_code="MES_CONNECTION_ERROR"
+            )
+        return MESResponse(success=True, message=message, data=result)
+
     async def get_work_order_status(
         self, 
         work_order_nrs: List[str]
@@ -123,6 +149,14 @@ class MESIntegrationService:
         Returns:
             MESResponse: 工单状态信息
         """
+        if settings.mes_base_url:
+            try:
+                statuses = await get_mes_client().get_work_order_status(work_order_nrs)
+            except MESRequestError as e:
+                logger.error(f"查询工单状态失败: {str(e)}")
+                return MESResponse(success=False, message=f"查询失败: {str(e)}", error_code="STATUS_QUERY_ERROR")
+            return MESResponse(success=True, message=f"查询到{len(statuses)}个工单状态", data={'statuses': statuses})
+
         try:
             await asyncio.sleep(self.mock_delay * 0.5)
             
@@ -0,0 +1,400 @@
+"""
+APS智慧排产系统 - MES工单下发发件箱
+
+工单推送不在接口请求或排产任务中同步调用MES，而是写入下发记录表 aps_mes_dispatch：
+
+- 排产任务在写入 aps_feeding_order / aps_packing_order 的同一事务中写入下发记录（dispatch_data 为
+  与MES导出相同格式的工单JSON），工单提交即下发记录提交，不会出现工单已生成但未下发的情况
+- 后台分发器按批领取到期记录（FOR UPDATE SKIP LOCKED，多进程部署时不会重复领取），
+  标记为 DISPATCHED 并设置租约（next_retry_time），通过 MESClient 推送后逐条回写结果：
+  MES接受 → CONFIRMED；MES拒绝 → FAILED；请求失败 → PENDING 并按重试次数指数退避，
+  超过 max_retry_count 后 → FAILED
+- 进程在推送后、回写前中断时，租约到期后记录被重新领取并再次推送（至少投递一次），
+  重复推送由工单幂等键在MES端去重；租约过期计为一次失败，同样受 max_retry_count 限制
+- MES停机期间记录保持 PENDING，恢复后分发器连续领取直到积压清空，无需用户重新推送
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta
+import asyncio
+import logging
+
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.connection import get_db_session
+from app.models.work_order_models import MESDispatch
+from app.services.mes_client import MESClient, get_mes_client, order_plan_id
+from app.services.mes_data_export_service import (
+    FEEDING_ORDER_SELECT, PACKING_ORDER_SELECT, MESDataExportService
+)
+from app.services.work_order_archive_service import WorkOrderArchiveService
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_STATUSES = ('PENDING', 'DISPATCHED', 'CONFIRMED', 'FAILED')
+
+
+class OutboxValidationError(ValueError):
+    """下发工单校验失败，errors为 [{'index': 工单序号, 'reason': 原因}]"""
+
+    def __init__(self, message: str, errors: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def infer_order_type(order: Dict[str, Any]) -> str:
+    """工单类型：优先使用 order_type 字段，否则按计划号前缀（HWS为喂丝机）判断"""
+    order_type = str(order.get('order_type') or '').upper()
+    if order_type in ('PACKING', 'FEEDING'):
+        return order_type
+    return 'FEEDING' if (order_plan_id(order) or '').startswith('HWS') else 'PACKING'
+
+
+def _chunks(items: Sequence[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def retry_delay(retry_count: int) -> float:
+    """第 retry_count 次失败后的重试间隔（秒）"""
+    return min(settings.mes_outbox_retry_max_delay,
+               settings.mes_outbox_retry_base_delay * (2 ** max(0, retry_count - 1)))
+
+
+class MESOutboxService:
+    """MES工单下发记录服务"""
+
+    @staticmethod
+    async def enqueue(
+        db: AsyncSession,
+        orders: List[Dict[str, Any]],
+        dispatch_batch_id: str,
+        order_type: Optional[str] = None
+    ) -> int:
+        """
+        写入待下发记录（不提交，由调用方与业务数据在同一事务中提交）
+
+        Args:
+            orders: MES格式工单字典（需包含 plan_id 或 work_order_nr）
+            dispatch_batch_id: 下发批次ID（排产任务ID或推送批次号）
+            order_type: PACKING/FEEDING，未指定时按工单推断
+
+        Raises:
+            OutboxValidationError: 有工单缺少 plan_id/work_order_nr 时整批不写入
+        """
+        errors = [{'index': index, 'reason': '工单缺少 plan_id/work_order_nr'}
+                  for index, order in enumerate(orders) if not order_plan_id(order)]
+        if errors:
+            raise OutboxValidationError(f"{len(errors)}个工单缺少 plan_id/work_order_nr", errors)
+
+        now = datetime.now()
+        rows = [{
+            'dispatch_batch_id': dispatch_batch_id,
+            'work_order_nr': order_plan_id(order),
+            'order_type': order_type or infer_order_type(order),
+            'dispatch_status': 'PENDING',
+            'dispatch_data': order,
+            'retry_count': 0,
+            'max_retry_count': settings.mes_outbox_max_retries,
+            'next_retry_time': now,
+        } for order in orders]
+        for chunk in _chunks(rows, settings.mes_outbox_batch_size):
+            await db.execute(insert(MESDispatch), list(chunk))
+        return len(rows)
+
+    @staticmethod
+    async def enqueue_task_orders(db: AsyncSession, task_id: str) -> Dict[str, int]:
+        """
+        读取任务的喂丝机/卷包机工单（含本事务中尚未提交的写入）并写入下发记录，
+        先写喂丝机工单，卷包机工单引用的前工序计划先到达MES；已归档的任务从归档表读取
+        """
+        formatter = MESDataExportService()
+        counts = {}
+        for order_type, select_sql, hot_table, to_dict in (
+            ('FEEDING', FEEDING_ORDER_SELECT, 'aps_feeding_order', formatter._row_to_feeding_dict),
+            ('PACKING', PACKING_ORDER_SELECT, 'aps_packing_order', formatter._row_to_packing_dict),
+        ):
+            table = await WorkOrderArchiveService.resolve_task_table(hot_table, task_id, db)
+            result = await db.execute(
+                text(select_sql.format(table=table) + " WHERE task_id = :task_id ORDER BY plan_start_time, sequence"),
+                {'task_id': task_id}
+            )
+            orders = [to_dict(row, include_task_id=False) for row in result.fetchall()]
+            counts[order_type] = await MESOutboxService.enqueue(db, orders, task_id, order_type)
+        return counts
+
+    @staticmethod
+    async def claim_batch(limit: int, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        领取到期的待下发记录（PENDING，或租约已过期的 DISPATCHED）并设置租约
+
+        租约过期说明上次推送后未回写结果（进程中断或推送超过租约时长），计为一次失败：
+        重试次数加1，达到 max_retry_count 的记录标记为 FAILED 且不再领取，
+        避免每次推送都使进程崩溃的工单被无限次重新领取
+        """
+        now = now or datetime.now()
+        async with get_db_session() as db:
+            result = await db.execute(
+                select(MESDispatch.id, MESDispatch.dispatch_data, MESDispatch.retry_count,
+                       MESDispatch.max_retry_count, MESDispatch.dispatch_status)
+                .where(MESDispatch.dispatch_status.in_(('PENDING', 'DISPATCHED')),
+                       MESDispatch.next_retry_time <= now)
+                .order_by(MESDispatch.next_retry_time, MESDispatch.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            records, expired, abandoned = [], [], []
+            for row in result:
+                record = dict(row._mapping)
+                if record.pop('dispatch_status') == 'DISPATCHED':
+                    record['retry_count'] = (record['retry_count'] or 0) + 1
+                    max_retry_count = record['max_retry_count']
+                    if max_retry_count is not None and record['retry_count'] >= max_retry_count:
+                        abandoned.append(record['id'])
+                        continue
+                    expired.append(record['id'])
+                records.append(record)
+
+            if abandoned:
+                await db.execute(
+                    update(MESDispatch).where(MESDispatch.id.in_(abandoned))
+                    .values(dispatch_status='FAILED', retry_count=func.coalesce(MESDispatch.retry_count, 0) + 1,
+                            mes_error_message="下发租约过期未回写结果，已达到最大重试次数")
+                )
+                logger.warning(f"{len(abandoned)}条下发记录租约过期且达到最大重试次数，标记为FAILED")
+            if expired:
+                await db.execute(
+                    update(MESDispatch).where(MESDispatch.id.in_(expired))
+                    .values(retry_count=func.coalesce(MESDispatch.retry_count, 0) + 1)
+                )
+            if records:
+                await db.execute(
+                    update(MESDispatch)
+                    .where(MESDispatch.id.in_([record['id'] for record in records]))
+                    .values(dispatch_status='DISPATCHED', dispatch_time=now,
+                            next_retry_time=now + timedelta(seconds=settings.mes_outbox_lease_seconds))
+                )
+        return records
+
+    @staticmethod
+    async def record_results(
+        records: List[Dict[str, Any]],
+        result: Optional[Dict[str, Any]],
+        error: Optional[str] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """
+        回写推送结果；result 为 MESClient.send_work_orders 的返回值，整批请求异常时为None并给出error
+        """
+        now = now or datetime.now()
+        ids_by_plan: Dict[Optional[str], List[int]] = defaultdict(list)
+        for record in records:
+            ids_by_plan[order_plan_id(record['dispatch_data'] or {})].append(record['id'])
+
+        confirmed: List[int] = []
+        rejected: Dict[str, List[int]] = defaultdict(list)
+        failed: Dict[str, List[int]] = defaultdict(list)
+        if result is None:
+            failed[error or "MES推送失败"] = [record['id'] for record in records]
+        else:
+            for plan_id in result.get('accepted_orders', []):
+                confirmed.extend(ids_by_plan.pop(plan_id, []))
+            for item in result.get('rejected_orders', []):
+                rejected[item.get('reason') or "MES拒绝"].extend(ids_by_plan.pop(item.get('work_order_nr'), []))
+            for item in result.get('failed_orders', []):
+                failed[item.get('reason') or "MES推送失败"].extend(ids_by_plan.pop(item.get('work_order_nr'), []))
+            # MES响应中未出现的工单按推送失败处理，稍后重试
+            for ids in ids_by_plan.values():
+                failed["MES响应中缺少该工单结果"].extend(ids)
+
+        retry_info = {record['id']: (record['retry_count'] or 0, record['max_retry_count']) for record in records}
+        # 按 (新重试次数, 是否放弃, 原因) 分组，同组记录用一条UPDATE回写
+        retry_groups: Dict[Tuple[int, bool, str], List[int]] = defaultdict(list)
+        for reason, ids in failed.items():
+            for record_id in ids:
+                retry_count, max_retry_count = retry_info[record_id]
+                retry_count += 1
+                give_up = max_retry_count is not None and retry_count >= max_retry_count
+                retry_groups[(retry_count, give_up, reason)].append(record_id)
+
+        async with get_db_session() as db:
+            if confirmed:
+                await db.execute(
+                    update(MESDispatch).where(MESDispatch.id.in_(confirmed))
+                    .values(dispatch_status='CONFIRMED', mes_confirm_time=now, mes_error_message=None,
+                            mes_response={'status': 'ACCEPTED', 'mes_batch_id': result.get('mes_batch_id')})
+                )
+            for reason, ids in rejected.items():
+                await db.execute(
+                    update(MESDispatch).where(MESDispatch.id.in_(ids))
+                    .values(dispatch_status='FAILED', mes_error_message=reason,
+                            mes_response={'status': 'REJECTED', 'reason': reason})
+                )
+            for (retry_count, give_up, reason), ids in retry_groups.items():
+                await db.execute(
+                    update(MESDispatch).where(MESDispatch.id.in_(ids))
+                    .values(dispatch_status='FAILED' if give_up else 'PENDING', retry_count=retry_count,
+                            mes_error_message=reason[:2000],
+                            next_retry_time=now + timedelta(seconds=retry_delay(retry_count)))
+                )
+
+        return {
+            'confirmed': len(confirmed),
+            'rejected': sum(len(ids) for ids in rejected.values()),
+            'retrying': sum(len(ids) for (_, give_up, _), ids in retry_groups.items() if not give_up),
+            'failed': sum(len(ids) for (_, give_up, _), ids in retry_groups.items() if give_up),
+        }
+
+    @staticmethod
+    async def get_summary(db: AsyncSession, dispatch_batch_id: Optional[str] = None) -> Dict[str, Any]:
+        """按下发状态统计记录数，以及最早一条待下发记录的创建时间"""
+        conditions = [MESDispatch.dispatch_batch_id == dispatch_batch_id] if dispatch_batch_id else []
+        result = await db.execute(
+            select(MESDispatch.dispatch_status, func.count(), func.min(MESDispatch.created_time))
+            .where(*conditions)
+            .group_by(MESDispatch.dispatch_status)
+        )
+        counts = {status: 0 for status in DISPATCH_STATUSES}
+        oldest_pending = None
+        for status, count, oldest in result:
+            counts[status] = count
+            if status in ('PENDING', 'DISPATCHED') and oldest and (oldest_pending is None or oldest < oldest_pending):
+                oldest_pending = oldest
+        return {
+            'dispatch_batch_id': dispatch_batch_id,
+            'status_counts': counts,
+            'total': sum(counts.values()),
+            'oldest_pending_time': oldest_pending.isoformat() if oldest_pending else None,
+        }
+
+    @staticmethod
+    async def get_records(
+        db: AsyncSession,
+        dispatch_batch_id: Optional[str] = None,
+        dispatch_status: Optional[str] = None,
+        work_order_nrs: Optional[List[str]] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """查询各工单的下发状态"""
+        query = select(
+            MESDispatch.dispatch_batch_id, MESDispatch.work_order_nr, MESDispatch.order_type,
+            MESDispatch.dispatch_status, MESDispatch.dispatch_time, MESDispatch.mes_confirm_time,
+            MESDispatch.retry_count, MESDispatch.next_retry_time, MESDispatch.mes_error_message,
+        )
+        if dispatch_batch_id:
+            query = query.where(MESDispatch.dispatch_batch_id == dispatch_batch_id)
+        if dispatch_status:
+            query = query.where(MESDispatch.dispatch_status == dispatch_status)
+        if work_order_nrs:
+            query = query.where(MESDispatch.work_order_nr.in_(work_order_nrs))
+        result = await db.execute(query.order_by(MESDispatch.id).limit(limit))
+        return [
+            {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row._mapping.items()}
+            for row in result
+        ]
+
+
+class MESOutboxDispatcher:
+    """后台分发器：持续领取到期的下发记录并推送到MES"""
+
+    def __init__(
+        self,
+        client: Optional[MESClient] = None,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.client = client
+        self.batch_size = batch_size or settings.mes_outbox_batch_size
+        self.poll_interval = settings.mes_outbox_poll_interval if poll_interval is None else poll_interval
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def dispatch_once(self) -> Dict[str, int]:
+        """领取一批记录并推送，返回本批统计"""
+        if self.client is None and not settings.mes_base_url:
+            # 未配置MES地址时不领取，记录保持待下发，配置后自动推送
+            return {'claimed': 0}
+        records = await MESOutboxService.claim_batch(self.batch_size)
+        if not records:
+            return {'claimed': 0}
+
+        client = self.client or get_mes_client()
+        try:
+            result = await client.send_work_orders([record['dispatch_data'] for record in records])
+            stats = await MESOutboxService.record_results(records, result)
+        except Exception as e:
+            logger.error(f"MES工单下发失败: {str(e)}")
+            stats = await MESOutboxService.record_results(records, None, error=str(e))
+        logger.info(f"MES工单下发: 领取{len(records)}条, {stats}")
+        return {'claimed': len(records), **stats}
+
+    async def run(self):
+        """循环下发：领满一批时立即继续（追赶积压），否则等待轮询间隔或新记录通知"""
+        while not self._stopping:
+            try:
+                stats = await self.dispatch_once()
+                if stats['claimed'] >= self.batch_size:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"MES工单分发器异常: {str(e)}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def notify(self):
+        """有新的下发记录提交时唤醒分发器"""
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(self._task, timeout=settings.mes_timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+            self._task = None
+
+
+_dispatcher: Optional[MESOutboxDispatcher] = None
+
+
+def start_mes_outbox_dispatcher() -> Optional[MESOutboxDispatcher]:
+    """启动后台分发器（应用启动时调用，未启用发件箱时不启动）"""
+    global _dispatcher
+    if not settings.mes_outbox_enabled:
+        return None
+    if not settings.mes_base_url:
+        logger.warning("已启用MES发件箱但未配置 mes_base_url，下发记录将在配置后推送")
+    if _dispatcher is None:
+        _dispatcher = MESOutboxDispatcher()
+        _dispatcher.start()
+        logger.info("MES工单分发器已启动")
+    return _dispatcher
+
+
+async def stop_mes_outbox_dispatcher():
+    """停止后台分发器（应用关闭时调用），正在推送的批次完成后退出"""
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+        _dispatcher = None
+        logger.info("MES工单分发器已停止")
+
+
+def notify_mes_outbox_dispatcher():
+    """通知本进程的分发器立即领取（其他进程的分发器在轮询间隔内领取）"""
+    if _dispatcher is not None:
+        _dispatcher.notify()
@@ -0,0 +1,176 @@
+"""
+APS智慧排产系统 - 本地MES替身服务
+
+实现 MESClient 使用的MES接口，用于测试和推送吞吐量基准测试，可注入延迟和错误：
+
+- latency / latency_jitter：每个请求的处理延迟（秒）
+- error_rate / error_status：按概率返回错误状态码（默认503，可重试）
+- fail_next：接下来的N个请求固定返回错误（测试重试逻辑）
+- reject_rate：按 plan_id 哈希确定性地拒绝部分工单（业务拒绝，不重试）
+- 按工单幂等键去重：重复推送的工单返回首次处理结果，不重复入库
+
+测试中通过 httpx.ASGITransport 直接调用 create_mes_stub_app()；独立运行：
+    python -m app.services.mes_stub_server --port 8820 --latency 0.05 --error-rate 0.02
+运行时可通过 PUT /_config 调整参数，GET /_stats 查看请求统计
+"""
+from typing import Any, Dict, List, Optional
+from dataclasses import asdict, dataclass, field
+import argparse
+import asyncio
+import random
+import zlib
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+@dataclass
+class MESStubConfig:
+    """替身服务注入参数"""
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    fail_next: int = 0
+    reject_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class MESStubState:
+    """替身服务状态：已接收工单、幂等键结果和请求统计"""
+    config: MESStubConfig
+    orders: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    requests: int = 0
+    errors: int = 0
+    duplicates: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    def __post_init__(self):
+        self.rng = random.Random(self.config.seed)
+
+    def reset(self):
+        """清空已接收工单和统计，保留注入参数"""
+        self.orders.clear()
+        self.results.clear()
+        self.requests = self.errors = self.duplicates = self.max_in_flight = 0
+        self.rng = random.Random(self.config.seed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests, 'errors': self.errors, 'duplicates': self.duplicates,
+            'orders': len(self.orders), 'max_in_flight': self.max_in_flight,
+        }
+
+
+class WorkOrderBatch(BaseModel):
+    work_orders: List[Dict[str, Any]]
+
+
+class StatusQuery(BaseModel):
+    plan_ids: List[str]
+
+
+def _is_rejected(plan_id: str, reject_rate: float) -> bool:
+    return zlib.crc32(plan_id.encode("utf-8")) % 1000 < reject_rate * 1000
+
+
+def create_mes_stub_app(config: Optional[MESStubConfig] = None) -> FastAPI:
+    """创建替身服务应用，状态保存在 app.state.stub"""
+    app = FastAPI(title="MES替身服务")
+    state = MESStubState(config or MESStubConfig())
+    app.state.stub = state
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path.startswith("/_"):
+            return await call_next(request)
+        state.requests += 1
+        state.in_flight += 1
+        state.max_in_flight = max(state.max_in_flight, state.in_flight)
+        try:
+            config = state.config
+            delay = config.latency + (state.rng.uniform(0, config.latency_jitter) if config.latency_jitter else 0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if config.fail_next > 0 or (config.error_rate and state.rng.random() < config.error_rate):
+                config.fail_next = max(0, config.fail_next - 1)
+                state.errors += 1
+                return JSONResponse({'detail': 'MES服务暂时不可用'}, status_code=config.error_status)
+            return await call_next(request)
+        finally:
+            state.in_flight -= 1
+
+    @app.post("/work-orders")
+    async def receive_work_orders(batch: WorkOrderBatch):
+        accepted, rejected = [], []
+        for order in batch.work_orders:
+            plan_id = str(order.get('plan_id') or order.get('work_order_nr'))
+            key = order.get('idempotency_key') or plan_id
+            result = state.results.get(key)
+            if result is not None:
+                state.duplicates += 1
+            elif _is_rejected(plan_id, state.config.reject_rate):
+                result = state.results[key] = {'plan_id': plan_id, 'reason': '机台维护中，暂时无法接收工单'}
+            else:
+                result = state.results[key] = {'plan_id': plan_id}
+                state.orders[plan_id] = {'plan_id': plan_id, 'status': 'PLANNED', 'progress': 0.0}
+            if 'reason' in result:
+                rejected.append(result)
+            else:
+                accepted.append(plan_id)
+        return {'accepted': accepted, 'rejected': rejected}
+
+    @app.post("/work-orders/status")
+    async def query_status(query: StatusQuery):
+        return {'statuses': [
+            {'work_order_nr': plan_id, **state.orders[plan_id]} if plan_id in state.orders
+            else {'work_order_nr': plan_id, 'status': 'NOT_FOUND', 'progress': 0.0,
+                  'message': '工单不存在于MES系统中'}
+            for plan_id in query.plan_ids
+        ]}
+
+    @app.get("/_stats")
+    async def get_stats():
+        return state.stats()
+
+    @app.put("/_config")
+    async def update_config(values: Dict[str, Any]):
+        for name, value in values.items():
+            if hasattr(state.config, name):
+                setattr(state.config, name, value)
+        return asdict(state.config)
+
+    @app.post("/_reset")
+    async def reset():
+        state.reset()
+        return state.stats()
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="本地MES替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8820)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    config = MESStubConfig(
+        latency=args.latency, latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+        error_status=args.error_status, reject_rate=args.reject_rate, seed=args.seed,
+    )
+    uvicorn.run(create_mes_stub_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
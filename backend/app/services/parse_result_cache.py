@@ -0,0 +1,132 @@
+"""
+APS智慧排产系统 - Excel解析结果缓存
+
+按 (解析器版本, 文件内容SHA-256) 缓存 ProductionPlanExcelParser 的解析结果
+（记录、错误、警告、工作表统计），相同内容的文件重复上传时直接复用解析结果，
+不再执行openpyxl解析；解析逻辑变化时递增 PARSER_VERSION 即可使旧结果失效
+
+流水线导入不在内存中物化完整解析结果，完成后只记录已写入旬计划的批次（导入批次标记），
+相同内容再次导入时复制该批次的旬计划记录
+"""
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import logging
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.cache import CacheManager
+from app.services.excel_parser import PARSER_VERSION, parse_production_plan_excel
+from app.services.parse_worker_pool import run_in_parse_pool
+
+logger = logging.getLogger(__name__)
+
+
+PARSE_RESULT_KEY_PREFIX = "aps:parse_result"
+
+_cache_manager: Optional[CacheManager] = None
+
+
+def _get_cache_manager() -> CacheManager:
+    """解析结果缓存管理器（不使用进程内缓存层：结果体积大，且调用方会修改记录）"""
+    global _cache_manager
+    if _cache_manager is None:
+        _cache_manager = CacheManager(local=None)
+    return _cache_manager
+
+
+class ParseResultCache:
+    """解析结果缓存服务"""
+
+    @staticmethod
+    def cache_key(content_hash: str) -> str:
+        return f"{PARSE_RESULT_KEY_PREFIX}:{PARSER_VERSION}:{content_hash}"
+
+    @staticmethod
+    def batch_key(content_hash: str) -> str:
+        return f"{ParseResultCache.cache_key(content_hash)}:batch"
+
+    @staticmethod
+    def hash_file(file_path: str) -> str:
+        """分块计算文件SHA-256（用于没有记录内容哈希的历史导入批次）"""
+        hasher = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(settings.upload_read_chunk_size), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @staticmethod
+    async def exists(content_hash: str) -> bool:
+        """是否已有该内容的解析结果"""
+        return await _get_cache_manager().exists(ParseResultCache.cache_key(content_hash))
+
+    @staticmethod
+    async def is_cached(content_hash: str) -> bool:
+        """是否可复用已有结果（解析结果缓存或流水线导入批次标记）"""
+        return (await ParseResultCache.exists(content_hash)
+                or await _get_cache_manager().exists(ParseResultCache.batch_key(content_hash)))
+
+    @staticmethod
+    async def get_imported_batch(content_hash: str) -> Optional[str]:
+        """读取该内容最近一次流水线导入完成的批次ID，不存在时返回None"""
+        return await _get_cache_manager().get_object(
+            ParseResultCache.batch_key(content_hash), namespace=PARSE_RESULT_KEY_PREFIX
+        )
+
+    @staticmethod
+    async def set_imported_batch(content_hash: str, import_batch_id: str) -> bool:
+        """记录流水线导入完成的批次（导入提交后调用）"""
+        return await _get_cache_manager().set_object(
+            ParseResultCache.batch_key(content_hash), import_batch_id, ttl=settings.parse_result_cache_ttl
+        )
+
+    @staticmethod
+    async def get(content_hash: str) -> Optional[Dict[str, Any]]:
+        """读取解析结果，不存在时返回None"""
+        return await _get_cache_manager().get_object(
+            ParseResultCache.cache_key(content_hash), namespace=PARSE_RESULT_KEY_PREFIX
+        )
+
+    @staticmethod
+    async def set(content_hash: str, parse_result: Dict[str, Any]) -> bool:
+        """保存解析结果（序列化后写入，调用方后续修改不影响缓存）"""
+        return await _get_cache_manager().set_object(
+            ParseResultCache.cache_key(content_hash), parse_result, ttl=settings.parse_result_cache_ttl
+        )
+
+    @staticmethod
+    async def parse(
+        file_path: str,
+        content_hash: Optional[str] = None,
+        force: bool = False
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        解析Excel文件，相同内容已解析过时直接返回缓存结果
+
+        Args:
+            file_path: Excel文件路径
+            content_hash: 文件内容SHA-256，为None时读取文件计算
+            force: 忽略缓存重新解析（结果仍会写入缓存）
+
+        Returns:
+            Tuple[Dict, bool]: (解析结果, 是否命中缓存)
+
+        Raises:
+            ExcelParseError: 解析失败
+        """
+        content_hash = content_hash or await run_in_threadpool(ParseResultCache.hash_file, file_path)
+
+        if not force:
+            cached = await ParseResultCache.get(content_hash)
+            if cached is not None:
+                logger.info(f"复用解析结果: {content_hash[:12]} (解析器版本 {PARSER_VERSION})")
+                return cached, True
+
+        # 在解析进程池中解析，不阻塞事件循环
+        start_time = time.perf_counter()
+        parse_result = await run_in_parse_pool(parse_production_plan_excel, file_path)
+        logger.info(f"解析文件 {content_hash[:12]} 耗时 {time.perf_counter() - start_time:.2f}s")
+
+        await ParseResultCache.set(content_hash, parse_result)
+        return parse_result, False
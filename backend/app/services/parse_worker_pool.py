@@ -0,0 +1,66 @@
+"""
+APS智慧排产系统 - Excel解析进程池
+
+openpyxl解析和聚合数值分配都是纯CPU的同步计算，在事件循环中直接调用会阻塞
+同一进程内的所有请求（甘特图、健康检查等）。这些计算提交到独立的进程池执行：
+工作进程以spawn方式启动，不继承父进程的事件循环、数据库连接和Redis连接；
+事件循环只等待结果。excel_parse_workers=0 时退化为默认线程池执行
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+import asyncio
+import logging
+import multiprocessing
+
+from app.core.config import settings
+from app.services.excel_parser import ExcelParseError
+
+logger = logging.getLogger(__name__)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """获取解析进程池（首次使用时创建），未启用进程池时返回None（使用默认线程池）"""
+    global _executor
+    if settings.excel_parse_workers <= 0:
+        return None
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.excel_parse_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"Excel解析进程池已创建: {settings.excel_parse_workers}个工作进程")
+    return _executor
+
+
+def shutdown_parse_executor(wait: bool = True):
+    """关闭解析进程池（应用关闭时调用）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+        logger.info("Excel解析进程池已关闭")
+
+
+async def run_in_parse_pool(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在解析进程池中执行同步函数，不阻塞事件循环
+
+    Args:
+        func: 模块级函数（进程池模式下函数、参数和返回值都需要可pickle）
+
+    Raises:
+        ExcelParseError: 工作进程异常退出（如内存不足被终止）
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_parse_executor(), partial(func, *args, **kwargs))
+    except BrokenProcessPool as e:
+        # 进程池中任一工作进程异常退出后整个池不可用，丢弃后下次调用重建
+        logger.error(f"Excel解析工作进程异常退出: {e}")
+        shutdown_parse_executor(wait=False)
+        raise ExcelParseError("解析进程异常退出，文件可能过大或已损坏")
@@ -0,0 +1,160 @@
+"""
+APS智慧排产系统 - 旬计划聚合数值分配
+
+Excel中同一牌号的多台机器记录共用合并单元格中的"本次投料"和"本次成品"聚合值，
+导入前需要按机台平均分配。分配是纯CPU计算，由解析进程池执行（见 parse_worker_pool）
+
+分组和分配按列向量化计算：先取出牌号、投料、成品、行号四列，相邻记录逐对比较得到
+分组边界，累加边界得到分组号，再按组整除/取余一次算出每条记录的分配值
+"""
+from typing import Any, Dict, List
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _column(values: List[Any]) -> np.ndarray:
+    """数值列：全部为整数时使用int64，否则使用object保持原有Python数值类型和运算语义"""
+    try:
+        column = np.array(values)
+    except (OverflowError, ValueError):
+        column = None
+    if column is not None and column.dtype.kind == 'i':
+        return column
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def allocate_aggregate_values(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    修正的聚合数值分配逻辑
+
+    关键识别规则：
+    1. 连续的相同牌号记录且有相同的投料/成品数值 = 需要分配的聚合组
+    2. 不同牌号或数值不同的记录 = 独立记录，保持原样
+    3. 只有投料或成品为0/None的记录 = 独立记录，保持原样
+
+    分配方式：每台整除分配，余数从组内第一条记录起逐条加1
+
+    Args:
+        records: 原始记录列表（不修改原记录）
+
+    Returns:
+        处理后的记录列表
+    """
+    if not records:
+        return []
+
+    count = len(records)
+    articles = np.empty(count, dtype=object)
+    articles[:] = [record.get('article_name', 'UNKNOWN') for record in records]
+    material = _column([record.get('material_input', 0) or 0 for record in records])
+    final = _column([record.get('final_quantity', 0) or 0 for record in records])
+    rows = _column([record.get('row_number', 0) for record in records])
+
+    # 分组条件（与前一条记录比较）：相同牌号 AND 相同数值 AND 两条记录的数值都不全为0 AND 行号相差1~2
+    nonzero = (material > 0) | (final > 0)
+    row_diff = rows[1:] - rows[:-1]
+    joins_previous = (
+        (articles[1:] == articles[:-1])
+        & (material[1:] == material[:-1])
+        & (final[1:] == final[:-1])
+        & nonzero[1:] & nonzero[:-1]
+        & (row_diff >= 1) & (row_diff <= 2)
+    ).astype(bool)
+
+    # 分组号、组起始位置、组大小、组内序号
+    group_ids = np.concatenate(([0], np.cumsum(~joins_previous)))
+    group_starts = np.flatnonzero(np.concatenate(([True], ~joins_previous)))
+    group_sizes = np.diff(np.append(group_starts, count))
+    sizes = group_sizes[group_ids]
+    positions = np.arange(count) - group_starts[group_ids]
+
+    # 只复制需要改写的记录，未分配的记录原样返回
+    processed_records = list(records)
+
+    allocated = np.flatnonzero(sizes > 1)
+    if allocated.size:
+        # 组内各记录的数值相同，取组首条记录的值作为聚合总量
+        total_material = material[group_starts[group_ids[allocated]]]
+        total_final = final[group_starts[group_ids[allocated]]]
+        machine_count = sizes[allocated]
+        position = positions[allocated]
+        if material.dtype == object or final.dtype == object:
+            # 转为Python整数，使整除/取余结果保持Python数值类型
+            machine_count = machine_count.astype(object)
+            position = position.astype(object)
+
+        # 基础分配（整除），余数分配给前几个记录；数值不为正时分配0
+        material_positive = total_material > 0
+        final_positive = total_final > 0
+        allocated_material = np.where(material_positive, total_material // machine_count, 0) \
+            + (position < np.where(material_positive, total_material % machine_count, 0))
+        allocated_final = np.where(final_positive, total_final // machine_count, 0) \
+            + (position < np.where(final_positive, total_final % machine_count, 0))
+
+        for index, material_value, final_value, original_material, original_final, machines in zip(
+            allocated.tolist(), allocated_material.tolist(), allocated_final.tolist(),
+            total_material.tolist(), total_final.tolist(), machine_count.tolist()
+        ):
+            record = processed_records[index] = processed_records[index].copy()
+            record['material_input'] = material_value
+            record['final_quantity'] = final_value
+            record['_allocation_info'] = {
+                'original_material_input': original_material,
+                'original_final_quantity': original_final,
+                'machine_count': machines,
+                'allocation_method': 'equal_distribution'
+            }
+
+    logger.debug(
+        f"聚合数值分配完成: {count}条记录, {len(group_sizes)}个组, "
+        f"{int((group_sizes > 1).sum())}个聚合组共{allocated.size}条记录参与分配"
+    )
+    return processed_records
+
+
+def _joins_previous(previous: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    """单对记录的分组条件，与 allocate_aggregate_values 中的向量化条件相同"""
+    previous_material = previous.get('material_input', 0) or 0
+    previous_final = previous.get('final_quantity', 0) or 0
+    material = current.get('material_input', 0) or 0
+    final = current.get('final_quantity', 0) or 0
+    row_diff = current.get('row_number', 0) - previous.get('row_number', 0)
+    return (
+        current.get('article_name', 'UNKNOWN') == previous.get('article_name', 'UNKNOWN')
+        and material == previous_material
+        and final == previous_final
+        and (material > 0 or final > 0)
+        and (previous_material > 0 or previous_final > 0)
+        and 1 <= row_diff <= 2
+    )
+
+
+class StreamingAggregateAllocator:
+    """
+    分块聚合数值分配
+
+    聚合组可能跨越块边界：每块末尾的连续记录暂不分配，与下一块拼接后再分配，
+    结果与对全部记录一次调用 allocate_aggregate_values 相同
+    """
+
+    def __init__(self):
+        self._pending: List[Dict[str, Any]] = []
+
+    def feed(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """加入一块记录，返回已确定分组的记录的分配结果"""
+        records = self._pending + records
+        cut = len(records) - 1
+        while cut > 0 and _joins_previous(records[cut - 1], records[cut]):
+            cut -= 1
+        self._pending = records[cut:]
+        return allocate_aggregate_values(records[:cut])
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """分配剩余记录"""
+        records, self._pending = self._pending, []
+        return allocate_aggregate_values(records)
@@ -0,0 +1,163 @@
+"""
+APS智慧排产系统 - 旬计划分块导入流水线
+
+原导入流程分三步且每步都完整物化全部记录：解析出全部记录 → 整体校验 → 整体分配并写入。
+流水线把三步改为并发的三个阶段，阶段之间用有界队列连接：
+
+    解析（线程，stream_excel_file 分块输出） → 分配/派生字段（线程池） → 分块INSERT（事件循环）
+
+队列满时上游阻塞等待，内存占用只与块大小和队列长度有关；写入一块的同时解析下一块，
+总耗时接近最慢的阶段。所有INSERT在同一事务中，由调用方提交或回滚
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.base_models import DecadePlan
+from app.services.excel_parser import ProductionPlanExcelParser
+from app.services.plan_allocation import StreamingAggregateAllocator
+
+logger = logging.getLogger(__name__)
+
+
+_END = object()  # 队列结束标记
+
+
+class PipelineAborted(Exception):
+    """下游阶段失败，解析线程停止输出"""
+    pass
+
+
+class PlanImportPipeline:
+    """旬计划分块导入流水线"""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        import_batch_id: str,
+        build_values: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+        chunk_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        insert_chunk_size: Optional[int] = None
+    ):
+        """
+        Args:
+            db: 数据库会话（事务由调用方提交）
+            import_batch_id: 导入批次ID
+            build_values: 记录字典 → aps_decade_plan 列值的转换函数（build_decade_plan_values）
+            chunk_size: 解析输出的每块记录数，None时使用配置 plan_import_chunk_size
+            queue_size: 阶段间队列长度，None时使用配置 plan_import_queue_size
+            insert_chunk_size: 每条INSERT的行数，None时使用配置 decade_plan_insert_chunk_size
+        """
+        self.db = db
+        self.import_batch_id = import_batch_id
+        self.build_values = build_values
+        self.chunk_size = chunk_size or settings.plan_import_chunk_size
+        self.queue_size = queue_size or settings.plan_import_queue_size
+        self.insert_chunk_size = insert_chunk_size or settings.decade_plan_insert_chunk_size
+        self._aborted = False
+        self.stats = {'rows': 0, 'chunks': 0, 'statements': 0, 'max_queued_chunks': 0}
+
+    async def run(self, file_path: str) -> Dict[str, Any]:
+        """
+        执行导入：删除该批次旧数据后流水线写入
+
+        Returns:
+            Dict: 解析汇总（同 stream_excel_file）及写入统计 import_stats
+
+        Raises:
+            ExcelParseError: 解析失败；写入失败时抛出数据库异常
+        """
+        loop = asyncio.get_running_loop()
+        parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        rows_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        start_time = time.perf_counter()
+
+        await self.db.execute(delete(DecadePlan).where(DecadePlan.import_batch_id == self.import_batch_id))
+
+        tasks = [
+            asyncio.create_task(self._parse_stage(loop, file_path, parsed_queue)),
+            asyncio.create_task(self._prepare_stage(parsed_queue, rows_queue)),
+            asyncio.create_task(self._insert_stage(rows_queue)),
+        ]
+        try:
+            summary, _, _ = await asyncio.gather(*tasks)
+        except BaseException:
+            self._aborted = True
+            for task in tasks[1:]:
+                task.cancel()
+            # 解析线程可能阻塞在已满的队列上，清空队列使其继续并看到中止标记
+            while not tasks[0].done():
+                self._drain(parsed_queue)
+                await asyncio.sleep(0.01)
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        elapsed = time.perf_counter() - start_time
+        summary['import_stats'] = {
+            **self.stats,
+            'elapsed_seconds': elapsed,
+            'rows_per_second': self.stats['rows'] / elapsed if elapsed > 0 else 0.0,
+        }
+        logger.info(
+            f"流水线导入 {self.import_batch_id}: {self.stats['rows']}行, {self.stats['chunks']}块, "
+            f"耗时{elapsed:.3f}秒, 队列最多积压{self.stats['max_queued_chunks']}块"
+        )
+        return summary
+
+    async def _parse_stage(self, loop, file_path: str, parsed_queue: asyncio.Queue) -> Dict[str, Any]:
+        """解析阶段：在线程中分块解析，每块阻塞放入队列（队列满时等待下游）"""
+        def on_chunk(records: List[Dict[str, Any]]):
+            if self._aborted:
+                raise PipelineAborted()
+            asyncio.run_coroutine_threadsafe(parsed_queue.put(records), loop).result()
+
+        try:
+            parser = ProductionPlanExcelParser(streaming=True)
+            return await run_in_threadpool(parser.stream_excel_file, file_path, on_chunk, self.chunk_size)
+        finally:
+            if not self._aborted:
+                await parsed_queue.put(_END)
+
+    async def _prepare_stage(self, parsed_queue: asyncio.Queue, rows_queue: asyncio.Queue):
+        """分配/派生字段阶段：聚合组可能跨块，由 StreamingAggregateAllocator 保留块末尾的连续记录"""
+        allocator = StreamingAggregateAllocator()
+        while True:
+            records = await parsed_queue.get()
+            self.stats['max_queued_chunks'] = max(self.stats['max_queued_chunks'], parsed_queue.qsize() + 1)
+            if records is _END:
+                break
+            rows = await run_in_threadpool(self._build_rows, allocator.feed, records)
+            if rows:
+                await rows_queue.put(rows)
+        rows = await run_in_threadpool(self._build_rows, lambda _: allocator.finish(), None)
+        if rows:
+            await rows_queue.put(rows)
+        await rows_queue.put(_END)
+
+    def _build_rows(self, allocate: Callable, records) -> List[Dict[str, Any]]:
+        return [self.build_values(self.import_batch_id, record) for record in allocate(records)]
+
+    async def _insert_stage(self, rows_queue: asyncio.Queue):
+        """写入阶段：每块按 insert_chunk_size 拆分为多行INSERT"""
+        table = DecadePlan.__table__
+        while True:
+            rows = await rows_queue.get()
+            if rows is _END:
+                break
+            for offset in range(0, len(rows), self.insert_chunk_size):
+                await self.db.execute(insert(table).values(rows[offset:offset + self.insert_chunk_size]))
+                self.stats['statements'] += 1
+            self.stats['rows'] += len(rows)
+            self.stats['chunks'] += 1
+
+    @staticmethod
+    def _drain(queue: asyncio.Queue):
+        while not queue.empty():
+            queue.get_nowait()
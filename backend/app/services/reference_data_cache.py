@@ -0,0 +1,232 @@
+"""
+APS智慧排产系统 - 基础配置数据缓存
+
+在 DatabaseQueryService 之上为机台关系、机台速度、班次配置、轮保计划、系统配置
+提供进程内缓存（VersionedCache），缓存有效性由Redis中单调递增的配置版本号决定：
+machines配置接口写入后原子递增版本号，所有API和工作进程在下次读取时一并失效
+Redis不可用时直接回退到数据库查询
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import copy
+import logging
+import time
+
+from app.core.config import settings
+from app.db.cache import CacheManager
+from app.services.database_query_service import DatabaseQueryService
+
+logger = logging.getLogger(__name__)
+
+
+REFERENCE_VERSION_KEY = "aps:reference_data:version"
+
+
+class VersionedCache:
+    """
+    版本号驱动的进程内缓存
+
+    数据缓存在本进程，有效性由Redis中 version_key 的值决定，
+    写入方递增版本号后所有进程在下次读取（受版本号读取节流间隔限制）时失效
+    """
+
+    def __init__(
+        self,
+        version_key: str,
+        cache: CacheManager = None,
+        max_entries: int = 256,
+        max_age: Optional[float] = None,
+        enabled_setting: str = "reference_cache_enabled"
+    ):
+        self.version_key = version_key
+        self.enabled_setting = enabled_setting
+        self._cache = cache
+        self.max_entries = max_entries
+        self._max_age = max_age
+        # {缓存键: (版本号, 加载时间, 数据)}
+        self._entries: Dict[str, Tuple[int, float, Any]] = {}
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+        self._redis_retry_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        """缓存开关，读取 settings 中名为 enabled_setting 的配置项"""
+        return getattr(settings, self.enabled_setting)
+
+    @property
+    def max_age(self) -> float:
+        """进程内缓存最长有效期（秒），未指定时使用 reference_cache_max_age"""
+        return self._max_age if self._max_age is not None else settings.reference_cache_max_age
+
+    @property
+    def cache(self) -> CacheManager:
+        if self._cache is None:
+            self._cache = CacheManager()
+        return self._cache
+
+    async def current_version(self) -> Optional[int]:
+        """
+        获取当前版本号（按 reference_cache_version_check_interval 节流读取Redis）
+
+        Returns:
+            Optional[int]: 版本号，Redis不可用时返回None
+        """
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked_at < settings.reference_cache_version_check_interval:
+            return self._version
+        if now < self._redis_retry_at:
+            return None
+
+        try:
+            value = await self.cache.client.get(self.version_key)
+        except Exception as e:
+            logger.warning(f"读取缓存版本号 {self.version_key} 失败，{settings.reference_cache_retry_interval}秒内直接查询数据库: {e}")
+            self._redis_retry_at = now + settings.reference_cache_retry_interval
+            self._version = None
+            return None
+
+        self._version = int(value) if value is not None else 0
+        self._version_checked_at = now
+        return self._version
+
+    async def bump_version(self) -> Optional[int]:
+        """
+        原子递增版本号（Redis INCR），使所有进程的缓存失效
+
+        Returns:
+            Optional[int]: 新版本号，Redis不可用时返回None
+        """
+        self._entries.clear()
+        try:
+            version = await self.cache.client.incr(self.version_key)
+        except Exception as e:
+            logger.error(f"递增缓存版本号 {self.version_key} 失败，其他进程将在缓存过期后刷新: {e}")
+            self._version = None
+            return None
+
+        self._version = int(version)
+        self._version_checked_at = time.monotonic()
+        return self._version
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        读取缓存数据，版本号变化、超过最大缓存时长或未命中时调用loader加载
+
+        返回数据的深拷贝，调用方修改不会影响缓存
+
+        Args:
+            key: 缓存键
+            loader: 数据加载协程函数
+
+        Returns:
+            Any: 数据
+        """
+        if not self.enabled:
+            return await loader()
+
+        version = await self.current_version()
+        if version is None:
+            return await loader()
+
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version and now - entry[1] < self.max_age:
+            self.hits += 1
+            return copy.deepcopy(entry[2])
+
+        self.misses += 1
+        value = await loader()
+
+        # 版本变化时丢弃旧版本数据，数量超限时淘汰最早的条目
+        self._entries = {k: v for k, v in self._entries.items() if v[0] == version}
+        while len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (version, now, value)
+        return copy.deepcopy(value)
+
+    def clear(self):
+        """清空进程内缓存"""
+        self._entries.clear()
+        self._version = None
+        self._version_checked_at = 0.0
+        self._redis_retry_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        total = self.hits + self.misses
+        return {
+            'version': self._version,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class ReferenceDataCache(VersionedCache):
+    """基础配置数据缓存（机台关系/速度/班次/轮保/系统配置）"""
+
+    def __init__(self, cache: CacheManager = None, max_entries: int = 256):
+        super().__init__(REFERENCE_VERSION_KEY, cache, max_entries)
+
+    # ==================== 基础数据读取 ====================
+
+    async def get_machine_relations(self) -> Dict[str, List[str]]:
+        """机台关系映射 {喂丝机代码: [卷包机代码列表]}"""
+        return await self.get_or_load('machine_relations', DatabaseQueryService.get_machine_relations)
+
+    async def get_machine_speeds(self) -> Dict[str, Dict[str, Any]]:
+        """机台速度配置 {机台代码: {速度配置}}"""
+        return await self.get_or_load('machine_speeds', DatabaseQueryService.get_machine_speeds)
+
+    async def get_shift_config(self, machine_name: str = '*', effective_date: date = None) -> List[Dict[str, Any]]:
+        """班次配置列表"""
+        effective_date = effective_date or datetime.now().date()
+        return await self.get_or_load(
+            f"shift_config:{machine_name}:{effective_date.isoformat()}",
+            lambda: DatabaseQueryService.get_shift_config(machine_name, effective_date)
+        )
+
+    async def get_maintenance_plans(
+        self,
+        machine_codes: List[str] = None,
+        start_date: date = None,
+        end_date: date = None
+    ) -> List[Dict[str, Any]]:
+        """
+        轮保计划列表
+
+        按日期范围缓存全部机台的计划，再按机台代码过滤，避免机台组合不同导致缓存分散
+        """
+        start_date = start_date or datetime.now().date()
+        end_date = end_date or start_date + timedelta(days=7)
+        plans = await self.get_or_load(
+            f"maintenance_plans:{start_date.isoformat()}:{end_date.isoformat()}",
+            lambda: DatabaseQueryService.get_maintenance_plans(None, start_date, end_date)
+        )
+        if machine_codes:
+            wanted = set(machine_codes)
+            plans = [plan for plan in plans if plan['machine_code'] in wanted]
+        return plans
+
+    async def get_system_config(self, config_group: str = None, config_keys: List[str] = None) -> Dict[str, Any]:
+        """系统配置参数 {config_key: config_value}"""
+        keys = ','.join(sorted(config_keys)) if config_keys else ''
+        return await self.get_or_load(
+            f"system_config:{config_group or ''}:{keys}",
+            lambda: DatabaseQueryService.get_system_config(config_group, config_keys)
+        )
+
+
+# 全局基础数据缓存
+reference_data_cache = ReferenceDataCache()
+
+
+async def invalidate_reference_data() -> Optional[int]:
+    """基础配置数据写入后调用，递增版本号使所有进程缓存失效"""
+    version = await reference_data_cache.bump_version()
+    logger.info(f"基础配置数据已变更，缓存版本号: {version}")
+    return version
@@ -0,0 +1,121 @@
+"""
+APS智慧排产系统 - CSV/Parquet计划文件读取
+
+上游系统可将旬计划导出为CSV或Parquet，读取速度远高于openpyxl解析xlsx的XML。
+文件以只读工作簿的形式提供（单个工作表，iter_rows(values_only=True) 逐行返回单元格值），
+由 ProductionPlanExcelParser 的流式模式解析，表头识别、年份提取、合并单元格继承和数据验证
+与xlsx完全一致
+
+- CSV：标准库csv模块（C实现）逐行读取，内容与xlsx工作表逐行对应，可包含标题行；
+  编码为UTF-8（可带BOM）或GB18030（Excel中文版导出的CSV）
+- Parquet：列名即表头，按记录批次读取列数据后转为行（依赖pyarrow）。
+  xlsx中表头之前的标题行、空行和数据之后的"有效期限"行写在文件元数据中
+  （parquet_layout_metadata），读取时按原位置还原，行号（工单号 WO_{行号}）和年份与xlsx相同；
+  缺少元数据时表头为第1行，年份按未找到年份处理（使用当前年份）
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+import codecs
+import csv
+import json
+import os
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # 见requirements.txt，未安装时不能导入Parquet文件
+    pq = None
+
+TABULAR_EXTENSIONS = ('.csv', '.parquet')
+TABULAR_SHEET_NAME = 'Sheet1'
+
+CSV_ENCODINGS = ('utf-8-sig', 'gb18030')
+ENCODING_PROBE_BYTES = 1024 * 1024
+PARQUET_BATCH_ROWS = 10000
+
+# Parquet文件元数据键：表头之前 / 数据之后的原工作表行（JSON二维数组）
+PARQUET_LEADING_ROWS_KEY = b'aps.leading_rows'
+PARQUET_TRAILING_ROWS_KEY = b'aps.trailing_rows'
+
+
+def is_tabular_file(file_path: str) -> bool:
+    """是否为CSV/Parquet计划文件（按扩展名判断）"""
+    return os.path.splitext(file_path)[1].lower() in TABULAR_EXTENSIONS
+
+
+def detect_csv_encoding(file_path: str) -> str:
+    """按文件开头的内容判断编码，UTF-8解码失败时视为GB18030"""
+    with open(file_path, 'rb') as f:
+        probe = f.read(ENCODING_PROBE_BYTES)
+    for encoding in CSV_ENCODINGS[:-1]:
+        try:
+            # 增量解码，读取截断在多字节字符中间时不报错
+            codecs.getincrementaldecoder(encoding)().decode(probe, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return CSV_ENCODINGS[-1]
+
+
+def parquet_layout_metadata(
+    leading_rows: Iterable[Sequence[Any]],
+    trailing_rows: Iterable[Sequence[Any]] = ()
+) -> Dict[bytes, bytes]:
+    """
+    生成Parquet文件元数据，记录xlsx工作表中表头之前（标题行、空行）和数据之后（有效期限行）的行
+
+    用法:
+        table = table.replace_schema_metadata(parquet_layout_metadata(rows[:header_index], trailer_rows))
+    """
+    def encode(rows):
+        return json.dumps([list(row) for row in rows], ensure_ascii=False, default=str).encode('utf-8')
+    return {PARQUET_LEADING_ROWS_KEY: encode(leading_rows), PARQUET_TRAILING_ROWS_KEY: encode(trailing_rows)}
+
+
+def _metadata_rows(metadata: Dict[bytes, bytes], key: bytes) -> List[List[Any]]:
+    return json.loads(metadata[key].decode('utf-8')) if key in metadata else []
+
+
+class TabularSheet:
+    """CSV/Parquet文件对应的只读工作表"""
+
+    def __init__(self, file_path: str, title: str = TABULAR_SHEET_NAME):
+        self.file_path = file_path
+        self.title = title
+        self.is_parquet = file_path.lower().endswith('.parquet')
+
+    def iter_rows(self, values_only: bool = True) -> Iterator[Sequence[Any]]:
+        """逐行返回单元格值，空单元格为空字符串（CSV）或None（Parquet）"""
+        if self.is_parquet:
+            return self._iter_parquet_rows()
+        return self._iter_csv_rows()
+
+    def _iter_csv_rows(self) -> Iterator[List[str]]:
+        with open(self.file_path, newline='', encoding=detect_csv_encoding(self.file_path)) as f:
+            yield from csv.reader(f)
+
+    def _iter_parquet_rows(self) -> Iterator[Sequence[Any]]:
+        parquet_file = pq.ParquetFile(self.file_path)
+        metadata = parquet_file.schema_arrow.metadata or {}
+        yield from _metadata_rows(metadata, PARQUET_LEADING_ROWS_KEY)
+        yield list(parquet_file.schema_arrow.names)
+        for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS):
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+        yield from _metadata_rows(metadata, PARQUET_TRAILING_ROWS_KEY)
+
+
+class TabularWorkbook:
+    """CSV/Parquet文件对应的只读工作簿（只有一个工作表）"""
+
+    def __init__(self, file_path: str):
+        if file_path.lower().endswith('.parquet') and pq is None:
+            raise RuntimeError("导入Parquet文件需要安装pyarrow")
+        self.worksheets = [TabularSheet(file_path)]
+        self.sheetnames = [sheet.title for sheet in self.worksheets]
+
+    def __getitem__(self, sheet_name: str) -> TabularSheet:
+        for sheet in self.worksheets:
+            if sheet.title == sheet_name:
+                return sheet
+        raise KeyError(f"Worksheet {sheet_name} does not exist.")
+
+    def close(self):
+        pass
@@ -0,0 +1,298 @@
+"""
+APS智慧排产系统 - 工单归档服务
+
+实现工单相关表的热/归档分离：被新排产任务取代的旧任务数据迁移到 *_archive 表，
+热表数据量只与当前有效任务相关，甘特图和导出查询耗时不随历史月份增长
+归档表按计划开始时间月度分区，表结构见 scripts/work-order-archive.sql
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import re
+
+from app.core.config import settings
+from app.db.connection import get_autocommit_connection, get_db_session, get_read_db_session
+from app.services.work_order_cache import invalidate_work_order_cache
+
+logger = logging.getLogger(__name__)
+
+
+# (热表, 归档表, 分区时间列)
+# 顺序满足外键依赖：卷包机工单引用喂丝机工单，需先于喂丝机工单删除
+ARCHIVE_TABLES: List[Tuple[str, str, str]] = [
+    ('aps_packing_order', 'aps_packing_order_archive', 'plan_start_time'),
+    ('aps_feeding_order', 'aps_feeding_order_archive', 'plan_start_time'),
+    ('aps_work_order_schedule', 'aps_work_order_schedule_archive', 'planned_start'),
+    ('aps_processing_log', 'aps_processing_log_archive', 'execution_time'),
+]
+
+ARCHIVE_TABLE_MAP: Dict[str, str] = {hot: archive for hot, archive, _ in ARCHIVE_TABLES}
+
+_MONTH_PARTITION_PATTERN = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+def _next_month(year: int, month: int) -> Tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def month_partitions(start: date, months: int) -> List[Tuple[str, str]]:
+    """
+    生成从start所在月份开始的月度分区定义
+
+    Args:
+        start: 起始日期
+        months: 月份数
+
+    Returns:
+        List[Tuple]: (分区名 pYYYYMM, 上界日期 YYYY-MM-01)
+    """
+    partitions = []
+    year, month = start.year, start.month
+    for _ in range(months):
+        next_year, next_month = _next_month(year, month)
+        partitions.append((f"p{year}{month:02d}", f"{next_year}-{next_month:02d}-01"))
+        year, month = next_year, next_month
+    return partitions
+
+
+def missing_month_partitions(existing: List[str], today: date, months_ahead: int) -> List[Tuple[str, str]]:
+    """
+    计算需要从pmax中拆分的月度分区：从已有最后一个月度分区的下一个月起，
+    连续补齐到 today 所在月起第 months_ahead 个月，归档作业停运期间跳过的月份也会补上
+
+    Args:
+        existing: 已有分区名
+        today: 基准日期
+        months_ahead: 需保证存在的月份数（含当前月）
+
+    Returns:
+        List[Tuple]: (分区名 pYYYYMM, 上界日期 YYYY-MM-01)
+    """
+    months = [
+        (int(match.group(1)), int(match.group(2)))
+        for match in (_MONTH_PARTITION_PATTERN.match(name or '') for name in existing) if match
+    ]
+    year, month = _next_month(*max(months)) if months else (today.year, today.month)
+    target = today.year * 12 + today.month - 1 + months_ahead - 1
+    count = target - (year * 12 + month - 1) + 1
+    return month_partitions(date(year, month, 1), count) if count > 0 else []
+
+
+class WorkOrderArchiveService:
+    """工单热/归档表分离服务"""
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """归档表是否已启用（需先执行 scripts/work-order-archive.sql）"""
+        return settings.work_order_archive_enabled
+
+    @staticmethod
+    async def find_superseded_task_ids(limit: int = None) -> List[str]:
+        """
+        查询已被取代且热表中仍有数据的排产任务
+
+        同一导入批次存在更新的COMPLETED任务时，较早的已结束任务视为已被取代
+
+        Args:
+            limit: 最多返回任务数，None时使用配置 work_order_archive_batch_limit
+
+        Returns:
+            List[str]: 任务ID列表，按创建时间升序
+        """
+        limit = limit or settings.work_order_archive_batch_limit
+        hot_data_conditions = " OR ".join(
+            f"EXISTS (SELECT 1 FROM {hot} h WHERE h.task_id = t.task_id)"
+            for hot, _, _ in ARCHIVE_TABLES
+        )
+        query = f"""
+        SELECT t.task_id
+        FROM aps_scheduling_task t
+        WHERE t.task_status IN ('COMPLETED', 'FAILED', 'CANCELLED')
+        AND EXISTS (
+            SELECT 1 FROM aps_scheduling_task n
+            WHERE n.import_batch_id = t.import_batch_id
+            AND n.task_status = 'COMPLETED'
+            AND n.created_time > t.created_time
+        )
+        AND ({hot_data_conditions})
+        ORDER BY t.created_time
+        LIMIT :limit
+        """
+
+        async with get_db_session() as db:
+            result = await db.execute(text(query), {'limit': limit})
+            return [row.task_id for row in result]
+
+    @staticmethod
+    async def archive_task(task_id: str) -> Dict[str, int]:
+        """
+        将单个任务的工单、排程和日志从热表迁移到归档表（单事务）
+
+        Args:
+            task_id: 排产任务ID
+
+        Returns:
+            Dict[str, int]: 各热表迁移的行数
+        """
+        moved = {}
+        async with get_db_session() as db:
+            for hot_table, archive_table, _ in ARCHIVE_TABLES:
+                await db.execute(
+                    text(f"INSERT INTO {archive_table} SELECT h.*, NOW() FROM {hot_table} h WHERE h.task_id = :task_id"),
+                    {'task_id': task_id}
+                )
+                result = await db.execute(
+                    text(f"DELETE FROM {hot_table} WHERE task_id = :task_id"),
+                    {'task_id': task_id}
+                )
+                moved[hot_table] = result.rowcount
+
+        logger.info(f"任务 {task_id} 归档完成: {moved}")
+        return moved
+
+    @staticmethod
+    async def ensure_archive_partitions(months_ahead: int = None, today: date = None) -> Dict[str, List[str]]:
+        """
+        为归档表补齐到当前月起后续月份的分区（从pmax中拆分）
+
+        分区DDL在自动提交连接上执行：MySQL的DDL会隐式提交事务，不与任务迁移共用事务会话
+
+        Args:
+            months_ahead: 需保证存在的月份数，None时使用配置 work_order_archive_months_ahead
+            today: 基准日期，None表示今天
+
+        Returns:
+            Dict[str, List[str]]: 各归档表新增的分区名
+        """
+        months_ahead = months_ahead or settings.work_order_archive_months_ahead
+        today = today or datetime.now().date()
+        added = {}
+
+        async with get_autocommit_connection() as conn:
+            for _, archive_table, _ in ARCHIVE_TABLES:
+                result = await conn.execute(
+                    text("""
+                    SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name
+                    """),
+                    {'table_name': archive_table}
+                )
+                missing = missing_month_partitions([row.PARTITION_NAME for row in result], today, months_ahead)
+                if not missing:
+                    continue
+
+                definitions = ", ".join(
+                    f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{bound}'))" for name, bound in missing
+                )
+                await conn.execute(text(
+                    f"ALTER TABLE {archive_table} REORGANIZE PARTITION pmax INTO "
+                    f"({definitions}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+                ))
+                added[archive_table] = [name for name, _ in missing]
+
+        if added:
+            logger.info(f"归档表新增分区: {added}")
+        return added
+
+    @staticmethod
+    async def archive_superseded_tasks(limit: int = None) -> Dict[str, Any]:
+        """
+        归档作业：补齐归档分区后逐个迁移已被取代的任务
+
+        Args:
+            limit: 本次最多归档任务数
+
+        Returns:
+            Dict: 归档统计
+        """
+        start_time = datetime.now()
+        partitions_added = await WorkOrderArchiveService.ensure_archive_partitions()
+        task_ids = await WorkOrderArchiveService.find_superseded_task_ids(limit)
+
+        archived_tasks = []
+        failed_tasks = []
+        rows_moved = {hot: 0 for hot, _, _ in ARCHIVE_TABLES}
+
+        for task_id in task_ids:
+            try:
+                moved = await WorkOrderArchiveService.archive_task(task_id)
+                for table_name, count in moved.items():
+                    rows_moved[table_name] += count
+                archived_tasks.append(task_id)
+            except Exception as e:
+                logger.error(f"任务 {task_id} 归档失败: {str(e)}")
+                failed_tasks.append({'task_id': task_id, 'error': str(e)})
+
+        if archived_tasks:
+            await invalidate_work_order_cache()
+
+        return {
+            'archived_tasks': archived_tasks,
+            'failed_tasks': failed_tasks,
+            'rows_moved': rows_moved,
+            'partitions_added': partitions_added,
+            'duration_seconds': (datetime.now() - start_time).total_seconds()
+        }
+
+    @staticmethod
+    async def resolve_task_table(hot_table: str, task_id: str, db: Optional[AsyncSession] = None) -> str:
+        """
+        返回任务数据所在的表：热表中有数据或未启用归档时返回热表，否则返回归档表
+
+        Args:
+            hot_table: 热表名
+            task_id: 排产任务ID
+            db: 在该会话中检查热表（可见本事务中尚未提交的写入），None时使用只读会话
+
+        Returns:
+            str: 表名
+        """
+        if not WorkOrderArchiveService.is_enabled():
+            return hot_table
+
+        probe = text(f"SELECT 1 FROM {hot_table} WHERE task_id = :task_id LIMIT 1")
+        if db is not None:
+            result = await db.execute(probe, {'task_id': task_id})
+            if result.first() is not None:
+                return hot_table
+        else:
+            async with get_read_db_session() as read_db:
+                result = await read_db.execute(probe, {'task_id': task_id})
+                if result.first() is not None:
+                    return hot_table
+
+        return ARCHIVE_TABLE_MAP[hot_table]
+
+    @staticmethod
+    def date_range_tables(hot_table: str, include_archive: bool = False) -> List[str]:
+        """
+        返回按时间范围查询时需要扫描的表
+
+        默认只查热表；include_archive时追加归档表，查询条件中的时间列会裁剪到相关月度分区
+
+        Args:
+            hot_table: 热表名
+            include_archive: 是否包含已归档的历史任务数据
+
+        Returns:
+            List[str]: 表名列表
+        """
+        if include_archive and WorkOrderArchiveService.is_enabled():
+            return [hot_table, ARCHIVE_TABLE_MAP[hot_table]]
+        return [hot_table]
+
+
+# 便利函数
+async def run_work_order_archive(limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    执行一次工单归档作业的便利函数
+
+    Args:
+        limit: 本次最多归档任务数
+
+    Returns:
+        Dict: 归档统计
+    """
+    return await WorkOrderArchiveService.archive_superseded_tasks(limit)
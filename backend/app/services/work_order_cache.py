@@ -0,0 +1,75 @@
+"""
+APS智慧排产系统 - 甘特图工单响应缓存
+
+按 (版本号, 查询参数) 缓存 GET /work-orders 序列化后的响应体，
+排产任务提交新工单或归档作业迁移工单后递增Redis中的工单版本号使缓存失效；
+强ETag由版本号、缓存时段和查询参数摘要组成，版本未变时无需读取缓存即可响应304。
+缓存时段按缓存最长有效期划分墙钟时间，版本号递增失败时旧ETag与缓存数据一样最多在一个有效期后失效
+"""
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import time
+
+from app.core.config import settings
+from app.services.reference_data_cache import VersionedCache
+
+logger = logging.getLogger(__name__)
+
+
+WORK_ORDER_VERSION_KEY = "aps:work_orders:version"
+
+# 全局甘特图工单响应缓存
+work_order_cache = VersionedCache(
+    WORK_ORDER_VERSION_KEY,
+    max_entries=settings.work_order_cache_max_entries,
+    enabled_setting="work_order_cache_enabled"
+)
+
+
+def work_order_cache_key(params: Dict[str, Any]) -> str:
+    """查询参数摘要（参数顺序无关）"""
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def etag_epoch(max_age: float, now: Optional[float] = None) -> int:
+    """ETag缓存时段编号：按缓存最长有效期划分墙钟时间，各进程一致"""
+    return int((time.time() if now is None else now) // max(max_age, 1))
+
+
+def build_etag(version: Optional[int], cache_key: str, body: bytes = None, epoch: Optional[int] = None) -> str:
+    """
+    生成强ETag
+
+    有版本号时由版本号、缓存时段和查询参数摘要组成；Redis不可用时按响应体内容计算
+    """
+    if version is not None:
+        return f'"wo-{version}.{epoch or 0}-{cache_key[:16]}"'
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 请求头是否匹配当前ETag（支持多个值、*、弱校验前缀）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+async def invalidate_work_order_cache() -> Optional[int]:
+    """工单数据写入后调用，递增版本号使所有进程的甘特图缓存与ETag失效"""
+    version = await work_order_cache.bump_version()
+    if version is None:
+        logger.warning(f"工单数据已变更但缓存版本号递增失败，甘特图缓存与ETag将在 {work_order_cache.max_age} 秒内过期")
+    else:
+        logger.info(f"工单数据已变更，甘特图缓存版本号: {version}")
+    return version
@@ -0,0 +1,128 @@
+"""
+APS智慧排产系统 - 工单流式导出（NDJSON/CSV）
+
+按服务端游标（DatabaseQueryService.stream_rows）逐批读取 aps_work_order_schedule、
+aps_feeding_order、aps_packing_order，每批编码为一个响应块直接交给 StreamingResponse：
+
+- 只有上一块写入连接后才会从游标取下一批（ASGI send 在连接写缓冲区满时等待），
+  客户端读得慢时数据库读取随之暂停，服务端内存只与 db_stream_batch_size 相关
+- 第一批查询返回即开始输出，首字节时间与导出总行数无关
+- NDJSON每行一个JSON对象（orjson序列化，时间为ISO 8601）；CSV为UTF-8带BOM（Excel可直接打开），
+  表头取自第一行的字段，无数据时为空文件
+"""
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from datetime import datetime
+import codecs
+import csv
+import io
+import logging
+
+from app.core.responses import dumps_json
+from app.services.database_query_service import DatabaseQueryService
+from app.services.mes_data_export_service import MESDataExportService
+
+logger = logging.getLogger(__name__)
+
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+EXPORT_DATASETS = ("schedules", "feeding-orders", "packing-orders")
+
+
+def stream_dataset(
+    dataset: str,
+    task_id: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_archive: bool = False,
+    batch_size: Optional[int] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    按数据集返回批量行的异步迭代器
+
+    schedules 按任务过滤（task_id为空时导出全部）；feeding-orders/packing-orders 按任务
+    （已归档任务读归档表）或按日期范围（include_archive时包含归档分区）过滤
+    """
+    if dataset == "schedules":
+        return DatabaseQueryService.stream_work_order_schedules(task_id=task_id, batch_size=batch_size)
+
+    service = MESDataExportService()
+    if dataset == "feeding-orders":
+        by_task, by_date = service.stream_feeding_orders_by_task, service.stream_feeding_orders_by_date_range
+    elif dataset == "packing-orders":
+        by_task, by_date = service.stream_packing_orders_by_task, service.stream_packing_orders_by_date_range
+    else:
+        raise ValueError(f"不支持的导出数据集: {dataset}")
+
+    if task_id:
+        return by_task(task_id, batch_size)
+    if start_date is None or end_date is None:
+        raise ValueError("工单导出需要指定任务ID或日期范围")
+    return by_date(start_date, end_date, batch_size, include_archive=include_archive)
+
+
+async def encode_ndjson(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """每批编码为一个NDJSON块"""
+    async for batch in batches:
+        if batch:
+            yield b"".join(dumps_json(row) + b"\n" for row in batch)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+async def encode_csv(batches: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """每批编码为一个CSV块，第一块包含BOM和表头"""
+    columns = None
+    async for batch in batches:
+        if not batch:
+            continue
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        prefix = b""
+        if columns is None:
+            columns = list(batch[0].keys())
+            writer.writerow(columns)
+            prefix = codecs.BOM_UTF8
+        writer.writerows([_csv_value(row.get(column)) for column in columns] for row in batch)
+        yield prefix + buffer.getvalue().encode("utf-8")
+
+
+ENCODERS: Dict[str, Callable[[AsyncIterator[List[Dict[str, Any]]]], AsyncIterator[bytes]]] = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+
+
+async def export_stream(
+    batches: AsyncIterator[List[Dict[str, Any]]],
+    export_format: str,
+    dataset: str
+) -> AsyncIterator[bytes]:
+    """将 stream_dataset 返回的批量行编码为NDJSON/CSV字节流，记录导出行数"""
+    row_count = 0
+
+    async def counted():
+        nonlocal row_count
+        async for batch in batches:
+            row_count += len(batch)
+            yield batch
+
+    try:
+        async for chunk in ENCODERS[export_format](counted()):
+            yield chunk
+    except Exception as e:
+        # 响应头已发送，只能中断连接；客户端收到不完整的文件
+        logger.error(f"流式导出{dataset}中断（已输出 {row_count} 行）: {str(e)}")
+        raise
+    logger.info(f"流式导出{dataset}完成: {row_count} 行（{export_format}）")
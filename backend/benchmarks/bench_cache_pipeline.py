@@ -0,0 +1,175 @@
+"""
+APS智慧排产系统 - Redis批量操作基准测试
+
+对比逐键 get/set/delete、hash_set+expire 两次往返与 MGET/MSET/管道批量操作的往返次数和耗时
+默认使用进程内模拟Redis（每次往返固定延迟），也可通过 --redis-url 连接本地Redis
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_cache_pipeline [--keys 1000] [--rtt-ms 0.2] [--redis-url redis://localhost:6379/0]
+"""
+import argparse
+import asyncio
+import time
+
+from app.db.cache import CacheManager
+
+
+class _FakePipeline:
+    """模拟管道：缓冲命令，execute 时计一次往返"""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._commands = []
+
+    def __getattr__(self, name):
+        def buffer(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return buffer
+
+    async def execute(self):
+        await self._redis.round_trip()
+        return [getattr(self._redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in self._commands]
+
+
+class RoundTripRedis:
+    """进程内模拟Redis，统计往返次数，每次往返休眠 rtt 秒"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.data = {}
+
+    async def round_trip(self):
+        self.round_trips += 1
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    # 同步实现（管道内复用）
+    def _get(self, key):
+        return self.data.get(key)
+
+    def _set(self, key, value, ex=None):
+        self.data[key] = value
+        return True
+
+    def _mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def _mset(self, mapping):
+        self.data.update(mapping)
+        return True
+
+    def _delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def _hset(self, key, field=None, value=None, mapping=None):
+        fields = self.data.setdefault(key, {})
+        if mapping:
+            fields.update(mapping)
+            return len(mapping)
+        fields[field] = value
+        return 1
+
+    def _expire(self, key, ttl):
+        return key in self.data
+
+    def __getattr__(self, name):
+        handler = getattr(type(self), f"_{name}", None)
+        if handler is None:
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            await self.round_trip()
+            return handler(self, *args, **kwargs)
+        return call
+
+    async def setex(self, key, ttl, value):
+        await self.round_trip()
+        return self._set(key, value, ex=ttl)
+
+
+async def measure(redis, coroutine_factory):
+    """返回 (往返次数, 耗时毫秒)"""
+    before = getattr(redis, 'round_trips', None)
+    start = time.perf_counter()
+    await coroutine_factory()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    round_trips = redis.round_trips - before if before is not None else None
+    return round_trips, elapsed_ms
+
+
+def report(name, legacy, batched):
+    def fmt(result):
+        round_trips, elapsed_ms = result
+        trips = f"{round_trips:6d} 次往返" if round_trips is not None else "     - 次往返"
+        return f"{trips} {elapsed_ms:9.1f} ms"
+    speedup = legacy[1] / batched[1] if batched[1] else float('inf')
+    print(f"{name:<22} 逐键 {fmt(legacy)}   批量 {fmt(batched)}   加速 {speedup:6.1f}x")
+
+
+async def run(key_count: int, rtt_ms: float, redis_url: str = None):
+    if redis_url:
+        import redis.asyncio as redis_asyncio
+        client = redis_asyncio.from_url(redis_url, decode_responses=True)
+    else:
+        client = RoundTripRedis(rtt_ms / 1000)
+    cache = CacheManager(client=client, local=None)
+
+    keys = [f"aps:bench:work_order:{index}" for index in range(key_count)]
+    values = {key: {'work_order_nr': key, 'quantity': index} for index, key in enumerate(keys)}
+    fields = {f"C{index}": {'status': 'RUNNING', 'speed': 100 + index} for index in range(key_count)}
+
+    async def set_each():
+        for key, value in values.items():
+            await cache.set(key, value, ttl=300)
+
+    async def get_each():
+        for key in keys:
+            await cache.get(key)
+
+    async def delete_each():
+        for key in keys:
+            await cache.delete(key)
+
+    async def hash_set_each():
+        # 原实现：HSET 与 EXPIRE 各一次往返
+        for field, value in fields.items():
+            await client.hset("aps:bench:machine_status", field, str(value))
+            await client.expire("aps:bench:machine_status", 300)
+
+    report("set ×N (TTL)", await measure(client, set_each),
+           await measure(client, lambda: cache.set_many(values, ttl=300)))
+    report("get ×N", await measure(client, get_each),
+           await measure(client, lambda: cache.get_many(keys)))
+    report("hash_set ×N (TTL)", await measure(client, hash_set_each),
+           await measure(client, lambda: cache.hash_set_many("aps:bench:machine_status", fields, ttl=300)))
+    await cache.set_many(values)
+    report("delete ×N", await measure(client, delete_each),
+           await measure(client, lambda: cache.delete_many(keys)))
+
+    if redis_url:
+        await client.delete("aps:bench:machine_status")
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis批量操作基准测试")
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--rtt-ms", type=float, default=0.2, help="模拟Redis每次往返延迟（毫秒）")
+    parser.add_argument("--redis-url", default=None, help="使用真实Redis（不统计往返次数）")
+    args = parser.parse_args()
+    asyncio.run(run(args.keys, args.rtt_ms, args.redis_url))
+
+
+if __name__ == "__main__":
+    main()
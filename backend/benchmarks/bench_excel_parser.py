@@ -0,0 +1,116 @@
+"""
+APS智慧排产系统 - 生产作业计划Excel解析基准测试
+
+生成与真实生产作业计划表结构一致的工作簿（标题行、第3行表头、合并单元格式的空白继承行、
+合计行和有效期限行），对比完整模式与流式只读模式的解析耗时和内存峰值，并校验两者结果一致；
+--sheets 大于1时生成多工作表工作簿，对比逐个解析与多进程并行解析的耗时
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_excel_parser [--rows 10000 100000] [--no-memory]
+    python -m benchmarks.bench_excel_parser --rows 50000 --sheets 4 [--workers 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+
+from app.services.excel_parser import ProductionPlanExcelParser
+
+HEADERS = ["包装", "规格", "喂丝机号", "卷包机号", "生产单元", "牌号", "本次投料", "本次成品", "成品生产日期"]
+ARTICLES = ["利群(软红长嘴)", "利群(软长嘴)", "利群(软蓝)", "利群(新版)", "利群(西子阳光)"]
+
+
+def generate_workbook(file_path: str, row_count: int, sheet_count: int = 1):
+    """以 write_only 模式生成测试工作簿，每组2行，第2行为继承上一行的空白单元格；每个工作表 row_count 行"""
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_index in range(sheet_count):
+        worksheet = workbook.create_sheet("生产作业计划" if sheet_count == 1 else f"车间{sheet_index + 1}")
+        worksheet.append(["2024年10月16～31日生产作业计划表"])
+        worksheet.append([])
+        worksheet.append(HEADERS)
+
+        for index in range(row_count // 2):
+            worksheet.append([
+                "软包" if index % 3 else "硬包", "长嘴" if index % 2 else "细支",
+                str(index % 30 + 1), f"C{index % 40 + 1}、C{index % 40 + 2}", str(index % 12 + 1),
+                ARTICLES[index % len(ARTICLES)], str(1000 + index % 5000), f"{2000 + index % 8000:,}",
+                "10.16 - 10.31",
+            ])
+            worksheet.append([None, None, str(index % 30 + 2), f"D{index % 40 + 1}", None, None, None, None, None])
+
+        worksheet.append(["合   计", None, None, None, None, None, "0", "0", None])
+        worksheet.append(["有效期限：2024.10.16～10.31"])
+    workbook.save(file_path)
+
+
+def measure(file_path: str, streaming: bool, track_memory: bool):
+    """返回 (解析结果, 耗时秒, 内存峰值MB)"""
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = ProductionPlanExcelParser(streaming=streaming).parse_excel_file(file_path)
+    elapsed = time.perf_counter() - start
+    peak_mb = None
+    if track_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    return result, elapsed, peak_mb
+
+
+def run(row_count: int, track_memory: bool):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, f"plan_{row_count}.xlsx")
+        generate_workbook(file_path, row_count)
+
+        full, full_seconds, full_peak = measure(file_path, False, track_memory)
+        streaming, streaming_seconds, streaming_peak = measure(file_path, True, track_memory)
+
+    assert streaming['records'] == full['records'], "流式模式与完整模式解析结果不一致"
+
+    def fmt(seconds, peak_mb):
+        memory = f"{peak_mb:8.1f} MB" if peak_mb is not None else "       - MB"
+        return f"{seconds:7.2f} s {memory}"
+
+    speedup = full_seconds / streaming_seconds if streaming_seconds else float('inf')
+    print(f"{row_count:>7} 行 ({full['total_records']} 条记录)  完整 {fmt(full_seconds, full_peak)}   "
+          f"流式 {fmt(streaming_seconds, streaming_peak)}   加速 {speedup:5.1f}x")
+
+
+def run_sheets(row_count: int, sheet_count: int, workers: int):
+    """多工作表：逐个解析与多进程并行解析（含工作进程启动开销）"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, f"plan_{sheet_count}x{row_count}.xlsx")
+        generate_workbook(file_path, row_count, sheet_count)
+
+        start = time.perf_counter()
+        serial = ProductionPlanExcelParser(sheet_workers=1).parse_excel_file(file_path)
+        serial_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = ProductionPlanExcelParser(sheet_workers=workers).parse_excel_file(file_path)
+        parallel_seconds = time.perf_counter() - start
+
+    assert parallel['records'] == serial['records'], "并行解析与逐个解析结果不一致"
+    print(f"{sheet_count} 个工作表 × {row_count} 行  逐个 {serial_seconds:7.2f} s   "
+          f"并行({workers}进程) {parallel_seconds:7.2f} s   加速 {serial_seconds / parallel_seconds:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生产作业计划Excel解析基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--no-memory", action="store_true", help="不统计内存峰值（tracemalloc会拖慢解析）")
+    parser.add_argument("--sheets", type=int, default=1, help="每个工作簿的工作表数，大于1时对比并行解析")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    for row_count in args.rows:
+        if args.sheets > 1:
+            run_sheets(row_count, args.sheets, args.workers)
+        else:
+            run(row_count, not args.no_memory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+APS智慧排产系统 - 视口甘特图基准测试
+
+模拟一个月、全部机台（默认40台卷包机、20台喂丝机）的排程，对比：
+
+- 分页接口：GET /work-orders 每页2000条翻页取完整个月的工单，累计响应字节数
+- 视口接口：GET /work-orders/gantt 按视口宽度合并，单次响应字节数和构建耗时
+
+分别统计月视图（整月）、周视图和日视图（第一天）三种缩放级别
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_gantt_timeline [--makers 40] [--width 1600] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.core.responses import dumps_json, success_payload
+from app.services.gantt_timeline import build_timeline, resolve_resolution
+
+START = datetime(2024, 10, 1)
+PAGE_SIZE = 2000
+
+
+def month_schedules(maker_count: int, days: int = 31):
+    """每台卷包机连续排产 1.5~4 小时的工单，换牌间隔 10~40 分钟"""
+    rows = []
+    for maker_index in range(maker_count):
+        cursor = START + timedelta(minutes=7 * maker_index)
+        step = 0
+        while cursor < START + timedelta(days=days):
+            duration = timedelta(minutes=90 + (maker_index * 37 + step * 53) % 150)
+            rows.append(SimpleNamespace(
+                work_order_nr=f"W{len(rows):06d}", article_nr=f"利群(软红长嘴){step % 20}",
+                maker_code=f"C{maker_index + 1}", feeder_code=f"F{maker_index // 2 + 1}",
+                planned_start=cursor, planned_end=cursor + duration,
+                final_quantity=1000 + step, quantity_total=2000 + step,
+                schedule_status="PLANNED", is_backup=False, task_id="SCHEDULE_20241001",
+                sync_group_id=f"SYNC_{len(rows)}", backup_reason=None, created_time=START,
+            ))
+            cursor += duration + timedelta(minutes=10 + (step * 11) % 30)
+            step += 1
+    rows.sort(key=lambda row: row.planned_start)
+    return rows
+
+
+def paged_bytes(rows) -> int:
+    """与 GET /work-orders 相同的工单格式，按每页2000条翻页的累计响应大小"""
+    total = 0
+    for offset in range(0, len(rows), PAGE_SIZE):
+        work_orders = [{
+            "work_order_nr": row.work_order_nr, "work_order_type": "HJB", "machine_type": "合并计划",
+            "machine_code": f"{row.maker_code}+{row.feeder_code}",
+            "maker_code": row.maker_code, "feeder_code": row.feeder_code,
+            "product_code": row.article_nr, "plan_quantity": row.final_quantity,
+            "quantity_total": row.quantity_total, "work_order_status": row.schedule_status,
+            "planned_start_time": row.planned_start, "planned_end_time": row.planned_end,
+            "created_time": row.created_time, "task_id": row.task_id, "is_backup": row.is_backup,
+            "backup_reason": row.backup_reason, "sync_group_id": row.sync_group_id,
+        } for row in rows[offset:offset + PAGE_SIZE]]
+        total += len(dumps_json(success_payload(
+            data={"work_orders": work_orders, "total_count": len(rows), "page": offset // PAGE_SIZE + 1},
+            message="查询成功"
+        )))
+    return total
+
+
+def viewport(rows, start, end, width):
+    overlapping = [row for row in rows if row.planned_start < end and row.planned_end > start]
+    timeline = build_timeline(overlapping, start, end, None, resolve_resolution(start, end, width))
+    return overlapping, timeline, dumps_json(success_payload(data=timeline, message="查询成功"))
+
+
+def run(maker_count: int, width: int, repeat: int):
+    rows = month_schedules(maker_count)
+    print(f"{len(rows)} 条工单，{maker_count} 台卷包机，视口宽度 {width}px")
+    for name, days in (("月视图", 31), ("周视图", 7), ("日视图", 1)):
+        start, end = START, START + timedelta(days=days)
+        overlapping, timeline, body = viewport(rows, start, end, width)
+        best = None
+        for _ in range(repeat):
+            began = time.perf_counter()
+            viewport(rows, start, end, width)
+            elapsed = time.perf_counter() - began
+            best = elapsed if best is None else min(best, elapsed)
+        pages = (len(overlapping) + PAGE_SIZE - 1) // PAGE_SIZE
+        print(f"{name}: 分页 {pages:3d} 次请求 {paged_bytes(overlapping) / 1024:9.1f} KB   "
+              f"视口 1 次请求 {len(body) / 1024:8.1f} KB（{timeline['item_count']} 个条目，"
+              f"{timeline['segment_count']} 个占用段）  构建 {best * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="视口甘特图基准测试")
+    parser.add_argument("--makers", type=int, default=40)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.makers, args.width, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
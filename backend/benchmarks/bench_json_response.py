@@ -0,0 +1,137 @@
+"""
+APS智慧排产系统 - 大列表接口JSON响应基准测试
+
+对比FastAPI默认路径（构建SuccessResponse/ParseResponse模型 → jsonable_encoder → 标准库json）
+与快速路径（字典直接由orjson序列化，见 app.core.responses）生成响应体的耗时，并校验内容一致：
+
+- 甘特图：2000行的 /work-orders/schedule 分页
+- 解析结果：2000条记录的解析响应（默认路径逐条构建 ParseResultRecord）
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_json_response [--rows 2000] [--repeat 20]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.v1.plans import build_parse_result_data
+from app.core import responses
+from app.core.responses import success_response
+from app.schemas.base import ParseErrorInfo, ParseResponse, ParseResult, ParseResultRecord, SuccessResponse
+
+
+def gantt_rows(row_count: int):
+    start = datetime(2024, 10, 16, 8)
+    return [{
+        "id": index,
+        "work_order_nr": f"W{index:04d}",
+        "article_nr": f"利群(软红长嘴){index % 20}",
+        "final_quantity": 1000 + index,
+        "quantity_total": 2000 + index,
+        "maker_code": f"C{index % 40 + 1}",
+        "feeder_code": str(index % 30 + 1),
+        "planned_start": (start + timedelta(hours=index)).isoformat(),
+        "planned_end": (start + timedelta(hours=index + 8)).isoformat(),
+        "task_id": "SCHEDULE_20241016",
+        "schedule_status": "PLANNED",
+        "sync_group_id": f"SYNC_{index // 2}",
+        "is_backup": index % 10 == 0,
+        "backup_reason": None,
+        "created_time": start.isoformat(),
+    } for index in range(row_count)]
+
+
+def parse_result(row_count: int):
+    return {
+        'total_records': row_count, 'valid_records': row_count, 'error_records': 0, 'warning_records': 1,
+        'records': [{
+            'row_number': index + 4, 'package_type': '软包', 'specification': '长嘴',
+            'feeder_codes': [str(index % 30 + 1)], 'maker_codes': [f"C{index % 40 + 1}", f"C{index % 40 + 2}"],
+            'production_unit': '1', 'article_name': '利群(软红长嘴)', 'article_nr': '利群(软红长嘴)',
+            'material_input': 1000 + index, 'final_quantity': 2000 + index,
+            'production_date_range': '10.16 - 10.31',
+            'planned_start': '2024-10-16T00:00:00', 'planned_end': '2024-10-31T00:00:00',
+            'extracted_year': 2024,
+        } for index in range(row_count)],
+        'errors': [],
+        'warnings': [{'type': 'warning', 'message': '行9: 投料量格式错误: abc', 'timestamp': '2024-10-16T08:00:00'}],
+    }
+
+
+def default_gantt(rows):
+    model = SuccessResponse(message="查询成功", data={"schedules": rows, "total_count": len(rows)})
+    return JSONResponse(content=jsonable_encoder(model)).body
+
+
+def fast_gantt(rows):
+    return success_response(data={"schedules": rows, "total_count": len(rows)}, message="查询成功").body
+
+
+def default_parse(result):
+    model = ParseResponse(
+        message="文件解析成功",
+        data=ParseResult(
+            import_batch_id="BATCH_1",
+            total_records=result['total_records'], valid_records=result['valid_records'],
+            error_records=result['error_records'], warning_records=result['warning_records'],
+            records=[ParseResultRecord(**record) for record in result['records']],
+            errors=[ParseErrorInfo(**error) for error in result['errors']],
+            warnings=[ParseErrorInfo(**warning) for warning in result['warnings']],
+        )
+    )
+    # response_model=ParseResponse：FastAPI按响应模型再校验一次后编码
+    model = ParseResponse.model_validate(model.model_dump())
+    return JSONResponse(content=jsonable_encoder(model)).body
+
+
+def fast_parse(result):
+    return success_response(data=build_parse_result_data("BATCH_1", result), message="文件解析成功").body
+
+
+def best_of(func, argument, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def comparable(body: bytes, volatile_keys):
+    payload = json.loads(body)
+    payload.pop("timestamp")
+    for key in volatile_keys:
+        payload["data"].pop(key)
+    return payload
+
+
+def run(row_count: int, repeat: int):
+    encoder = "orjson" if responses.orjson is not None else "标准库json（未安装orjson）"
+    print(f"{row_count} 行，各取 {repeat} 次中的最短耗时，快速路径使用 {encoder}")
+    cases = [
+        ("甘特图分页", gantt_rows(row_count), default_gantt, fast_gantt, []),
+        ("解析结果", parse_result(row_count), default_parse, fast_parse, ["parse_time"]),
+    ]
+    for name, argument, default, fast, volatile_keys in cases:
+        assert comparable(default(argument), volatile_keys) == comparable(fast(argument), volatile_keys), f"{name}响应内容不一致"
+        default_time = best_of(default, argument, repeat)
+        fast_time = best_of(fast, argument, repeat)
+        print(f"{name:<8} 默认 {default_time * 1000:8.2f} ms   快速 {fast_time * 1000:8.2f} ms   "
+              f"加速 {default_time / fast_time:5.1f}x   {len(fast(argument)) / 1024:7.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大列表接口JSON响应基准测试")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+APS智慧排产系统 - MES工单推送吞吐量基准测试
+
+在子进程中启动本地MES替身服务（app.services.mes_stub_server，每个请求注入固定延迟），
+对比逐个工单推送（每个请求新建连接、串行）与 MESClient（长连接池 + 分批 + 并发）的吞吐量，
+并在注入错误率后验证重试后的最终结果
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_mes_client [--orders 5000] [--latency 0.05] [--error-rate 0.1]
+"""
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.services.mes_client import MESClient, order_idempotency_key
+
+
+def make_orders(count: int):
+    return [{
+        'plan_id': f"HJB{index:08d}", 'production_line': f"C{index % 40 + 1}",
+        'material_code': f"利群(软红长嘴){index % 20}", 'quantity': 500,
+        'plan_start_time': "2024/10/16 08:00:00", 'plan_end_time': "2024/10/16 20:00:00",
+        'order_status': 'PLANNED',
+    } for index in range(count)]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port: int, latency: float) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, "-m", "app.services.mes_stub_server",
+        "--port", str(port), "--latency", str(latency), "--seed", "1",
+    ])
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/_stats", timeout=0.5)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("MES替身服务启动失败")
+
+
+async def per_order(base_url: str, orders):
+    """逐个工单推送：每个请求新建连接，串行等待"""
+    for order in orders:
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            response = await client.post(
+                "/work-orders", json={"work_orders": [dict(order, idempotency_key=order_idempotency_key(order))]}
+            )
+            response.raise_for_status()
+
+
+def report(name: str, count: int, elapsed: float, extra: str = ""):
+    print(f"{name:<28} {count:>6} 个工单  耗时 {elapsed:7.2f} s  吞吐 {count / elapsed:9.0f} 个/秒  {extra}")
+
+
+async def run(orders: int, baseline_orders: int, latency: float, error_rate: float,
+              batch_size: int, concurrency: int):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_stub(port, latency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url) as control:
+            print(f"替身服务每个请求延迟 {latency * 1000:.0f} ms")
+
+            start = time.perf_counter()
+            await per_order(base_url, make_orders(baseline_orders))
+            report("逐个推送（新建连接）", baseline_orders, time.perf_counter() - start)
+
+            await control.post("/_reset")
+            async with MESClient(base_url, batch_size=batch_size, max_concurrency=concurrency) as client:
+                start = time.perf_counter()
+                result = await client.send_work_orders(make_orders(orders))
+                report(f"MESClient（{batch_size}/批, 并发{concurrency}）", orders, time.perf_counter() - start,
+                       f"{result['batch_count']} 个请求")
+
+                await control.post("/_reset")
+                await control.put("/_config", json={"error_rate": error_rate})
+                start = time.perf_counter()
+                result = await client.send_work_orders(make_orders(orders))
+                stats = (await control.get("/_stats")).json()
+                report(f"MESClient（错误率 {error_rate:.0%}）", orders, time.perf_counter() - start,
+                       f"重试 {result['retry_count']} 次, 失败 {result['failed_count']} 个, "
+                       f"MES返回错误 {stats['errors']} 次, 入库 {stats['orders']} 个")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MES工单推送吞吐量基准测试")
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--baseline-orders", type=int, default=200, help="逐个推送的工单数（较慢）")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.orders, args.baseline_orders, args.latency, args.error_rate,
+                    args.batch_size, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
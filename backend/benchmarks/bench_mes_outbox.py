@@ -0,0 +1,138 @@
+"""
+APS智慧排产系统 - MES发件箱下发基准测试
+
+下发记录表使用本地SQLite数据库（表结构同 aps_mes_dispatch），MES使用进程内替身服务
+（app.services.mes_stub_server，每个请求注入延迟和错误率），对比：
+
+- 同步推送：调用方等待 MESClient 推送完成
+- 发件箱：调用方只等待下发记录写入提交，后台分发器领取、推送并回写结果；
+  另测MES停机期间写入的积压在恢复后被分发器追赶下发的耗时
+
+SQLite的写入开销与MySQL不同，结果只用于比较调用方等待时间的量级
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_mes_outbox [--orders 5000] [--latency 0.2] [--error-rate 0.05]
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.work_order_models import MESDispatch
+from app.services.mes_client import MESClient
+from app.services.mes_outbox import MESOutboxDispatcher, MESOutboxService
+from app.services.mes_stub_server import MESStubConfig, create_mes_stub_app
+
+DISPATCH_TABLE_DDL = """
+CREATE TABLE aps_mes_dispatch (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, dispatch_batch_id VARCHAR(50) NOT NULL,
+    work_order_nr VARCHAR(50) NOT NULL, order_type VARCHAR(10) NOT NULL,
+    dispatch_status VARCHAR(20) DEFAULT 'PENDING', dispatch_time DATETIME, dispatch_data JSON,
+    mes_response JSON, mes_confirm_time DATETIME, mes_error_message TEXT, retry_count INTEGER DEFAULT 0,
+    max_retry_count INTEGER DEFAULT 3, next_retry_time DATETIME, created_time DATETIME, updated_time DATETIME
+)
+"""
+
+
+def make_orders(count: int, prefix: str):
+    return [{
+        'plan_id': f"{prefix}{index:09d}", 'production_line': f"C{index % 40 + 1}",
+        'material_code': f"利群(软红长嘴){index % 20}", 'quantity': 500,
+        'plan_start_time': "2024/10/16 08:00:00", 'plan_end_time': "2024/10/16 20:00:00",
+        'order_status': 'PLANNED',
+    } for index in range(count)]
+
+
+async def pending_count(factory) -> int:
+    async with factory() as db:
+        result = await db.execute(
+            select(func.count()).where(MESDispatch.dispatch_status.in_(('PENDING', 'DISPATCHED')))
+        )
+        return result.scalar()
+
+
+async def wait_drained(factory, timeout: float = 600) -> float:
+    start = time.perf_counter()
+    while await pending_count(factory):
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("下发积压未在超时前清空")
+        await asyncio.sleep(0.05)
+    return time.perf_counter() - start
+
+
+async def run(orders: int, latency: float, error_rate: float, batch_size: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(directory) / 'aps.db'}")
+        async with engine.begin() as conn:
+            await conn.execute(text(DISPATCH_TABLE_DDL))
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        @asynccontextmanager
+        async def db_session():
+            async with factory() as session:
+                yield session
+                await session.commit()
+
+        stub_app = create_mes_stub_app(MESStubConfig(latency=latency, error_rate=error_rate, seed=1))
+        client = MESClient("http://mes.test", transport=httpx.ASGITransport(app=stub_app),
+                           retry_base_delay=0.05, rng=random.Random(0))
+        print(f"{orders} 个工单，MES每个请求延迟 {latency * 1000:.0f} ms，错误率 {error_rate:.0%}")
+
+        start = time.perf_counter()
+        result = await client.send_work_orders(make_orders(orders, "HJB"))
+        print(f"同步推送      调用方等待 {time.perf_counter() - start:7.3f} s  "
+              f"（重试 {result['retry_count']} 次, 失败 {result['failed_count']} 个）")
+
+        with patch('app.services.mes_outbox.get_db_session', db_session), \
+             patch('app.services.mes_outbox.settings.mes_outbox_retry_base_delay', 0.1):
+            dispatcher = MESOutboxDispatcher(client, batch_size=batch_size, poll_interval=0.1)
+            dispatcher.start()
+
+            start = time.perf_counter()
+            async with factory() as db:
+                await MESOutboxService.enqueue(db, make_orders(orders, "HWS"), "BENCH_ENQUEUE")
+                await db.commit()
+            enqueue_elapsed = time.perf_counter() - start
+            dispatcher.notify()
+            drained = await wait_drained(factory)
+            print(f"发件箱        调用方等待 {enqueue_elapsed:7.3f} s  后台下发完成 {drained:7.3f} s")
+
+            # MES停机期间写入积压，恢复后由分发器自动追赶
+            stub_app.state.stub.config.error_rate = 1.0
+            async with factory() as db:
+                await MESOutboxService.enqueue(db, make_orders(orders, "HJC"), "BENCH_OUTAGE")
+                await db.commit()
+            dispatcher.notify()
+            await asyncio.sleep(1.0)
+            backlog = await pending_count(factory)
+            stub_app.state.stub.config.error_rate = error_rate
+            dispatcher.notify()
+            drained = await wait_drained(factory)
+            print(f"停机后追赶    积压 {backlog} 条  恢复后下发完成 {drained:7.3f} s  "
+                  f"MES入库 {len(stub_app.state.stub.orders)} 个")
+
+            await dispatcher.stop()
+        await client.aclose()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MES发件箱下发基准测试")
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.orders, args.latency, args.error_rate, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
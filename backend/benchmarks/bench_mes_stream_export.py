@@ -0,0 +1,122 @@
+"""
+APS智慧排产系统 - MES文档流式导出基准测试
+
+服务端游标（DatabaseQueryService.stream_rows）替换为按批生成的合成喂丝机/卷包机工单行（各占一半），
+对比一次性导出（export_work_orders_by_task：工单字典列表 → ElementTree → minidom 格式化）与
+流式导出（stream_export_by_task：逐批逐个元素输出）的耗时、输出大小和内存峰值（tracemalloc）
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_mes_stream_export [--orders 100000] [--format XML] [--compress]
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from app.core.config import settings
+from app.services.database_query_service import DatabaseQueryService
+from app.services.mes_data_export_service import MESDataExportService
+
+START = datetime(2024, 10, 1)
+
+FeedingRow = namedtuple("FeedingRow", [
+    "plan_id", "production_line", "batch_code", "material_code", "bom_revision", "quantity",
+    "plan_start_time", "plan_end_time", "sequence", "shift",
+    "is_vaccum", "is_sh93", "is_hdt", "is_flavor", "unit", "plan_date", "plan_output_quantity",
+    "is_outsourcing", "is_backup", "order_status", "task_id",
+])
+PackingRow = namedtuple("PackingRow", [
+    "plan_id", "production_line", "batch_code", "material_code", "bom_revision", "quantity",
+    "plan_start_time", "plan_end_time", "sequence", "shift",
+    "input_plan_id", "input_batch_code", "input_quantity", "batch_sequence",
+    "is_whole_batch", "is_main_channel", "is_deleted", "is_last_one",
+    "input_material_code", "input_bom_revision", "tiled",
+    "is_vaccum", "is_sh93", "is_hdt", "is_flavor", "unit", "plan_date", "plan_output_quantity",
+    "is_outsourcing", "is_backup", "order_status", "task_id",
+])
+
+
+def make_row(packing: bool, index: int):
+    start = START + timedelta(minutes=index)
+    common = dict(
+        plan_id=f"{'HJB' if packing else 'HWS'}{index:08d}", production_line=f"C{index % 40 + 1}",
+        batch_code=None, material_code=f"利群(软红长嘴){index % 20}", bom_revision=None,
+        quantity=500 if packing else None, plan_start_time=start, plan_end_time=start + timedelta(hours=8),
+        sequence=index % 10 + 1, shift=None, is_vaccum=0, is_sh93=0, is_hdt=0, is_flavor=0,
+        unit="箱" if packing else "公斤", plan_date=start.date(), plan_output_quantity=None,
+        is_outsourcing=0, is_backup=int(index % 10 == 0), order_status="PLANNED", task_id="SCHEDULE_20241001",
+    )
+    if not packing:
+        return FeedingRow(**common)
+    return PackingRow(
+        **common, input_plan_id=f"HWS{index:08d}", input_batch_code=None, input_quantity="3",
+        batch_sequence=1, is_whole_batch=1, is_main_channel=1, is_deleted=0, is_last_one=None,
+        input_material_code=f"利群(软红长嘴){index % 20}", input_bom_revision=None, tiled=None,
+    )
+
+
+def synthetic_rows(per_table: int):
+    async def stream_rows(query, params=None, batch_size=None):
+        batch_size = batch_size or settings.db_stream_batch_size
+        packing = "input_plan_id" in query
+        for offset in range(0, per_table, batch_size):
+            yield [make_row(packing, index) for index in range(offset, min(offset + batch_size, per_table))]
+    return stream_rows
+
+
+async def buffered_export(service: MESDataExportService, export_format: str):
+    result = await service.export_work_orders_by_task("SCHEDULE_20241001", export_format)
+    return len(result["content"].encode("utf-8"))
+
+
+async def streamed_export(service: MESDataExportService, export_format: str, compress: bool):
+    size = 0
+    async for chunk in service.stream_export_by_task("SCHEDULE_20241001", export_format, compress=compress):
+        size += len(chunk)
+    return size
+
+
+def measure(name: str, coroutine_factory):
+    # minidom节点间有循环引用，先回收上一次导出的对象，峰值按本次新增内存计算
+    gc.collect()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    size = asyncio.run(coroutine_factory())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    print(f"{name:<6} 耗时 {elapsed:7.2f} s   输出 {size / 1024 / 1024:8.1f} MB   "
+          f"内存峰值 {(peak - baseline) / 1024 / 1024:8.1f} MB")
+
+
+def run(orders: int, export_format: str, compress: bool, skip_buffered: bool):
+    per_table = orders // 2
+    print(f"{orders} 个工单（喂丝机/卷包机各 {per_table}），格式 {export_format}{'（gzip）' if compress else ''}")
+    service = MESDataExportService()
+    with patch.object(DatabaseQueryService, 'stream_rows', staticmethod(synthetic_rows(per_table))), \
+         patch('app.services.mes_data_export_service.WorkOrderArchiveService.resolve_task_table',
+               AsyncMock(side_effect=lambda table, task_id: table)), \
+         patch.object(service, '_count_orders', AsyncMock(return_value=per_table)):
+        tracemalloc.start()
+        if not skip_buffered:
+            measure("一次性", lambda: buffered_export(service, export_format))
+        measure("流式", lambda: streamed_export(service, export_format, compress))
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MES文档流式导出基准测试")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--format", choices=["XML", "JSON"], default="XML")
+    parser.add_argument("--compress", action="store_true")
+    parser.add_argument("--skip-buffered", action="store_true", help="只测流式导出（一次性导出内存不足时）")
+    args = parser.parse_args()
+    run(args.orders, args.format, args.compress, args.skip_buffered)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+APS智慧排产系统 - Excel解析对事件循环的阻塞基准测试
+
+解析大工作簿期间，每10ms发起一次模拟的轻量请求（健康检查/甘特图缓存命中），
+统计请求延迟；对比在事件循环中直接解析（原实现）与提交到解析进程池两种方式
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_parse_event_loop [--rows 50000] [--workers 2]
+    （生成的工作簿每万行约0.25MB，50MB约需200万行）
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from app.core.config import settings
+from app.services.excel_parser import parse_production_plan_excel
+from app.services.parse_worker_pool import run_in_parse_pool, shutdown_parse_executor
+from benchmarks.bench_excel_parser import generate_workbook
+
+REQUEST_INTERVAL = 0.01
+
+
+async def light_request():
+    """模拟轻量请求：只需事件循环调度一次即可完成"""
+    await asyncio.sleep(0)
+
+
+async def measure_latency(parse_coroutine):
+    """解析期间周期性发起请求，返回 (解析耗时秒, 请求延迟毫秒列表)"""
+    latencies = []
+    stop = asyncio.Event()
+
+    async def client():
+        while not stop.is_set():
+            scheduled = time.perf_counter()
+            await asyncio.sleep(REQUEST_INTERVAL)
+            # 实际开始处理的时间 - 预期时间 = 被阻塞的时间
+            await light_request()
+            latencies.append((time.perf_counter() - scheduled - REQUEST_INTERVAL) * 1000)
+
+    client_task = asyncio.create_task(client())
+    await asyncio.sleep(REQUEST_INTERVAL * 5)
+    start = time.perf_counter()
+    await parse_coroutine()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await client_task
+    return elapsed, latencies
+
+
+def report(name, elapsed, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:<12} 解析 {elapsed:7.2f} s   请求数 {len(latencies):5d}   "
+          f"p50 {statistics.median(ordered):8.1f} ms   p99 {p99:8.1f} ms   最大 {ordered[-1]:8.1f} ms")
+
+
+async def run(row_count: int, workers: int):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "plan.xlsx")
+        generate_workbook(file_path, row_count)
+        print(f"{row_count} 行工作簿 {os.path.getsize(file_path) / 1024 / 1024:.1f} MB")
+
+        async def inline_parse():
+            # 原实现：async 接口中直接调用同步解析
+            parse_production_plan_excel(file_path)
+
+        async def pool_parse():
+            await run_in_parse_pool(parse_production_plan_excel, file_path)
+
+        report("事件循环内", *await measure_latency(inline_parse))
+
+        settings.excel_parse_workers = workers
+        # 预先启动工作进程，排除spawn启动开销
+        await run_in_parse_pool(os.getpid)
+        report("解析进程池", *await measure_latency(pool_parse))
+        shutdown_parse_executor()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel解析对事件循环的阻塞基准测试")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.workers))
+
+
+if __name__ == "__main__":
+    main()
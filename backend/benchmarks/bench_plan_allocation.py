@@ -0,0 +1,202 @@
+"""
+APS智慧排产系统 - 聚合数值分配基准测试
+
+对比原逐条分配实现（每条记录打印多行过程信息）与按列向量化分配的耗时，并校验结果一致
+原实现的打印输出重定向到空设备计时（输出到终端或日志文件时更慢），各取3次中的最短耗时
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_plan_allocation [--rows 10000 100000]
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+from app.services.plan_allocation import allocate_aggregate_values
+
+
+def legacy_allocate_aggregate_values(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """原实现：逐条分组、分配并打印过程"""
+    print(f"🔄 开始修正的聚合数值分配，共 {len(records)} 条记录")
+    
+    if not records:
+        return []
+    
+    # 按连续的相同牌号和相同数值进行分组
+    groups = []
+    current_group = []
+    
+    for i, record in enumerate(records):
+        article_name = record.get('article_name', 'UNKNOWN')
+        material_input = record.get('material_input', 0) or 0
+        final_quantity = record.get('final_quantity', 0) or 0
+        
+        print(f"  处理记录 {i+1}: {article_name} - 投料:{material_input}, 成品:{final_quantity}")
+        
+        # 检查是否与当前组匹配
+        should_group = False
+        if current_group:
+            last_record = current_group[-1]
+            last_article = last_record.get('article_name', 'UNKNOWN')
+            last_material = last_record.get('material_input', 0) or 0
+            last_final = last_record.get('final_quantity', 0) or 0
+            
+            # 分组条件：相同牌号 AND 相同数值 AND 数值不为0 AND 行号连续
+            row_diff = record.get('row_number', 0) - last_record.get('row_number', 0)
+            should_group = (
+                article_name == last_article and
+                material_input == last_material and
+                final_quantity == last_final and
+                (material_input > 0 or final_quantity > 0) and  # 至少一个不为0
+                (last_material > 0 or last_final > 0) and  # 前一个记录也至少一个不为0
+                1 <= row_diff <= 2  # 行号必须是递增且相近的（考虑合并单元格但不允许跳跃）
+            )
+        
+        if should_group:
+            # 加入当前组
+            current_group.append(record.copy())
+            print(f"    ✓ 加入当前组（组大小: {len(current_group)}）")
+        else:
+            # 结束当前组，开始新组
+            if current_group:
+                groups.append(current_group)
+                print(f"    📦 完成组: {len(current_group)}条记录")
+            
+            current_group = [record.copy()]
+            print(f"    🆕 开始新组")
+    
+    # 添加最后一组
+    if current_group:
+        groups.append(current_group)
+        print(f"    📦 最后一组: {len(current_group)}条记录")
+    
+    print(f"📊 分组完成: 共 {len(groups)} 个组")
+    
+    # 处理每个组
+    processed_records = []
+    
+    for group_idx, group_records in enumerate(groups):
+        if len(group_records) == 1:
+            # 单个记录，保持原样
+            print(f"🎯 组 {group_idx+1}: 单条记录，保持原样")
+            processed_records.append(group_records[0])
+            continue
+        
+        # 多个记录，需要分配
+        first_record = group_records[0]
+        article_name = first_record.get('article_name', 'UNKNOWN')
+        total_material = first_record.get('material_input', 0) or 0
+        total_final = first_record.get('final_quantity', 0) or 0
+        
+        print(f"🎯 组 {group_idx+1}: {article_name}，{len(group_records)}条记录需要分配")
+        print(f"   📦 聚合数值 - 投料:{total_material}, 成品:{total_final}")
+        
+        if total_material == 0 and total_final == 0:
+            # 都是0，保持原样
+            print(f"   ⚠️ 数值全为0，保持原样")
+            processed_records.extend(group_records)
+            continue
+        
+        # 平均分配
+        machine_count = len(group_records)
+        
+        # 基础分配（整除）
+        material_per_machine = total_material // machine_count if total_material > 0 else 0
+        final_per_machine = total_final // machine_count if total_final > 0 else 0
+        
+        # 余数处理
+        material_remainder = total_material % machine_count if total_material > 0 else 0
+        final_remainder = total_final % machine_count if total_final > 0 else 0
+        
+        print(f"   🎲 分配策略 - 每台基础: 投料{material_per_machine}, 成品{final_per_machine}")
+        print(f"   📈 余数: 投料余数{material_remainder}, 成品余数{final_remainder}")
+        
+        # 执行分配
+        for i, record in enumerate(group_records):
+            # 基础分配
+            allocated_material = material_per_machine
+            allocated_final = final_per_machine
+            
+            # 余数分配给前几个记录
+            if i < material_remainder:
+                allocated_material += 1
+            if i < final_remainder:
+                allocated_final += 1
+            
+            # 更新记录
+            record['material_input'] = allocated_material
+            record['final_quantity'] = allocated_final
+            record['_allocation_info'] = {
+                'original_material_input': total_material,
+                'original_final_quantity': total_final,
+                'machine_count': machine_count,
+                'allocation_method': 'equal_distribution'
+            }
+            
+            print(f"   ✅ 记录 {i+1}: 分配 投料{allocated_material}, 成品{allocated_final}")
+            processed_records.append(record)
+        
+        # 验证总量
+        verify_material = sum(r.get('material_input', 0) for r in group_records)
+        verify_final = sum(r.get('final_quantity', 0) for r in group_records)
+        
+        if verify_material == total_material and verify_final == total_final:
+            print(f"   ✅ 分配验证成功")
+        else:
+            print(f"   ❌ 分配验证失败: 投料{verify_material}/{total_material}, 成品{verify_final}/{total_final}")
+    
+    print(f"🎊 修正的聚合分配完成，处理后共 {len(processed_records)} 条记录")
+    return processed_records
+
+
+def generate_records(row_count: int) -> List[Dict[str, Any]]:
+    """生成解析结果形式的记录：每个牌号2~4台机台共用一组聚合投料/成品"""
+    rng = random.Random(0)
+    records = []
+    row_number = 4
+    while len(records) < row_count:
+        article = f"利群({rng.randint(1, 30)})"
+        material, final = rng.randint(1000, 9000), rng.randint(1000, 12000)
+        for _ in range(rng.randint(1, 4)):
+            records.append({'article_name': article, 'material_input': material, 'final_quantity': final,
+                            'row_number': row_number, 'maker_codes': [f"C{rng.randint(1, 40)}"]})
+            row_number += 1
+    return records[:row_count]
+
+
+def best_of(func, records, repeat: int = 3):
+    """返回 (结果, 最短耗时秒)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(records)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def run(row_count: int):
+    records = generate_records(row_count)
+
+    # 先测向量化实现，避免原实现的大量记录副本增加垃圾回收开销
+    vectorized, vectorized_seconds = best_of(allocate_aggregate_values, records)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        legacy, legacy_seconds = best_of(legacy_allocate_aggregate_values, records)
+
+    assert vectorized == legacy, "向量化分配结果与原实现不一致"
+    print(f"{row_count:>7} 条记录  逐条 {legacy_seconds * 1000:9.1f} ms   向量化 {vectorized_seconds * 1000:8.1f} ms   "
+          f"加速 {legacy_seconds / vectorized_seconds:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="聚合数值分配基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    for row_count in args.rows:
+        run(row_count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+APS智慧排产系统 - 旬计划导入流水线基准测试
+
+对比原顺序导入（整体解析 → 整体分配 → 分块INSERT）与流水线导入（解析、分配、写入并发）
+的总耗时和Python内存峰值。数据库用模拟会话代替，每条INSERT等待 --insert-ms 毫秒模拟写入往返；
+内存峰值由 tracemalloc 统计（计时与内存分两次运行，避免跟踪开销影响耗时）
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_plan_import_pipeline [--rows 50000] [--insert-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from app.api.v1.plans import build_decade_plan_values, save_parse_results_to_decade_plan
+from app.core.config import settings
+from app.services.excel_parser import parse_production_plan_excel
+from app.services.plan_import_pipeline import PlanImportPipeline
+from benchmarks.bench_excel_parser import generate_workbook
+
+
+class SlowSession:
+    """模拟数据库会话：INSERT等待固定时间，其余语句立即返回"""
+
+    def __init__(self, insert_seconds: float):
+        self.insert_seconds = insert_seconds
+        self.statements = 0
+
+    async def execute(self, statement):
+        if getattr(statement, 'is_insert', False):
+            self.statements += 1
+            await asyncio.sleep(self.insert_seconds)
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+async def sequential_import(file_path: str, session: SlowSession):
+    parse_result = parse_production_plan_excel(file_path)
+    await save_parse_results_to_decade_plan(session, "BENCH", parse_result)
+
+
+async def pipelined_import(file_path: str, session: SlowSession):
+    await PlanImportPipeline(session, "BENCH", build_decade_plan_values).run(file_path)
+
+
+async def measure(name: str, importer, file_path: str, insert_seconds: float):
+    session = SlowSession(insert_seconds)
+    start = time.perf_counter()
+    await importer(file_path, session)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    await importer(file_path, SlowSession(0))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<8} {elapsed:8.2f} s   INSERT {session.statements:5d}条   内存峰值 {peak / 1024 / 1024:8.1f} MB")
+
+
+async def run(row_count: int, insert_ms: float):
+    # 分配在线程池中执行，避免进程间传输记录的开销干扰对比
+    settings.excel_parse_workers = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "plan.xlsx")
+        generate_workbook(file_path, row_count)
+        print(f"{row_count} 行工作簿 {os.path.getsize(file_path) / 1024 / 1024:.1f} MB, "
+              f"每块 {settings.plan_import_chunk_size} 行, 队列 {settings.plan_import_queue_size} 块, "
+              f"INSERT {settings.decade_plan_insert_chunk_size} 行/条, 每条 {insert_ms} ms")
+        await measure("顺序导入", sequential_import, file_path, insert_ms / 1000)
+        await measure("流水线", pipelined_import, file_path, insert_ms / 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="旬计划导入流水线基准测试")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--insert-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.insert_ms))
+
+
+if __name__ == "__main__":
+    main()
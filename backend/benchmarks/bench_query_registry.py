@@ -0,0 +1,125 @@
+"""
+APS智慧排产系统 - 预编译查询注册表基准测试
+
+对比每次调用拼接SQL + text() 与注册表预编译语句的构造开销，
+以及按属性名逐行取值与按列下标生成映射函数的行转换开销
+使用内存SQLite生成真实的 SQLAlchemy Row 对象，不依赖MySQL
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_query_registry [行数]
+"""
+import sys
+import timeit
+from collections import namedtuple
+from datetime import time
+
+from sqlalchemy import create_engine, text
+
+from app.services.database_query_service import MACHINES_QUERY, SHIFT_CONFIG_QUERY
+
+
+def legacy_build_machines_statement(status, machine_types):
+    """原实现：每次调用拼接SQL并构造text()"""
+    query = """
+    SELECT machine_code, machine_name, machine_type, equipment_type,
+           production_line, status
+    FROM aps_machine
+    WHERE status = :status
+    """
+    params = {'status': status}
+    if machine_types:
+        query += " AND machine_type IN :machine_types"
+        params['machine_types'] = tuple(machine_types)
+    query += " ORDER BY machine_type, machine_code"
+    return text(query), params
+
+
+def legacy_map_machine(row):
+    """原实现：按属性名取值"""
+    return {
+        'machine_code': row.machine_code,
+        'machine_name': row.machine_name,
+        'machine_type': row.machine_type,
+        'equipment_type': row.equipment_type,
+        'production_line': row.production_line,
+        'status': row.status
+    }
+
+
+def legacy_format_time(value, default):
+    """原实现：hasattr判断time/timedelta"""
+    if hasattr(value, 'strftime'):
+        return value.strftime('%H:%M')
+    if hasattr(value, 'total_seconds'):
+        total_seconds = int(value.total_seconds())
+        return f'{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}'
+    return default
+
+
+def legacy_map_shift(row):
+    return {
+        'name': row.shift_name,
+        'start_time': legacy_format_time(row.start_time, '08:00'),
+        'end_time': legacy_format_time(row.end_time, '16:00'),
+        'is_ot_needed': bool(row.is_ot_needed) if row.is_ot_needed is not None else False,
+        'max_ot_duration': legacy_format_time(row.max_ot_duration, None) if row.max_ot_duration else None
+    }
+
+
+def load_machine_rows(row_count):
+    """生成机台查询结果（真实Row对象）"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE aps_machine (machine_code TEXT, machine_name TEXT, machine_type TEXT, "
+            "equipment_type TEXT, production_line TEXT, status TEXT)"
+        ))
+        conn.execute(
+            text("INSERT INTO aps_machine VALUES (:c, :n, :t, :e, :l, 'ACTIVE')"),
+            [{'c': f'C{i}', 'n': f'卷包机{i}', 't': 'PACKING', 'e': 'PROTOS70', 'l': 'L1'} for i in range(row_count)]
+        )
+        machine_rows = conn.execute(text(
+            "SELECT machine_code, machine_name, machine_type, equipment_type, production_line, status FROM aps_machine"
+        )).fetchall()
+    return machine_rows
+
+
+def report(name, legacy_seconds, registry_seconds, number):
+    legacy_us = legacy_seconds / number * 1e6
+    registry_us = registry_seconds / number * 1e6
+    print(f"{name:<28} 原实现 {legacy_us:10.2f} µs   注册表 {registry_us:10.2f} µs   加速 {legacy_us / registry_us:5.2f}x")
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    machine_rows = load_machine_rows(row_count)
+
+    number = 2000
+    report(
+        "语句构造(含IN条件)",
+        timeit.timeit(lambda: legacy_build_machines_statement('ACTIVE', ['PACKING', 'FEEDING']), number=number),
+        timeit.timeit(lambda: MACHINES_QUERY.bind(status='ACTIVE', machine_types=['PACKING', 'FEEDING']), number=number),
+        number
+    )
+
+    number = 20
+    report(
+        f"机台行映射({row_count}行)",
+        timeit.timeit(lambda: [legacy_map_machine(row) for row in machine_rows], number=number),
+        timeit.timeit(lambda: MACHINES_QUERY.map_rows(machine_rows), number=number),
+        number
+    )
+
+    # 班次行：具名元组同时支持属性访问和下标访问
+    ShiftRow = namedtuple('ShiftRow', ['shift_name', 'start_time', 'end_time', 'is_ot_needed', 'max_ot_duration'])
+    shift_rows = [ShiftRow(f'班次{i}', time(8, 0), time(16, 0), 1, None) for i in range(row_count)]
+    report(
+        f"班次行映射({row_count}行)",
+        timeit.timeit(lambda: [legacy_map_shift(row) for row in shift_rows], number=number),
+        timeit.timeit(lambda: SHIFT_CONFIG_QUERY.map_rows(shift_rows), number=number),
+        number
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+APS智慧排产系统 - 响应压缩基准测试（限速本地链路）
+
+在本机启动uvicorn（挂载压缩中间件的甘特图分页接口），客户端经过限速TCP代理访问，
+模拟车间客户端的慢速链路（默认 4 Mbit/s、单向延迟 20 ms）。分别以不压缩、gzip、br
+（安装brotli时）请求同一带ETag的2000行甘特图分页，统计每次传输字节数和延迟p50/p95
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_response_compression [--rows 2000] [--requests 30] [--mbps 4] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware
+from app.core.responses import success_response
+from benchmarks.bench_json_response import gantt_rows
+
+
+def build_app(row_count: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+    rows = gantt_rows(row_count)
+
+    @app.get("/work-orders")
+    async def work_orders():
+        # 与甘特图工单缓存相同：数据版本不变时ETag不变
+        return success_response(data={"work_orders": rows, "total_count": len(rows)},
+                                message="查询成功", headers={"ETag": '"wo-1-bench"'})
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def throttled_pipe(reader, writer, bytes_per_second: float, latency: float):
+    """按带宽限速转发，每块数据额外延迟 latency 秒"""
+    try:
+        while True:
+            data = await reader.read(16 * 1024)
+            if not data:
+                break
+            await asyncio.sleep(latency + len(data) / bytes_per_second)
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_proxy(target_port: int, bytes_per_second: float, latency: float):
+    async def handle(client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", target_port)
+        try:
+            await asyncio.gather(
+                throttled_pipe(client_reader, server_writer, bytes_per_second, latency),
+                throttled_pipe(server_reader, client_writer, bytes_per_second, latency),
+            )
+        except asyncio.CancelledError:
+            # 测试结束关闭代理时客户端保持的连接
+            pass
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def measure(proxy_port: int, accept_encoding: str, request_count: int):
+    latencies, transferred = [], []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{proxy_port}", timeout=120) as client:
+        for _ in range(request_count):
+            start = time.perf_counter()
+            async with client.stream("GET", "/work-orders", headers={"Accept-Encoding": accept_encoding}) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+            latencies.append((time.perf_counter() - start) * 1000)
+            transferred.append(len(raw))
+            encoding = response.headers.get("content-encoding", "identity")
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{accept_encoding:<10} -> {encoding:<9} 每次 {statistics.mean(transferred) / 1024:8.1f} KB   "
+          f"p50 {statistics.median(ordered):8.1f} ms   p95 {p95:8.1f} ms")
+
+
+async def run(row_count: int, request_count: int, mbps: float, latency_ms: float):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(build_app(row_count), port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    proxy = await start_proxy(port, mbps * 1024 * 1024 / 8, latency_ms / 1000)
+    proxy_port = proxy.sockets[0].getsockname()[1]
+    print(f"{row_count} 行甘特图分页，{request_count} 次请求，链路 {mbps} Mbit/s，单向延迟 {latency_ms} ms")
+    try:
+        encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+        for accept_encoding in encodings:
+            await measure(proxy_port, accept_encoding, request_count)
+        if compression.brotli is None:
+            print("未安装brotli，跳过br")
+    finally:
+        proxy.close()
+        server.should_exit = True
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应压缩基准测试（限速本地链路）")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--mbps", type=float, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.requests, args.mbps, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
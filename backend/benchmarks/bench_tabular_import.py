@@ -0,0 +1,95 @@
+"""
+APS智慧排产系统 - xlsx与CSV/Parquet计划文件解析基准测试
+
+生成同一份计划数据的xlsx、CSV（UTF-8）和Parquet（标题行、有效期限行写入文件元数据）文件，
+分别计时完整解析（parse_production_plan_excel），并校验记录（含行号、日期）和年份一致；各取3次中的最短耗时
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_tabular_import [--rows 10000 100000]
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import openpyxl
+
+from app.services.excel_parser import parse_production_plan_excel
+from app.services.tabular_reader import parquet_layout_metadata, pq
+from benchmarks.bench_excel_parser import generate_workbook
+
+
+def export_csv(xlsx_path: str, csv_path: str):
+    """逐行导出工作表（与上游系统导出的CSV相同：空单元格为空字符串）"""
+    workbook = openpyxl.load_workbook(xlsx_path, read_only=True)
+    try:
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for row in workbook.active.iter_rows(values_only=True):
+                writer.writerow(['' if value is None else value for value in row])
+    finally:
+        workbook.close()
+
+
+def export_parquet(xlsx_path: str, parquet_path: str):
+    """表头行作为列名，标题行和末尾只有首列的说明行（有效期限）写入文件元数据"""
+    import pyarrow as pa
+
+    workbook = openpyxl.load_workbook(xlsx_path, read_only=True)
+    try:
+        rows = list(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+    data_end = len(rows)
+    while data_end > 3 and not any(value is not None for value in rows[data_end - 1][1:]):
+        data_end -= 1
+    headers, data_rows = rows[2], rows[3:data_end]
+    table = pa.table({
+        header: [str(row[index]) if index < len(row) and row[index] is not None else None for row in data_rows]
+        for index, header in enumerate(headers)
+    })
+    table = table.replace_schema_metadata(parquet_layout_metadata(rows[:2], rows[data_end:]))
+    pq.write_table(table, parquet_path)
+
+
+def measure(file_path: str):
+    best, result = None, None
+    for _ in range(3):
+        start = time.perf_counter()
+        result = parse_production_plan_excel(file_path, streaming=True, sheet_workers=1)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(row_count: int):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = {'xlsx': os.path.join(temp_dir, "plan.xlsx"), 'csv': os.path.join(temp_dir, "plan.csv")}
+        generate_workbook(files['xlsx'], row_count)
+        export_csv(files['xlsx'], files['csv'])
+        if pq is not None:
+            files['parquet'] = os.path.join(temp_dir, "plan.parquet")
+            export_parquet(files['xlsx'], files['parquet'])
+        else:
+            print("未安装pyarrow，跳过Parquet")
+
+        baseline_time, baseline = measure(files['xlsx'])
+        for name, file_path in files.items():
+            elapsed, result = (baseline_time, baseline) if name == 'xlsx' else measure(file_path)
+            assert result['records'] == baseline['records'], f"{name}解析结果与xlsx不一致"
+            assert result['extracted_year'] == baseline['extracted_year'], f"{name}年份与xlsx不一致"
+            print(f"{row_count:>8} 行  {name:<8} {os.path.getsize(file_path) / 1024 / 1024:6.1f} MB  "
+                  f"{elapsed:8.3f} s  {row_count / elapsed:10.0f} 行/秒  加速 {baseline_time / elapsed:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="xlsx与CSV/Parquet计划文件解析基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    for row_count in args.rows:
+        run(row_count)
+
+
+if __name__ == "__main__":
+    main()
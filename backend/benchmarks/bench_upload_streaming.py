@@ -0,0 +1,95 @@
+"""
+APS智慧排产系统 - 上传文件流式保存基准测试
+
+对比一次性读取整个上传文件再写盘（原实现）与分块流式保存（save_uploaded_file）
+的内存峰值，以及保存期间事件循环的最大阻塞时间
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_upload_streaming [--sizes 5 50] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from fastapi import UploadFile
+
+from app.api.v1.plans import save_uploaded_file
+from app.core.config import settings
+
+
+async def legacy_save(file: UploadFile):
+    """原实现：整个文件读入内存后同步写盘"""
+    content = await file.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+    file_path = os.path.join(settings.upload_temp_dir, f"{uuid.uuid4()}.xlsx")
+    with open(file_path, "wb") as buffer:
+        buffer.write(content)
+    return file_path, content_hash, len(content)
+
+
+def make_upload(size_mb: int, seed: int) -> UploadFile:
+    """模拟Starlette的上传文件（内容已落盘到临时文件）"""
+    spooled = tempfile.TemporaryFile()
+    block = os.urandom(1024 * 1024)
+    for index in range(size_mb):
+        spooled.write(block[:-8] + seed.to_bytes(4, "big") + index.to_bytes(4, "big"))
+    spooled.seek(0)
+    return UploadFile(file=spooled, filename=f"plan_{seed}.xlsx")
+
+
+async def measure(save, size_mb: int, concurrency: int):
+    """返回 (内存峰值MB, 事件循环最大阻塞毫秒, 耗时秒)"""
+    uploads = [make_upload(size_mb, seed) for seed in range(concurrency)]
+    gaps = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last - 0.005)
+            last = now
+
+    ticker_task = asyncio.create_task(ticker())
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = await asyncio.gather(*[save(upload) for upload in uploads])
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    stop.set()
+    await ticker_task
+
+    for file_path, _, _ in results:
+        if os.path.exists(file_path):
+            os.unlink(file_path)
+    for upload in uploads:
+        upload.file.close()
+    return peak, max(gaps) * 1000, elapsed
+
+
+async def run(sizes, concurrency: int):
+    for size_mb in sizes:
+        legacy = await measure(legacy_save, size_mb, concurrency)
+        streaming = await measure(save_uploaded_file, size_mb, concurrency)
+        for name, (peak, max_block, elapsed) in (("整体读取", legacy), ("分块流式", streaming)):
+            print(f"{size_mb:>4} MB × {concurrency}  {name}  内存峰值 {peak:8.1f} MB   "
+                  f"事件循环最大阻塞 {max_block:8.1f} ms   耗时 {elapsed:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上传文件流式保存基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50], help="文件大小（MB）")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发上传数")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
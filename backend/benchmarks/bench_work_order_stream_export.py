@@ -0,0 +1,121 @@
+"""
+APS智慧排产系统 - 工单流式导出基准测试
+
+在本机启动uvicorn，服务端游标（DatabaseQueryService.stream_rows）替换为按批生成的合成工单排程行，
+客户端流式读取 GET /work-orders/export/schedules，统计首字节时间、总耗时、吞吐和进程内存峰值（tracemalloc），
+并与一次性构建完整结果再序列化的做法对比内存峰值
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_work_order_stream_export [--rows 1000000] [--baseline-rows 100000] [--format ndjson]
+"""
+import argparse
+import asyncio
+import socket
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import httpx
+import uvicorn
+
+from app.core.config import settings
+from app.core.responses import dumps_json
+from app.main import app
+from app.services.database_query_service import DatabaseQueryService, WORK_ORDER_SCHEDULES_QUERY
+
+START = datetime(2024, 10, 1)
+
+
+def synthetic_rows(row_count: int):
+    """按 db_stream_batch_size 分批生成与 WORK_ORDER_SCHEDULES_QUERY 列顺序一致的行"""
+    async def stream_rows(query, params=None, batch_size=None):
+        batch_size = batch_size or settings.db_stream_batch_size
+        for offset in range(0, row_count, batch_size):
+            yield [(
+                index, f"W{index:07d}", f"利群(软红长嘴){index % 20}", 1000 + index % 500, 2000,
+                f"C{index % 40 + 1}", f"F{index % 20 + 1}",
+                START + timedelta(minutes=index), START + timedelta(minutes=index + 90),
+                "SCHEDULE_20241001", "PLANNED", f"SYNC_{index}", index % 10 == 0, None, START,
+            ) for index in range(offset, min(offset + batch_size, row_count))]
+            await asyncio.sleep(0)
+    return stream_rows
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def measure_stream(port: int, export_format: str):
+    url = f"http://127.0.0.1:{port}/api/v1/work-orders/export/schedules"
+    transferred = 0
+    first_byte = None
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    async with httpx.AsyncClient(timeout=600) as client:
+        async with client.stream("GET", url, params={"format": export_format},
+                                 headers={"Accept-Encoding": "identity"}) as response:
+            async for chunk in response.aiter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                transferred += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return first_byte, elapsed, transferred, peak
+
+
+def measure_buffered(row_count: int):
+    """基线：先取完整结果列表，再一次性序列化"""
+    async def load():
+        rows = []
+        async for batch in synthetic_rows(row_count)(None):
+            rows.extend(WORK_ORDER_SCHEDULES_QUERY.map_rows(batch))
+        return dumps_json({"schedules": rows})
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    body = asyncio.run(load())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    return elapsed, len(body), peak
+
+
+def run(row_count: int, baseline_rows: int, export_format: str):
+    tracemalloc.start()
+    baseline_elapsed, baseline_size, baseline_peak = measure_buffered(baseline_rows)
+    print(f"一次性构建 {baseline_rows} 行: 首字节 = 总耗时 {baseline_elapsed:6.2f} s   "
+          f"{baseline_size / 1024 / 1024:7.1f} MB   内存峰值 {baseline_peak / 1024 / 1024:7.1f} MB")
+
+    port = free_port()
+    with patch.object(DatabaseQueryService, 'stream_rows', staticmethod(synthetic_rows(row_count))):
+        server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", lifespan="off"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        try:
+            for rows in sorted({min(row_count, baseline_rows), row_count}):
+                with patch.object(DatabaseQueryService, 'stream_rows', staticmethod(synthetic_rows(rows))):
+                    first_byte, elapsed, transferred, peak = asyncio.run(measure_stream(port, export_format))
+                print(f"流式导出 {rows:>8} 行（{export_format}）: 首字节 {first_byte * 1000:6.1f} ms   "
+                      f"总耗时 {elapsed:6.2f} s   {transferred / 1024 / 1024:7.1f} MB   "
+                      f"{rows / elapsed:9.0f} 行/s   内存峰值 {peak / 1024 / 1024:7.1f} MB")
+        finally:
+            server.should_exit = True
+            thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工单流式导出基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--baseline-rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args()
+    run(args.rows, args.baseline_rows, args.format)
+
+
+if __name__ == "__main__":
+    main()
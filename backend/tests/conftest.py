@@ -0,0 +1,157 @@
+"""
+APS智慧排产系统 - 测试公共替身
+
+多个测试模块共用的Redis客户端、数据库会话和查询结果替身，测试模块中直接导入使用：
+
+    from conftest import FakeRedis, FakeSession, make_session_factory
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock
+
+
+class FakeRedis:
+    """模拟解码响应的Redis版本号存储（多个缓存实例共享时模拟多进程），fail为True时模拟Redis不可用"""
+
+    def __init__(self, store=None):
+        self.store = dict(store or {})
+        self.fail = False
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.store.get(key)
+
+    async def incr(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return int(self.store[key])
+
+
+class FakeBinaryRedis:
+    """模拟不解码响应的Redis客户端，fail为True时模拟Redis不可用"""
+
+    def __init__(self):
+        self.store = {}
+        self.get_calls = 0
+        self.fail = False
+
+    async def get(self, key):
+        self.get_calls += 1
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if self.fail:
+            raise ConnectionError("redis down")
+        if nx and key in self.store:
+            return None
+        self.store[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def exists(self, key):
+        return int(key in self.store)
+
+    async def delete(self, *keys):
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.store.get(key) == token.encode():
+            del self.store[key]
+            return 1
+        return 0
+
+
+class FakeCacheManager:
+    """只提供Redis客户端的缓存管理器"""
+
+    def __init__(self, client):
+        self.client = client
+
+
+class FakeResult:
+    """模拟查询结果"""
+
+    def __init__(self, rows=None, rowcount=0):
+        self.rows = rows or []
+        self.rowcount = rowcount
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeStreamResult:
+    """模拟AsyncResult，按partitions分批返回行"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def partitions(self, size):
+        for i in range(0, len(self.rows), size):
+            yield self.rows[i:i + size]
+
+
+class FakeSession:
+    """
+    记录执行语句的模拟会话
+
+    Args:
+        responder: (sql, params) -> 查询结果，None时返回 rowcount=1 的结果
+        rows: stream() 返回的行
+        fail_on: 第N条语句执行时抛出 RuntimeError
+    """
+
+    def __init__(self, responder=None, rows=None, fail_on=None):
+        self.responder = responder
+        self.rows = rows or []
+        self.fail_on = fail_on
+        self.statements = []
+        self.params = []
+        self.calls = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    @property
+    def executed(self):
+        """已执行的 (SQL文本, 参数)"""
+        return [(str(statement), params) for statement, params in zip(self.statements, self.params)]
+
+    async def execute(self, statement, params=None):
+        self.statements.append(statement)
+        self.params.append(params)
+        # 让出事件循环，使并发的生产者（如解析线程回调）有机会推进
+        await asyncio.sleep(0)
+        if self.fail_on is not None and len(self.statements) == self.fail_on:
+            raise RuntimeError("数据库写入失败")
+        if self.responder is not None:
+            return self.responder(str(statement), params)
+        return MagicMock(rowcount=1)
+
+    async def stream(self, statement, params=None, execution_options=None):
+        self.calls.append({
+            'sql': str(statement),
+            'params': params,
+            'execution_options': execution_options
+        })
+        return FakeStreamResult(self.rows)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def make_session_factory(session):
+    """替代 get_db_session 等会话上下文管理器，始终返回同一个会话，opened 记录打开次数"""
+    @asynccontextmanager
+    async def fake_session():
+        fake_session.opened += 1
+        yield session
+    fake_session.opened = 0
+    return fake_session
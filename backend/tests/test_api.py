@@ -150,7 +150,7 @@ class TestParseAPI:
     """解析API测试"""
     
     @patch('app.api.v1.plans.get_async_session')
-    @patch('app.api.v1.plans.parse_production_plan_excel')
+    @patch('app.services.parse_result_cache.parse_production_plan_excel')
     def test_parse_excel_success(self, mock_parse, mock_get_session, client):
         """测试成功解析Excel文件"""
         # Mock数据库会话和查询结果
@@ -0,0 +1,366 @@
+"""
+APS智慧排产系统 - 缓存管理器测试
+
+验证二进制序列化、进程内LRU缓存层、get_or_compute防击穿以及命名空间统计
+"""
+import asyncio
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from app.core.config import Settings
+from app.db.cache import (
+    CacheManager, CacheStats, LocalLRUCache, JsonSerializer, PickleSerializer, get_serializer, _MISSING
+)
+
+from conftest import FakeBinaryRedis
+
+
+@pytest.fixture
+def redis():
+    return FakeBinaryRedis()
+
+
+def make_manager(redis, serializer='pickle', local=None, stats=None):
+    return CacheManager(client=redis, serializer=serializer, local=local, stats=stats or CacheStats())
+
+
+SAMPLE = {
+    'plan_date': date(2025, 10, 18),
+    'start': datetime(2025, 10, 18, 8, 30),
+    'duration': timedelta(hours=2),
+    'quantity': Decimal('12.50'),
+    'machines': ('C1', 'C2'),
+}
+
+
+class TestSerializers:
+    """序列化器测试"""
+
+    def test_pickle_keeps_types(self):
+        serializer = PickleSerializer()
+        assert serializer.loads(serializer.dumps(SAMPLE)) == SAMPLE
+
+    def test_json_stringifies_datetimes(self):
+        serializer = JsonSerializer()
+        assert serializer.loads(serializer.dumps(SAMPLE))['start'] == '2025-10-18 08:30:00'
+
+    def test_msgpack_keeps_types(self):
+        pytest.importorskip('msgpack')
+        serializer = get_serializer('msgpack')
+        restored = serializer.loads(serializer.dumps(SAMPLE))
+        assert restored == {**SAMPLE, 'machines': ['C1', 'C2']}
+
+    def test_unknown_serializer(self):
+        with pytest.raises(ValueError):
+            get_serializer('xml')
+
+    @pytest.mark.asyncio
+    async def test_values_readable_after_serializer_switch(self, redis):
+        """测试切换序列化格式后旧值仍按格式前缀读取"""
+        await make_manager(redis, 'json').set_object('aps:plans:1', {'a': 1})
+        assert await make_manager(redis, 'pickle').get_object('aps:plans:1') == {'a': 1}
+
+    @pytest.mark.asyncio
+    async def test_pickle_values_ignored_unless_configured(self, redis):
+        """测试未配置pickle时不反序列化Redis中pickle前缀的值"""
+        pytest.importorskip('msgpack')
+        await make_manager(redis, 'pickle').set_object('aps:plans:1', {'a': 1})
+
+        assert await make_manager(redis, 'msgpack').get_object('aps:plans:1', default='miss') == 'miss'
+
+    def test_default_serializer_not_pickle(self):
+        assert Settings.model_fields['cache_serializer'].default == 'msgpack'
+
+
+class TestLocalLRUCache:
+    """进程内LRU缓存层测试"""
+
+    def test_evicts_least_recently_used(self):
+        lru = LocalLRUCache(max_entries=2, ttl=30)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        assert lru.get('a') == 1
+        assert lru.get('c') == 3
+        assert len(lru) == 2
+        assert lru.get('b') is _MISSING
+
+    def test_values_copied_on_write_and_read(self):
+        """测试调用方修改写入的对象或读取结果不影响缓存值"""
+        lru = LocalLRUCache(max_entries=2, ttl=30)
+        value = {'machines': ['C1']}
+        lru.set('a', value)
+        value['machines'].append('C2')
+        lru.get('a')['machines'].append('C3')
+
+        assert lru.get('a') == {'machines': ['C1']}
+
+    def test_expired_entry_dropped(self):
+        lru = LocalLRUCache(max_entries=2, ttl=30)
+        lru.set('a', 1, ttl=-1)
+
+        assert lru.get('a') is _MISSING
+        assert len(lru) == 0
+
+
+class TestGetOrCompute:
+    """get_or_compute 测试"""
+
+    @pytest.mark.asyncio
+    async def test_local_tier_avoids_redis_round_trip(self, redis):
+        """测试命中进程内缓存层时不访问Redis，统计按命名空间记录"""
+        stats = CacheStats()
+        manager = make_manager(redis, local=LocalLRUCache(), stats=stats)
+
+        first = await manager.get_or_compute('aps:plans:1', lambda: SAMPLE, ttl=60)
+        calls = redis.get_calls
+        second = await manager.get_or_compute('aps:plans:1', lambda: {'stale': True}, ttl=60)
+
+        assert first == second == SAMPLE
+        assert redis.get_calls == calls
+        snapshot = stats.snapshot()['aps:plans']
+        assert snapshot['misses'] == 1
+        assert snapshot['local_hits'] == 1
+        assert snapshot['computes'] == 1
+        assert snapshot['hit_rate'] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_remote_hit_keeps_types(self, redis):
+        """测试其他进程写入的值从Redis读取后类型不变"""
+        await make_manager(redis).set_object('aps:plans:2', SAMPLE)
+        manager = make_manager(redis, local=LocalLRUCache())
+
+        assert await manager.get_or_compute('aps:plans:2', lambda: None) == SAMPLE
+        assert manager.stats.snapshot()['aps:plans']['remote_hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_compute_once(self, redis):
+        """测试同一键并发未命中时只计算一次"""
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return [1, 2, 3]
+
+        manager = make_manager(redis)
+        results = await asyncio.gather(*[manager.get_or_compute('aps:gantt:1', compute) for _ in range(10)])
+
+        assert calls == 1
+        assert all(result == [1, 2, 3] for result in results)
+        assert 'aps:gantt:1:lock' not in redis.store
+        assert manager.stats.snapshot()['aps:gantt']['waits'] == 9
+
+    @pytest.mark.asyncio
+    async def test_waits_for_other_process_holding_lock(self, redis, monkeypatch):
+        """测试锁被其他进程持有时等待其写入结果"""
+        monkeypatch.setattr('app.db.cache.settings.cache_lock_poll_interval', 0.001)
+        redis.store['aps:gantt:2:lock'] = b'other'
+        manager = make_manager(redis)
+
+        async def other_process():
+            await asyncio.sleep(0.01)
+            await make_manager(redis).set_object('aps:gantt:2', 'from-other')
+
+        async def compute():
+            raise AssertionError("不应重复计算")
+
+        result, _ = await asyncio.gather(manager.get_or_compute('aps:gantt:2', compute), other_process())
+
+        assert result == 'from-other'
+
+    @pytest.mark.asyncio
+    async def test_compute_error_propagates_to_waiters(self, redis):
+        """测试计算失败时等待方收到同一异常，且不写入缓存"""
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        manager = make_manager(redis)
+        results = await asyncio.gather(
+            *[manager.get_or_compute('aps:gantt:3', compute) for _ in range(3)], return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert 'aps:gantt:3' not in redis.store
+
+    @pytest.mark.asyncio
+    async def test_cancelled_owner_handed_over_to_waiter(self, redis):
+        """测试计算方被取消（客户端断开）时等待方不被取消，由其中一个接手计算"""
+        calls = 0
+        started = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            started.set()
+            await asyncio.sleep(0.05 if calls == 1 else 0)
+            return [calls]
+
+        manager = make_manager(redis)
+        owner = asyncio.create_task(manager.get_or_compute('aps:gantt:4', compute))
+        await started.wait()
+        waiters = [asyncio.create_task(manager.get_or_compute('aps:gantt:4', compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        owner.cancel()
+
+        results = await asyncio.gather(*waiters)
+
+        assert owner.cancelled()
+        assert results == [[2]] * 3
+        assert calls == 2
+        assert 'aps:gantt:4:lock' not in redis.store
+
+    @pytest.mark.asyncio
+    async def test_waiters_receive_independent_copies(self, redis):
+        """测试等待同一次计算的调用方得到互不影响的结果"""
+        async def compute():
+            await asyncio.sleep(0.01)
+            return {'machines': ['C1']}
+
+        manager = make_manager(redis, local=LocalLRUCache())
+        results = await asyncio.gather(*[manager.get_or_compute('aps:gantt:5', compute) for _ in range(3)])
+        results[1]['machines'].append('C2')
+
+        assert results[0] == results[2] == {'machines': ['C1']}
+        assert await manager.get_or_compute('aps:gantt:5', compute) == {'machines': ['C1']}
+
+    @pytest.mark.asyncio
+    async def test_redis_unavailable_computes_directly(self, redis):
+        """测试Redis不可用时直接计算"""
+        redis.fail = True
+        manager = make_manager(redis)
+
+        assert await manager.get_or_compute('aps:plans:3', lambda: 42) == 42
+        assert manager.stats.snapshot()['aps:plans']['errors'] >= 1
+
+
+class PipelineRedis:
+    """模拟支持MGET/MSET/管道的Redis客户端，记录每次往返发送的命令"""
+
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+        self.round_trips = []
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.commands = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                return False
+
+            def __getattr__(self, name):
+                def buffer(*args, **kwargs):
+                    self.commands.append((name, args, kwargs))
+                    return self
+                return buffer
+
+            async def execute(self):
+                redis.round_trips.append([name for name, _, _ in self.commands])
+                return [getattr(redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in self.commands]
+
+        return Pipeline()
+
+    async def mget(self, keys):
+        self.round_trips.append(['mget'])
+        return [self.store.get(key) for key in keys]
+
+    async def mset(self, mapping):
+        self.round_trips.append(['mset'])
+        self.store.update(mapping)
+        return True
+
+    def _set(self, key, value, ex=None):
+        self.store[key] = value
+        self.ttls[key] = ex
+        return True
+
+    def _delete(self, *keys):
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    def _hset(self, key, field=None, value=None, mapping=None):
+        fields = self.store.setdefault(key, {})
+        new_fields = mapping or {field: value}
+        added = len(set(new_fields) - set(fields))
+        fields.update(new_fields)
+        return added
+
+    def _lpush(self, key, *values):
+        items = self.store.setdefault(key, [])
+        items[:0] = reversed(values)
+        return len(items)
+
+    def _expire(self, key, ttl):
+        self.ttls[key] = ttl
+        return key in self.store
+
+
+class TestBatchOperations:
+    """批量读写测试"""
+
+    @pytest.fixture
+    def pipeline_redis(self):
+        return PipelineRedis()
+
+    @pytest.mark.asyncio
+    async def test_get_many_single_mget(self, pipeline_redis):
+        """测试批量读取一次MGET，缺失键不返回"""
+        manager = CacheManager(client=pipeline_redis, local=None)
+        await manager.set_many({'aps:wo:1': {'qty': 1}, 'aps:wo:2': 'RUNNING'})
+
+        result = await manager.get_many(['aps:wo:1', 'aps:wo:2', 'aps:wo:3'])
+
+        assert result == {'aps:wo:1': {'qty': 1}, 'aps:wo:2': 'RUNNING'}
+        assert pipeline_redis.round_trips == [['mset'], ['mget']]
+
+    @pytest.mark.asyncio
+    async def test_set_many_with_ttl_in_one_pipeline(self, pipeline_redis):
+        """测试带过期时间的批量写入在一个管道中完成"""
+        manager = CacheManager(client=pipeline_redis, local=None)
+
+        assert await manager.set_many({f'aps:wo:{i}': {'qty': i} for i in range(1000)}, ttl=60)
+
+        assert len(pipeline_redis.round_trips) == 1
+        assert pipeline_redis.ttls['aps:wo:999'] == 60
+
+    @pytest.mark.asyncio
+    async def test_delete_many_chunks_in_one_pipeline(self, pipeline_redis):
+        """测试批量删除按块拆分DEL，仍为一次往返，并清除本地缓存层"""
+        local = LocalLRUCache()
+        local.set('aps:wo:1', 'cached')
+        manager = CacheManager(client=pipeline_redis, local=local)
+        await manager.set_many({f'aps:wo:{i}': i for i in range(5)})
+
+        deleted = await manager.delete_many([f'aps:wo:{i}' for i in range(5)], chunk_size=2)
+
+        assert deleted == 5
+        assert pipeline_redis.round_trips[-1] == ['delete', 'delete', 'delete']
+        assert local.get('aps:wo:1') is _MISSING
+
+    @pytest.mark.asyncio
+    async def test_hash_and_list_writes_set_ttl_in_same_round_trip(self, pipeline_redis):
+        """测试哈希/列表写入与过期时间设置合并为一次往返"""
+        manager = CacheManager(client=pipeline_redis, local=None)
+
+        assert await manager.hash_set('aps:machine_status', 'C1', {'status': 'RUNNING'}, ttl=60)
+        assert await manager.hash_set_many('aps:machine_status', {'C2': 'IDLE', 'C3': {'speed': 100}}, ttl=60) == 2
+        assert await manager.list_push('aps:events', {'a': 1}, 'b', ttl=60) == 2
+        lengths = await manager.list_push_many({'aps:q1': [1, 2], 'aps:q2': [3]}, ttl=60)
+
+        assert lengths == {'aps:q1': 2, 'aps:q2': 1}
+        assert pipeline_redis.round_trips == [
+            ['hset', 'expire'], ['hset', 'expire'], ['lpush', 'expire'],
+            ['lpush', 'expire', 'lpush', 'expire'],
+        ]
+        assert pipeline_redis.store['aps:machine_status']['C3'] == '{"speed": 100}'
@@ -0,0 +1,137 @@
+"""
+APS智慧排产系统 - 响应压缩中间件测试
+
+验证压缩阈值、编码协商、流式响应压缩，以及带强ETag响应的压缩结果缓存
+"""
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI, Header, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, select_encoding
+from app.core.responses import success_response
+
+LARGE_ROWS = [{"work_order_nr": f"W{index:04d}", "article_nr": "利群(软红长嘴)"} for index in range(500)]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, cache_max_entries=8)
+
+    @app.get("/large")
+    async def large():
+        return success_response(data={"rows": LARGE_ROWS}, message="查询成功")
+
+    @app.get("/small")
+    async def small():
+        return success_response(data={"rows": LARGE_ROWS[:1]}, message="查询成功")
+
+    @app.get("/etag")
+    async def etag(if_none_match: str = Header(None)):
+        if if_none_match in ('"wo-1-abc"', 'W/"wo-1-abc"'):
+            return Response(status_code=304, headers={"ETag": '"wo-1-abc"'})
+        return success_response(data={"rows": LARGE_ROWS}, message="查询成功", headers={"ETag": '"wo-1-abc"'})
+
+    @app.get("/etag-other")
+    async def etag_other():
+        # 与 /etag 相同的强ETag、不同的内容（如按内容摘要生成ETag的其他接口）
+        return success_response(data={"rows": LARGE_ROWS[::-1]}, message="查询成功", headers={"ETag": '"wo-1-abc"'})
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for row in LARGE_ROWS:
+                yield f'{row["work_order_nr"]},{row["article_nr"]}\n'.encode("utf-8")
+        return StreamingResponse(lines(), media_type="text/csv")
+
+    @app.get("/binary")
+    async def binary():
+        return Response(content=b"x" * 4096, media_type="application/octet-stream")
+
+    return TestClient(app)
+
+
+class TestSelectEncoding:
+    """编码协商测试"""
+
+    def test_prefers_brotli_when_available(self):
+        with patch.object(compression, 'brotli', object()):
+            assert select_encoding("gzip, deflate, br") == "br"
+            assert select_encoding("gzip, deflate, br", brotli_enabled=False) == "gzip"
+            assert select_encoding("br;q=0.5, gzip") == "gzip"
+
+    def test_gzip_without_brotli(self):
+        with patch.object(compression, 'brotli', None):
+            assert select_encoding("gzip, deflate, br") == "gzip"
+            assert select_encoding("*") == "gzip"
+        assert select_encoding("identity") is None
+        assert select_encoding("gzip;q=0") is None
+        assert select_encoding(None) is None
+
+
+@patch.object(compression, 'brotli', None)
+class TestCompressionMiddleware:
+    """压缩中间件测试"""
+
+    def test_large_response_gzipped(self, client):
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json()["data"]["rows"] == LARGE_ROWS
+        assert int(response.headers["content-length"]) < len(response.content) / 5
+
+    def test_small_and_unaccepted_responses_not_compressed(self, client):
+        assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+        assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+        assert "content-encoding" not in client.get("/binary", headers={"Accept-Encoding": "gzip"}).headers
+
+    def test_disabled_by_setting(self, client):
+        with patch('app.core.compression.settings.compression_enabled', False):
+            response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    def test_etag_response_compressed_once(self, client):
+        """测试相同强ETag的响应只压缩一次，压缩后为弱ETag且仍可用于条件请求"""
+        with patch('app.core.compression.compress_body', wraps=compression.compress_body) as compress:
+            first = client.get("/etag", headers={"Accept-Encoding": "gzip"})
+            second = client.get("/etag", headers={"Accept-Encoding": "gzip"})
+
+        assert compress.call_count == 1
+        assert first.headers["etag"] == 'W/"wo-1-abc"'
+        assert first.content == second.content
+        assert first.headers["content-length"] == second.headers["content-length"]
+
+        not_modified = client.get("/etag", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+        assert not_modified.status_code == 304
+
+    def test_same_etag_on_different_urls_not_shared(self, client):
+        """测试不同URL（含查询串）的响应即使ETag相同也不共用压缩结果"""
+        first = client.get("/etag", headers={"Accept-Encoding": "gzip"})
+        other = client.get("/etag-other", headers={"Accept-Encoding": "gzip"})
+        with patch('app.core.compression.compress_body', wraps=compression.compress_body) as compress:
+            query = client.get("/etag", params={"page": 2}, headers={"Accept-Encoding": "gzip"})
+
+        assert other.json()["data"]["rows"] == LARGE_ROWS[::-1]
+        assert first.json()["data"]["rows"] == LARGE_ROWS
+        assert compress.call_count == 1
+        assert query.json()["data"]["rows"] == LARGE_ROWS
+
+    def test_streaming_response_compressed_in_chunks(self, client):
+        response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.text.splitlines()[0] == "W0000,利群(软红长嘴)"
+        assert len(response.text.splitlines()) == len(LARGE_ROWS)
+
+    def test_raw_body_is_valid_gzip(self, client):
+        with client.stream("GET", "/large", headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+        assert json.loads(gzip.decompress(raw))["data"]["rows"] == LARGE_ROWS
@@ -0,0 +1,111 @@
+"""
+APS智慧排产系统 - 数据库查询服务测试
+
+验证服务端游标流式查询的分批行为与兼容的全量查询接口
+"""
+import pytest
+from unittest.mock import patch
+
+from app.services.database_query_service import DatabaseQueryService, DECADE_PLANS_QUERY
+
+from conftest import FakeSession, make_session_factory
+
+
+def make_decade_plan_row(index):
+    """按SELECT列顺序构造的旬计划行"""
+    values = dict(
+        id=index,
+        import_batch_id='BATCH_1',
+        work_order_nr=f'WO_{index}',
+        article_nr='A001',
+        package_type='软包',
+        specification='84mm',
+        quantity_total=100,
+        final_quantity=100,
+        production_unit='卷包车间',
+        maker_code='C1',
+        feeder_code='F1',
+        planned_start=None,
+        planned_end=None,
+        production_date_range='10.16-10.31',
+        validation_status='VALID',
+        validation_message=None
+    )
+    return tuple(values[column] for column in DECADE_PLANS_QUERY.columns)
+
+
+class TestStreamRows:
+    """流式查询基础方法测试"""
+
+    @pytest.mark.asyncio
+    async def test_stream_rows_yields_batches(self):
+        """测试按批大小分批返回并设置yield_per"""
+        session = FakeSession(rows=list(range(5)))
+
+        with patch('app.services.database_query_service.get_read_db_session', make_session_factory(session)):
+            batches = [batch async for batch in DatabaseQueryService.stream_rows('SELECT 1', batch_size=2)]
+
+        assert batches == [[0, 1], [2, 3], [4]]
+        assert session.calls[0]['execution_options'] == {'yield_per': 2}
+        assert session.calls[0]['params'] == {}
+
+    @pytest.mark.asyncio
+    async def test_stream_rows_default_batch_size(self):
+        """测试未指定批大小时使用配置值"""
+        session = FakeSession(rows=[])
+
+        with patch('app.services.database_query_service.get_read_db_session', make_session_factory(session)), \
+             patch('app.services.database_query_service.settings') as mock_settings:
+            mock_settings.db_stream_batch_size = 500
+            batches = [batch async for batch in DatabaseQueryService.stream_rows('SELECT 1')]
+
+        assert batches == []
+        assert session.calls[0]['execution_options'] == {'yield_per': 500}
+
+
+class TestDecadePlanQueries:
+    """旬计划查询测试"""
+
+    @pytest.mark.asyncio
+    async def test_stream_decade_plans_maps_rows(self):
+        """测试流式旬计划查询的行映射与过滤条件"""
+        session = FakeSession(rows=[make_decade_plan_row(i) for i in range(3)])
+
+        with patch('app.services.database_query_service.get_read_db_session', make_session_factory(session)):
+            batches = [
+                batch async for batch in DatabaseQueryService.stream_decade_plans(
+                    import_batch_id='BATCH_1', batch_size=2
+                )
+            ]
+
+        assert [len(batch) for batch in batches] == [2, 1]
+        assert batches[0][0]['work_order_nr'] == 'WO_0'
+        assert batches[1][0]['production_date_range'] == '10.16-10.31'
+        assert 'import_batch_id = :import_batch_id' in session.calls[0]['sql']
+        assert session.calls[0]['params']['import_batch_id'] == 'BATCH_1'
+
+    @pytest.mark.asyncio
+    async def test_get_decade_plans_collects_all_batches(self):
+        """测试全量查询接口汇总所有批次"""
+        session = FakeSession(rows=[make_decade_plan_row(i) for i in range(5)])
+
+        with patch('app.services.database_query_service.get_read_db_session', make_session_factory(session)), \
+             patch('app.services.database_query_service.settings') as mock_settings:
+            mock_settings.db_stream_batch_size = 2
+            plans = await DatabaseQueryService.get_decade_plans(import_batch_id='BATCH_1')
+
+        assert [plan['work_order_nr'] for plan in plans] == [f'WO_{i}' for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_get_decade_plans_primary_bypasses_replica(self):
+        """测试写入路径（primary=True）读主库，不使用只读会话"""
+        session = FakeSession(rows=[make_decade_plan_row(i) for i in range(2)])
+
+        def fail_read_session():
+            raise AssertionError("写入路径不应使用只读会话")
+
+        with patch('app.services.database_query_service.get_read_db_session', fail_read_session), \
+             patch('app.services.database_query_service.get_db_session', make_session_factory(session)):
+            plans = await DatabaseQueryService.get_decade_plans(import_batch_id='BATCH_1', primary=True)
+
+        assert len(plans) == 2
@@ -0,0 +1,113 @@
+"""
+APS智慧排产系统 - 旬计划导入写入测试
+
+验证旬计划派生字段计算与Core批量插入的分块行为
+"""
+import pytest
+from datetime import datetime
+
+from app.api.v1.plans import (
+    build_decade_plan_values,
+    bulk_insert_decade_plans,
+    create_decade_plan_record,
+)
+
+from conftest import FakeSession
+
+
+def make_record(row_number, **overrides):
+    record = {
+        'row_number': row_number,
+        'article_name': '利群（新版）',
+        'package_type': '软包',
+        'specification': '长嘴',
+        'material_input': 100,
+        'final_quantity': 98,
+        'production_unit': '卷包车间',
+        'feeder_codes': ['15'],
+        'maker_codes': ['C1', 'C2'],
+        'production_date_range': '10.16-10.31',
+        'extracted_year': 2025,
+    }
+    record.update(overrides)
+    return record
+
+
+class TestBuildDecadePlanValues:
+    """派生字段计算测试"""
+
+    def test_derived_fields(self):
+        """测试日期范围、机台代码和工单号派生"""
+        values = build_decade_plan_values('BATCH_1', make_record(7))
+
+        assert values['work_order_nr'] == 'WO_7'
+        assert values['planned_start'] == datetime(2025, 10, 16)
+        assert values['planned_end'] == datetime(2025, 10, 31)
+        assert values['maker_code'] == 'C1,C2'
+        assert values['feeder_code'] == '15'
+        assert values['article_nr'] == '利群（新版）'
+        assert values['validation_status'] == 'VALID'
+        assert values['validation_message'] is None
+
+    def test_year_from_planned_start_takes_priority(self):
+        """测试planned_start中的年份优先于提取年份"""
+        record = make_record(1, planned_start='2024-10-16T00:00:00')
+        values = build_decade_plan_values('BATCH_1', record)
+
+        assert values['planned_start'] == datetime(2024, 10, 16)
+
+    def test_validation_status(self):
+        """测试缺少牌号或机台时标记为ERROR"""
+        no_article = build_decade_plan_values('BATCH_1', make_record(1, article_name=None))
+        no_machine = build_decade_plan_values('BATCH_1', make_record(2, feeder_codes=[], maker_codes=[]))
+
+        assert no_article['validation_status'] == 'ERROR'
+        assert no_article['validation_message'] == '缺少牌号信息'
+        assert no_machine['validation_status'] == 'ERROR'
+        assert no_machine['maker_code'] == 'UNKNOWN'
+
+    def test_default_dates_when_range_missing(self):
+        """测试无日期范围时使用默认日期"""
+        values = build_decade_plan_values('BATCH_1', make_record(1, production_date_range=None))
+
+        assert values['planned_start'] == datetime(2025, 11, 1)
+        assert values['planned_end'] == datetime(2025, 11, 15)
+
+    def test_orm_record_matches_values(self):
+        """测试ORM记录与Core列值一致"""
+        record = make_record(3)
+        plan = create_decade_plan_record('BATCH_1', record)
+        values = build_decade_plan_values('BATCH_1', record)
+
+        for key, value in values.items():
+            assert getattr(plan, key) == value
+
+
+class TestBulkInsertDecadePlans:
+    """Core批量插入测试"""
+
+    @pytest.mark.asyncio
+    async def test_chunked_insert(self):
+        """测试按块执行多行insert并返回吞吐统计"""
+        db = FakeSession()
+        records = [make_record(i) for i in range(5)]
+
+        stats = await bulk_insert_decade_plans(db, 'BATCH_1', records, chunk_size=2)
+
+        assert stats['rows'] == 5
+        assert stats['chunks'] == 3
+        assert stats['rows_per_second'] > 0
+        assert len(db.statements) == 3
+        assert all(stmt.table.name == 'aps_decade_plan' for stmt in db.statements)
+        assert [len(stmt._multi_values[0]) for stmt in db.statements] == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_empty_records(self):
+        """测试空记录不执行写入"""
+        db = FakeSession()
+
+        stats = await bulk_insert_decade_plans(db, 'BATCH_1', [], chunk_size=2)
+
+        assert stats['rows'] == 0
+        assert stats['chunks'] == 0
+        assert db.statements == []
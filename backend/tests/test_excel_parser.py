@@ -335,4 +335,94 @@ class TestEdgeCases:
         result = parser._parse_machine_codes("C1、、C2")  # 连续分隔符
         assert len(result) == 2
         assert "C1" in result
-        assert "C2" in result
\ No newline at end of file
+        assert "C2" in result
+
+def _comparable(result):
+    """去除时间戳等与解析模式无关的字段"""
+    def strip(items):
+        return [{k: v for k, v in item.items() if k != 'timestamp'} for item in items]
+    return {
+        'records': result['records'],
+        'errors': strip(result['errors']),
+        'warnings': strip(result['warnings']),
+        'extracted_year': result['extracted_year'],
+        'sheets_processed': result['sheets_processed'],
+    }
+
+
+class TestStreamingMode:
+    """流式只读模式测试"""
+
+    def test_streaming_matches_full_mode(self, sample_excel_file):
+        """测试流式模式与完整模式解析结果一致（含合并单元格）"""
+        streaming = ProductionPlanExcelParser(streaming=True).parse_excel_file(sample_excel_file)
+        full = ProductionPlanExcelParser(streaming=False).parse_excel_file(sample_excel_file)
+
+        assert streaming['total_records'] > 0
+        assert _comparable(streaming) == _comparable(full)
+
+    def test_streaming_title_year_and_skip_rows(self, tmp_path):
+        """测试流式模式从标题提取年份，并跳过合计和有效期限行"""
+        file_path = tmp_path / "plan.xlsx"
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        worksheet.append(["2024年10月16～31日生产作业计划表"])
+        worksheet.append([])
+        worksheet.append(["包装", "规格", "喂丝机号", "卷包机号", "生产单元", "牌号", "本次投料", "本次成品", "成品生产日期"])
+        worksheet.append(["软包", "长嘴", "14", "C1、C2", "1", "利群(软红长嘴)", "3,200", "--", "10.16 - 10.31"])
+        worksheet.append([None, None, "13", "C3", None, None, None, None, None])
+        worksheet.append(["合计", None, None, None, None, None, "3200", "0", None])
+        worksheet.append(["有效期限：2024.10.16～10.31"])
+        workbook.save(file_path)
+
+        streaming = parse_production_plan_excel(str(file_path), streaming=True)
+        full = parse_production_plan_excel(str(file_path), streaming=False)
+
+        assert streaming['extracted_year'] == 2024
+        assert [r['row_number'] for r in streaming['records']] == [4, 5]
+        assert streaming['records'][1]['article_name'] == "利群(软红长嘴)"
+        assert streaming['records'][0]['material_input'] == 3200
+        assert streaming['records'][0]['final_quantity'] == 0
+        assert _comparable(streaming) == _comparable(full)
+
+
+class TestParallelSheets:
+    """多工作表并行解析测试"""
+
+    @pytest.fixture
+    def multi_sheet_file(self, tmp_path):
+        file_path = tmp_path / "multi.xlsx"
+        workbook = openpyxl.Workbook()
+        workbook.remove(workbook.active)
+        headers = ["包装", "规格", "喂丝机号", "卷包机号", "生产单元", "牌号", "本次投料", "本次成品", "成品生产日期"]
+        for sheet_index, year in enumerate([2024, 2025, 2026]):
+            worksheet = workbook.create_sheet(f"车间{sheet_index + 1}")
+            worksheet.append([f"{year}年11月1～15日生产作业计划表"])
+            worksheet.append([])
+            worksheet.append(headers)
+            for index in range(20):
+                worksheet.append(["软包", "长嘴", str(index + 1), f"C{index + 1}", "1",
+                                  f"利群({sheet_index}-{index // 2})", "abc" if index == 5 else "3200", "4870",
+                                  "11.1 - 11.15"])
+        workbook.create_sheet("说明").append(["本表无数据"])
+        workbook.save(file_path)
+        return str(file_path)
+
+    def test_parallel_matches_serial(self, multi_sheet_file):
+        """测试并行解析按工作表顺序合并，行号、警告与逐个解析一致"""
+        parallel = parse_production_plan_excel(multi_sheet_file, sheet_workers=3)
+        serial = parse_production_plan_excel(multi_sheet_file, sheet_workers=1)
+
+        assert parallel['sheets_processed'] == 3
+        assert [sheet['sheet_name'] for sheet in parallel['sheet_details']] == ["车间1", "车间2", "车间3"]
+        assert [sheet['extracted_year'] for sheet in parallel['sheet_details']] == [2024, 2025, 2026]
+        assert [r['row_number'] for r in parallel['records']][:3] == [4, 5, 6]
+        assert len(parallel['warnings']) == 3
+        assert _comparable(parallel) == _comparable(serial)
+
+    def test_small_files_parsed_serially(self, multi_sheet_file, monkeypatch):
+        """测试小于阈值的文件不启动工作进程"""
+        parser = ProductionPlanExcelParser()
+        monkeypatch.setattr(parser, '_parse_sheets_parallel', lambda *args: pytest.fail("不应并行解析"))
+
+        assert parser.parse_excel_file(multi_sheet_file)['sheets_processed'] == 3
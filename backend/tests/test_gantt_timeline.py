@@ -0,0 +1,186 @@
+"""
+APS智慧排产系统 - 视口甘特图测试
+
+验证机台泳道分配、按分辨率合并占用段、响应大小随视口宽度有界，以及 GET /work-orders/gantt 接口
+"""
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.gantt_timeline import build_timeline, load_timeline, merge_lane, resolve_resolution
+from app.services.reference_data_cache import VersionedCache
+from app.services.work_order_cache import WORK_ORDER_VERSION_KEY
+
+from conftest import FakeCacheManager, FakeRedis, FakeSession, make_session_factory
+
+START = datetime(2024, 10, 1)
+
+
+def schedule_row(index, start, hours, maker="C1", feeder="F1", quantity=100):
+    return SimpleNamespace(
+        work_order_nr=f"W{index:04d}", article_nr="利群(软红长嘴)",
+        maker_code=maker, feeder_code=feeder,
+        planned_start=start, planned_end=start + timedelta(hours=hours),
+        final_quantity=quantity, schedule_status="PLANNED", is_backup=False,
+    )
+
+
+class TestMergeLane:
+    """单机台合并测试"""
+
+    def test_separated_bars_kept_as_detail(self):
+        rows = [schedule_row(0, START, 2), schedule_row(1, START + timedelta(hours=3), 2)]
+
+        items = merge_lane(rows, timedelta(minutes=30))
+
+        assert [item["type"] for item in items] == ["bar", "bar"]
+        assert items[0]["work_order_nr"] == "W0000"
+
+    def test_close_bars_merged_into_segment(self):
+        rows = [
+            schedule_row(0, START, 2, quantity=100),
+            schedule_row(1, START + timedelta(hours=2, minutes=10), 2, quantity=200),
+            schedule_row(2, START + timedelta(hours=3), 2, quantity=300),  # 与上一条重叠
+            schedule_row(3, START + timedelta(hours=10), 1),
+        ]
+
+        items = merge_lane(rows, timedelta(minutes=30))
+
+        assert [item["type"] for item in items] == ["segment", "bar"]
+        segment = items[0]
+        assert segment["start"] == START
+        assert segment["end"] == START + timedelta(hours=5)
+        assert segment["bar_count"] == 3
+        assert segment["final_quantity"] == 600
+        # 并集：0-2h、2h10m-5h
+        assert segment["busy_seconds"] == (timedelta(hours=2) + timedelta(hours=2, minutes=50)).total_seconds()
+
+    def test_contained_bar_does_not_shrink_segment(self):
+        rows = [schedule_row(0, START, 10), schedule_row(1, START + timedelta(hours=1), 1)]
+
+        items = merge_lane(rows, timedelta(0))
+
+        assert items[0]["end"] == START + timedelta(hours=10)
+        assert items[0]["busy_seconds"] == timedelta(hours=10).total_seconds()
+
+
+class TestBuildTimeline:
+    """泳道与细节层级测试"""
+
+    def test_row_appears_in_maker_and_feeder_lanes(self):
+        rows = [schedule_row(0, START, 2, maker="C1", feeder="F1"), schedule_row(1, START, 2, maker="C2", feeder="F1")]
+
+        timeline = build_timeline(rows, START, START + timedelta(days=1), None, 60)
+
+        lanes = {lane["machine_code"]: lane["items"] for lane in timeline["lanes"]}
+        assert set(lanes) == {"C1", "C2", "F1"}
+        assert lanes["F1"][0]["type"] == "segment"
+        assert timeline["bar_count"] == 2
+        assert timeline["level"] == "aggregate"
+
+    def test_machine_filter_limits_lanes(self):
+        rows = [schedule_row(0, START, 2, maker="C1", feeder="F1")]
+
+        timeline = build_timeline(rows, START, START + timedelta(days=1), ["C1"], 60)
+
+        assert [lane["machine_code"] for lane in timeline["lanes"]] == ["C1"]
+        assert timeline["level"] == "detail"
+
+    def test_item_count_bounded_by_viewport_width(self):
+        """测试一个月内数千条工单在窄视口下的条目数不超过视口宽度"""
+        rows, cursor = [], START
+        for index in range(600):
+            rows.append(schedule_row(index, cursor, 0.25))
+            # 工单间隔45分钟，每7条之后停机6小时
+            cursor += timedelta(hours=6) if index % 7 == 6 else timedelta(hours=1)
+        end = START + timedelta(days=31)
+
+        narrow = build_timeline(rows, START, end, None, resolve_resolution(START, end, 200))
+        wide = build_timeline(rows, START, end, None, resolve_resolution(START, end, 8000))
+
+        for lane in narrow["lanes"]:
+            assert 1 < len(lane["items"]) <= 200 + 1
+        assert narrow["item_count"] < wide["item_count"] == 2 * len(rows)
+        assert sum(item.get("bar_count", 1) for lane in narrow["lanes"] for item in lane["items"]) == 2 * len(rows)
+
+    def test_bucket_seconds_overrides_width(self):
+        assert resolve_resolution(START, START + timedelta(hours=1), 60) == 60
+        assert resolve_resolution(START, START + timedelta(hours=1), 60, bucket_seconds=900) == 900
+
+
+@pytest.mark.asyncio
+async def test_load_timeline_queries_window_overlap():
+    """测试查询条件为窗口重叠加机台过滤，并使用服务端游标读取"""
+    db = FakeSession(rows=[schedule_row(0, START, 2)])
+
+    timeline = await load_timeline(db, START, START + timedelta(days=1), machines=["C1"], task_id="T1", width=1000)
+
+    sql = db.calls[0]['sql']
+    assert "planned_start <" in sql and "planned_end >" in sql
+    assert "maker_code IN" in sql and "feeder_code IN" in sql
+    assert "task_id =" in sql
+    assert "yield_per" in db.calls[0]['execution_options']
+    assert timeline["lanes"][0]["items"][0]["work_order_nr"] == "W0000"
+
+
+@pytest.mark.asyncio
+async def test_load_timeline_merges_across_batches():
+    """测试跨批次到达的相邻工单合并为同一占用段，与一次性合并结果一致"""
+    rows = [schedule_row(index, START + timedelta(hours=index), 1) for index in range(6)]
+    end = START + timedelta(days=1)
+
+    with patch('app.services.gantt_timeline.settings.db_stream_batch_size', 4):
+        timeline = await load_timeline(FakeSession(rows=rows), START, end, width=100)
+
+    assert timeline == build_timeline(rows, START, end, None, resolve_resolution(START, end, 100))
+    assert timeline["lanes"][0]["items"][0]["bar_count"] == 6
+
+
+class TestGanttEndpoint:
+    """GET /work-orders/gantt 接口测试"""
+
+    @pytest.fixture
+    def client(self):
+        cache = VersionedCache(WORK_ORDER_VERSION_KEY, FakeCacheManager(FakeRedis({WORK_ORDER_VERSION_KEY: "1"})),
+                               enabled_setting="work_order_cache_enabled")
+        with patch('app.api.v1.work_orders.work_order_cache', cache), \
+             patch('app.api.v1.work_orders.is_read_replica_enabled', return_value=False), \
+             patch('app.api.v1.work_orders.get_read_db_session', make_session_factory(FakeSession())):
+            yield TestClient(app)
+
+    def test_returns_timeline_with_etag(self, client):
+        timeline = build_timeline([schedule_row(0, START, 2)], START, START + timedelta(days=1), None, 72)
+        with patch('app.api.v1.work_orders.load_timeline', AsyncMock(return_value=timeline)) as loader:
+            response = client.get("/api/v1/work-orders/gantt", params={
+                "start": "2024-10-01T00:00:00", "end": "2024-10-02T00:00:00",
+                "machines": "C1, F1", "width": 1200
+            })
+            not_modified = client.get("/api/v1/work-orders/gantt", params={
+                "start": "2024-10-01T00:00:00", "end": "2024-10-02T00:00:00",
+                "machines": "C1, F1", "width": 1200
+            }, headers={"If-None-Match": response.headers["etag"]})
+
+        assert response.status_code == 200
+        payload = json.loads(response.content)
+        assert payload["data"]["lanes"][0]["items"][0]["start"] == "2024-10-01T00:00:00"
+        assert loader.call_args.args[3] == ["C1", "F1"]
+        assert not_modified.status_code == 304
+        assert loader.await_count == 1
+
+    def test_rejects_sub_pixel_gap(self, client):
+        """测试 min_gap_px 小于1时拒绝请求（否则条目数不再受视口宽度限制）"""
+        response = client.get("/api/v1/work-orders/gantt", params={
+            "start": "2024-10-01T00:00:00", "end": "2024-10-02T00:00:00", "min_gap_px": 0
+        })
+        assert response.status_code == 422
+
+    def test_rejects_empty_window(self, client):
+        response = client.get("/api/v1/work-orders/gantt", params={
+            "start": "2024-10-02T00:00:00", "end": "2024-10-01T00:00:00"
+        })
+        assert response.status_code == 400
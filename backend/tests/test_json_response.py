@@ -0,0 +1,135 @@
+"""
+APS智慧排产系统 - 大列表接口JSON响应测试
+
+验证快速序列化与 jsonable_encoder + 标准库json 的输出一致、响应字段与Pydantic模型一致
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from app.api.v1.plans import build_parse_result_data
+from app.core import responses
+from app.core.responses import FastJSONResponse, dumps_json, success_payload
+from app.db.connection import get_read_session
+from app.main import app
+from app.schemas.base import ParseErrorInfo, ParseResult, ParseResultRecord, ResponseStatus, SuccessResponse
+
+SAMPLE = {
+    "name": "利群(软红长嘴)",
+    "planned_start": datetime(2024, 10, 16, 8, 30, 15, 123456),
+    "plan_date": date(2024, 10, 16),
+    "shift_start": time(8, 0),
+    "quantity": Decimal("3200"),
+    "ratio": Decimal("0.25"),
+    "status": ResponseStatus.SUCCESS,
+    "codes": ["C1", "C2"],
+    "missing": None,
+    "nested": [{"is_backup": False, "count": 3}],
+}
+
+
+class TestDumpsJson:
+    """序列化测试"""
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_matches_jsonable_encoder(self, use_orjson):
+        """测试datetime/date/time/Decimal/Enum的输出与FastAPI默认路径一致"""
+        expected = json.loads(json.dumps(jsonable_encoder(SAMPLE), ensure_ascii=False))
+        with patch.object(responses, 'orjson', responses.orjson if use_orjson else None):
+            body = dumps_json(SAMPLE)
+            pretty = dumps_json(SAMPLE, pretty=True)
+
+        assert json.loads(body) == expected
+        assert json.loads(pretty) == expected
+        assert "利群".encode("utf-8") in body
+        assert b"\n  " in pretty
+
+    def test_unsupported_type_raises(self):
+        with pytest.raises(TypeError):
+            dumps_json({"value": object()})
+
+    def test_response_renders_with_fast_encoder(self):
+        response = FastJSONResponse(content={"time": datetime(2024, 1, 1)})
+        assert response.body == b'{"time":"2024-01-01T00:00:00"}'
+        assert response.media_type == "application/json"
+
+
+class TestResponsePayloads:
+    """响应格式测试"""
+
+    def test_success_payload_matches_model(self):
+        data = {"plans": [{"planned_start": "2024-10-16T00:00:00"}]}
+        payload = json.loads(dumps_json(success_payload(data, "查询成功")))
+        model = json.loads(SuccessResponse(message="查询成功", data=data).model_dump_json())
+
+        assert list(payload) == list(model)
+        payload.pop("timestamp"), model.pop("timestamp")
+        assert payload == model
+
+    def test_parse_result_data_matches_model(self):
+        """测试解析响应与逐条构建 ParseResultRecord 的结果一致（忽略解析器的附加字段）"""
+        parse_result = {
+            'total_records': 2, 'valid_records': 1, 'error_records': 1, 'warning_records': 0,
+            'records': [
+                {'row_number': 4, 'article_name': '利群', 'maker_codes': ['C1'], 'feeder_codes': ['14'],
+                 'material_input': 3200, 'planned_start': '2024-10-16T00:00:00', 'extracted_year': 2024},
+                {'row_number': 5, 'article_name': None},
+            ],
+            'errors': [{'type': 'error', 'message': '行5: 缺少机台信息', 'timestamp': '2024-10-16T08:00:00'}],
+            'warnings': [],
+        }
+        model = ParseResult(
+            import_batch_id="BATCH_1",
+            **{key: parse_result[key] for key in ('total_records', 'valid_records', 'error_records', 'warning_records')},
+            records=[ParseResultRecord(**record) for record in parse_result['records']],
+            errors=[ParseErrorInfo(**error) for error in parse_result['errors']],
+            warnings=[],
+        )
+
+        fast = json.loads(dumps_json(build_parse_result_data("BATCH_1", parse_result)))
+        expected = json.loads(model.model_dump_json())
+
+        assert list(fast) == list(expected)
+        fast.pop("parse_time"), expected.pop("parse_time")
+        assert fast == expected
+
+
+class TestDecadePlansEndpoint:
+    """旬计划查询接口测试"""
+
+    def test_decade_plans_response(self):
+        plan = MagicMock(
+            work_order_nr="W0001", article_nr="利群", package_type="软包", specification="长嘴",
+            feeder_code="14", maker_code="C1", quantity_total=3200, final_quantity=4870,
+            planned_start=datetime(2024, 10, 16), planned_end=datetime(2024, 10, 31),
+            row_number=4, validation_status="VALID", validation_message=None
+        )
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = [plan]
+        session = MagicMock()
+
+        async def execute(*args, **kwargs):
+            return result
+
+        session.execute = execute
+
+        async def override_session():
+            yield session
+
+        app.dependency_overrides[get_read_session] = override_session
+        try:
+            response = TestClient(app).get("/api/v1/plans/BATCH_1/decade-plans")
+        finally:
+            app.dependency_overrides.pop(get_read_session, None)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "success"
+        assert body["data"]["total_plans"] == 1
+        assert body["data"]["plans"][0]["planned_start"] == "2024-10-16T00:00:00"
+        assert body["data"]["plans"][0]["article_nr"] == "利群"
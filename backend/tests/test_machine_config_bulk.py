@@ -0,0 +1,198 @@
+"""
+APS智慧排产系统 - 机台配置批量写入测试
+
+验证JSON/CSV解析、整批校验、分块 INSERT ... ON DUPLICATE KEY UPDATE 单事务写入、
+批量删除，以及每批只使缓存失效一次
+"""
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import mysql
+
+from app.main import app
+from app.api.v1.machines import BULK_TABLE_SPECS
+from app.db.connection import get_async_session
+from app.services.machine_config_bulk import BulkValidationError, MachineConfigBulkService, parse_bulk_payload
+
+from conftest import FakeSession
+
+
+def speed_items(count):
+    return [{
+        "machine_code": f"C{index % 40 + 1}", "article_nr": f"利群{index}",
+        "speed": 120.5, "efficiency_rate": 85, "effective_from": "2024-10-01T00:00:00",
+    } for index in range(count)]
+
+
+class TestParsePayload:
+    """请求体解析测试"""
+
+    def test_json_array_and_items_object(self):
+        assert parse_bulk_payload(b'[{"a": 1}]', "application/json") == [{"a": 1}]
+        assert parse_bulk_payload(b'{"items": [{"a": 1}]}', None) == [{"a": 1}]
+        with pytest.raises(BulkValidationError):
+            parse_bulk_payload(b'{"a": 1}', "application/json")
+
+    def test_csv_with_bom_and_empty_cells(self):
+        body = "\ufeffmachine_code,article_nr,speed,efficiency_rate,status\nC1,利群,120,85,\n".encode("utf-8")
+
+        items = parse_bulk_payload(body, "text/csv; charset=utf-8")
+
+        assert items == [{"machine_code": "C1", "article_nr": "利群", "speed": "120", "efficiency_rate": "85"}]
+
+    def test_csv_gb18030_and_undecodable(self):
+        body = "machine_code,article_nr\nC1,利群\n".encode("gb18030")
+        assert parse_bulk_payload(body, "text/csv") == [{"machine_code": "C1", "article_nr": "利群"}]
+
+        with pytest.raises(BulkValidationError, match="CSV编码无法识别"):
+            parse_bulk_payload(b"machine_code\nC1\x81", "text/csv")
+
+
+class TestValidateRows:
+    """整批校验测试"""
+
+    def test_collects_all_errors(self):
+        items = speed_items(3)
+        items[0]["speed"] = "快"
+        del items[2]["machine_code"]
+
+        with pytest.raises(BulkValidationError) as error:
+            MachineConfigBulkService.validate_rows(BULK_TABLE_SPECS["machine-speeds"], items)
+
+        assert [entry["row"] for entry in error.value.errors] == [1, 3]
+
+    def test_duplicate_keys_last_row_wins(self):
+        items = speed_items(2) + [dict(speed_items(1)[0], speed=99)]
+
+        rows = MachineConfigBulkService.validate_rows(BULK_TABLE_SPECS["machine-speeds"], items)
+
+        assert len(rows) == 2
+        assert rows[0]["speed"] == 99
+        assert rows[0]["effective_from"] == date(2024, 10, 1)
+
+    def test_table_checks(self):
+        plan = {"plan_code": "M1", "machine_code": "C1", "maintenance_type": "轮保",
+                "planned_start_time": "2024-10-02T08:00:00", "planned_end_time": "2024-10-02T06:00:00"}
+        with pytest.raises(BulkValidationError) as error:
+            MachineConfigBulkService.validate_rows(BULK_TABLE_SPECS["maintenance-plans"], [plan])
+        assert "结束时间" in error.value.errors[0]["errors"][0]
+
+    def test_row_limit(self):
+        with patch('app.services.machine_config_bulk.settings.machine_bulk_max_rows', 2):
+            with pytest.raises(BulkValidationError):
+                MachineConfigBulkService.validate_rows(BULK_TABLE_SPECS["machine-speeds"], speed_items(3))
+
+
+@pytest.mark.asyncio
+async def test_upsert_chunks_in_one_transaction():
+    spec = BULK_TABLE_SPECS["maintenance-plans"]
+    items = [{"plan_code": f"M{index}", "machine_code": "C1", "maintenance_type": "轮保",
+              "planned_start_time": "2024-10-02T08:00:00", "planned_end_time": "2024-10-02T12:00:00"}
+             for index in range(5)]
+    rows = MachineConfigBulkService.validate_rows(spec, items)
+    db = FakeSession()
+
+    with patch('app.services.machine_config_bulk.settings.machine_bulk_chunk_size', 2), \
+         patch('app.services.machine_config_bulk.invalidate_reference_data', AsyncMock()) as invalidate:
+        result = await MachineConfigBulkService.upsert(db, spec, rows)
+
+    assert result["statements"] == 3
+    assert db.commits == 1
+    invalidate.assert_awaited_once()
+    sql = str(db.statements[0].compile(dialect=mysql.dialect()))
+    assert sql.startswith("INSERT INTO aps_maintenance_plan")
+    update_clause = sql.split("ON DUPLICATE KEY UPDATE")[1]
+    assert "maint_start_time = VALUES(maint_start_time)" in update_clause
+    # 唯一键与仅新增时填写的字段不更新
+    assert "maint_plan_no =" not in update_clause
+    assert "equipment_position" not in update_clause
+
+
+@pytest.mark.asyncio
+async def test_upsert_failure_rolls_back_without_invalidation():
+    spec = BULK_TABLE_SPECS["machine-speeds"]
+    rows = MachineConfigBulkService.validate_rows(spec, speed_items(5))
+    db = FakeSession(fail_on=2)
+
+    with patch('app.services.machine_config_bulk.settings.machine_bulk_chunk_size', 2), \
+         patch('app.services.machine_config_bulk.invalidate_reference_data', AsyncMock()) as invalidate:
+        with pytest.raises(RuntimeError):
+            await MachineConfigBulkService.upsert(db, spec, rows)
+
+    assert (db.commits, db.rollbacks) == (0, 1)
+    invalidate.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_delete_by_unique_key():
+    spec = BULK_TABLE_SPECS["machine-relations"]
+    mode, targets = MachineConfigBulkService.resolve_delete_targets(
+        spec, [{"feeder_code": "15", "maker_code": "C1", "effective_from": "2024-10-01"}]
+    )
+    db = FakeSession()
+
+    with patch('app.services.machine_config_bulk.invalidate_reference_data', AsyncMock()):
+        await MachineConfigBulkService.delete(db, spec, mode, targets)
+
+    sql = str(db.statements[0].compile(dialect=mysql.dialect()))
+    assert "(aps_machine_relation.feeder_code, aps_machine_relation.maker_code, aps_machine_relation.effective_from) IN" in sql
+    assert db.commits == 1
+
+
+def test_delete_targets_reject_mixed_and_invalid():
+    spec = BULK_TABLE_SPECS["machines"]
+    assert MachineConfigBulkService.resolve_delete_targets(spec, [1, {"id": "2"}]) == ("id", [1, 2])
+    with pytest.raises(BulkValidationError):
+        MachineConfigBulkService.resolve_delete_targets(spec, [1, {"machine_code": "C1"}])
+    with pytest.raises(BulkValidationError):
+        MachineConfigBulkService.resolve_delete_targets(spec, ["abc"])
+
+
+class TestBulkEndpoints:
+    """批量接口测试"""
+
+    @pytest.fixture
+    def client(self):
+        db = FakeSession()
+
+        async def session():
+            yield db
+
+        app.dependency_overrides[get_async_session] = session
+        with patch('app.services.machine_config_bulk.invalidate_reference_data', AsyncMock()):
+            test_client = TestClient(app)
+            test_client.db = db
+            yield test_client
+        app.dependency_overrides.pop(get_async_session, None)
+
+    def test_csv_upsert(self, client):
+        body = "shift_name,shift_code,start_time,end_time,is_active\n早班,ALL,08:00,16:00,true\n中班,ALL,16:00,00:00,1\n"
+
+        response = client.post("/api/v1/machines/shift-configs/bulk", content=body.encode("utf-8"),
+                               headers={"Content-Type": "text/csv"})
+
+        assert response.status_code == 200
+        assert response.json()["data"]["rows"] == 2
+        assert client.db.commits == 1
+
+    def test_invalid_rows_rejected(self, client):
+        response = client.post("/api/v1/machines/machines/bulk", json=[
+            {"machine_code": "C1", "machine_name": "卷包机1", "machine_type": "PACKING"},
+            {"machine_code": "C2", "machine_name": "卷包机2", "machine_type": "OTHER"},
+        ])
+
+        assert response.status_code == 422
+        assert response.json()["detail"]["errors"][0]["row"] == 2
+        assert client.db.statements == []
+
+    def test_undecodable_csv_rejected(self, client):
+        response = client.post("/api/v1/machines/shift-configs/bulk", content=b"shift_name\n\x81",
+                               headers={"Content-Type": "text/csv"})
+
+        assert response.status_code == 422
+        assert "CSV编码无法识别" in response.json()["detail"]["message"]
+
+    def test_unknown_table(self, client):
+        assert client.post("/api/v1/machines/materials/bulk", json=[]).status_code == 404
@@ -0,0 +1,155 @@
+"""
+APS智慧排产系统 - MES客户端测试
+
+通过 httpx.ASGITransport 调用本地MES替身服务，验证分批、并发上限、退避重试、幂等键去重
+和 MESIntegrationService 的客户端接入
+"""
+import random
+from datetime import datetime
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services.mes_client import MESClient, order_idempotency_key
+from app.services.mes_integration import MESIntegrationService
+from app.services.mes_stub_server import MESStubConfig, create_mes_stub_app
+
+
+def make_orders(count, prefix="HJB"):
+    return [{
+        'plan_id': f"{prefix}{index:06d}", 'production_line': f"C{index % 40 + 1}",
+        'material_code': '利群(软红长嘴)', 'quantity': 500,
+        'plan_start_time': datetime(2024, 10, 16, 8), 'order_status': 'PLANNED',
+    } for index in range(count)]
+
+
+def make_client(config=None, **kwargs):
+    stub_app = create_mes_stub_app(config)
+    options = dict(batch_size=100, max_concurrency=4, retry_base_delay=0.001, rng=random.Random(0))
+    options.update(kwargs)
+    client = MESClient("http://mes.test", transport=httpx.ASGITransport(app=stub_app), **options)
+    return client, stub_app.state.stub
+
+
+@pytest.mark.asyncio
+async def test_batches_with_concurrency_limit():
+    client, stub = make_client(MESStubConfig(latency=0.01), batch_size=50, max_concurrency=3)
+
+    async with client:
+        result = await client.send_work_orders(make_orders(1000))
+
+    assert (result['accepted_count'], result['failed_count'], result['batch_count']) == (1000, 0, 20)
+    assert stub.requests == 20
+    assert stub.max_in_flight == 3
+    assert len(stub.orders) == 1000
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors():
+    client, stub = make_client(MESStubConfig(fail_next=2), max_retries=3)
+
+    async with client:
+        result = await client.send_work_orders(make_orders(10))
+
+    assert result['accepted_count'] == 10
+    assert result['retry_count'] == 2
+    assert stub.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_reported_as_failed():
+    client, stub = make_client(MESStubConfig(fail_next=10), max_retries=2, batch_size=5)
+
+    async with client:
+        result = await client.send_work_orders(make_orders(5))
+
+    assert (result['accepted_count'], result['failed_count']) == (0, 5)
+    assert "503" in result['failed_orders'][0]['reason']
+    assert stub.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_not_retried():
+    client, stub = make_client(MESStubConfig(fail_next=1, error_status=400))
+
+    async with client:
+        result = await client.send_work_orders(make_orders(3))
+
+    assert result['failed_count'] == 3
+    assert stub.requests == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("content", [b"<html>gateway</html>", b'["accepted"]'])
+async def test_malformed_success_body_reported_as_failed(content):
+    """测试2xx响应体不是JSON对象时按批次记为失败，不抛出到调用方"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, content=content)
+
+    client = MESClient("http://mes.test", transport=httpx.MockTransport(handler), batch_size=2)
+
+    async with client:
+        result = await client.send_work_orders(make_orders(3))
+
+    assert (result['accepted_count'], result['failed_count']) == (0, 3)
+    assert "MES响应不是" in result['failed_orders'][0]['reason']
+    assert len(requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_idempotent_resend_and_rejections():
+    client, stub = make_client(MESStubConfig(reject_rate=0.2))
+    orders = make_orders(200)
+
+    async with client:
+        first = await client.send_work_orders(orders)
+        second = await client.send_work_orders(orders)
+
+    assert 0 < first['rejected_count'] < 200
+    assert first['accepted_orders'] == second['accepted_orders']
+    assert first['rejected_orders'] == second['rejected_orders']
+    assert stub.duplicates == 200
+    assert len(stub.orders) == first['accepted_count']
+
+
+def test_idempotency_key_tracks_content():
+    order = make_orders(1)[0]
+
+    key = order_idempotency_key(order)
+
+    assert key.startswith("HJB000000:")
+    assert order_idempotency_key(dict(order, idempotency_key=key)) == key
+    assert order_idempotency_key(dict(order, quantity=600)) != key
+
+
+def test_backoff_delay_bounds():
+    client = MESClient("http://mes.test", retry_base_delay=0.2, retry_max_delay=1.0, rng=random.Random(1))
+
+    delays = [client.backoff_delay(retry) for retry in range(6) for _ in range(20)]
+
+    assert all(0 <= delay <= 1.0 for delay in delays)
+    assert max(client.backoff_delay(0) for _ in range(50)) <= 0.2
+    assert client.backoff_delay(0, retry_after=3) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_integration_service_uses_client():
+    client, stub = make_client()
+    orders = [{'work_order_nr': f"WO{index}"} for index in range(3)] + [{'quantity': 1}]
+
+    with patch('app.services.mes_integration.settings.mes_base_url', "http://mes.test"), \
+         patch('app.services.mes_integration.get_mes_client', return_value=client):
+        service = MESIntegrationService()
+        pushed = await service.send_work_order_to_mes(orders)
+        statuses = await service.get_work_order_status(["WO0", "WO9"])
+    await client.aclose()
+
+    assert pushed.success
+    assert pushed.data['accepted_count'] == 3
+    assert pushed.data['rejected_count'] == 1
+    assert [status['status'] for status in statuses.data['statuses']] == ['PLANNED', 'NOT_FOUND']
+    assert service.work_order_statuses == {}
@@ -0,0 +1,350 @@
+"""
+APS智慧排产系统 - MES工单下发发件箱测试
+
+下发记录表使用本地SQLite数据库，MES使用本地替身服务（httpx.ASGITransport），验证写入、领取、
+结果回写、MES停机后的追赶、租约到期后的重新下发（至少投递一次）和后台分发器
+"""
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.db.connection import get_async_session, get_read_session
+from app.models.work_order_models import MESDispatch
+from app.services.mes_client import MESClient
+from app.services.mes_outbox import (
+    MESOutboxDispatcher, MESOutboxService, OutboxValidationError, infer_order_type
+)
+from app.services.mes_stub_server import MESStubConfig, create_mes_stub_app
+
+DISPATCH_TABLE_DDL = """
+CREATE TABLE aps_mes_dispatch (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dispatch_batch_id VARCHAR(50) NOT NULL,
+    work_order_nr VARCHAR(50) NOT NULL,
+    order_type VARCHAR(10) NOT NULL,
+    dispatch_status VARCHAR(20) DEFAULT 'PENDING',
+    dispatch_time DATETIME,
+    dispatch_data JSON,
+    mes_response JSON,
+    mes_confirm_time DATETIME,
+    mes_error_message TEXT,
+    retry_count INTEGER DEFAULT 0,
+    max_retry_count INTEGER DEFAULT 3,
+    next_retry_time DATETIME,
+    created_time DATETIME,
+    updated_time DATETIME
+)
+"""
+
+
+def make_orders(count, prefix="HJB"):
+    return [{
+        'plan_id': f"{prefix}{index:09d}", 'production_line': 'C1', 'material_code': '利群(软红长嘴)',
+        'quantity': 500, 'plan_start_time': '2024/10/16 08:00:00', 'order_status': 'PLANNED',
+    } for index in range(count)]
+
+
+def create_session_factory(tmp_path):
+    """本地SQLite下发记录表；NullPool使连接在使用它的事件循环中创建（TestClient运行在独立事件循环）"""
+    pytest.importorskip("aiosqlite")
+    url = f"sqlite+aiosqlite:///{tmp_path / 'aps.db'}"
+
+    async def create_table():
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.execute(text(DISPATCH_TABLE_DDL))
+        await engine.dispose()
+
+    asyncio.run(create_table())
+    factory = async_sessionmaker(create_async_engine(url, poolclass=NullPool), expire_on_commit=False)
+
+    @asynccontextmanager
+    async def db_session():
+        async with factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    return factory, db_session
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    factory, db_session = create_session_factory(tmp_path)
+    with patch('app.services.mes_outbox.get_db_session', db_session):
+        yield factory
+
+
+@pytest.fixture
+def mes():
+    stub_app = create_mes_stub_app(MESStubConfig())
+    client = MESClient("http://mes.test", transport=httpx.ASGITransport(app=stub_app),
+                       batch_size=50, max_retries=0, rng=random.Random(0))
+    return client, stub_app.state.stub
+
+
+async def enqueue(session_factory, orders, batch_id="SCHEDULE_20241016"):
+    async with session_factory() as db:
+        count = await MESOutboxService.enqueue(db, orders, batch_id)
+        await db.commit()
+    return count
+
+
+async def load_records(session_factory):
+    async with session_factory() as db:
+        result = await db.execute(select(MESDispatch).order_by(MESDispatch.id))
+        return result.scalars().all()
+
+
+async def make_due(session_factory):
+    """跳过退避等待：所有待重试记录立即到期"""
+    async with session_factory() as db:
+        await db.execute(text("UPDATE aps_mes_dispatch SET next_retry_time = :now WHERE dispatch_status = 'PENDING'"),
+                         {'now': datetime.now() - timedelta(seconds=1)})
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_confirms_and_rejects(session_factory, mes):
+    client, stub = mes
+    stub.config.reject_rate = 0.2
+    await enqueue(session_factory, make_orders(120))
+
+    stats = await MESOutboxDispatcher(client, batch_size=500).dispatch_once()
+
+    records = await load_records(session_factory)
+    confirmed = [record for record in records if record.dispatch_status == 'CONFIRMED']
+    failed = [record for record in records if record.dispatch_status == 'FAILED']
+    assert stats['claimed'] == 120
+    assert len(confirmed) == stats['confirmed'] == len(stub.orders)
+    assert len(failed) == stats['rejected'] > 0
+    assert failed[0].mes_response['status'] == 'REJECTED'
+    assert confirmed[0].mes_confirm_time is not None
+
+
+@pytest.mark.asyncio
+async def test_catches_up_after_outage(session_factory, mes):
+    client, stub = mes
+    await enqueue(session_factory, make_orders(30))
+    dispatcher = MESOutboxDispatcher(client, batch_size=10)
+
+    stub.config.fail_next = 100
+    stats = await dispatcher.dispatch_once()
+    assert stats['retrying'] == 10
+    pending = [record for record in await load_records(session_factory) if record.retry_count == 1]
+    assert len(pending) == 10
+    assert all(record.dispatch_status == 'PENDING' and record.next_retry_time > datetime.now() for record in pending)
+
+    # MES恢复，退避间隔置0后积压记录在后续领取中全部下发
+    stub.config.fail_next = 0
+    await make_due(session_factory)
+    with patch('app.services.mes_outbox.settings.mes_outbox_retry_base_delay', 0):
+        while (await dispatcher.dispatch_once())['claimed']:
+            pass
+
+    records = await load_records(session_factory)
+    assert {record.dispatch_status for record in records} == {'CONFIRMED'}
+    assert len(stub.orders) == 30
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_redelivered_once(session_factory, mes):
+    client, stub = mes
+    orders = make_orders(5)
+    await enqueue(session_factory, orders)
+
+    # 推送成功后、回写结果前进程中断：记录停留在 DISPATCHED
+    claimed = await MESOutboxService.claim_batch(10)
+    await client.send_work_orders([record['dispatch_data'] for record in claimed])
+    assert await MESOutboxService.claim_batch(10) == []
+
+    later = datetime.now() + timedelta(seconds=301)
+    reclaimed = await MESOutboxService.claim_batch(10, now=later)
+    result = await client.send_work_orders([record['dispatch_data'] for record in reclaimed])
+    await MESOutboxService.record_results(reclaimed, result)
+
+    assert len(reclaimed) == 5
+    assert stub.duplicates == 5
+    assert len(stub.orders) == 5
+    assert {record.dispatch_status for record in await load_records(session_factory)} == {'CONFIRMED'}
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_counts_as_retry(session_factory):
+    """测试租约反复过期（推送中进程崩溃）计入重试次数，达到上限后标记为FAILED不再领取"""
+    with patch('app.services.mes_outbox.settings.mes_outbox_max_retries', 2):
+        await enqueue(session_factory, make_orders(2))
+
+    now = datetime.now()
+    claimed = await MESOutboxService.claim_batch(10, now=now)
+    now += timedelta(seconds=301)
+    reclaimed = await MESOutboxService.claim_batch(10, now=now)
+    assert [record['retry_count'] for record in claimed] == [0, 0]
+    assert [record['retry_count'] for record in reclaimed] == [1, 1]
+
+    now += timedelta(seconds=301)
+    assert await MESOutboxService.claim_batch(10, now=now) == []
+    records = await load_records(session_factory)
+    assert {(record.dispatch_status, record.retry_count) for record in records} == {('FAILED', 2)}
+    assert "租约过期" in records[0].mes_error_message
+
+
+@pytest.mark.asyncio
+async def test_enqueue_rejects_orders_without_plan_id(session_factory):
+    orders = make_orders(3)
+    orders[1] = {**orders[1], 'plan_id': None}
+
+    with pytest.raises(OutboxValidationError) as excinfo:
+        await enqueue(session_factory, orders)
+
+    assert excinfo.value.errors == [{'index': 1, 'reason': '工单缺少 plan_id/work_order_nr'}]
+    assert await load_records(session_factory) == []
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries(session_factory):
+    with patch('app.services.mes_outbox.settings.mes_outbox_max_retries', 2):
+        await enqueue(session_factory, make_orders(3))
+    client = MagicMock(send_work_orders=AsyncMock(side_effect=RuntimeError("连接被拒绝")))
+    dispatcher = MESOutboxDispatcher(client, batch_size=10)
+
+    await dispatcher.dispatch_once()
+    await make_due(session_factory)
+    stats = await dispatcher.dispatch_once()
+
+    records = await load_records(session_factory)
+    assert stats['failed'] == 3
+    assert {(record.dispatch_status, record.retry_count) for record in records} == {('FAILED', 2)}
+    assert records[0].mes_error_message == "连接被拒绝"
+
+
+@pytest.mark.asyncio
+async def test_background_dispatcher_drains_on_notify(session_factory, mes):
+    client, stub = mes
+    dispatcher = MESOutboxDispatcher(client, batch_size=20, poll_interval=60)
+    dispatcher.start()
+    try:
+        await asyncio.sleep(0)
+        await enqueue(session_factory, make_orders(50))
+        dispatcher.notify()
+        for _ in range(200):
+            if len(stub.orders) == 50:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await dispatcher.stop()
+
+    assert len(stub.orders) == 50
+    assert {record.dispatch_status for record in await load_records(session_factory)} == {'CONFIRMED'}
+
+
+@pytest.mark.asyncio
+async def test_enqueue_task_orders_reads_archived_task():
+    """测试已归档任务从归档表读取工单"""
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(fetchall=MagicMock(return_value=[])))
+
+    with patch('app.services.mes_outbox.WorkOrderArchiveService.resolve_task_table',
+               AsyncMock(side_effect=lambda table, task_id, session: f"{table}_archive")):
+        await MESOutboxService.enqueue_task_orders(db, "T1")
+
+    sql = [str(call.args[0]) for call in db.execute.call_args_list]
+    assert "FROM aps_feeding_order_archive" in sql[0]
+    assert "FROM aps_packing_order_archive" in sql[1]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_task_orders_uses_mes_format():
+    row = SimpleNamespace(
+        plan_id="HWS000000001", production_line="15", batch_code=None, material_code="利群", bom_revision=None,
+        quantity=None, plan_start_time=datetime(2024, 10, 16, 8), plan_end_time=datetime(2024, 10, 16, 20),
+        sequence=1, shift=None, is_vaccum=0, is_sh93=0, is_hdt=0, is_flavor=0, unit="公斤",
+        plan_date=datetime(2024, 10, 16).date(), plan_output_quantity=None, is_outsourcing=0, is_backup=0,
+        order_status="PLANNED", task_id="T1",
+    )
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=[
+        MagicMock(fetchall=MagicMock(return_value=[row])), None,
+        MagicMock(fetchall=MagicMock(return_value=[])),
+    ])
+
+    with patch('app.services.mes_outbox.WorkOrderArchiveService.resolve_task_table',
+               AsyncMock(side_effect=lambda table, task_id, session: table)) as resolve:
+        counts = await MESOutboxService.enqueue_task_orders(db, "T1")
+
+    assert counts == {'FEEDING': 1, 'PACKING': 0}
+    assert [call.args for call in resolve.call_args_list] == [
+        ('aps_feeding_order', "T1", db), ('aps_packing_order', "T1", db)
+    ]
+    assert "FROM aps_feeding_order" in str(db.execute.call_args_list[0].args[0])
+    inserted = db.execute.call_args_list[1].args[1][0]
+    assert inserted['order_type'] == 'FEEDING'
+    assert inserted['dispatch_batch_id'] == "T1"
+    assert inserted['dispatch_data']['plan_start_time'] == '2024/10/16 08:00:00'
+    assert 'task_id' not in inserted['dispatch_data']
+
+
+def test_infer_order_type():
+    assert infer_order_type({'plan_id': 'HWS000000001'}) == 'FEEDING'
+    assert infer_order_type({'work_order_nr': 'HJB000000001'}) == 'PACKING'
+    assert infer_order_type({'plan_id': 'X1', 'order_type': 'feeding'}) == 'FEEDING'
+
+
+class TestOutboxEndpoints:
+    """下发队列接口测试"""
+
+    @pytest.fixture
+    def client(self, session_factory):
+        async def session():
+            async with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_async_session] = session
+        app.dependency_overrides[get_read_session] = session
+        yield TestClient(app)
+        app.dependency_overrides.pop(get_async_session, None)
+        app.dependency_overrides.pop(get_read_session, None)
+
+    def test_push_enqueue_and_status(self, client):
+        with patch('app.api.v1.mes.settings.mes_outbox_enabled', True):
+            response = client.post("/api/v1/mes/work-orders/push", params={"enqueue": True},
+                                   json={"work_orders": make_orders(3, prefix="HWS")})
+        assert response.status_code == 200
+        batch_id = response.json()["data"]["dispatch_batch_id"]
+
+        status = client.get("/api/v1/mes/outbox", params={"dispatch_batch_id": batch_id}).json()["data"]
+
+        assert status["status_counts"]["PENDING"] == 3
+        assert status["oldest_pending_time"] is not None
+        assert [record["order_type"] for record in status["records"]] == ["FEEDING"] * 3
+
+    def test_push_enqueue_rejects_orders_without_plan_id(self, client):
+        orders = make_orders(3)
+        orders[2] = {key: value for key, value in orders[2].items() if key != 'plan_id'}
+        with patch('app.api.v1.mes.settings.mes_outbox_enabled', True):
+            response = client.post("/api/v1/mes/work-orders/push", params={"enqueue": True},
+                                   json={"work_orders": orders})
+
+        assert response.status_code == 422
+        assert response.json()["detail"]["errors"] == [{'index': 2, 'reason': '工单缺少 plan_id/work_order_nr'}]
+        assert client.get("/api/v1/mes/outbox").json()["data"]["total"] == 0
+
+    def test_enqueue_requires_outbox_enabled(self, client):
+        response = client.post("/api/v1/mes/work-orders/push", params={"enqueue": True},
+                               json={"work_orders": make_orders(1)})
+        assert response.status_code == 400
+        assert client.get("/api/v1/mes/outbox", params={"dispatch_status": "DONE"}).status_code == 400
@@ -0,0 +1,144 @@
+"""
+APS智慧排产系统 - MES文档流式导出测试
+
+验证逐批输出的XML/JSON文档与一次性生成的MES文档逐字节一致，以及gzip压缩、写文件和导出接口
+"""
+import gzip
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.mes_data_export_service import MESDataExportService
+
+
+def feeding_order(index):
+    return {
+        'plan_id': f'F{index:05d}', 'production_line': 'L"1<&>', 'batch_code': None,
+        'material_code': '利群(软红长嘴)', 'bom_revision': None, 'quantity': None,
+        'plan_start_time': '2024/10/16 08:00:00', 'plan_end_time': '2024/10/16 20:00:00',
+        'sequence': index, 'shift': None, 'is_vaccum': False, 'is_sh93': True, 'is_hdt': False,
+        'is_flavor': False, 'unit': '公斤', 'plan_date': '2024/10/16', 'plan_output_quantity': None,
+        'is_outsourcing': False, 'is_backup': False, 'order_status': 'PLANNED',
+    }
+
+
+def packing_order(index):
+    input_batch = {
+        'input_plan_id': f'F{index:05d}', 'input_batch_code': None, 'quantity': '3', 'batch_sequence': 1,
+        'is_whole_batch': True, 'is_main_channel': True, 'is_deleted': False, 'is_last_one': None,
+        'material_code': '利群(软红长嘴)', 'bom_revision': None, 'tiled': None, 'remark1': None, 'remark2': None,
+    }
+    return {
+        'plan_id': f'P{index:05d}', 'production_line': 'C1', 'batch_code': None,
+        'material_code': '利群(软红长嘴)', 'bom_revision': None, 'quantity': 500 + index,
+        'plan_start_time': '2024/10/16 08:00:00', 'plan_end_time': '2024/10/16 20:00:00',
+        'sequence': 1, 'shift': None, 'input_batch': input_batch if index % 2 else None,
+        'is_vaccum': False, 'is_sh93': False, 'is_hdt': False, 'is_flavor': False, 'unit': '箱',
+        'plan_date': '2024/10/16', 'plan_output_quantity': None,
+        'is_outsourcing': False, 'is_backup': index == 0, 'order_status': 'PLANNED',
+    }
+
+
+def batches(orders, batch_size=2):
+    async def iterate():
+        for offset in range(0, len(orders), batch_size):
+            yield orders[offset:offset + batch_size]
+    return iterate()
+
+
+async def collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+CASES = [(5, 3), (0, 2), (4, 0), (0, 0)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("feeding_count,packing_count", CASES)
+async def test_streamed_xml_matches_generated_document(feeding_count, packing_count):
+    service = MESDataExportService()
+    feeding = [feeding_order(index) for index in range(feeding_count)]
+    packing = [packing_order(index) for index in range(packing_count)]
+    export_data = {'task_id': 'T1', 'export_time': '2024-10-16T08:00:00',
+                   'feeding_orders_count': feeding_count, 'packing_orders_count': packing_count}
+
+    streamed = await collect(service._iter_mes_xml(export_data, batches(feeding), batches(packing)))
+
+    expected = service._generate_mes_xml(dict(export_data, feeding_orders=feeding, packing_orders=packing))
+    assert streamed.decode("utf-8") == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("pretty", [True, False])
+@pytest.mark.parametrize("feeding_count,packing_count", CASES)
+async def test_streamed_json_matches_generated_document(feeding_count, packing_count, pretty):
+    service = MESDataExportService()
+    service.config.pretty_format = pretty
+    feeding = [feeding_order(index) for index in range(feeding_count)]
+    packing = [packing_order(index) for index in range(packing_count)]
+    export_data = {'date_range': {'start_date': '2024-10-01T00:00:00', 'end_date': '2024-10-31T00:00:00'},
+                   'export_time': '2024-10-16T08:00:00',
+                   'feeding_orders_count': feeding_count, 'packing_orders_count': packing_count}
+
+    streamed = await collect(service._iter_mes_json(export_data, batches(feeding), batches(packing)))
+
+    expected = service._generate_mes_json(dict(export_data, feeding_orders=feeding, packing_orders=packing))
+    assert streamed.decode("utf-8") == expected
+
+
+@pytest.fixture
+def mocked_service():
+    service = MESDataExportService()
+    feeding = [feeding_order(index) for index in range(3)]
+    packing = [packing_order(index) for index in range(2)]
+    with patch.object(service, '_count_orders', AsyncMock(side_effect=[3, 2])), \
+         patch.object(service, 'stream_feeding_orders_by_task', return_value=batches(feeding)), \
+         patch.object(service, 'stream_packing_orders_by_task', return_value=batches(packing)), \
+         patch('app.services.mes_data_export_service.WorkOrderArchiveService.resolve_task_table',
+               AsyncMock(side_effect=lambda table, task_id: table)):
+        yield service
+
+
+@pytest.mark.asyncio
+async def test_stream_export_by_task_gzip(mocked_service):
+    compressed = await collect(mocked_service.stream_export_by_task('T1', 'XML', compress=True))
+
+    document = gzip.decompress(compressed).decode("utf-8")
+    assert "<FeedingOrdersCount>3</FeedingOrdersCount>" in document
+    assert document.count("<PackingOrder>") == 2
+    assert document.endswith("</MESWorkOrders>\n")
+
+
+@pytest.mark.asyncio
+async def test_write_export_file(mocked_service, tmp_path):
+    file_path = tmp_path / "mes.json"
+
+    written = await mocked_service.write_export_file(mocked_service.stream_export_by_task('T1', 'JSON'), str(file_path))
+
+    assert written == file_path.stat().st_size
+    assert '"feeding_orders_count": 3' in file_path.read_text(encoding="utf-8")
+
+
+class TestExportEndpoint:
+    """GET /mes/work-orders/export 接口测试"""
+
+    def test_streams_document(self):
+        async def chunks():
+            yield b'<?xml version="1.0" encoding="utf-8"?>\n'
+            yield b"<MESWorkOrders/>\n"
+
+        with patch.object(MESDataExportService, 'stream_export_by_task', return_value=chunks()) as stream:
+            response = TestClient(app).get("/api/v1/mes/work-orders/export", params={"task_id": "T1", "compress": True})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/gzip"
+        assert 'filename="mes_work_orders_T1.xml.gz"' in response.headers["content-disposition"]
+        assert stream.call_args.kwargs["compress"] is True
+
+    def test_requires_task_or_date_range(self):
+        client = TestClient(app)
+        assert client.get("/api/v1/mes/work-orders/export").status_code == 400
+        assert client.get("/api/v1/mes/work-orders/export",
+                          params={"task_id": "T1", "export_format": "csv"}).status_code == 400
@@ -0,0 +1,244 @@
+"""
+APS智慧排产系统 - 上传文件内容去重与解析结果缓存测试
+
+验证上传时分块计算内容哈希、相同内容只保存一份、按内容哈希复用解析结果
+"""
+import asyncio
+import copy
+import hashlib
+import io
+import os
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.api.v1.plans import parse_excel_background, save_uploaded_file
+from app.db.cache import CacheManager
+from app.services import parse_result_cache
+from app.services.excel_parser import PARSER_VERSION
+from app.models.base_models import DecadePlan, ImportPlan
+from app.services.parse_result_cache import ParseResultCache
+
+from conftest import FakeBinaryRedis
+
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    with patch('app.api.v1.plans.settings.upload_temp_dir', str(tmp_path)), \
+         patch('app.api.v1.plans.settings.upload_read_chunk_size', 4):
+        yield tmp_path
+
+
+@pytest.fixture
+def redis():
+    fake = FakeBinaryRedis()
+    # 线程池模式解析，使打桩的解析函数生效
+    with patch.object(parse_result_cache, '_cache_manager', CacheManager(client=fake, local=None, serializer='pickle')), \
+         patch('app.services.parse_worker_pool.settings.excel_parse_workers', 0):
+        yield fake
+
+
+PARSE_RESULT = {
+    'total_records': 1,
+    'valid_records': 1,
+    'error_records': 0,
+    'warning_records': 0,
+    'records': [{'article_name': '利群', 'maker_codes': ['C1']}],
+    'errors': [],
+    'warnings': [],
+    'sheets_processed': 1,
+    'sheet_details': [{'sheet_name': 'Sheet1', 'total_records': 1}],
+}
+
+
+class TestSaveUploadedFile:
+    """上传文件保存测试"""
+
+    @pytest.mark.asyncio
+    async def test_hash_computed_while_streaming(self, upload_dir):
+        """测试分块读取时计算SHA-256，文件按内容哈希命名"""
+        content = b"PK\x03\x04 plan content"
+        file_path, content_hash, file_size = await save_uploaded_file(
+            UploadFile(file=io.BytesIO(content), filename="计划.XLSX")
+        )
+
+        assert content_hash == hashlib.sha256(content).hexdigest()
+        assert file_size == len(content)
+        assert file_path == os.path.join(str(upload_dir), f"{content_hash}.xlsx")
+        with open(file_path, 'rb') as f:
+            assert f.read() == content
+
+    @pytest.mark.asyncio
+    async def test_same_content_stored_once(self, upload_dir):
+        """测试相同内容重复上传只保存一份，不残留临时文件"""
+        content = b"same workbook bytes"
+        first = await save_uploaded_file(UploadFile(file=io.BytesIO(content), filename="a.xlsx"))
+        second = await save_uploaded_file(UploadFile(file=io.BytesIO(content), filename="b.xlsx"))
+
+        assert first == second
+        assert os.listdir(upload_dir) == [os.path.basename(first[0])]
+
+    @pytest.mark.asyncio
+    async def test_size_limit_enforced_while_streaming(self, upload_dir):
+        """测试未声明大小的上传在读取过程中超限即中止，并清理临时文件"""
+        with patch('app.api.v1.plans.settings.upload_max_size', 10):
+            with pytest.raises(HTTPException) as exc_info:
+                await save_uploaded_file(UploadFile(file=io.BytesIO(b"x" * 11), filename="big.xlsx"))
+
+            file_path, _, file_size = await save_uploaded_file(
+                UploadFile(file=io.BytesIO(b"x" * 10), filename="ok.xlsx")
+            )
+
+        assert exc_info.value.status_code == 400
+        assert file_size == 10
+        assert os.listdir(upload_dir) == [os.path.basename(file_path)]
+
+
+class TestParseResultCache:
+    """解析结果缓存测试"""
+
+    def test_cache_key_includes_parser_version(self):
+        assert ParseResultCache.cache_key('abc') == f"aps:parse_result:{PARSER_VERSION}:abc"
+
+    @pytest.mark.asyncio
+    async def test_known_hash_skips_parser(self, redis):
+        """测试相同内容第二次解析直接返回缓存结果"""
+        with patch('app.services.parse_result_cache.parse_production_plan_excel', side_effect=lambda path: copy.deepcopy(PARSE_RESULT)) as parser:
+            first, first_hit = await ParseResultCache.parse('/tmp/a.xlsx', 'abc')
+            first['records'].clear()
+            second, second_hit = await ParseResultCache.parse('/tmp/b.xlsx', 'abc')
+
+        assert parser.call_count == 1
+        assert (first_hit, second_hit) == (False, True)
+        assert second['records'] == PARSE_RESULT['records']
+        assert second['sheet_details'] == PARSE_RESULT['sheet_details']
+        assert await ParseResultCache.exists('abc')
+
+    @pytest.mark.asyncio
+    async def test_force_reparse_ignores_cache(self, redis):
+        """测试强制重新解析时不读取缓存"""
+        with patch('app.services.parse_result_cache.parse_production_plan_excel', side_effect=lambda path: copy.deepcopy(PARSE_RESULT)) as parser:
+            await ParseResultCache.parse('/tmp/a.xlsx', 'abc')
+            _, hit = await ParseResultCache.parse('/tmp/a.xlsx', 'abc', force=True)
+
+        assert parser.call_count == 2
+        assert hit is False
+
+    @pytest.mark.asyncio
+    async def test_hash_computed_from_file_when_missing(self, redis, tmp_path):
+        """测试历史批次未记录内容哈希时从文件计算"""
+        path = tmp_path / "plan.xlsx"
+        path.write_bytes(b"legacy upload")
+
+        with patch('app.services.parse_result_cache.parse_production_plan_excel', side_effect=lambda path: copy.deepcopy(PARSE_RESULT)):
+            await ParseResultCache.parse(str(path))
+
+        assert ParseResultCache.cache_key(hashlib.sha256(b"legacy upload").hexdigest()) in redis.store
+
+
+IMPORT_TABLES_DDL = [
+    """
+    CREATE TABLE aps_import_plan (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, import_batch_id VARCHAR(50) NOT NULL UNIQUE,
+        file_name VARCHAR(255) NOT NULL, file_path VARCHAR(500), file_size BIGINT, content_hash VARCHAR(64),
+        total_records BIGINT, valid_records BIGINT, error_records BIGINT, import_status VARCHAR(20),
+        import_start_time DATETIME, import_end_time DATETIME, error_message TEXT, created_by VARCHAR(100),
+        created_time DATETIME, updated_time DATETIME
+    )
+    """,
+    """
+    CREATE TABLE aps_decade_plan (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, import_batch_id VARCHAR(50) NOT NULL,
+        work_order_nr VARCHAR(50) NOT NULL, article_nr VARCHAR(100) NOT NULL, package_type VARCHAR(50),
+        specification VARCHAR(50), quantity_total BIGINT NOT NULL, final_quantity BIGINT NOT NULL,
+        production_unit VARCHAR(50), maker_code VARCHAR(100) NOT NULL, feeder_code VARCHAR(100) NOT NULL,
+        planned_start DATETIME NOT NULL, planned_end DATETIME NOT NULL, production_date_range VARCHAR(100),
+        row_number BIGINT, validation_status VARCHAR(20), validation_message TEXT,
+        created_time DATETIME, updated_time DATETIME
+    )
+    """,
+]
+
+
+@pytest.fixture
+def import_db(tmp_path):
+    """本地SQLite导入记录表与旬计划表：已完成批次 SOURCE（2条旬计划）和待解析批次 NEW"""
+    pytest.importorskip("aiosqlite")
+    url = f"sqlite+aiosqlite:///{tmp_path / 'aps.db'}"
+
+    async def create_tables():
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            for ddl in IMPORT_TABLES_DDL:
+                await conn.execute(text(ddl))
+            await conn.execute(text(
+                "INSERT INTO aps_import_plan (import_batch_id, file_name, total_records, valid_records, "
+                "error_records, import_status) VALUES ('SOURCE', 'a.xlsx', 2, 2, 0, 'COMPLETED'), "
+                "('NEW', 'b.xlsx', 0, 0, 0, 'PARSING')"
+            ))
+            await conn.execute(text(
+                "INSERT INTO aps_decade_plan (import_batch_id, work_order_nr, article_nr, quantity_total, "
+                "final_quantity, maker_code, feeder_code, planned_start, planned_end) VALUES "
+                "('SOURCE', 'WO1', '利群', 10, 10, 'C1', '14', '2024-10-16 00:00:00', '2024-10-31 23:59:59'), "
+                "('SOURCE', 'WO2', '利群', 20, 20, 'C2', '14', '2024-10-16 00:00:00', '2024-10-31 23:59:59')"
+            ))
+        await engine.dispose()
+
+    asyncio.run(create_tables())
+    factory = async_sessionmaker(create_async_engine(url, poolclass=NullPool), expire_on_commit=False)
+
+    @asynccontextmanager
+    async def db_session():
+        async with factory() as session:
+            yield session
+
+    with patch('app.api.v1.plans.get_db_session', db_session), \
+         patch('app.api.v1.plans.settings.plan_import_pipeline_enabled', True):
+        yield factory
+
+
+class TestPipelinedImportReuse:
+    """流水线导入批次标记测试"""
+
+    @pytest.mark.asyncio
+    async def test_pipelined_import_records_batch_marker(self, redis, import_db):
+        """测试流水线导入完成后记录批次标记，上传接口的 parse_result_cached 随之为真"""
+        with patch('app.api.v1.plans.import_excel_pipelined', AsyncMock()) as pipelined:
+            await parse_excel_background("NEW", "/tmp/plan.xlsx", "abc")
+
+        pipelined.assert_awaited_once()
+        assert await ParseResultCache.get_imported_batch("abc") == "NEW"
+        assert await ParseResultCache.is_cached("abc")
+
+    @pytest.mark.asyncio
+    async def test_same_content_copies_completed_batch(self, redis, import_db):
+        """测试相同内容再次导入时复制已完成批次的旬计划记录，不再解析"""
+        await ParseResultCache.set_imported_batch("abc", "SOURCE")
+
+        with patch('app.api.v1.plans.import_excel_pipelined', AsyncMock()) as pipelined:
+            await parse_excel_background("NEW", "/tmp/plan.xlsx", "abc")
+
+        pipelined.assert_not_awaited()
+        async with import_db() as db:
+            copied = (await db.execute(
+                select(DecadePlan.work_order_nr).where(DecadePlan.import_batch_id == "NEW").order_by(DecadePlan.id)
+            )).scalars().all()
+            plan = (await db.execute(select(ImportPlan).where(ImportPlan.import_batch_id == "NEW"))).scalar_one()
+        assert copied == ["WO1", "WO2"]
+        assert (plan.import_status, plan.total_records, plan.valid_records) == ("COMPLETED", 2, 2)
+
+    @pytest.mark.asyncio
+    async def test_missing_source_batch_falls_back_to_pipeline(self, redis, import_db):
+        """测试标记指向的批次已不存在（如被覆盖上传删除）时重新流水线导入"""
+        await ParseResultCache.set_imported_batch("abc", "DELETED")
+
+        with patch('app.api.v1.plans.import_excel_pipelined', AsyncMock()) as pipelined:
+            await parse_excel_background("NEW", "/tmp/plan.xlsx", "abc")
+
+        pipelined.assert_awaited_once()
+        assert await ParseResultCache.get_imported_batch("abc") == "NEW"
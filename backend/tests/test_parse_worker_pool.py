@@ -0,0 +1,172 @@
+"""
+APS智慧排产系统 - Excel解析进程池测试
+
+验证解析在独立进程中执行且不阻塞事件循环、工作进程异常退出后的恢复，
+以及解析接口的后台任务模式
+"""
+import asyncio
+import os
+import time
+import pytest
+import openpyxl
+from contextlib import asynccontextmanager
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.main import app
+from app.api.v1.plans import parse_excel_background
+from app.db.connection import get_async_session
+from app.services import parse_worker_pool
+from app.services.excel_parser import ExcelParseError, parse_production_plan_excel
+from app.services.parse_worker_pool import run_in_parse_pool, shutdown_parse_executor
+
+HEADERS = ["包装", "规格", "喂丝机号", "卷包机号", "生产单元", "牌号", "本次投料", "本次成品", "成品生产日期"]
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    file_path = tmp_path / "plan.xlsx"
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    worksheet.append(["2024年10月16～31日生产作业计划表"])
+    worksheet.append([])
+    worksheet.append(HEADERS)
+    for index in range(3000):
+        worksheet.append(["软包", "长嘴", str(index % 30 + 1), f"C{index % 40 + 1}", "1",
+                          "利群(软红长嘴)", str(1000 + index), str(2000 + index), "10.16 - 10.31"])
+    workbook.save(file_path)
+    return str(file_path)
+
+
+@pytest.fixture
+def process_pool():
+    with patch('app.services.parse_worker_pool.settings.excel_parse_workers', 1):
+        yield
+        shutdown_parse_executor()
+
+
+class TestParseWorkerPool:
+    """解析进程池测试"""
+
+    @pytest.mark.asyncio
+    async def test_parse_in_process_pool_keeps_loop_responsive(self, workbook_path, process_pool):
+        """测试进程池解析结果与进程内一致，解析期间事件循环保持响应"""
+        gaps = []
+
+        async def ticker(stop):
+            last = time.perf_counter()
+            while not stop.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        stop = asyncio.Event()
+        ticker_task = asyncio.create_task(ticker(stop))
+        result = await run_in_parse_pool(parse_production_plan_excel, workbook_path)
+        stop.set()
+        await ticker_task
+
+        assert result['records'] == parse_production_plan_excel(workbook_path)['records']
+        assert result['total_records'] == 3000
+        assert max(gaps) < 0.5
+
+    @pytest.mark.asyncio
+    async def test_broken_worker_raises_parse_error_and_pool_recovers(self, workbook_path, process_pool):
+        """测试工作进程异常退出时抛出解析错误，之后重建进程池"""
+        with pytest.raises(ExcelParseError):
+            await run_in_parse_pool(os._exit, 1)
+
+        assert parse_worker_pool._executor is None
+        result = await run_in_parse_pool(parse_production_plan_excel, workbook_path)
+        assert result['total_records'] == 3000
+
+    @pytest.mark.asyncio
+    async def test_zero_workers_uses_thread_pool(self):
+        """测试工作进程数为0时在线程池中执行"""
+        with patch('app.services.parse_worker_pool.settings.excel_parse_workers', 0):
+            assert await run_in_parse_pool(os.getpid) == os.getpid()
+            assert parse_worker_pool._executor is None
+
+
+class TestBackgroundParseEndpoint:
+    """解析接口后台任务模式测试"""
+
+    def test_background_parse_returns_202_and_schedules_job(self, workbook_path):
+        import_plan = MagicMock(import_status="UPLOADED", file_path=workbook_path, content_hash="abc")
+        query_result = MagicMock()
+        query_result.scalar_one_or_none.return_value = import_plan
+        session = AsyncMock()
+        session.execute.return_value = query_result
+
+        async def override_session():
+            yield session
+
+        app.dependency_overrides[get_async_session] = override_session
+        try:
+            with patch('app.api.v1.plans.parse_excel_background', AsyncMock()) as job:
+                response = TestClient(app).post("/api/v1/plans/BATCH_1/parse", params={"background": True})
+        finally:
+            app.dependency_overrides.pop(get_async_session, None)
+
+        assert response.status_code == 202
+        body = response.json()
+        assert body["data"]["status"] == "PARSING"
+        assert body["data"]["status_url"] == "/api/v1/plans/BATCH_1/status"
+        session.commit.assert_awaited()
+        job.assert_awaited_once_with("BATCH_1", workbook_path, "abc", False)
+
+
+class RecordingSession:
+    """记录导入记录状态更新与提交顺序"""
+
+    def __init__(self):
+        self.events = []
+
+    async def execute(self, statement, params=None):
+        values = statement.compile().params if hasattr(statement, 'compile') else {}
+        if 'import_status' in values:
+            self.events.append(('status', values['import_status']))
+
+    async def commit(self):
+        self.events.append(('commit', None))
+
+    async def rollback(self):
+        self.events.append(('rollback', None))
+
+
+class TestBackgroundParseJob:
+    """后台解析任务测试"""
+
+    PARSE_RESULT = {'total_records': 1, 'valid_records': 1, 'error_records': 0, 'records': [{'article_name': '利群'}]}
+
+    async def run_job(self, write):
+        session = RecordingSession()
+
+        @asynccontextmanager
+        async def db_session():
+            yield session
+
+        with patch('app.api.v1.plans.get_db_session', db_session), \
+             patch('app.api.v1.plans.settings.plan_import_pipeline_enabled', False), \
+             patch('app.api.v1.plans.ParseResultCache.parse', AsyncMock(return_value=(self.PARSE_RESULT, True))), \
+             patch('app.api.v1.plans.write_parse_results_to_decade_plan', write):
+            await parse_excel_background("BATCH_1", "/tmp/plan.xlsx", "abc")
+        return session.events
+
+    @pytest.mark.asyncio
+    async def test_plans_and_completed_status_committed_together(self):
+        """测试旬计划写入与COMPLETED状态在同一次提交中"""
+        write = AsyncMock(return_value={'rows': 1})
+
+        events = await self.run_job(write)
+
+        write.assert_awaited_once()
+        assert events == [('status', 'COMPLETED'), ('commit', None)]
+
+    @pytest.mark.asyncio
+    async def test_write_failure_marks_import_failed(self):
+        """测试旬计划写入失败时导入记录标记为FAILED，不会先提交COMPLETED"""
+        events = await self.run_job(AsyncMock(side_effect=RuntimeError("数据库写入失败")))
+
+        assert events == [('rollback', None), ('status', 'FAILED'), ('commit', None)]
@@ -0,0 +1,141 @@
+"""
+APS智慧排产系统 - 旬计划聚合数值分配测试
+
+以原逐条分配实现为参照，对随机生成的记录序列验证向量化分配结果完全一致
+"""
+import random
+import pytest
+
+from app.services.plan_allocation import StreamingAggregateAllocator, allocate_aggregate_values
+
+
+def reference_allocate(records):
+    """原逐条实现（去除打印），作为分配结果的参照"""
+    groups = []
+    current_group = []
+    for record in records:
+        article_name = record.get('article_name', 'UNKNOWN')
+        material_input = record.get('material_input', 0) or 0
+        final_quantity = record.get('final_quantity', 0) or 0
+        should_group = False
+        if current_group:
+            last_record = current_group[-1]
+            last_material = last_record.get('material_input', 0) or 0
+            last_final = last_record.get('final_quantity', 0) or 0
+            row_diff = record.get('row_number', 0) - last_record.get('row_number', 0)
+            should_group = (
+                article_name == last_record.get('article_name', 'UNKNOWN') and
+                material_input == last_material and
+                final_quantity == last_final and
+                (material_input > 0 or final_quantity > 0) and
+                (last_material > 0 or last_final > 0) and
+                1 <= row_diff <= 2
+            )
+        if should_group:
+            current_group.append(record.copy())
+        else:
+            if current_group:
+                groups.append(current_group)
+            current_group = [record.copy()]
+    if current_group:
+        groups.append(current_group)
+
+    processed_records = []
+    for group_records in groups:
+        if len(group_records) == 1:
+            processed_records.append(group_records[0])
+            continue
+        total_material = group_records[0].get('material_input', 0) or 0
+        total_final = group_records[0].get('final_quantity', 0) or 0
+        if total_material == 0 and total_final == 0:
+            processed_records.extend(group_records)
+            continue
+        machine_count = len(group_records)
+        material_per_machine = total_material // machine_count if total_material > 0 else 0
+        final_per_machine = total_final // machine_count if total_final > 0 else 0
+        material_remainder = total_material % machine_count if total_material > 0 else 0
+        final_remainder = total_final % machine_count if total_final > 0 else 0
+        for i, record in enumerate(group_records):
+            record['material_input'] = material_per_machine + (1 if i < material_remainder else 0)
+            record['final_quantity'] = final_per_machine + (1 if i < final_remainder else 0)
+            record['_allocation_info'] = {
+                'original_material_input': total_material,
+                'original_final_quantity': total_final,
+                'machine_count': machine_count,
+                'allocation_method': 'equal_distribution'
+            }
+            processed_records.append(record)
+    return processed_records
+
+
+def random_records(rng, with_floats=False):
+    """生成带合并单元格特征的记录：连续同牌号同数值、行号间隔、0/None/负数和缺失字段"""
+    records = []
+    row_number = rng.randint(0, 5)
+    while len(records) < rng.randint(0, 60):
+        article = rng.choice(['利群(软红长嘴)', '利群(新版)', None])
+        material = rng.choice([0, None, -3, rng.randint(1, 20), rng.randint(1, 20000)])
+        final = rng.choice([0, None, rng.randint(1, 20), rng.randint(1, 30000)])
+        if with_floats and rng.random() < 0.3:
+            material = float(rng.randint(1, 50)) + rng.choice([0.0, 0.5])
+        for _ in range(rng.randint(1, 6)):
+            record = {'article_name': article, 'material_input': material,
+                      'final_quantity': final, 'row_number': row_number, 'maker_codes': ['C1']}
+            for field in ('article_name', 'material_input', 'final_quantity'):
+                if rng.random() < 0.03:
+                    del record[field]
+            records.append(record)
+            row_number += rng.choice([1, 1, 1, 2, 3])
+    return records
+
+
+def assert_same(actual, expected):
+    assert actual == expected
+    for actual_record, expected_record in zip(actual, expected):
+        for field in ('material_input', 'final_quantity'):
+            assert type(actual_record.get(field)) is type(expected_record.get(field))
+
+
+class TestAllocateAggregateValues:
+    """聚合数值分配测试"""
+
+    @pytest.mark.parametrize("seed", range(200))
+    def test_matches_reference_on_random_records(self, seed):
+        """性质测试：任意记录序列的分配结果与原实现一致"""
+        rng = random.Random(seed)
+        records = random_records(rng, with_floats=seed % 4 == 0)
+        snapshot = [record.copy() for record in records]
+
+        assert_same(allocate_aggregate_values(records), reference_allocate(records))
+        assert records == snapshot
+
+    def test_remainder_goes_to_first_records(self):
+        records = [
+            {'article_name': '利群', 'material_input': 10, 'final_quantity': 7, 'row_number': row}
+            for row in (4, 5, 7)
+        ]
+
+        result = allocate_aggregate_values(records)
+
+        assert [r['material_input'] for r in result] == [4, 3, 3]
+        assert [r['final_quantity'] for r in result] == [3, 2, 2]
+        assert result[0]['_allocation_info']['machine_count'] == 3
+
+    def test_empty(self):
+        assert allocate_aggregate_values([]) == []
+
+    @pytest.mark.parametrize("seed", range(50))
+    def test_streaming_allocator_matches_single_pass(self, seed):
+        """性质测试：任意分块方式下分块分配与整体分配一致"""
+        rng = random.Random(seed)
+        records = random_records(rng)
+        allocator = StreamingAggregateAllocator()
+        result = []
+        offset = 0
+        while offset < len(records):
+            size = rng.randint(1, 8)
+            result.extend(allocator.feed(records[offset:offset + size]))
+            offset += size
+        result.extend(allocator.finish())
+
+        assert_same(result, allocate_aggregate_values(records))
@@ -0,0 +1,136 @@
+"""
+APS智慧排产系统 - 旬计划分块导入流水线测试
+
+验证分块流式解析与整体解析结果一致、流水线写入的行与原导入流程一致、
+阶段间队列有界，以及写入失败时解析线程停止
+"""
+import pytest
+import openpyxl
+from unittest.mock import patch
+
+from app.api.v1.plans import build_decade_plan_values, save_parse_results_to_decade_plan
+from app.services.excel_parser import ProductionPlanExcelParser, parse_production_plan_excel
+from app.services.plan_import_pipeline import PlanImportPipeline
+
+from conftest import FakeSession
+
+HEADERS = ["包装", "规格", "喂丝机号", "卷包机号", "生产单元", "牌号", "本次投料", "本次成品", "成品生产日期"]
+
+
+@pytest.fixture
+def plan_file(tmp_path):
+    """两个工作表：第一个标题含年份，第二个年份只在末尾的有效期限行；每3行一个聚合组"""
+    file_path = tmp_path / "plan.xlsx"
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for sheet_index in range(2):
+        worksheet = workbook.create_sheet(f"车间{sheet_index + 1}")
+        worksheet.append(["2024年10月16～31日生产作业计划表" if sheet_index == 0 else "生产作业计划表"])
+        worksheet.append([])
+        worksheet.append(HEADERS)
+        for index in range(100):
+            group = index // 3
+            first = index % 3 == 0
+            worksheet.append([
+                "软包" if index % 10 == 0 else None, "长嘴" if index % 10 == 0 else None,
+                str(index % 30 + 1), f"C{index % 40 + 1}", "1",
+                f"利群({sheet_index}-{group})", str(1000 + group), str(2000 + group),
+                "10.16 - 10.31" if first else None,
+            ])
+        if sheet_index == 1:
+            worksheet.append(["有效期限：2025.10.16～10.31"])
+    workbook.save(file_path)
+    return str(file_path)
+
+
+class RecordingInsert:
+    """替代 sqlalchemy.insert，记录每条INSERT的行"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, table):
+        return self
+
+    def values(self, rows):
+        self.statements.append(list(rows))
+        return ('insert', len(rows))
+
+    @property
+    def rows(self):
+        return [row for statement in self.statements for row in statement]
+
+
+def _stream(file_path, chunk_size):
+    chunks = []
+    summary = ProductionPlanExcelParser().stream_excel_file(file_path, chunks.append, chunk_size)
+    return chunks, summary
+
+
+class TestStreamExcelFile:
+    """分块流式解析测试"""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+    def test_chunks_match_full_parse(self, plan_file, chunk_size):
+        """测试各块拼接后与整体解析的记录一致（含跨块传播和末尾年份）"""
+        chunks, summary = _stream(plan_file, chunk_size)
+        full = parse_production_plan_excel(plan_file, streaming=True)
+
+        assert all(len(chunk) <= chunk_size for chunk in chunks)
+        assert [record for chunk in chunks for record in chunk] == full['records']
+        for key in ('total_records', 'valid_records', 'error_records', 'extracted_year', 'sheets_processed'):
+            assert summary[key] == full[key]
+        assert 'records' not in summary
+        assert [sheet['extracted_year'] for sheet in summary['sheet_details']] == [2024, 2025]
+
+
+class TestPlanImportPipeline:
+    """流水线导入测试"""
+
+    @pytest.mark.asyncio
+    async def test_pipeline_inserts_same_rows_as_sequential_import(self, plan_file):
+        """测试流水线写入的行（含跨块聚合分配）与整体解析后导入一致"""
+        sequential_insert, pipeline_insert = RecordingInsert(), RecordingInsert()
+        with patch('app.api.v1.plans.insert', sequential_insert), \
+             patch('app.services.parse_worker_pool.settings.excel_parse_workers', 0):
+            await save_parse_results_to_decade_plan(
+                FakeSession(), "BATCH_1", parse_production_plan_excel(plan_file)
+            )
+
+        session = FakeSession()
+        with patch('app.services.plan_import_pipeline.insert', pipeline_insert):
+            pipeline = PlanImportPipeline(
+                session, "BATCH_1", build_decade_plan_values, chunk_size=7, queue_size=2, insert_chunk_size=5
+            )
+            summary = await pipeline.run(plan_file)
+
+        assert len(pipeline_insert.rows) == 200
+        assert pipeline_insert.rows == sequential_insert.rows
+        assert max(len(statement) for statement in pipeline_insert.statements) <= 5
+        assert summary['total_records'] == 200
+        assert summary['import_stats']['rows'] == 200
+        assert summary['import_stats']['max_queued_chunks'] <= 2
+        # 事务由调用方提交
+        assert session.commits == 0
+
+    @pytest.mark.asyncio
+    async def test_insert_failure_stops_parsing(self, plan_file):
+        """测试写入失败时异常抛给调用方，解析线程不再继续输出"""
+        emitted = []
+        original = ProductionPlanExcelParser.stream_excel_file
+
+        def counting_stream(self, file_path, on_chunk, chunk_size=None):
+            def on_chunk_counted(records):
+                emitted.append(len(records))
+                on_chunk(records)
+            return original(self, file_path, on_chunk_counted, chunk_size)
+
+        with patch('app.services.plan_import_pipeline.insert', RecordingInsert()), \
+             patch.object(ProductionPlanExcelParser, 'stream_excel_file', counting_stream):
+            pipeline = PlanImportPipeline(
+                FakeSession(fail_on=3), "BATCH_1", build_decade_plan_values, chunk_size=2, queue_size=1
+            )
+            with pytest.raises(RuntimeError):
+                await pipeline.run(plan_file)
+
+        assert sum(emitted) < 200
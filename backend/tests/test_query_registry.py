@@ -0,0 +1,118 @@
+"""
+APS智慧排产系统 - 预编译查询注册表测试
+
+验证语句缓存、可选条件组合、参数绑定以及按列下标的行映射
+"""
+import pytest
+from datetime import time, timedelta, datetime
+
+from sqlalchemy.dialects import mysql
+
+from app.db.query_registry import QueryRegistry, build_row_mapper, time_to_hhmm
+from app.services.database_query_service import SHIFT_CONFIG_QUERY, query_registry
+
+
+@pytest.fixture
+def registry():
+    return QueryRegistry()
+
+
+@pytest.fixture
+def machines_query(registry):
+    return registry.register(
+        'machines',
+        "SELECT machine_code, machine_type FROM aps_machine WHERE status = :status",
+        columns=['machine_code', 'machine_type'],
+        filters={'machine_types': "AND machine_type IN :machine_types"},
+        order_by="ORDER BY machine_code",
+        expanding=['machine_types'],
+    )
+
+
+class TestCompiledQuery:
+    """预编译查询测试"""
+
+    def test_statement_cached_per_filter_combination(self, machines_query):
+        """测试同一条件组合只编译一次"""
+        first, _ = machines_query.bind(status='ACTIVE', machine_types=['PACKING'])
+        second, _ = machines_query.bind(status='ACTIVE', machine_types=['FEEDING'])
+        base, _ = machines_query.bind(status='ACTIVE', machine_types=None)
+
+        assert first is second
+        assert base is not first
+        assert 'machine_type IN' not in str(base)
+
+    def test_bind_drops_inactive_filters(self, machines_query):
+        """测试未启用的可选条件参数不参与绑定，IN列表参数转换为列表"""
+        _, params = machines_query.bind(status='ACTIVE', machine_types=None)
+        _, expanded = machines_query.bind(status='ACTIVE', machine_types=('PACKING', 'FEEDING'))
+
+        assert params == {'status': 'ACTIVE'}
+        assert expanded['machine_types'] == ['PACKING', 'FEEDING']
+
+    def test_empty_string_filter_inactive(self, registry):
+        """测试空字符串参数（如空查询参数）与None一样不启用过滤条件"""
+        query = registry.register(
+            'plans', "SELECT work_order_nr FROM aps_decade_plan WHERE 1 = 1",
+            columns=['work_order_nr'], filters={'import_batch_id': "AND import_batch_id = :import_batch_id"},
+        )
+
+        statement, params = query.bind(import_batch_id='')
+
+        assert 'import_batch_id' not in str(statement)
+        assert params == {}
+
+    def test_expanding_in_renders_for_mysql(self, machines_query):
+        """测试IN列表按展开参数编译"""
+        statement, params = machines_query.bind(status='ACTIVE', machine_types=['PACKING', 'FEEDING'])
+        compiled = statement.bindparams(**params).compile(
+            dialect=mysql.dialect(), compile_kwargs={'render_postcompile': True}
+        )
+
+        assert 'machine_type IN (%s, %s)' in compiled.string
+        assert compiled.string.rstrip().endswith('ORDER BY machine_code')
+
+    def test_duplicate_registration_rejected(self, registry, machines_query):
+        """测试重复注册同名查询"""
+        with pytest.raises(ValueError):
+            registry.register('machines', "SELECT 1", columns=['one'])
+
+
+class TestRowMapper:
+    """行映射测试"""
+
+    def test_index_based_mapping_with_converters(self):
+        """测试按列下标映射并应用转换函数"""
+        mapper = build_row_mapper(['code', 'rate'], {'rate': float})
+
+        assert mapper(('C1', '0.85')) == {'code': 'C1', 'rate': 0.85}
+
+    def test_unknown_converter_column(self):
+        """测试转换函数引用不存在的列"""
+        with pytest.raises(ValueError):
+            build_row_mapper(['code'], {'rate': float})
+
+    def test_time_to_hhmm(self):
+        """测试TIME列的time/timedelta两种返回形式"""
+        assert time_to_hhmm(time(8, 5)) == '08:05'
+        assert time_to_hhmm(timedelta(hours=23, minutes=30)) == '23:30'
+        assert time_to_hhmm(datetime(2025, 1, 1, 16, 0)) == '16:00'
+        assert time_to_hhmm(None) is None
+
+    def test_shift_config_defaults(self):
+        """测试班次配置映射的默认值与加班时长处理"""
+        row = ('早班', None, timedelta(hours=16), None, timedelta(0))
+
+        assert SHIFT_CONFIG_QUERY.map_row(row) == {
+            'name': '早班',
+            'start_time': '08:00',
+            'end_time': '16:00',
+            'is_ot_needed': False,
+            'max_ot_duration': None
+        }
+
+    def test_service_queries_registered(self):
+        """测试数据库查询服务的查询均已注册"""
+        for name in ('decade_plans', 'work_order_schedules', 'maintenance_plans', 'shift_config',
+                     'machine_relations', 'machine_speeds', 'machines', 'materials', 'system_config'):
+            assert name in query_registry
@@ -0,0 +1,111 @@
+"""
+APS智慧排产系统 - 读写分离路由测试
+
+验证只读会话在副本可用、副本不可用、写后窗口期等场景下的路由行为
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db import connection
+
+
+@pytest.fixture
+def reset_write_marker():
+    """每个测试前后清除写入时间标记"""
+    connection._last_primary_write_at = None
+    yield
+    connection._last_primary_write_at = None
+
+
+class TestRoutingDecision:
+    """路由判定测试"""
+
+    def test_no_replica_reads_from_primary(self, reset_write_marker):
+        """测试未配置副本时读请求走主库"""
+        with patch.object(connection, 'read_engine', connection.engine):
+            assert connection.is_read_replica_enabled() is False
+            assert connection.should_read_from_primary() is True
+
+    def test_replica_used_without_recent_write(self, reset_write_marker):
+        """测试无近期写入时读请求走副本"""
+        with patch.object(connection, 'read_engine', object()):
+            assert connection.should_read_from_primary() is False
+
+    def test_read_after_write_routes_to_primary(self, reset_write_marker):
+        """测试写后窗口期内读请求走主库，窗口期后恢复副本"""
+        with patch.object(connection, 'read_engine', object()), \
+             patch.object(connection.settings, 'db_read_after_write_window', 5.0), \
+             patch.object(connection.time, 'monotonic', side_effect=[100.0, 102.0, 106.0]):
+            connection.mark_primary_write()
+            assert connection.should_read_from_primary() is True
+            assert connection.should_read_from_primary() is False
+
+    def test_commit_with_write_marks_primary(self, reset_write_marker):
+        """测试只有包含写语句的事务提交才记录写入"""
+        conn = SimpleNamespace(info={})
+
+        connection._flag_pending_write(conn, None, "SELECT * FROM aps_machine", {}, None, False)
+        connection._record_committed_write(conn)
+        assert connection._last_primary_write_at is None
+
+        connection._flag_pending_write(conn, None, "  insert into aps_machine VALUES (1)", {}, None, False)
+        connection._record_committed_write(conn)
+        assert connection._last_primary_write_at is not None
+        assert "has_pending_write" not in conn.info
+
+
+class TestReadSession:
+    """只读会话获取测试"""
+
+    @pytest.mark.asyncio
+    async def test_replica_failure_falls_back_to_primary(self, reset_write_marker):
+        """测试副本连接失败时回退到主库会话"""
+        primary_session = object()
+
+        class BrokenSession:
+            closed = False
+
+            async def connection(self):
+                raise OperationalError("SELECT 1", {}, Exception("replica down"))
+
+            async def close(self):
+                self.closed = True
+
+        broken = BrokenSession()
+
+        with patch.object(connection, 'read_engine', object()), \
+             patch.object(connection, 'AsyncReadSessionLocal', lambda: broken), \
+             patch.object(connection, 'AsyncSessionLocal', lambda: primary_session):
+            session = await connection._open_read_session()
+
+        assert session is primary_session
+        assert broken.closed is True
+
+    @pytest.mark.asyncio
+    async def test_primary_and_replica_share_local_database(self, tmp_path, reset_write_marker):
+        """测试主库与副本指向同一本地数据库时读会话可见已提交写入"""
+        pytest.importorskip("aiosqlite")
+        url = f"sqlite+aiosqlite:///{tmp_path / 'aps.db'}"
+        primary = create_async_engine(url)
+        replica = create_async_engine(url)
+
+        try:
+            async with primary.begin() as conn:
+                await conn.execute(text("CREATE TABLE aps_machine (machine_code VARCHAR(20))"))
+                await conn.execute(text("INSERT INTO aps_machine VALUES ('C1')"))
+
+            with patch.object(connection, 'read_engine', replica), \
+                 patch.object(connection, 'AsyncReadSessionLocal',
+                              async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)):
+                async with connection.get_read_db_session() as db:
+                    assert db.bind is replica
+                    result = await db.execute(text("SELECT machine_code FROM aps_machine"))
+                    assert result.scalars().all() == ['C1']
+        finally:
+            await primary.dispose()
+            await replica.dispose()
@@ -0,0 +1,106 @@
+"""
+APS智慧排产系统 - 基础配置数据缓存测试
+
+验证版本号驱动的缓存命中、跨进程失效、Redis不可用回退等行为
+"""
+import pytest
+from datetime import date, datetime
+from unittest.mock import AsyncMock, patch
+
+from app.services.reference_data_cache import ReferenceDataCache, REFERENCE_VERSION_KEY
+
+from conftest import FakeCacheManager, FakeRedis
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def no_throttle():
+    """关闭版本号读取节流，每次读取都访问Redis"""
+    with patch('app.services.reference_data_cache.settings') as mock_settings:
+        mock_settings.reference_cache_enabled = True
+        mock_settings.reference_cache_version_check_interval = 0
+        mock_settings.reference_cache_max_age = 300
+        mock_settings.reference_cache_retry_interval = 30
+        yield mock_settings
+
+
+def make_cache(redis):
+    return ReferenceDataCache(cache=FakeCacheManager(redis))
+
+
+class TestReferenceDataCache:
+    """缓存行为测试"""
+
+    @pytest.mark.asyncio
+    async def test_hit_within_same_version(self, redis, no_throttle):
+        """测试同一版本内只加载一次，且返回副本"""
+        cache = make_cache(redis)
+        loader = AsyncMock(return_value={'15': ['C1', 'C2']})
+
+        first = await cache.get_or_load('machine_relations', loader)
+        first['15'].append('C9')
+        second = await cache.get_or_load('machine_relations', loader)
+
+        assert loader.await_count == 1
+        assert second == {'15': ['C1', 'C2']}
+        assert cache.stats()['hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_version_bump_invalidates_other_processes(self, redis, no_throttle):
+        """测试一个进程递增版本号后其他进程重新加载"""
+        worker = make_cache(redis)
+        api = make_cache(redis)
+        loader = AsyncMock(side_effect=[{'v': 1}, {'v': 2}])
+
+        assert await worker.get_or_load('machine_speeds', loader) == {'v': 1}
+        assert await api.bump_version() == 1
+        assert redis.store[REFERENCE_VERSION_KEY] == '1'
+        assert await worker.get_or_load('machine_speeds', loader) == {'v': 2}
+
+    @pytest.mark.asyncio
+    async def test_redis_unavailable_falls_back_to_loader(self, redis, no_throttle):
+        """测试Redis不可用时每次直接查询数据库"""
+        redis.fail = True
+        cache = make_cache(redis)
+        loader = AsyncMock(return_value=[])
+
+        await cache.get_or_load('shift_config', loader)
+        await cache.get_or_load('shift_config', loader)
+
+        assert loader.await_count == 2
+        assert await cache.bump_version() is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_always_loads(self, redis, no_throttle):
+        """测试关闭缓存时不访问Redis"""
+        no_throttle.reference_cache_enabled = False
+        redis.fail = True
+        cache = make_cache(redis)
+        loader = AsyncMock(return_value={})
+
+        await cache.get_or_load('machine_speeds', loader)
+
+        assert loader.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_maintenance_plans_filtered_from_shared_entry(self, redis, no_throttle):
+        """测试轮保计划按日期缓存全部机台，再按机台过滤"""
+        cache = make_cache(redis)
+        plans = [
+            {'machine_code': 'C1', 'maint_start_time': datetime(2025, 10, 20, 8)},
+            {'machine_code': 'C2', 'maint_start_time': datetime(2025, 10, 21, 8)},
+        ]
+
+        with patch('app.services.reference_data_cache.DatabaseQueryService.get_maintenance_plans',
+                   AsyncMock(return_value=plans)) as loader:
+            c1 = await cache.get_maintenance_plans(['C1'], date(2025, 10, 18), date(2025, 10, 25))
+            c2 = await cache.get_maintenance_plans(['C2'], date(2025, 10, 18), date(2025, 10, 25))
+
+        assert loader.await_count == 1
+        assert loader.await_args.args == (None, date(2025, 10, 18), date(2025, 10, 25))
+        assert [plan['machine_code'] for plan in c1] == ['C1']
+        assert [plan['machine_code'] for plan in c2] == ['C2']
@@ -0,0 +1,143 @@
+"""
+APS智慧排产系统 - CSV/Parquet计划文件导入测试
+
+验证与xlsx内容相同的CSV/Parquet文件解析出相同的记录、错误和警告
+"""
+import csv
+import pytest
+import openpyxl
+from unittest.mock import patch
+
+from app.services import tabular_reader
+from app.services.excel_parser import ExcelParseError, parse_production_plan_excel
+from app.api.v1.plans import build_decade_plan_values
+from app.services.tabular_reader import detect_csv_encoding, is_tabular_file, parquet_layout_metadata
+
+HEADERS = ["包装", "规格", "喂丝机号", "卷包机号", "生产单元", "牌号", "本次投料", "本次成品", "成品生产日期"]
+
+ROWS = [
+    ["2024年10月16～31日生产作业计划表"],
+    [],
+    HEADERS,
+    ["软包", "长嘴", "14", "C1、C2", "1", "利群(软红长嘴)", "3,200", "4870", "10.16 - 10.31"],
+    [None, None, "13", "C3", None, None, None, None, None],
+    [None, "短嘴", "18", "C6", "4", "利群(软蓝)", "abc", "--", "10.16 - 10.31"],
+    ["硬包", None, "9", "A4", "5", "利群(新版)", "7200", "11600", "10.16 - 10.31"],
+    [None, None, None, None, None, None, "3200", "0", None],
+    ["合   计", None, None, None, None, None, "13600", "16470", None],
+    ["有效期限：2024.10.16～10.31"],
+]
+
+
+def _comparable(result):
+    def strip(items):
+        return [{k: v for k, v in item.items() if k != 'timestamp'} for item in items]
+    return {
+        'records': result['records'],
+        'errors': strip(result['errors']),
+        'warnings': strip(result['warnings']),
+        'extracted_year': result['extracted_year'],
+        'total_records': result['total_records'],
+        'valid_records': result['valid_records'],
+    }
+
+
+@pytest.fixture
+def xlsx_file(tmp_path):
+    file_path = tmp_path / "plan.xlsx"
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    for row in ROWS:
+        worksheet.append(row)
+    workbook.save(file_path)
+    return str(file_path)
+
+
+def _write_csv(file_path, encoding):
+    with open(file_path, 'w', newline='', encoding=encoding) as f:
+        csv.writer(f).writerows([['' if value is None else value for value in row] for row in ROWS])
+    return str(file_path)
+
+
+class TestCsvImport:
+    """CSV导入测试"""
+
+    @pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "gb18030"])
+    def test_csv_matches_xlsx(self, xlsx_file, tmp_path, encoding):
+        """测试CSV与xlsx解析结果一致（标题年份、空单元格继承、格式错误警告、跳过合计行）"""
+        csv_file = _write_csv(tmp_path / "plan.csv", encoding)
+
+        from_csv = parse_production_plan_excel(csv_file)
+        from_xlsx = parse_production_plan_excel(xlsx_file)
+
+        assert from_csv['total_records'] == 5
+        assert from_csv['extracted_year'] == 2024
+        assert from_csv['sheets_processed'] == 1
+        assert _comparable(from_csv) == _comparable(from_xlsx)
+
+    def test_detect_encoding(self, tmp_path):
+        assert detect_csv_encoding(_write_csv(tmp_path / "a.csv", "utf-8-sig")) == "utf-8-sig"
+        assert detect_csv_encoding(_write_csv(tmp_path / "b.csv", "gb18030")) == "gb18030"
+
+    def test_is_tabular_file(self):
+        assert is_tabular_file("/tmp/abc.CSV")
+        assert is_tabular_file("/tmp/abc.parquet")
+        assert not is_tabular_file("/tmp/abc.xlsx")
+
+
+class TestParquetImport:
+    """Parquet导入测试"""
+
+    @staticmethod
+    def _write_parquet(file_path, metadata=None):
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        data_rows = ROWS[3:-1]
+        table = pa.table({
+            header: [row[index] if index < len(row) else None for row in data_rows]
+            for index, header in enumerate(HEADERS)
+        })
+        if metadata is not None:
+            table = table.replace_schema_metadata(metadata)
+        pq.write_table(table, str(file_path))
+        return str(file_path)
+
+    def test_parquet_matches_xlsx(self, xlsx_file, tmp_path):
+        """测试带标题/有效期限行元数据的Parquet与xlsx解析结果一致（行号、工单号、年份、日期）"""
+        parquet_file = self._write_parquet(tmp_path / "plan.parquet", parquet_layout_metadata(ROWS[:2], ROWS[-1:]))
+
+        from_parquet = parse_production_plan_excel(parquet_file)
+        from_xlsx = parse_production_plan_excel(xlsx_file)
+
+        assert from_parquet['extracted_year'] == 2024
+        assert _comparable(from_parquet) == _comparable(from_xlsx)
+        work_order_nrs = [build_decade_plan_values('B1', record)['work_order_nr'] for record in from_parquet['records']]
+        assert work_order_nrs == [build_decade_plan_values('B1', record)['work_order_nr']
+                                  for record in from_xlsx['records']]
+
+    def test_parquet_year_from_trailing_row(self, xlsx_file, tmp_path):
+        """测试年份只在数据之后的有效期限行时也能提取"""
+        parquet_file = self._write_parquet(tmp_path / "plan.parquet", parquet_layout_metadata([], ROWS[-1:]))
+
+        result = parse_production_plan_excel(parquet_file)
+
+        assert result['extracted_year'] == 2024
+        assert result['records'][0]['row_number'] == 2
+
+    def test_parquet_without_layout_metadata(self, tmp_path):
+        """测试没有布局元数据时表头为第1行"""
+        parquet_file = self._write_parquet(tmp_path / "plan.parquet")
+
+        result = parse_production_plan_excel(parquet_file)
+
+        assert result['records'][0]['row_number'] == 2
+        assert result['total_records'] == 5
+
+    def test_parquet_without_pyarrow(self, tmp_path):
+        """测试未安装pyarrow时解析失败并提示"""
+        parquet_file = tmp_path / "plan.parquet"
+        parquet_file.write_bytes(b"PAR1")
+
+        with patch.object(tabular_reader, 'pq', None):
+            with pytest.raises(ExcelParseError, match="pyarrow"):
+                parse_production_plan_excel(str(parquet_file))
@@ -0,0 +1,74 @@
+"""
+APS智慧排产系统 - 上传请求体大小限制中间件测试
+
+验证声明长度超限时不读取请求体直接返回413、分块传输时读取过程中中止，以及非multipart请求不受限制
+"""
+import pytest
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.upload_limit import UploadSizeLimitMiddleware
+
+BOUNDARY = "aps-boundary"
+
+
+def multipart_body(content: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"plan.xlsx\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_body_size=1024)
+    app.state.handled = 0
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.handled += 1
+        return {"size": len(await file.read())}
+
+    @app.post("/json")
+    async def json_body(request: Request):
+        return {"size": len(await request.body())}
+
+    return TestClient(app)
+
+
+def chunks(data: bytes, size: int = 256):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+class TestUploadSizeLimit:
+    """上传请求体大小限制测试"""
+
+    def test_within_limit_passes(self, client):
+        response = client.post("/upload", files={"file": ("plan.xlsx", b"x" * 512)})
+
+        assert response.status_code == 200
+        assert response.json() == {"size": 512}
+
+    def test_declared_length_rejected_before_handler(self, client):
+        response = client.post("/upload", files={"file": ("plan.xlsx", b"x" * 2048)})
+
+        assert response.status_code == 413
+        assert "上传请求体超过限制" in response.json()["detail"]
+        assert client.app.state.handled == 0
+
+    def test_chunked_upload_aborted_while_reading(self, client):
+        """测试未声明长度的分块上传在累计超过限制时中止"""
+        response = client.post(
+            "/upload", content=chunks(multipart_body(b"x" * 4096)),
+            headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+        )
+
+        assert response.status_code == 413
+        assert client.app.state.handled == 0
+
+    def test_non_multipart_not_limited(self, client):
+        response = client.post("/json", content=b"x" * 4096, headers={"Content-Type": "application/json"})
+
+        assert response.status_code == 200
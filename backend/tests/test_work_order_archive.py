@@ -0,0 +1,128 @@
+"""
+APS智慧排产系统 - 工单归档服务测试
+
+验证归档分区生成、任务迁移语句顺序以及查询表选择
+"""
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.services.work_order_archive_service import (
+    ARCHIVE_TABLES,
+    WorkOrderArchiveService,
+    missing_month_partitions,
+    month_partitions,
+)
+
+from conftest import FakeResult, FakeSession, make_session_factory
+
+
+class TestMonthPartitions:
+    """月度分区定义测试"""
+
+    def test_month_partitions_cross_year(self):
+        """测试跨年的分区名和上界"""
+        partitions = month_partitions(date(2026, 11, 18), 3)
+
+        assert partitions == [
+            ('p202611', '2026-12-01'),
+            ('p202612', '2027-01-01'),
+            ('p202701', '2027-02-01'),
+        ]
+
+    def test_missing_month_partitions_fills_skipped_months(self):
+        """测试归档作业停运数月后从最后一个月度分区起连续补齐，不跳过中间月份"""
+        existing = ['p_history', 'p202605', 'p202604', 'pmax']
+
+        missing = missing_month_partitions(existing, date(2026, 10, 18), 2)
+
+        assert [name for name, _ in missing] == [f'p2026{month:02d}' for month in range(6, 12)]
+        assert missing[0] == ('p202606', '2026-07-01')
+        assert missing_month_partitions(existing + ['p202612'], date(2026, 10, 18), 2) == []
+
+
+class TestArchiveTask:
+    """任务迁移测试"""
+
+    @pytest.mark.asyncio
+    async def test_archive_task_moves_tables_in_fk_order(self):
+        """测试先归档卷包机工单再归档喂丝机工单，且每表先复制后删除"""
+        session = FakeSession(lambda sql, params: FakeResult(rowcount=2))
+
+        with patch('app.services.work_order_archive_service.get_db_session', make_session_factory(session)):
+            moved = await WorkOrderArchiveService.archive_task('TASK_1')
+
+        statements = [sql for sql, _ in session.executed]
+        assert len(statements) == len(ARCHIVE_TABLES) * 2
+        assert statements[0].startswith('INSERT INTO aps_packing_order_archive')
+        assert statements[1].startswith('DELETE FROM aps_packing_order')
+        assert statements[2].startswith('INSERT INTO aps_feeding_order_archive')
+        assert all(params == {'task_id': 'TASK_1'} for _, params in session.executed)
+        assert moved == {hot: 2 for hot, _, _ in ARCHIVE_TABLES}
+
+    @pytest.mark.asyncio
+    async def test_ensure_archive_partitions_adds_missing_only(self):
+        """测试只为缺失的月份拆分pmax分区"""
+        def responder(sql, params):
+            if 'information_schema.PARTITIONS' in sql:
+                return FakeResult([SimpleNamespace(PARTITION_NAME='p202610'), SimpleNamespace(PARTITION_NAME='pmax')])
+            return FakeResult()
+
+        session = FakeSession(responder)
+
+        with patch('app.services.work_order_archive_service.get_autocommit_connection', make_session_factory(session)):
+            added = await WorkOrderArchiveService.ensure_archive_partitions(months_ahead=2, today=date(2026, 10, 18))
+
+        assert added == {archive: ['p202611'] for _, archive, _ in ARCHIVE_TABLES}
+        alters = [sql for sql, _ in session.executed if sql.startswith('ALTER TABLE')]
+        assert len(alters) == len(ARCHIVE_TABLES)
+        assert "PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01'))" in alters[0]
+        assert alters[0].endswith('PARTITION pmax VALUES LESS THAN MAXVALUE)')
+
+
+class TestTableSelection:
+    """查询表选择测试"""
+
+    @pytest.mark.asyncio
+    async def test_resolve_task_table_disabled(self):
+        """测试未启用归档时始终使用热表"""
+        with patch('app.services.work_order_archive_service.settings') as mock_settings:
+            mock_settings.work_order_archive_enabled = False
+            table = await WorkOrderArchiveService.resolve_task_table('aps_feeding_order', 'TASK_1')
+
+        assert table == 'aps_feeding_order'
+
+    @pytest.mark.asyncio
+    async def test_resolve_task_table_archived(self):
+        """测试热表中无任务数据时使用归档表"""
+        session = FakeSession(lambda sql, params: FakeResult())
+
+        with patch('app.services.work_order_archive_service.settings') as mock_settings, \
+             patch('app.services.work_order_archive_service.get_read_db_session', make_session_factory(session)):
+            mock_settings.work_order_archive_enabled = True
+            table = await WorkOrderArchiveService.resolve_task_table('aps_feeding_order', 'TASK_1')
+
+        assert table == 'aps_feeding_order_archive'
+
+    @pytest.mark.asyncio
+    async def test_resolve_task_table_uses_given_session(self):
+        """测试传入会话时在该会话中检查热表（可见本事务中尚未提交的工单）"""
+        session = FakeSession(lambda sql, params: FakeResult(rows=[(1,)]))
+        read_session = MagicMock(side_effect=AssertionError("不应打开只读会话"))
+
+        with patch('app.services.work_order_archive_service.settings') as mock_settings, \
+             patch('app.services.work_order_archive_service.get_read_db_session', read_session):
+            mock_settings.work_order_archive_enabled = True
+            table = await WorkOrderArchiveService.resolve_task_table('aps_feeding_order', 'TASK_1', session)
+
+        assert table == 'aps_feeding_order'
+
+    def test_date_range_tables(self):
+        """测试按时间范围查询默认只扫描热表"""
+        with patch('app.services.work_order_archive_service.settings') as mock_settings:
+            mock_settings.work_order_archive_enabled = True
+            assert WorkOrderArchiveService.date_range_tables('aps_packing_order') == ['aps_packing_order']
+            assert WorkOrderArchiveService.date_range_tables('aps_packing_order', include_archive=True) == [
+                'aps_packing_order', 'aps_packing_order_archive'
+            ]
@@ -0,0 +1,135 @@
+"""
+APS智慧排产系统 - 甘特图工单响应缓存测试
+
+验证 GET /work-orders 的响应缓存、ETag/304 以及排产提交后的失效
+"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+
+from app.main import app
+from app.services.reference_data_cache import VersionedCache
+from app.services.work_order_cache import (
+    WORK_ORDER_VERSION_KEY, build_etag, etag_epoch, etag_matches, work_order_cache_key
+)
+
+from conftest import FakeCacheManager, FakeRedis, FakeSession, make_session_factory
+
+
+@pytest.fixture
+def cache():
+    return VersionedCache(WORK_ORDER_VERSION_KEY, FakeCacheManager(FakeRedis()), enabled_setting="work_order_cache_enabled")
+
+
+@pytest.fixture
+def client(cache):
+    payload = {"code": 200, "message": "ok", "data": {"work_orders": [{"work_order_nr": "W0001"}]}}
+    loader = AsyncMock(return_value=json.dumps(payload).encode("utf-8"))
+    read_session = make_session_factory(FakeSession())
+    with patch('app.api.v1.work_orders.work_order_cache', cache), \
+         patch('app.api.v1.work_orders._load_work_orders_payload', loader), \
+         patch('app.api.v1.work_orders.is_read_replica_enabled', return_value=False), \
+         patch('app.api.v1.work_orders.get_read_db_session', read_session), \
+         patch('app.services.reference_data_cache.settings.reference_cache_version_check_interval', 0):
+        test_client = TestClient(app)
+        test_client.loader = loader
+        test_client.read_session = read_session
+        yield test_client
+
+
+class TestEtagHelpers:
+    """ETag辅助函数测试"""
+
+    def test_cache_key_ignores_parameter_order(self):
+        assert work_order_cache_key({'a': 1, 'b': None}) == work_order_cache_key({'b': None, 'a': 1})
+
+    def test_etag_matches_lists_and_weak_prefix(self):
+        etag = build_etag(3, 'abcdef0123456789ffff', epoch=7)
+        assert etag == '"wo-3.7-abcdef0123456789"'
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches('*', etag)
+        assert not etag_matches('"wo-2.7-abcdef0123456789"', etag)
+        assert not etag_matches(None, etag)
+
+
+class TestWorkOrdersEndpointCache:
+    """GET /work-orders 缓存测试"""
+
+    def test_repeat_load_served_from_cache(self, client):
+        """测试相同参数重复请求只查询一次数据库"""
+        first = client.get("/api/v1/work-orders", params={"task_id": "T1", "page_size": 2000})
+        second = client.get("/api/v1/work-orders", params={"page_size": 2000, "task_id": "T1"})
+
+        assert first.status_code == second.status_code == 200
+        assert first.json()["data"]["work_orders"][0]["work_order_nr"] == "W0001"
+        assert first.headers["etag"] == second.headers["etag"]
+        assert client.loader.await_count == 1
+        # 缓存命中不打开数据库会话
+        assert client.read_session.opened == 1
+
+    def test_if_none_match_returns_304(self, client):
+        """测试ETag匹配时返回304"""
+        etag = client.get("/api/v1/work-orders").headers["etag"]
+
+        response = client.get("/api/v1/work-orders", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert client.loader.await_count == 1
+        assert client.read_session.opened == 1
+
+    def test_replica_fill_uses_single_primary_session(self, client):
+        """测试配置只读副本时缓存填充只打开一个主库会话，不再占用只读会话"""
+        primary_session = make_session_factory(FakeSession())
+        with patch('app.api.v1.work_orders.is_read_replica_enabled', return_value=True), \
+             patch('app.api.v1.work_orders.get_db_session', primary_session):
+            etag = client.get("/api/v1/work-orders").headers["etag"]
+            response = client.get("/api/v1/work-orders", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert primary_session.opened == 1
+        assert client.read_session.opened == 0
+
+    def test_different_filters_cached_separately(self, client):
+        """测试不同查询参数使用不同缓存项和ETag"""
+        first = client.get("/api/v1/work-orders", params={"page": 1})
+        second = client.get("/api/v1/work-orders", params={"page": 2})
+
+        assert first.headers["etag"] != second.headers["etag"]
+        assert client.loader.await_count == 2
+
+    def test_invalidation_changes_etag(self, client, cache):
+        """测试排产任务提交后版本号递增，旧ETag不再匹配"""
+        etag = client.get("/api/v1/work-orders").headers["etag"]
+
+        with patch('app.services.work_order_cache.work_order_cache', cache):
+            from app.services.work_order_cache import invalidate_work_order_cache
+            import asyncio
+            asyncio.run(invalidate_work_order_cache())
+
+        response = client.get("/api/v1/work-orders", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert client.loader.await_count == 2
+
+    def test_etag_expires_with_max_age_when_bump_fails(self, client, cache):
+        """测试版本号递增失败（版本号不变）时，超过缓存最长有效期后旧ETag不再匹配"""
+        etag = client.get("/api/v1/work-orders").headers["etag"]
+        later = etag_epoch(cache.max_age) + 1
+
+        with patch('app.api.v1.work_orders.etag_epoch', return_value=later):
+            response = client.get("/api/v1/work-orders", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_cache_disabled_still_validates_by_content(self, client):
+        """测试关闭缓存时按响应体计算ETag，每次查询数据库"""
+        with patch('app.services.reference_data_cache.settings.work_order_cache_enabled', False):
+            etag = client.get("/api/v1/work-orders").headers["etag"]
+            response = client.get("/api/v1/work-orders", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert client.loader.await_count == 2
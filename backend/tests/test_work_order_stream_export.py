@@ -0,0 +1,118 @@
+"""
+APS智慧排产系统 - 工单流式导出测试
+
+验证NDJSON/CSV编码、数据集分派、按需从游标取批（背压），以及 GET /work-orders/export/{dataset} 接口
+"""
+import codecs
+import csv
+import io
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import work_order_stream_export
+from app.services.work_order_stream_export import encode_csv, encode_ndjson, export_stream, stream_dataset
+
+
+def schedule_batches(batch_count, batch_size=3, pulled=None):
+    async def batches():
+        for batch_index in range(batch_count):
+            if pulled is not None:
+                pulled.append(batch_index)
+            yield [{
+                "work_order_nr": f"W{batch_index * batch_size + index:04d}",
+                "article_nr": "利群(软红长嘴)",
+                "planned_start": datetime(2024, 10, 16, 8),
+                "is_backup": index == 0,
+                "backup_reason": None,
+            } for index in range(batch_size)]
+    return batches()
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_one_chunk_per_batch():
+    chunks = await collect(encode_ndjson(schedule_batches(2)))
+
+    assert len(chunks) == 2
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    assert len(lines) == 6
+    assert json.loads(lines[0]) == {
+        "work_order_nr": "W0000", "article_nr": "利群(软红长嘴)",
+        "planned_start": "2024-10-16T08:00:00", "is_backup": True, "backup_reason": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_csv_header_and_bom_only_in_first_chunk():
+    chunks = await collect(encode_csv(schedule_batches(2)))
+
+    assert chunks[0].startswith(codecs.BOM_UTF8)
+    assert not chunks[1].startswith(codecs.BOM_UTF8)
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+    assert rows[0] == ["work_order_nr", "article_nr", "planned_start", "is_backup", "backup_reason"]
+    assert rows[1] == ["W0000", "利群(软红长嘴)", "2024-10-16T08:00:00", "true", ""]
+    assert len(rows) == 7
+
+
+@pytest.mark.asyncio
+async def test_export_pulls_batches_on_demand():
+    """测试每输出一块才从游标取下一批"""
+    pulled = []
+    stream = export_stream(schedule_batches(100, pulled=pulled), "ndjson", "schedules")
+
+    await stream.__anext__()
+    await stream.__anext__()
+    assert pulled == [0, 1]
+    await stream.aclose()
+
+
+class TestStreamDataset:
+    """数据集分派测试"""
+
+    def test_packing_orders_by_task_or_date(self):
+        with patch('app.services.work_order_stream_export.MESDataExportService') as service_class:
+            service = service_class.return_value
+            stream_dataset("packing-orders", task_id="T1")
+            service.stream_packing_orders_by_task.assert_called_once_with("T1", None)
+
+            start, end = datetime(2024, 10, 1), datetime(2024, 10, 31)
+            stream_dataset("packing-orders", start_date=start, end_date=end, include_archive=True)
+            service.stream_packing_orders_by_date_range.assert_called_once_with(start, end, None, include_archive=True)
+
+    def test_order_export_requires_filter(self):
+        with pytest.raises(ValueError):
+            stream_dataset("feeding-orders")
+        with pytest.raises(ValueError):
+            stream_dataset("machines")
+
+
+class TestExportEndpoint:
+    """GET /work-orders/export/{dataset} 接口测试"""
+
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+
+    def test_streams_schedules_as_csv(self, client):
+        with patch.object(work_order_stream_export.DatabaseQueryService, 'stream_work_order_schedules',
+                          return_value=schedule_batches(4)) as stream:
+            response = client.get("/api/v1/work-orders/export/schedules", params={"format": "csv", "task_id": "T1"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="schedules_T1.csv"' in response.headers["content-disposition"]
+        assert len(response.content.decode("utf-8-sig").splitlines()) == 1 + 12
+        assert stream.call_args.kwargs["task_id"] == "T1"
+
+    def test_invalid_requests_rejected_before_streaming(self, client):
+        assert client.get("/api/v1/work-orders/export/machines").status_code == 404
+        assert client.get("/api/v1/work-orders/export/schedules", params={"format": "xlsx"}).status_code == 400
+        assert client.get("/api/v1/work-orders/export/feeding-orders").status_code == 400
@@ -126,6 +126,7 @@ CREATE TABLE `aps_import_plan` (
   `file_name` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL COMMENT '文件名',
   `file_path` varchar(500) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci DEFAULT NULL COMMENT '文件路径',
   `file_size` bigint DEFAULT NULL COMMENT '文件大小（字节）',
+  `content_hash` char(64) CHARACTER SET ascii COLLATE ascii_bin DEFAULT NULL COMMENT '文件内容SHA-256',
   `total_records` int DEFAULT '0' COMMENT '总记录数',
   `valid_records` int DEFAULT '0' COMMENT '有效记录数',
   `error_records` int DEFAULT '0' COMMENT '错误记录数',
@@ -139,6 +140,7 @@ CREATE TABLE `aps_import_plan` (
   PRIMARY KEY (`id`) USING BTREE,
   UNIQUE KEY `uk_import_batch` (`import_batch_id`) USING BTREE,
   KEY `idx_import_status` (`import_status`) USING BTREE,
+  KEY `idx_content_hash` (`content_hash`) USING BTREE,
   KEY `idx_created_time` (`created_time`) USING BTREE
 ) ENGINE=InnoDB AUTO_INCREMENT=81 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='计划导入记录表';
 
@@ -321,7 +323,8 @@ CREATE TABLE `aps_mes_dispatch` (
   KEY `idx_work_order` (`work_order_nr`) USING BTREE,
   KEY `idx_dispatch_status` (`dispatch_status`) USING BTREE,
   KEY `idx_order_type` (`order_type`) USING BTREE,
-  KEY `idx_dispatch_time` (`dispatch_time`) USING BTREE
+  KEY `idx_dispatch_time` (`dispatch_time`) USING BTREE,
+  KEY `idx_status_next_retry` (`dispatch_status`,`next_retry_time`) USING BTREE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='MES工单下发记录表';
 
 -- ----------------------------
@@ -560,7 +563,9 @@ CREATE TABLE `aps_work_order_schedule` (
   PRIMARY KEY (`id`) USING BTREE,
   KEY `idx_work_order_nr` (`work_order_nr`) USING BTREE,
   KEY `idx_task_id` (`task_id`) USING BTREE,
-  KEY `idx_planned_time` (`planned_start`,`planned_end`) USING BTREE
+  KEY `idx_planned_time` (`planned_start`,`planned_end`) USING BTREE,
+  KEY `idx_maker_time` (`maker_code`,`planned_start`) USING BTREE,
+  KEY `idx_feeder_time` (`feeder_code`,`planned_start`) USING BTREE
 ) ENGINE=InnoDB AUTO_INCREMENT=1764 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='工单机台排程表';
 
 -- ----------------------------
@@ -0,0 +1,17 @@
+/*
+ APS智慧排产系统 - 工单机台排程表增加机台+开始时间索引
+
+ 视口甘特图接口（GET /api/v1/work-orders/gantt）按机台集合和时间窗口查询排程，
+ (maker_code, planned_start) / (feeder_code, planned_start) 索引使 OR 条件可走
+ index_merge，只扫描所选机台在窗口附近的排程。已有库执行一次本脚本即可，
+ 新库使用 database-schema.sql 建表时已包含该索引。
+
+ Target Server Type    : MySQL
+ Target Server Version : 80036 (8.0.36)
+*/
+
+SET NAMES utf8mb4;
+
+ALTER TABLE `aps_work_order_schedule`
+  ADD KEY `idx_maker_time` (`maker_code`,`planned_start`) USING BTREE,
+  ADD KEY `idx_feeder_time` (`feeder_code`,`planned_start`) USING BTREE;
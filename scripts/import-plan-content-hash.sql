@@ -0,0 +1,16 @@
+/*
+ APS智慧排产系统 - 计划导入记录增加文件内容哈希
+
+ 上传时边读取边计算SHA-256，相同内容的文件只保存一份并复用已缓存的解析结果
+ （见 app/services/parse_result_cache.py）。已有库执行一次本脚本即可，
+ 新库使用 database-schema.sql 建表时已包含该列。
+
+ Target Server Type    : MySQL
+ Target Server Version : 80036 (8.0.36)
+*/
+
+SET NAMES utf8mb4;
+
+ALTER TABLE `aps_import_plan`
+  ADD COLUMN `content_hash` char(64) CHARACTER SET ascii COLLATE ascii_bin DEFAULT NULL COMMENT '文件内容SHA-256' AFTER `file_size`,
+  ADD KEY `idx_content_hash` (`content_hash`) USING BTREE;
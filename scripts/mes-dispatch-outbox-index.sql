@@ -0,0 +1,17 @@
+/*
+ APS智慧排产系统 - MES工单下发记录表增加分发索引
+
+ aps_mes_dispatch 作为工单推送发件箱：排产任务在写入工单的同一事务中写入下发记录，
+ 后台分发器（MESOutboxDispatcher）按 dispatch_status IN ('PENDING','DISPATCHED')
+ AND next_retry_time <= NOW() 领取待下发记录（FOR UPDATE SKIP LOCKED），
+ (dispatch_status, next_retry_time) 索引使领取只扫描到期的记录，不随已确认记录增长。
+ 已有库执行一次本脚本即可，新库使用 database-schema.sql 建表时已包含该索引。
+
+ Target Server Type    : MySQL
+ Target Server Version : 80036 (8.0.36)
+*/
+
+SET NAMES utf8mb4;
+
+ALTER TABLE `aps_mes_dispatch`
+  ADD KEY `idx_status_next_retry` (`dispatch_status`,`next_retry_time`) USING BTREE;
@@ -0,0 +1,183 @@
+/*
+ APS智慧排产系统 - 工单热/归档表分离
+
+ aps_feeding_order / aps_packing_order / aps_work_order_schedule / aps_processing_log
+ 热表只保留每个导入批次最新排产任务的数据，被新任务取代的旧任务数据由归档作业
+ （WorkOrderArchiveService）整体迁移到对应的 *_archive 表。
+
+ 热表存在外键约束，MySQL分区表不支持外键，因此热表保持不分区；
+ 归档表不带外键，按计划开始时间做月度RANGE分区，按时间范围查询历史时只扫描相关分区。
+ 归档作业运行时会自动为后续月份追加分区（REORGANIZE PARTITION pmax）。
+
+ 归档表列顺序 = 热表列 + archived_time，归档使用 INSERT ... SELECT hot.*, NOW()
+ 本脚本只需在热表结构确定后执行一次，并设置 APS_WORK_ORDER_ARCHIVE_ENABLED=true
+
+ Target Server Type    : MySQL
+ Target Server Version : 80036 (8.0.36)
+*/
+
+SET NAMES utf8mb4;
+
+-- ----------------------------
+-- Archive table for aps_feeding_order
+-- ----------------------------
+CREATE TABLE IF NOT EXISTS `aps_feeding_order_archive` LIKE `aps_feeding_order`;
+ALTER TABLE `aps_feeding_order_archive`
+  MODIFY `id` bigint NOT NULL COMMENT '主键ID（沿用热表ID）',
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `plan_start_time`) USING BTREE,
+  DROP INDEX `plan_id`,
+  ADD KEY `idx_plan_id` (`plan_id`) USING BTREE,
+  ADD COLUMN `archived_time` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '归档时间',
+  COMMENT = '喂丝机工单归档表';
+ALTER TABLE `aps_feeding_order_archive`
+PARTITION BY RANGE (TO_DAYS(`plan_start_time`)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+  PARTITION p202501 VALUES LESS THAN (TO_DAYS('2025-02-01')),
+  PARTITION p202502 VALUES LESS THAN (TO_DAYS('2025-03-01')),
+  PARTITION p202503 VALUES LESS THAN (TO_DAYS('2025-04-01')),
+  PARTITION p202504 VALUES LESS THAN (TO_DAYS('2025-05-01')),
+  PARTITION p202505 VALUES LESS THAN (TO_DAYS('2025-06-01')),
+  PARTITION p202506 VALUES LESS THAN (TO_DAYS('2025-07-01')),
+  PARTITION p202507 VALUES LESS THAN (TO_DAYS('2025-08-01')),
+  PARTITION p202508 VALUES LESS THAN (TO_DAYS('2025-09-01')),
+  PARTITION p202509 VALUES LESS THAN (TO_DAYS('2025-10-01')),
+  PARTITION p202510 VALUES LESS THAN (TO_DAYS('2025-11-01')),
+  PARTITION p202511 VALUES LESS THAN (TO_DAYS('2025-12-01')),
+  PARTITION p202512 VALUES LESS THAN (TO_DAYS('2026-01-01')),
+  PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')),
+  PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01')),
+  PARTITION p202603 VALUES LESS THAN (TO_DAYS('2026-04-01')),
+  PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')),
+  PARTITION p202605 VALUES LESS THAN (TO_DAYS('2026-06-01')),
+  PARTITION p202606 VALUES LESS THAN (TO_DAYS('2026-07-01')),
+  PARTITION p202607 VALUES LESS THAN (TO_DAYS('2026-08-01')),
+  PARTITION p202608 VALUES LESS THAN (TO_DAYS('2026-09-01')),
+  PARTITION p202609 VALUES LESS THAN (TO_DAYS('2026-10-01')),
+  PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+  PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')),
+  PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- ----------------------------
+-- Archive table for aps_packing_order
+-- ----------------------------
+CREATE TABLE IF NOT EXISTS `aps_packing_order_archive` LIKE `aps_packing_order`;
+ALTER TABLE `aps_packing_order_archive`
+  MODIFY `id` bigint NOT NULL COMMENT '主键ID（沿用热表ID）',
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `plan_start_time`) USING BTREE,
+  DROP INDEX `uk_plan_id`,
+  ADD KEY `idx_plan_id` (`plan_id`) USING BTREE,
+  ADD COLUMN `archived_time` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '归档时间',
+  COMMENT = '卷包机工单归档表';
+ALTER TABLE `aps_packing_order_archive`
+PARTITION BY RANGE (TO_DAYS(`plan_start_time`)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+  PARTITION p202501 VALUES LESS THAN (TO_DAYS('2025-02-01')),
+  PARTITION p202502 VALUES LESS THAN (TO_DAYS('2025-03-01')),
+  PARTITION p202503 VALUES LESS THAN (TO_DAYS('2025-04-01')),
+  PARTITION p202504 VALUES LESS THAN (TO_DAYS('2025-05-01')),
+  PARTITION p202505 VALUES LESS THAN (TO_DAYS('2025-06-01')),
+  PARTITION p202506 VALUES LESS THAN (TO_DAYS('2025-07-01')),
+  PARTITION p202507 VALUES LESS THAN (TO_DAYS('2025-08-01')),
+  PARTITION p202508 VALUES LESS THAN (TO_DAYS('2025-09-01')),
+  PARTITION p202509 VALUES LESS THAN (TO_DAYS('2025-10-01')),
+  PARTITION p202510 VALUES LESS THAN (TO_DAYS('2025-11-01')),
+  PARTITION p202511 VALUES LESS THAN (TO_DAYS('2025-12-01')),
+  PARTITION p202512 VALUES LESS THAN (TO_DAYS('2026-01-01')),
+  PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')),
+  PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01')),
+  PARTITION p202603 VALUES LESS THAN (TO_DAYS('2026-04-01')),
+  PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')),
+  PARTITION p202605 VALUES LESS THAN (TO_DAYS('2026-06-01')),
+  PARTITION p202606 VALUES LESS THAN (TO_DAYS('2026-07-01')),
+  PARTITION p202607 VALUES LESS THAN (TO_DAYS('2026-08-01')),
+  PARTITION p202608 VALUES LESS THAN (TO_DAYS('2026-09-01')),
+  PARTITION p202609 VALUES LESS THAN (TO_DAYS('2026-10-01')),
+  PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+  PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')),
+  PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- ----------------------------
+-- Archive table for aps_work_order_schedule
+-- ----------------------------
+CREATE TABLE IF NOT EXISTS `aps_work_order_schedule_archive` LIKE `aps_work_order_schedule`;
+ALTER TABLE `aps_work_order_schedule_archive`
+  MODIFY `id` bigint NOT NULL COMMENT '主键ID（沿用热表ID）',
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `planned_start`) USING BTREE,
+  ADD COLUMN `archived_time` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '归档时间',
+  COMMENT = '工单机台排程归档表';
+ALTER TABLE `aps_work_order_schedule_archive`
+PARTITION BY RANGE (TO_DAYS(`planned_start`)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+  PARTITION p202501 VALUES LESS THAN (TO_DAYS('2025-02-01')),
+  PARTITION p202502 VALUES LESS THAN (TO_DAYS('2025-03-01')),
+  PARTITION p202503 VALUES LESS THAN (TO_DAYS('2025-04-01')),
+  PARTITION p202504 VALUES LESS THAN (TO_DAYS('2025-05-01')),
+  PARTITION p202505 VALUES LESS THAN (TO_DAYS('2025-06-01')),
+  PARTITION p202506 VALUES LESS THAN (TO_DAYS('2025-07-01')),
+  PARTITION p202507 VALUES LESS THAN (TO_DAYS('2025-08-01')),
+  PARTITION p202508 VALUES LESS THAN (TO_DAYS('2025-09-01')),
+  PARTITION p202509 VALUES LESS THAN (TO_DAYS('2025-10-01')),
+  PARTITION p202510 VALUES LESS THAN (TO_DAYS('2025-11-01')),
+  PARTITION p202511 VALUES LESS THAN (TO_DAYS('2025-12-01')),
+  PARTITION p202512 VALUES LESS THAN (TO_DAYS('2026-01-01')),
+  PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')),
+  PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01')),
+  PARTITION p202603 VALUES LESS THAN (TO_DAYS('2026-04-01')),
+  PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')),
+  PARTITION p202605 VALUES LESS THAN (TO_DAYS('2026-06-01')),
+  PARTITION p202606 VALUES LESS THAN (TO_DAYS('2026-07-01')),
+  PARTITION p202607 VALUES LESS THAN (TO_DAYS('2026-08-01')),
+  PARTITION p202608 VALUES LESS THAN (TO_DAYS('2026-09-01')),
+  PARTITION p202609 VALUES LESS THAN (TO_DAYS('2026-10-01')),
+  PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+  PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')),
+  PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- ----------------------------
+-- Archive table for aps_processing_log
+-- ----------------------------
+CREATE TABLE IF NOT EXISTS `aps_processing_log_archive` LIKE `aps_processing_log`;
+ALTER TABLE `aps_processing_log_archive`
+  MODIFY `id` bigint NOT NULL COMMENT '主键ID（沿用热表ID）',
+  DROP PRIMARY KEY,
+  ADD PRIMARY KEY (`id`, `execution_time`) USING BTREE,
+  ADD COLUMN `archived_time` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '归档时间',
+  COMMENT = '排产处理日志归档表';
+ALTER TABLE `aps_processing_log_archive`
+PARTITION BY RANGE (TO_DAYS(`execution_time`)) (
+  PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+  PARTITION p202501 VALUES LESS THAN (TO_DAYS('2025-02-01')),
+  PARTITION p202502 VALUES LESS THAN (TO_DAYS('2025-03-01')),
+  PARTITION p202503 VALUES LESS THAN (TO_DAYS('2025-04-01')),
+  PARTITION p202504 VALUES LESS THAN (TO_DAYS('2025-05-01')),
+  PARTITION p202505 VALUES LESS THAN (TO_DAYS('2025-06-01')),
+  PARTITION p202506 VALUES LESS THAN (TO_DAYS('2025-07-01')),
+  PARTITION p202507 VALUES LESS THAN (TO_DAYS('2025-08-01')),
+  PARTITION p202508 VALUES LESS THAN (TO_DAYS('2025-09-01')),
+  PARTITION p202509 VALUES LESS THAN (TO_DAYS('2025-10-01')),
+  PARTITION p202510 VALUES LESS THAN (TO_DAYS('2025-11-01')),
+  PARTITION p202511 VALUES LESS THAN (TO_DAYS('2025-12-01')),
+  PARTITION p202512 VALUES LESS THAN (TO_DAYS('2026-01-01')),
+  PARTITION p202601 VALUES LESS THAN (TO_DAYS('2026-02-01')),
+  PARTITION p202602 VALUES LESS THAN (TO_DAYS('2026-03-01')),
+  PARTITION p202603 VALUES LESS THAN (TO_DAYS('2026-04-01')),
+  PARTITION p202604 VALUES LESS THAN (TO_DAYS('2026-05-01')),
+  PARTITION p202605 VALUES LESS THAN (TO_DAYS('2026-06-01')),
+  PARTITION p202606 VALUES LESS THAN (TO_DAYS('2026-07-01')),
+  PARTITION p202607 VALUES LESS THAN (TO_DAYS('2026-08-01')),
+  PARTITION p202608 VALUES LESS THAN (TO_DAYS('2026-09-01')),
+  PARTITION p202609 VALUES LESS THAN (TO_DAYS('2026-10-01')),
+  PARTITION p202610 VALUES LESS THAN (TO_DAYS('2026-11-01')),
+  PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')),
+  PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')),
+  PARTITION pmax VALUES LESS THAN MAXVALUE
+);